@@ -3,11 +3,13 @@ import os
 
 import graphene
 from flask import Blueprint
-from flask_graphql import GraphQLView
 
 from gtmcore.configuration import Configuration
+from gtmcore.locking import describe_lock_metrics
+from gtmcore.metrics import MetricsRegistry, SamplingProfiler, install_process_counters
 from lmsrvcore.middleware import AuthorizationMiddleware, DataloaderMiddleware, time_all_resolvers_middleware, \
-    error_middleware, RepositoryCacheMiddleware
+    error_middleware, RepositoryCacheMiddleware, ResolverMetricsMiddleware, MetricsGraphQLView, \
+    operation_name_middleware
 from lmsrvlabbook.api import LabbookQuery, LabbookMutations
 
 
@@ -30,13 +32,27 @@ if config.is_hub_client:
 else:
     api_target = config.config["proxy"]["labmanager_api_prefix"]
 
+middleware = [error_middleware, RepositoryCacheMiddleware(), DataloaderMiddleware(), AuthorizationMiddleware()]
+
+# Record resolver and operation latencies, git and Redis use, and lock contention, for the metrics endpoint
+metrics_registry = MetricsRegistry.get_instance(config)
+if metrics_registry:
+    install_process_counters(metrics_registry)
+    MetricsGraphQLView.describe_metrics(metrics_registry)
+    describe_lock_metrics(metrics_registry, config)
+    middleware.append(ResolverMetricsMiddleware(metrics_registry))
+
+# Profile slow operations if enabled
+profiler = SamplingProfiler.get_instance(config)
+if metrics_registry or profiler:
+    middleware.append(operation_name_middleware)
+
 complete_labbook_service.add_url_rule(f'{api_target}/labbook/',
-                                      view_func=GraphQLView.as_view('graphql', schema=full_schema,
-                                                                    graphiql=config.config["flask"]["DEBUG"],
-                                                                    middleware=[error_middleware,
-                                                                                RepositoryCacheMiddleware(),
-                                                                                DataloaderMiddleware(),
-                                                                                AuthorizationMiddleware()]),
+                                      view_func=MetricsGraphQLView.as_view('graphql', schema=full_schema,
+                                                                           graphiql=config.config["flask"]["DEBUG"],
+                                                                           middleware=middleware,
+                                                                           metrics_registry=metrics_registry,
+                                                                           profiler=profiler),
                                       methods=['GET', 'POST', 'OPTION'])
 
 
@@ -1,5 +1,6 @@
 from lmsrvcore.middleware.authorization import AuthorizationMiddleware
 from lmsrvcore.middleware.dataloader import DataloaderMiddleware
 from lmsrvcore.middleware.error import error_middleware
-from lmsrvcore.middleware.metric import time_all_resolvers_middleware
+from lmsrvcore.middleware.metric import time_all_resolvers_middleware, ResolverMetricsMiddleware, MetricsGraphQLView, \
+    operation_name_middleware
 from lmsrvcore.middleware.cache import RepositoryCacheMiddleware
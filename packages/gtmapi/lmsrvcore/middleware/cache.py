@@ -2,6 +2,7 @@ from typing import Dict, Tuple
 from itertools import product
 
 from gtmcore.logging import LMLogger
+from gtmcore.inventory.inventory import InventoryManager
 from lmsrvcore.auth.user import get_logged_in_username
 from lmsrvcore.caching import LabbookCacheController, DatasetCacheController
 
@@ -91,6 +92,8 @@ class RepositoryCacheMiddleware:
         # It must continue to be this way until we have a more structured way to
         # discriminate whether the given mutation is for a Dataset or Labbook.
         lb_cache, ds_cache = LabbookCacheController(), DatasetCacheController()
+        inventory = InventoryManager()
         for owner, name in product(owners, names):
             lb_cache.clear_entry((get_logged_in_username(), owner, name))
             ds_cache.clear_entry((get_logged_in_username(), owner, name))
+            inventory.invalidate_cached_repository(get_logged_in_username(), owner, name)
@@ -1,9 +1,11 @@
 from lmsrvlabbook.dataloader.labbook import LabBookLoader
 from lmsrvlabbook.dataloader.dataset import DatasetLoader
+from lmsrvlabbook.dataloader.fetch import FetchLoader
 
 
 class DataloaderMiddleware(object):
-    """Middleware to insert an instance of the LabBookLoader and DatasetLoader dataloaders into the request context"""
+    """Middleware to insert an instance of the LabBookLoader, DatasetLoader and FetchLoader dataloaders into the request
+    context"""
     def resolve(self, next, root, info, **args):
         if hasattr(info.context, "labbook_loader"):
             if not info.context.labbook_loader:
@@ -17,4 +19,10 @@ class DataloaderMiddleware(object):
         else:
             info.context.dataset_loader = DatasetLoader()
 
+        if hasattr(info.context, "fetch_loader"):
+            if not info.context.fetch_loader:
+                info.context.fetch_loader = FetchLoader()
+        else:
+            info.context.fetch_loader = FetchLoader()
+
         return next(root, info, **args)
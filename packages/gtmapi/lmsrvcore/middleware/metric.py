@@ -1,9 +1,20 @@
+from typing import Optional
+
+from flask import request
+from flask_graphql import GraphQLView
 from gtmcore.logging import LMLogger
-from time import time as timer
+from gtmcore.metrics import MetricsRegistry, SamplingProfiler
+from time import time as timer, perf_counter
 import json
 
 logger = LMLogger.get_logger()
 
+RESOLVER_METRIC = 'gigantum_graphql_resolver_duration_seconds'
+OPERATION_METRIC = 'gigantum_graphql_operation_duration_seconds'
+
+# WSGI environ key used to pass the executed operation name from the middleware to the view
+OPERATION_ENVIRON_KEY = 'gigantum.graphql_operation'
+
 
 def time_all_resolvers_middleware(next, root, info, **args):
     """Middleware to time and log all resolvers"""
@@ -19,3 +30,62 @@ def time_all_resolvers_middleware(next, root, info, **args):
     if duration * 1000 > 10:
         logger.info(f"METRIC :: {json.dumps(data)}")
     return return_value
+
+
+def operation_name_middleware(next, root, info, **args):
+    """Middleware to let MetricsGraphQLView know the name of the operation being executed"""
+    if info.operation and info.operation.name and hasattr(info.context, 'environ'):
+        info.context.environ[OPERATION_ENVIRON_KEY] = info.operation.name.value
+    return next(root, info, **args)
+
+
+class ResolverMetricsMiddleware(object):
+    """Middleware to record the duration of every resolver in a histogram per (parent type, field)
+
+    Resolvers returning promises (e.g. dataloaders) are recorded up to the point the promise is returned.
+    """
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        registry.describe(RESOLVER_METRIC, 'histogram', 'Time spent in each field resolver, by parent type and field')
+
+    def resolve(self, next, root, info, **args):
+        start = perf_counter()
+        try:
+            return next(root, info, **args)
+        finally:
+            parent_type = info.parent_type.name if info.parent_type else ''
+            self.registry.observe(RESOLVER_METRIC, perf_counter() - start, parent_type=parent_type,
+                                  field=info.field_name)
+
+
+class MetricsGraphQLView(GraphQLView):
+    """GraphQLView that records the duration of each request in a histogram per GraphQL operation name, and profiles
+    slow requests
+
+    The operation name is set by operation_name_middleware, so it is taken from the executed document rather than
+    trusted from the request body. Anonymous operations, and requests that fail before any resolver runs, are
+    recorded as `unknown`.
+    """
+    metrics_registry: Optional[MetricsRegistry] = None
+    profiler: Optional[SamplingProfiler] = None
+
+    def dispatch_request(self):
+        start = perf_counter()
+        session = self.profiler.start() if self.profiler else None
+        try:
+            return super().dispatch_request()
+        finally:
+            operation = request.environ.get(OPERATION_ENVIRON_KEY, 'unknown')
+            # Recording metrics must never fail the request itself
+            try:
+                if self.metrics_registry:
+                    self.metrics_registry.observe(OPERATION_METRIC, perf_counter() - start, operation=operation)
+                if self.profiler and session:
+                    self.profiler.stop(session, operation)
+            except Exception as err:
+                logger.exception(f"Failed to record metrics of {operation}: {err}")
+
+    @staticmethod
+    def describe_metrics(registry: MetricsRegistry) -> None:
+        """Set the help text of the operation duration metric"""
+        registry.describe(OPERATION_METRIC, 'histogram', 'Time to execute each GraphQL operation, by operation name')
@@ -6,7 +6,8 @@ from typing import Any, Tuple, Dict, List
 
 from gtmcore.logging import LMLogger
 from gtmcore.inventory.inventory import InventoryManager
-from gtmcore.dispatcher import default_redis_conn
+from gtmcore.dispatcher import JobAccounting, default_redis_conn
+from gtmcore.dispatcher.accounting import USAGE_FIELDS
 from gtmcore.configuration import Configuration
 from gtmcore.configuration.utils import call_subprocess
 
@@ -61,6 +62,10 @@ def service_telemetry():
         rq_dict = _calc_rq_free()
     except Exception as e:
         rq_dict = {'collectionError': str(e)}
+    try:
+        jobs_dict = _calc_job_statistics()
+    except Exception as e:
+        jobs_dict = {'collectionError': str(e)}
 
     compute_time = time.time() - t0
     return {
@@ -74,6 +79,7 @@ def service_telemetry():
             'lowDiskWarning': disk_avail < DISK_WARNING_THRESHOLD_GB
         },
         'rq': rq_dict,
+        'jobs': jobs_dict,
         # How long it took to collect stats - round to two decimal places
         'collectionTimeSec': float(f'{compute_time:.2f}'),
         'gpu': {
@@ -125,3 +131,23 @@ def _calc_rq_free() -> Dict[str, Any]:
     resp.update({f'queue{q.capitalize()}Size':
                  len(rq.Queue(f'gigantum-{q}-queue', connection=conn)) for q in queues})
     return resp
+
+
+def _to_camel_case(name: str) -> str:
+    first, *rest = name.split('_')
+    return first + ''.join([p.capitalize() for p in rest])
+
+
+def _calc_job_statistics() -> Dict[str, Any]:
+    """Returns the recorded wall-clock time and resource usage of background jobs, by job method, e.g.
+
+    {'sync_repository': {'count': 10, 'failed': 1, 'since': 1600000000.0,
+                         'runSeconds': {'mean': 12.5, 'max': 40.1}, ...}}
+    """
+    resp: Dict[str, Any] = dict()
+    for stats in JobAccounting().statistics():
+        method_dict: Dict[str, Any] = {'count': stats.count, 'failed': stats.failed, 'since': stats.since}
+        method_dict.update({_to_camel_case(f): {'mean': float(f'{stats.mean[f]:.2f}'), 'max': stats.max[f]}
+                            for f in USAGE_FIELDS})
+        resp[stats.method] = method_dict
+    return resp
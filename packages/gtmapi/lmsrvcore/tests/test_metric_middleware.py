@@ -0,0 +1,90 @@
+import time
+from unittest.mock import patch
+
+import graphene
+from flask import Flask
+
+from gtmcore.metrics import MetricsRegistry, SamplingProfiler
+from lmsrvcore.middleware import ResolverMetricsMiddleware, MetricsGraphQLView, operation_name_middleware
+from lmsrvcore.middleware.metric import RESOLVER_METRIC, OPERATION_METRIC
+
+
+class Widget(graphene.ObjectType):
+    name = graphene.String()
+
+    def resolve_name(self, info):
+        return 'widget'
+
+
+class MetricsQuery(graphene.ObjectType):
+    widget = graphene.Field(Widget)
+
+    slow = graphene.Boolean()
+
+    def resolve_widget(self, info):
+        return Widget()
+
+    def resolve_slow(self, info):
+        time.sleep(0.1)
+        return True
+
+
+def helper_app(registry: MetricsRegistry, profiler: SamplingProfiler = None) -> Flask:
+    app = Flask(__name__)
+    schema = graphene.Schema(query=MetricsQuery)
+    middleware = [ResolverMetricsMiddleware(registry), operation_name_middleware]
+    app.add_url_rule('/graphql', view_func=MetricsGraphQLView.as_view('graphql', schema=schema,
+                                                                      middleware=middleware,
+                                                                      metrics_registry=registry,
+                                                                      profiler=profiler))
+    return app
+
+
+class TestMetricMiddleware(object):
+    def test_resolver_and_operation_histograms(self):
+        registry = MetricsRegistry()
+        client = helper_app(registry).test_client()
+
+        for _ in range(3):
+            response = client.post('/graphql', json={'query': 'query GetWidget { widget { name } }'})
+            assert response.get_json() == {'data': {'widget': {'name': 'widget'}}}
+        client.post('/graphql', json={'query': '{ widget { name } }'})
+        client.post('/graphql', json={'query': '{ notAField }'})
+
+        assert registry.histogram(RESOLVER_METRIC, parent_type='MetricsQuery', field='widget').count == 4
+        assert registry.histogram(RESOLVER_METRIC, parent_type='Widget', field='name').count == 4
+        assert registry.histogram(OPERATION_METRIC, operation='GetWidget').count == 3
+        # Anonymous operations and invalid documents
+        assert registry.histogram(OPERATION_METRIC, operation='unknown').count == 2
+
+        output = registry.render()
+        assert f'{OPERATION_METRIC}_count{{operation="GetWidget"}} 3' in output
+        assert f'{RESOLVER_METRIC}_bucket{{field="name",parent_type="Widget",le="+Inf"}} 4' in output
+
+    def test_profile_slow_operations(self, tmpdir):
+        profiler = SamplingProfiler(str(tmpdir), threshold=0.05, interval=0.001)
+        client = helper_app(MetricsRegistry(), profiler).test_client()
+
+        client.post('/graphql', json={'query': 'query GetWidget { widget { name } }'})
+        assert profiler.list_profiles() == []
+
+        response = client.post('/graphql', json={'query': 'query SlowQuery { slow }'})
+        assert response.get_json() == {'data': {'slow': True}}
+        profiles = profiler.list_profiles()
+        assert len(profiles) == 1
+        assert profiles[0]['operation'] == 'SlowQuery'
+        assert profiles[0]['duration_ms'] >= 100
+
+        with open(profiler.profile_path(profiles[0]['name']), 'rt') as f:
+            stacks = f.read()
+        assert 'resolve_slow' in stacks
+        assert 'dispatch_request' in stacks
+
+    def test_profiler_failure_does_not_fail_request(self, tmpdir):
+        profiler = SamplingProfiler(str(tmpdir), threshold=0)
+        client = helper_app(MetricsRegistry(), profiler).test_client()
+
+        with patch.object(SamplingProfiler, 'stop', side_effect=RuntimeError('dictionary changed size')):
+            response = client.post('/graphql', json={'query': 'query GetWidget { widget { name } }'})
+        assert response.status_code == 200
+        assert response.get_json() == {'data': {'widget': {'name': 'widget'}}}
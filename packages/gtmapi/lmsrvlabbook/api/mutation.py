@@ -4,7 +4,8 @@ from lmsrvlabbook.api.mutations.labbook import (CreateLabbook, DeleteLabbook,
                                                 ChangeLabbookBase,
                                                 SetLabbookDescription,
                                                 MakeLabbookDirectory,
-                                                AddLabbookFile, MoveLabbookFile, DeleteLabbookFiles,
+                                                AddLabbookFile, MoveLabbookFile, MoveLabbookFiles,
+                                                DeleteLabbookFiles,
                                                 WriteLabbookReadme, CompleteBatchUploadTransaction, FetchLabbookEdge)
 from lmsrvlabbook.api.mutations.migrations import MigrateLabbookSchema
 from lmsrvlabbook.api.mutations.environment import (BuildImage, StartContainer, StopContainer, CancelBuild)
@@ -182,6 +183,9 @@ class LabbookMutations(BranchMutations, LabbookSharingMutations,
     # Move files or directory within a labbook
     move_labbook_file = MoveLabbookFile.Field()
 
+    # Move many files or directories within a labbook, in a single commit
+    move_labbook_files = MoveLabbookFiles.Field()
+
     # Delete a file or directory inside of a Labbook.
     delete_labbook_files = DeleteLabbookFiles.Field()
 
@@ -2,7 +2,8 @@ from lmsrvlabbook.api.mutations.labbook import (CreateLabbook, DeleteLabbook,
                                                 ChangeLabbookBase,
                                                 SetLabbookDescription,
                                                 MakeLabbookDirectory,
-                                                AddLabbookFile, MoveLabbookFile, DeleteLabbookFiles,
+                                                AddLabbookFile, MoveLabbookFile, MoveLabbookFiles,
+                                                DeleteLabbookFiles,
                                                 WriteLabbookReadme, CompleteBatchUploadTransaction, FetchLabbookEdge)
 
 from lmsrvlabbook.api.mutations.migrations import MigrateLabbookSchema
@@ -278,11 +278,12 @@ class ExportDataset(graphene.relay.ClientIDMutation):
     class Input:
         owner = graphene.String(required=True)
         dataset_name = graphene.String(required=True)
+        metadata_only = graphene.Boolean(required=False)
 
     job_key = graphene.String()
 
     @classmethod
-    def mutate_and_get_payload(cls, root, info, owner, dataset_name, client_mutation_id=None):
+    def mutate_and_get_payload(cls, root, info, owner, dataset_name, metadata_only=False, client_mutation_id=None):
         username = get_logged_in_username()
         working_directory = flask.current_app.config['LABMGR_CONFIG'].app_workdir
         ds = InventoryManager().load_dataset(username, owner, dataset_name,
@@ -291,7 +292,9 @@ class ExportDataset(graphene.relay.ClientIDMutation):
         job_metadata = {'method': 'export_dataset_as_zip',
                         'dataset': ds.key}
         job_kwargs = {'dataset_path': ds.root_dir,
-                      'ds_export_directory': os.path.join(working_directory, 'export')}
+                      'ds_export_directory': os.path.join(working_directory, 'export'),
+                      'username': username,
+                      'metadata_only': metadata_only}
         dispatcher = Dispatcher()
         job_key = dispatcher.dispatch_task(jobs.export_dataset_as_zip,
                                            kwargs=job_kwargs,
@@ -166,7 +166,7 @@ class StopContainer(graphene.relay.ClientIDMutation):
             pr.remove(target[1:])
 
         wf = LabbookWorkflow(lb)
-        wf.garbagecollect()
+        wf.schedule_maintenance()
 
         # Clean up empty bind mount dirs from datasets if needed
         submodules = lb.git.list_submodules()
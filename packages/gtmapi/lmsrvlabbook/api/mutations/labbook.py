@@ -1,13 +1,14 @@
 import base64
 import os
 import graphene
+from typing import Any, Dict, List
 
 from gtmcore.container import container_for_context
 from gtmcore.dispatcher import (Dispatcher, jobs)
 
 from gtmcore.inventory.inventory import InventoryManager
 from gtmcore.logging import LMLogger
-from gtmcore.files import FileOperations
+from gtmcore.files import FileOperations, FileOperationsException
 from gtmcore.activity import ActivityStore, ActivityDetailRecord, ActivityDetailType, ActivityRecord, ActivityType
 from gtmcore.activity.utils import ImmutableDict, TextData, DetailRecordList, ImmutableList
 from gtmcore.environment import ComponentManager
@@ -18,7 +19,7 @@ from lmsrvcore.auth.user import get_logged_in_username, get_logged_in_author
 from lmsrvlabbook.api.connections.labbookfileconnection import LabbookFileConnection
 from lmsrvlabbook.api.connections.labbook import LabbookConnection
 from lmsrvlabbook.api.objects.labbook import Labbook
-from lmsrvlabbook.api.objects.labbookfile import LabbookFile
+from lmsrvlabbook.api.objects.labbookfile import LabbookFile, LabbookFileMoveInput
 from lmsrvlabbook.dataloader.labbook import LabBookLoader
 
 logger = LMLogger.get_logger()
@@ -230,6 +231,19 @@ class AddLabbookFile(graphene.relay.ClientIDMutation, ChunkUploadMutation):
 
     @classmethod
     def mutate_and_wait_for_chunks(cls, info, **kwargs):
+        chunk_params = kwargs['chunk_upload_params']
+        if chunk_params['chunk_index'] == 0:
+            # Reject a file that can't be added on its first chunk, instead of after the whole file is uploaded
+            lb = InventoryManager().load_labbook(get_logged_in_username(), kwargs['owner'], kwargs['labbook_name'],
+                                                 author=get_logged_in_author())
+            dst_path = os.path.join(os.path.dirname(kwargs['file_path']), cls.get_filename(chunk_params['filename']))
+            if FileOperations.ignored_paths(lb, kwargs['section'], [dst_path]):
+                try:
+                    os.remove(cls.get_temp_filename(chunk_params['upload_id'], chunk_params['filename']))
+                except FileNotFoundError:
+                    pass
+                raise FileOperationsException(f"`{dst_path}` matches ignored pattern")
+
         return AddLabbookFile(new_labbook_file_edge=LabbookFileConnection.Edge(node=None, cursor="null"))
 
     @classmethod
@@ -296,6 +310,25 @@ class DeleteLabbookFiles(graphene.ClientIDMutation):
         return DeleteLabbookFiles(success=True)
 
 
+def helper_moved_file_edges(owner: str, labbook_name: str, section: str,
+                            mv_results: List[Dict[str, Any]]) -> List[Any]:
+    """Build the edges of the files and directories returned by a move"""
+    file_edges = list()
+    for file_dict in mv_results:
+        file_edges.append(LabbookFile(owner=owner,
+                                      name=labbook_name,
+                                      section=section,
+                                      key=file_dict['key'],
+                                      is_dir=file_dict['is_dir'],
+                                      modified_at=file_dict['modified_at'],
+                                      size=str(file_dict['size'])))
+
+    cursors = [base64.b64encode("{}".format(cnt).encode("UTF-8")).decode("UTF-8")
+               for cnt, x in enumerate(file_edges)]
+
+    return [LabbookFileConnection.Edge(node=e, cursor=c) for e, c in zip(file_edges, cursors)]
+
+
 class MoveLabbookFile(graphene.ClientIDMutation):
     """Method to move/rename a file or directory. If file, both src_path and dst_path should contain the file name.
     If a directory, be sure to include the trailing slash"""
@@ -318,22 +351,31 @@ class MoveLabbookFile(graphene.ClientIDMutation):
         with lb.lock():
             mv_results = FileOperations.move_file(lb, section, src_path, dst_path)
 
-        file_edges = list()
-        for file_dict in mv_results:
-            file_edges.append(LabbookFile(owner=owner,
-                                          name=labbook_name,
-                                          section=section,
-                                          key=file_dict['key'],
-                                          is_dir=file_dict['is_dir'],
-                                          modified_at=file_dict['modified_at'],
-                                          size=str(file_dict['size'])))
+        return MoveLabbookFile(updated_edges=helper_moved_file_edges(owner, labbook_name, section, mv_results))
+
+
+class MoveLabbookFiles(graphene.ClientIDMutation):
+    """Method to move/rename many files or directories at once, with a single commit and activity record. See
+    MoveLabbookFile for the format of each move."""
+    class Input:
+        owner = graphene.String(required=True)
+        labbook_name = graphene.String(required=True)
+        section = graphene.String(required=True)
+        moves = graphene.List(LabbookFileMoveInput, required=True)
+
+    updated_edges = graphene.List(LabbookFileConnection.Edge)
 
-        cursors = [base64.b64encode("{}".format(cnt).encode("UTF-8")).decode("UTF-8")
-                   for cnt, x in enumerate(file_edges)]
+    @classmethod
+    def mutate_and_get_payload(cls, root, info, owner, labbook_name, section, moves,
+                               client_mutation_id=None, **kwargs):
+        username = get_logged_in_username()
+        lb = InventoryManager().load_labbook(username, owner, labbook_name,
+                                             author=get_logged_in_author())
 
-        edge_objs = [LabbookFileConnection.Edge(node=e, cursor=c) for e, c in zip(file_edges, cursors)]
+        with lb.lock():
+            mv_results = FileOperations.move_files(lb, section, [(m.src_path, m.dst_path) for m in moves])
 
-        return MoveLabbookFile(updated_edges=edge_objs)
+        return MoveLabbookFiles(updated_edges=helper_moved_file_edges(owner, labbook_name, section, mv_results))
 
 
 class MakeLabbookDirectory(graphene.ClientIDMutation):
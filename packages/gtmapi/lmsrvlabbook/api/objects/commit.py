@@ -1,13 +1,11 @@
 from typing import Optional
 import graphene
 
-from gtmcore.inventory.inventory import InventoryManager
 from gtmcore.inventory.branching import BranchManager
 from lmsrvcore.auth.identity import get_identity_manager_instance
 
 from lmsrvcore.auth.user import get_logged_in_username
 from lmsrvcore.api.interfaces import GitCommit, GitRepository
-from lmsrvcore.utilities import configure_git_credentials
 from lmsrvlabbook.dataloader.fetch import FetchLoader
 
 
@@ -69,6 +67,10 @@ class Branch(graphene.ObjectType):
     # Count of commits on local branch not present in remote.
     commits_ahead = graphene.Int()
 
+    # When the remote was last fetched, i.e. how current commits_ahead and commits_behind are. Remotes of viewed
+    # branches are fetched in the background, so this may be before the request.
+    remote_fetched_on_utc = graphene.types.datetime.DateTime()
+
     @classmethod
     def get_node(cls, info, id):
         owner, labbook_name, branch_name = id.split('&')
@@ -77,62 +79,48 @@ class Branch(graphene.ObjectType):
     def resolve_id(self, info):
         return '&'.join((self.owner, self.name, self.branch_name))
 
+    def helper_load_refs(self, info):
+        """Load the ref snapshot of the labbook, shared by all branch fields"""
+        return info.context.labbook_loader.load(f"{get_logged_in_username()}&{self.owner}&{self.name}").then(
+            lambda labbook: BranchManager(labbook).refs)
+
     def resolve_is_active(self, info):
-        lb = InventoryManager().load_labbook(get_logged_in_username(),
-                                             self.owner,
-                                             self.name)
-        return BranchManager(lb).active_branch == self.branch_name
+        return self.helper_load_refs(info).then(lambda refs: refs.active_branch == self.branch_name)
 
     def resolve_is_local(self, info):
-        lb = InventoryManager().load_labbook(get_logged_in_username(),
-                                             self.owner,
-                                             self.name)
-        return self.branch_name in BranchManager(lb).branches_local
+        return self.helper_load_refs(info).then(lambda refs: self.branch_name in refs.local)
 
     def resolve_is_remote(self, info):
-        lb = InventoryManager().load_labbook(get_logged_in_username(),
-                                             self.owner,
-                                             self.name)
-        return self.branch_name in BranchManager(lb).branches_remote
+        return self.helper_load_refs(info).then(lambda refs: self.branch_name in refs.branches_remote)
 
     def resolve_is_mergeable(self, info):
-        lb = InventoryManager().load_labbook(get_logged_in_username(),
-                                             self.owner,
-                                             self.name)
-        mergeable = self.branch_name in BranchManager(lb).branches_local \
-                    and self.branch_name != BranchManager(lb).active_branch
+        return self.helper_load_refs(info).then(
+            lambda refs: self.branch_name in refs.local and self.branch_name != refs.active_branch)
 
-        return mergeable
+    def helper_fetch_labbook(self, info):
+        """Make sure a fetch of the labbook is scheduled if due, once per request, then load the labbook"""
+        logged_in_user = get_logged_in_username()
+        fetch_loader = self._fetch_loader or info.context.fetch_loader
+        return fetch_loader.load(f"labbook&{logged_in_user}&{self.owner}&{self.name}").then(
+            lambda _: info.context.labbook_loader.load(f"{logged_in_user}&{self.owner}&{self.name}"))
 
     def resolve_commits_ahead(self, info):
         if not get_identity_manager_instance().allow_server_access:
             return 0
         else:
-            logged_in_user = get_logged_in_username()
-            lb = InventoryManager().load_labbook(logged_in_user,
-                                                 self.owner,
-                                                 self.name)
-            configure_git_credentials()
-            bm = BranchManager(lb)
-            if self._fetch_loader:
-                return self._fetch_loader.load(f"labbook&{logged_in_user}&{self.owner}&{self.name}").then(
-                    lambda _: bm.get_commits_ahead(branch_name=self.branch_name))
-            else:
-                return bm.get_commits_ahead(branch_name=self.branch_name)
+            return self.helper_fetch_labbook(info).then(
+                lambda labbook: BranchManager(labbook).get_commits_ahead(branch_name=self.branch_name))
 
     def resolve_commits_behind(self, info):
         if not get_identity_manager_instance().allow_server_access:
             return 0
         else:
-            logged_in_user = get_logged_in_username()
-            lb = InventoryManager().load_labbook(logged_in_user,
-                                                 self.owner,
-                                                 self.name)
-            configure_git_credentials()
-            bm = BranchManager(lb)
-            if self._fetch_loader:
-                return self._fetch_loader.load(f"labbook&{logged_in_user}&{self.owner}&{self.name}").then(
-                    lambda _: bm.get_commits_behind(branch_name=self.branch_name))
-            else:
-                return bm.get_commits_behind(branch_name=self.branch_name)
+            return self.helper_fetch_labbook(info).then(
+                lambda labbook: BranchManager(labbook).get_commits_behind(branch_name=self.branch_name))
 
+    def resolve_remote_fetched_on_utc(self, info):
+        if not get_identity_manager_instance().allow_server_access:
+            return None
+        else:
+            fetch_loader = self._fetch_loader or info.context.fetch_loader
+            return fetch_loader.load(f"labbook&{get_logged_in_username()}&{self.owner}&{self.name}")
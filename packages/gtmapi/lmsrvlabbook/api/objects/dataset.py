@@ -1,20 +1,17 @@
 from typing import List, Optional
 import graphene
 import base64
-import math
 import flask
 from gtmcore.activity import ActivityStore
 
 from lmsrvcore.caching import DatasetCacheController
 from lmsrvcore.auth.user import get_logged_in_username
 from lmsrvcore.api.interfaces import GitRepository
-from lmsrvcore.utilities import configure_git_credentials
 
 from gtmcore.dataset.manifest import Manifest
 from gtmcore.workflows.gitlab import GitLabManager, ProjectPermissions, GitLabException
 from gtmcore.inventory.inventory import InventoryManager
 from gtmcore.logging import LMLogger
-from gtmcore.configuration.utils import call_subprocess
 from gtmcore.inventory.branching import BranchManager
 from lmsrvcore.auth.identity import get_identity_manager_instance
 from lmsrvcore.auth.identity import tokens_from_request_context
@@ -111,6 +108,10 @@ class Dataset(graphene.ObjectType):
     commits_behind = graphene.Int()
     commits_ahead = graphene.Int()
 
+    # When the remote was last fetched. Remotes of viewed datasets are fetched in the background, so this may be
+    # before the request.
+    remote_fetched_on_utc = graphene.types.datetime.DateTime()
+
     @classmethod
     def get_node(cls, info, id):
         """Method to resolve the object based on it's Node ID"""
@@ -501,44 +502,9 @@ class Dataset(graphene.ObjectType):
             lambda dataset: dataset.backend.verify_contents(dataset, logger.info))
 
     def helper_resolve_commits_ahead_behind(self, dataset) -> None:
-        """Helper to get the commits ahead and behind for a dataset. This is done together so only 1 fetch will
-        occur. In the future when branches are enabled, the fetch dataloader can be used to manage this more
-        gracefully"""
-        behind_commit_output = str()
-        ahead_commit_output = str()
-
-        current_hash = call_subprocess(['git', 'rev-list', 'HEAD', '--max-count=1'],
-                                       cwd=dataset.root_dir, check=True)
-
-        if dataset.has_remote:
-            # Make sure remote git credentials are configured if the remote is a server that requires authentication
-            if "http" == dataset.remote[0:4]:
-                configure_git_credentials()
-
-            # Dataset has been published, so look up changes
-            bm = BranchManager(dataset)
-            bm.fetch()
-            behind_commit_output = call_subprocess(['git', 'log', f'{current_hash.strip()}..origin/master',
-                                                    '--pretty=oneline'],
-                                                   cwd=dataset.root_dir, check=True)
-
-            ahead_commit_output = call_subprocess(['git', 'log', f'origin/master..{current_hash.strip()}',
-                                                   '--pretty=oneline'],
-                                                  cwd=dataset.root_dir, check=True)
-
-        if not behind_commit_output:
-            self.commits_behind = 0
-        else:
-            behind_commit_list = [x for x in behind_commit_output.split('\n') if x != ""]
-            commits_behind = len(behind_commit_list)
-            self.commits_behind = int(math.ceil(float(commits_behind) / 2.0))
-
-        if not ahead_commit_output:
-            self.commits_ahead = 0
-        else:
-            ahead_commit_list = [x for x in ahead_commit_output.split('\n') if x != ""]
-            commits_ahead = len(ahead_commit_list)
-            self.commits_ahead = int(math.ceil(float(commits_ahead) / 2.0))
+        """Helper to get the commits ahead and behind for a dataset, from its remote tracking branch as of the last
+        fetch. Fetches are dispatched in the background by the FetchLoader, see `remote_fetched_on_utc`."""
+        self.commits_ahead, self.commits_behind = BranchManager(dataset).get_commits_ahead_behind()
 
     def helper_resolve_commits_behind(self, dataset) -> Optional[int]:
         """Helper to get the commits behind for a dataset."""
@@ -547,6 +513,12 @@ class Dataset(graphene.ObjectType):
 
         return self.commits_behind
 
+    def helper_fetch_dataset(self, info):
+        """Make sure a fetch of the dataset is scheduled if due, once per request, then load the dataset"""
+        logged_in_user = get_logged_in_username()
+        return info.context.fetch_loader.load(f"dataset&{logged_in_user}&{self.owner}&{self.name}").then(
+            lambda _: info.context.dataset_loader.load(f"{logged_in_user}&{self.owner}&{self.name}"))
+
     def resolve_commits_behind(self, info):
         """Method to get the commits behind for a dataset.
 
@@ -556,8 +528,7 @@ class Dataset(graphene.ObjectType):
         Returns:
 
         """
-        return info.context.dataset_loader.load(f"{get_logged_in_username()}&{self.owner}&{self.name}").then(
-            lambda dataset: self.helper_resolve_commits_behind(dataset))
+        return self.helper_fetch_dataset(info).then(lambda dataset: self.helper_resolve_commits_behind(dataset))
 
     def helper_resolve_commits_ahead(self, dataset) -> Optional[int]:
         """Helper to get the commits ahead for a dataset."""
@@ -575,5 +546,16 @@ class Dataset(graphene.ObjectType):
         Returns:
 
         """
-        return info.context.dataset_loader.load(f"{get_logged_in_username()}&{self.owner}&{self.name}").then(
-            lambda dataset: self.helper_resolve_commits_ahead(dataset))
+        return self.helper_fetch_dataset(info).then(lambda dataset: self.helper_resolve_commits_ahead(dataset))
+
+    def resolve_remote_fetched_on_utc(self, info):
+        """Method to get when the remote of the dataset was last fetched, i.e. how current the commits ahead/behind
+        counts are.
+
+        Args:
+            info:
+
+        Returns:
+
+        """
+        return info.context.fetch_loader.load(f"dataset&{get_logged_in_username()}&{self.owner}&{self.name}")
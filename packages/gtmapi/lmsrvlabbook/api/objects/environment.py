@@ -1,9 +1,11 @@
+from typing import Dict, List
 import graphene
 import base64
 
 from gtmcore.dispatcher import Dispatcher
 from gtmcore.labbook import SecretStore
 from gtmcore.environment.componentmanager import ComponentManager
+from gtmcore.environment.utils import get_package_manager
 from gtmcore.container import container_for_context
 from gtmcore.logging import LMLogger
 from gtmcore.environment.bundledapp import BundledAppManager
@@ -109,7 +111,7 @@ class Environment(graphene.ObjectType):
         """Helper to resolve the image status of a labbook"""
 
         dispatcher = Dispatcher()
-        lb_jobs = [dispatcher.query_task(j.job_key) for j in dispatcher.get_jobs_for_labbook(labbook.key)]
+        lb_jobs = dispatcher.get_jobs_for_labbook(labbook.key)
 
         for j in lb_jobs:
             logger.debug("Current job for labbook: status {}, meta {}".format(j.status, j.meta))
@@ -244,6 +246,18 @@ class Environment(graphene.ObjectType):
             keys = [f"{k['manager']}&{k['package']}" for k in lbc.edges]
             vd = PackageDataloader(keys, labbook, get_logged_in_username())
 
+            # Warm the package metadata cache for packages on other pages in the background
+            other_packages: Dict[str, List[str]] = dict()
+            for edge in edges:
+                if f"{edge['manager']}&{edge['package']}" not in keys:
+                    other_packages.setdefault(edge['manager'], list()).append(edge['package'])
+            for manager, package_names in other_packages.items():
+                try:
+                    get_package_manager(manager).prefetch_package_records(package_names, labbook,
+                                                                           get_logged_in_username())
+                except Exception as err:
+                    logger.warning(f"Failed to prefetch {manager} package metadata: {err}")
+
             # Get DevEnv instances
             edge_objs = []
             for edge, cursor in zip(lbc.edges, lbc.cursors):
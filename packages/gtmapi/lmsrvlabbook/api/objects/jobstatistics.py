@@ -0,0 +1,61 @@
+import datetime
+
+import graphene
+
+from gtmcore.dispatcher import JobStatistics
+
+
+class BackgroundJobStatistics(graphene.ObjectType):
+    """Wall-clock time and resources used by the background jobs of one method (e.g. `sync_repository`), aggregated
+    over every run recorded by the workers. Used to size the number of workers and the cpu limits of dataset jobs.
+    """
+    # Name of the job method
+    method = graphene.String(required=True)
+
+    # Number of recorded runs, and how many of them failed
+    count = graphene.Int()
+    failed_count = graphene.Int()
+
+    # Time the first run was recorded
+    since = graphene.types.datetime.DateTime()
+
+    # Seconds between a job being enqueued and started
+    queue_seconds_mean = graphene.Float()
+    queue_seconds_max = graphene.Float()
+
+    # Seconds a job ran
+    run_seconds_mean = graphene.Float()
+    run_seconds_max = graphene.Float()
+
+    # CPU seconds used by the job, and by the processes it ran (e.g. git)
+    cpu_seconds_mean = graphene.Float()
+    cpu_seconds_max = graphene.Float()
+    subprocess_seconds_mean = graphene.Float()
+    subprocess_seconds_max = graphene.Float()
+
+    # Peak resident set size of the job or any process it ran, in kilobytes
+    peak_rss_kb_mean = graphene.Float()
+    peak_rss_kb_max = graphene.Float()
+
+    # Bytes read from and written to storage
+    bytes_read_mean = graphene.Float()
+    bytes_read_max = graphene.Float()
+    bytes_written_mean = graphene.Float()
+    bytes_written_max = graphene.Float()
+
+    @classmethod
+    def from_statistics(cls, statistics: JobStatistics) -> 'BackgroundJobStatistics':
+        """Method to create the object from the statistics recorded by the workers
+
+        Args:
+            statistics: Statistics of a job method
+
+        Returns:
+            BackgroundJobStatistics
+        """
+        fields = {f'{name}_mean': value for name, value in statistics.mean.items()}
+        fields.update({f'{name}_max': value for name, value in statistics.max.items()})
+        since = datetime.datetime.fromtimestamp(statistics.since, tz=datetime.timezone.utc) \
+            if statistics.since is not None else None
+        return cls(method=statistics.method, count=statistics.count, failed_count=statistics.failed, since=since,
+                   **fields)
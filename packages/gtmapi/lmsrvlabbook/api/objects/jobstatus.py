@@ -19,10 +19,13 @@
 # SOFTWARE.
 import ast
 import json
+from typing import List
+
 import graphene
 
 from gtmcore.logging import LMLogger
-from gtmcore.dispatcher import Dispatcher, JobKey
+from gtmcore.dispatcher import Dispatcher, JobKey, JobProgress
+from gtmcore.dispatcher import JobStatus as CoreJobStatus
 
 
 logger = LMLogger.get_logger()
@@ -54,16 +57,61 @@ class JobStatus(graphene.ObjectType):
     # Result.. None if no result or void method.
     result = graphene.Field(graphene.String)
 
-    def _loader(self):
-        self.job_key = self.id
-        d = Dispatcher()
-        q = d.query_task(JobKey(self.job_key))
+    # Progress reported by the job. These are read from the job's progress channel only, without fetching the job.
+    feedback = graphene.String()
+    percent_complete = graphene.Float()
+    has_failures = graphene.Boolean()
+    failure_detail = graphene.String()
+
+    # Set once all fields have been populated, so fields that are legitimately None are not re-queried
+    _loaded = False
+    _progress_loaded = False
+
+    def _populate_progress(self, record) -> None:
+        self.feedback = record.feedback if record else None
+        self.percent_complete = record.percent_complete if record else None
+        self.has_failures = record.has_failures if record else None
+        self.failure_detail = record.failure_detail if record else None
+        self._progress_loaded = True
+
+    def _populate(self, q) -> None:
         self.status = q.status
-        self.job_metadata = json.dumps(q.meta)
+        # Progress used to be stored in the job metadata, so it is still included for existing clients
+        self.job_metadata = json.dumps({**q.meta, **JobProgress.to_metadata(q.progress)})
+        self._populate_progress(q.progress)
         self.failure_message = q.failure_message
         self.started_at = q.started_at
         self.finished_at = q.finished_at
         self.result = q.result
+        self._loaded = True
+
+    def _loader(self):
+        if self._loaded:
+            return
+        self.job_key = self.id
+        d = Dispatcher()
+        q = d.query_task(JobKey(self.job_key))
+        self._populate(q)
+
+    def _progress_loader(self):
+        if self._progress_loaded:
+            return
+        job_key = self.job_key or self.id
+        self._populate_progress(JobProgress.read(job_key.split(':')[-1]))
+
+    @classmethod
+    def from_job_status(cls, job_status) -> 'JobStatus':
+        """Create a JobStatus from a gtmcore JobStatus that has already been fetched (e.g., via the job index)"""
+        job = cls(id=job_status.job_key.key_str, job_key=job_status.job_key.key_str)
+        job._populate(job_status)
+        return job
+
+    @classmethod
+    def from_job_statuses(cls, job_statuses) -> List['JobStatus']:
+        """Create JobStatuses from gtmcore JobStatuses that have already been fetched, reading their progress in a
+        single round trip"""
+        CoreJobStatus.prefetch_progress(job_statuses)
+        return [cls.from_job_status(j) for j in job_statuses]
 
     def resolve_job_key(self, info):
         if self.job_key is None:
@@ -101,6 +149,22 @@ class JobStatus(graphene.ObjectType):
             self._loader()
         return self.result
 
+    def resolve_feedback(self, info):
+        self._progress_loader()
+        return self.feedback
+
+    def resolve_percent_complete(self, info):
+        self._progress_loader()
+        return self.percent_complete
+
+    def resolve_has_failures(self, info):
+        self._progress_loader()
+        return self.has_failures
+
+    def resolve_failure_detail(self, info):
+        self._progress_loader()
+        return self.failure_detail
+
     @classmethod
     def get_node(cls, info, id):
         """Method to resolve the object based on it's Node ID"""
@@ -30,7 +30,6 @@ from lmsrvlabbook.api.objects.activity import ActivityDetailObject, ActivityReco
 from lmsrvlabbook.api.objects.packagecomponent import PackageComponent, PackageComponentInput
 from lmsrvlabbook.api.objects.dataset import Dataset
 from lmsrvlabbook.dataloader.package import PackageDataloader
-from lmsrvlabbook.dataloader.fetch import FetchLoader
 
 logger = LMLogger.get_logger()
 
@@ -202,9 +201,8 @@ class Labbook(graphene.ObjectType):
     def resolve_mergeable_branch_names(self, info):
         def _mergeable(lb):
             # TODO(billvb) - Refactor for new branch model.
-            username = get_logged_in_username()
-            bm = BranchManager(lb, username=username)
-            return [b for b in bm.branches_local if bm.active_branch != b]
+            refs = BranchManager(lb, username=get_logged_in_username()).refs
+            return [b for b in refs.branches_local if refs.active_branch != b]
 
         return info.context.labbook_loader.load(f"{get_logged_in_username()}&{self.owner}&{self.name}").then(
             _mergeable)
@@ -279,13 +277,11 @@ class Labbook(graphene.ObjectType):
         return info.context.labbook_loader.load(f"{get_logged_in_username()}&{self.owner}&{self.name}").then(
             lambda labbook: self.helper_resolve_default_remote(labbook))
 
-    def helper_resolve_branches(self, lb, kwargs):
-        bm = BranchManager(lb)
-
-        fetcher = FetchLoader()
+    def helper_resolve_branches(self, lb, kwargs, fetcher):
+        refs = BranchManager(lb).refs
 
         return [Branch(_fetch_loader=fetcher, owner=self.owner, name=self.name, branch_name=b)
-                for b in sorted(set(bm.branches_local + bm.branches_remote))]
+                for b in sorted(set(refs.branches_local + refs.branches_remote))]
 
     def resolve_branches(self, info, **kwargs):
         """Method to page through branch Refs
@@ -299,7 +295,7 @@ class Labbook(graphene.ObjectType):
 
         """
         return info.context.labbook_loader.load(f"{get_logged_in_username()}&{self.owner}&{self.name}").then(
-            lambda labbook: self.helper_resolve_branches(labbook, kwargs))
+            lambda labbook: self.helper_resolve_branches(labbook, kwargs, info.context.fetch_loader))
 
     def resolve_code(self, info):
         """Method to resolve the code section"""
@@ -503,7 +499,7 @@ class Labbook(graphene.ObjectType):
         """Helper to generate background job info from a labbook"""
         d = Dispatcher()
         jobs = d.get_jobs_for_labbook(labbook_key=labbook.key)
-        return [JobStatus(j.job_key.key_str) for j in jobs]
+        return JobStatus.from_job_statuses(jobs)
 
     def resolve_background_jobs(self, info):
         """ Return the job keys, tasks, and statuses for all background jobs. """
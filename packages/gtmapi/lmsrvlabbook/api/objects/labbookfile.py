@@ -25,6 +25,16 @@ from lmsrvcore.api.interfaces import GitRepository
 from lmsrvcore.auth.user import get_logged_in_username
 
 
+class LabbookFileMoveInput(graphene.InputObjectType):
+    """An input type to support moving many files or directories at once"""
+
+    # Source file or directory, relative to the section
+    src_path = graphene.String(required=True)
+
+    # Target file name and/or directory, relative to the section. Include the trailing slash for a directory.
+    dst_path = graphene.String(required=True)
+
+
 class LabbookFile(graphene.ObjectType):
     """A type representing a file or directory inside the labbook file system."""
     class Meta:
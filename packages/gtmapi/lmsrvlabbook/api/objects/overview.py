@@ -1,13 +1,13 @@
 import base64
 import graphene
 import os
-import glob
 from collections import OrderedDict
 from operator import itemgetter
 from typing import List
 
 from gtmcore.logging import LMLogger
 from gtmcore.activity import ActivityStore
+from gtmcore.environment.snapshot import get_environment_snapshot
 
 from lmsrvcore.auth.user import get_logged_in_username
 from lmsrvcore.api.interfaces import GitRepository
@@ -48,15 +48,14 @@ class LabbookOverview(graphene.ObjectType):
         Returns:
             None
         """
-        pkg_dir = os.path.join(labbook.root_dir, ".gigantum", "env", "package_manager")
+        snapshot = get_environment_snapshot(os.path.join(labbook.root_dir, ".gigantum", "env"))
 
         self._package_manager_counts = {'apt': 0,
                                         'conda2': 0,
                                         'conda3': 0,
                                         'pip': 0}
 
-        for f in glob.glob(os.path.join(pkg_dir, "*.yaml")):
-            f = os.path.basename(f)
+        for f in snapshot.file_names("package_manager"):
             mgr, _ = f.split('_', 1)
 
             self._package_manager_counts[mgr] = self._package_manager_counts[mgr] + 1
@@ -116,9 +115,8 @@ class LabbookOverview(graphene.ObjectType):
     @staticmethod
     def helper_resolve_num_custom_dependencies(labbook):
         """Helper to count the number of custom deps"""
-        custom_dir = os.path.join(labbook.root_dir, ".gigantum", "env", "custom")
-        count = len([x for x in glob.glob(os.path.join(custom_dir, "*.yaml"))])
-        return count
+        snapshot = get_environment_snapshot(os.path.join(labbook.root_dir, ".gigantum", "env"))
+        return len(snapshot.file_names("custom"))
 
     def resolve_num_custom_dependencies(self, info):
         """Resolver for getting number of custom dependencies in the labbook"""
@@ -5,7 +5,7 @@ import os
 import flask
 
 from gtmcore.logging import LMLogger
-from gtmcore.dispatcher import Dispatcher
+from gtmcore.dispatcher import Dispatcher, JobAccounting
 from gtmcore.environment import BaseRepository
 from gtmcore.environment.repository import RepositoryLock
 from gtmcore.labbook.schemas import CURRENT_SCHEMA
@@ -22,6 +22,7 @@ from lmsrvlabbook.api.objects.labbooklist import LabbookList
 from lmsrvlabbook.api.objects.datasetlist import DatasetList
 from lmsrvlabbook.api.objects.basecomponent import BaseComponent
 from lmsrvlabbook.api.objects.jobstatus import JobStatus
+from lmsrvlabbook.api.objects.jobstatistics import BackgroundJobStatistics
 from lmsrvlabbook.api.connections.environment import BaseComponentConnection
 from lmsrvlabbook.api.connections.jobstatus import JobStatusConnection
 from lmsrvlabbook.api.objects.datasettype import DatasetType
@@ -52,6 +53,9 @@ class AppQueries(graphene.ObjectType):
     # All background jobs in the system: Queued, Completed, Failed, and Started.
     background_jobs = graphene.relay.ConnectionField(JobStatusConnection)
 
+    # Time and resources used by background jobs, aggregated by job method
+    background_job_statistics = graphene.List(BackgroundJobStatistics)
+
     # Get the current logged in user identity, primarily used when running offline
     user_identity = graphene.Field(UserIdentity)
 
@@ -109,6 +113,14 @@ class AppQueries(graphene.ObjectType):
 
         return JobStatusConnection(edges=edge_objs, page_info=lbc.page_info)
 
+    def resolve_background_job_statistics(self, info):
+        """Method to return the time and resources used by background jobs, for each job method that has run
+
+        Returns:
+            list(BackgroundJobStatistics)
+        """
+        return [BackgroundJobStatistics.from_statistics(s) for s in JobAccounting().statistics()]
+
     def resolve_user_identity(self, info):
         """Method to return a graphene UserIdentity instance based on the current logged (both on & offline) user
 
@@ -1,20 +1,28 @@
-from typing import List
+import datetime
+from typing import List, Optional
 
+import flask
 from promise import Promise
 from promise.dataloader import DataLoader
 
 from gtmcore.inventory.inventory import InventoryManager
 from gtmcore.configuration.utils import call_subprocess
+from gtmcore.workflows.fetch_scheduler import FetchScheduler
+from lmsrvcore.utilities import configure_git_credentials
 
 
 class FetchLoader(DataLoader):
     """Dataloader to fetch a project or dataset once per request if needed
 
+    If background fetches are enabled, the fetch is dispatched to a background job when one is due and the request
+    does not wait for it. The loaded value is the time of the last completed fetch, so resolvers can report how
+    current their ahead/behind counts are.
+
     The key for this object is (labbook|dataset)&username&owner&repository_name
     """
 
     @staticmethod
-    def run_fetch(key: str):
+    def run_fetch(key: str) -> Optional[datetime.datetime]:
         # Get identifying info from key
         repository_type, username, owner_name, repository_name = key.split('&')
         if repository_type == 'labbook':
@@ -24,11 +32,25 @@ class FetchLoader(DataLoader):
         else:
             raise ValueError(f"Unsupported repository type: {repository_type}")
 
-        if repo.remote:
+        scheduler = FetchScheduler(flask.current_app.config['LABMGR_CONFIG'])
+        if scheduler.enabled:
+            if scheduler.claim(repo):
+                # Make sure remote git credentials are configured if the remote is a server that requires
+                # authentication, as the background job can't configure them
+                try:
+                    if (repo.remote or '').startswith('http'):
+                        configure_git_credentials()
+                except Exception:
+                    scheduler.release(repo)
+                    raise
+                scheduler.dispatch(repo)
+        elif repo.remote:
             # If no remote, can't fetch!
+            if repo.remote.startswith('http'):
+                configure_git_credentials()
             call_subprocess(['git', 'fetch'], cwd=repo.root_dir).strip()
 
-        return None
+        return scheduler.last_fetched(repo)
 
     def batch_load_fn(self, keys: List[str]):
         """Method to load dataset objects based on a list of unique keys
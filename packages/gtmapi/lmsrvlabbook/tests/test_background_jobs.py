@@ -20,7 +20,7 @@
 import time
 
 from lmsrvlabbook.tests.fixtures import fixture_working_dir_env_repo_scoped
-from gtmcore.dispatcher import Dispatcher, jobs
+from gtmcore.dispatcher import Dispatcher, JobAccounting, JobUsage, jobs
 
 
 class TestBackgroundJobs(object):
@@ -67,3 +67,38 @@ class TestBackgroundJobs(object):
                         for x in result['data']['backgroundJobs']['edges']])
         finally:
             time.sleep(2)
+
+    def test_get_background_job_statistics(self, fixture_working_dir_env_repo_scoped):
+        accounting = JobAccounting()
+        accounting.reset()
+        accounting.record(JobUsage('sync_repository', False, 1.0, 10.0, 2.0, 4.0, 1000, 512, 0))
+        accounting.record(JobUsage('sync_repository', True, 3.0, 20.0, 4.0, 8.0, 3000, 1536, 1024))
+
+        query = """
+                {
+                  backgroundJobStatistics {
+                    method
+                    count
+                    failedCount
+                    since
+                    queueSecondsMax
+                    runSecondsMean
+                    peakRssKbMax
+                    bytesReadMean
+                  }
+                }
+        """
+        try:
+            result = fixture_working_dir_env_repo_scoped[2].execute(query)
+            assert 'errors' not in result
+            stats = [s for s in result['data']['backgroundJobStatistics'] if s['method'] == 'sync_repository']
+            assert len(stats) == 1
+            assert stats[0]['count'] == 2
+            assert stats[0]['failedCount'] == 1
+            assert stats[0]['since'] is not None
+            assert stats[0]['queueSecondsMax'] == 3.0
+            assert stats[0]['runSecondsMean'] == 15.0
+            assert stats[0]['peakRssKbMax'] == 3000
+            assert stats[0]['bytesReadMean'] == 1024
+        finally:
+            accounting.reset()
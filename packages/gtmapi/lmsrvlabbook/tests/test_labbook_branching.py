@@ -24,6 +24,7 @@ from gtmcore.fixtures import helper_create_remote_repo, flush_redis_repo_cache
 from lmsrvlabbook.api.query import LabbookQuery
 from lmsrvlabbook.api.mutation import LabbookMutations
 from gtmcore.workflows import LabbookWorkflow
+from gtmcore.workflows.fetch_scheduler import FetchScheduler
 
 UT_USERNAME = "default"
 UT_LBNAME = "unittest-workflow-branch-1"
@@ -685,6 +686,9 @@ class TestWorkflowsBranching(object):
 
             wf_other.sync(username=other_user)
 
+            # Remotes are fetched by a background job when viewed, so run the fetch here
+            FetchScheduler(lb.client_config).fetch(lb)
+
             r = client.execute(q)
             assert 'errors' not in r
             assert len(r['data']['labbook']['branches']) == 3
@@ -431,6 +431,40 @@ class TestLabBookServiceMutations(object):
         assert os.path.exists(os.path.join(labbook_dir, 'subdir', 'sillyfile'))
         assert os.path.isfile(os.path.join(labbook_dir, 'subdir', 'sillyfile'))
 
+    def test_move_files(self, mock_create_labbooks):
+        """Test moving many files in a single mutation"""
+        labbook_dir = os.path.join(mock_create_labbooks[1], 'default', 'default', 'labbooks', 'labbook1', 'code')
+        os.makedirs(os.path.join(labbook_dir, 'subdir'))
+        with open(os.path.join(labbook_dir, 'subdir', 'other.txt'), 'wt') as f:
+            f.write('other')
+
+        query = """
+        mutation MoveLabbookFiles {
+            moveLabbookFiles(input: {
+                owner: "default",
+                labbookName: "labbook1",
+                section: "code",
+                moves: [{srcPath: "sillyfile", dstPath: "renamed"},
+                        {srcPath: "subdir/", dstPath: "subdir2/"}]
+            }) {
+                updatedEdges {
+                    node {
+                        section
+                        key
+                        isDir
+                    }
+                }
+            }
+        }
+        """
+        result = mock_create_labbooks[2].execute(query)
+        assert 'errors' not in result
+        nodes = result['data']['moveLabbookFiles']['updatedEdges']
+        assert [n['node']['key'] for n in nodes] == ['renamed', 'subdir2/', 'subdir2/other.txt']
+        assert os.path.isfile(os.path.join(labbook_dir, 'renamed'))
+        assert os.path.isfile(os.path.join(labbook_dir, 'subdir2', 'other.txt'))
+        assert not os.path.exists(os.path.join(labbook_dir, 'subdir'))
+
     def test_delete_file(self, mock_create_labbooks):
         query = """
         mutation deleteLabbookFiless {
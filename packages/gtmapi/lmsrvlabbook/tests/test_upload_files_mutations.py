@@ -184,6 +184,9 @@ class TestUploadFilesMutations(object):
                             }}
                             """
                 r = client.execute(query, context_value=DummyContext(file))
+                if chunk_index == 0:
+                    # The file is rejected on the first chunk, before the rest of it is uploaded
+                    assert 'matches ignored pattern' in r['errors'][0]['message']
 
             # This must be outside of the chunk upload loop
             pprint.pprint(r)
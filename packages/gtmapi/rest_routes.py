@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, request, abort, current_app
+from flask import Blueprint, jsonify, request, abort, current_app, Response, send_file
 from flask_cors import cross_origin
 import redis
 import requests
@@ -7,6 +7,7 @@ from lmsrvcore import telemetry
 from lmsrvcore.auth.user import get_logged_in_username
 from gtmcore.inventory.inventory import InventoryManager
 from gtmcore.logging import LMLogger
+from gtmcore.metrics import MetricsRegistry, SamplingProfiler
 from gtmcore.gitlib.git import GitAuthor
 from gtmcore.workflows.gitlab import check_backup_in_progress
 
@@ -21,6 +22,35 @@ def sysinfo():
     return jsonify(telemetry.service_telemetry())
 
 
+@rest_routes.route(f"/metrics")
+def metrics():
+    """Resolver and operation latency histograms and git/Redis counters of the process serving this request, and lock
+    contention counters of all processes, in the Prometheus text format"""
+    registry = MetricsRegistry.get_instance(current_app.config['LABMGR_CONFIG'])
+    if not registry:
+        abort(404)
+    return Response(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@rest_routes.route(f"/profiles")
+def list_profiles():
+    """List the stored profiles of slow GraphQL operations, most recent first"""
+    profiler = SamplingProfiler.get_instance(current_app.config['LABMGR_CONFIG'])
+    if not profiler:
+        abort(404)
+    return jsonify(profiler.list_profiles())
+
+
+@rest_routes.route(f"/profiles/<name>")
+def download_profile(name: str):
+    """Download a stored profile, in the folded stack format read by flamegraph tools"""
+    profiler = SamplingProfiler.get_instance(current_app.config['LABMGR_CONFIG'])
+    path = profiler.profile_path(name) if profiler else None
+    if not path:
+        abort(404)
+    return send_file(path, mimetype='text/plain', as_attachment=True, attachment_filename=name)
+
+
 @rest_routes.route(f"/project-errors")
 @cross_origin(headers=["Content-Type", "Authorization"], max_age=7200)
 def check_projects():
@@ -8,6 +8,7 @@ from gtmcore.activity.processors.processor import ActivityProcessor, ExecutionDa
 from gtmcore.container import container_for_context
 from gtmcore.inventory.inventory  import InventoryManager
 from gtmcore.gitlib.git import GitAuthor
+from gtmcore.gitlib.change_index import ChangeIndex
 
 logger = LMLogger.get_logger()
 
@@ -51,6 +52,17 @@ class ActivityMonitor(metaclass=abc.ABCMeta):
         # A flag indicating if the activity record is OK to store
         self.can_store_activity_record = False
 
+        # Track working tree changes so status and staging only touch what changed since the last commit
+        change_index_config = self.labbook.client_config.config['change_index']
+        if change_index_config['enabled']:
+            ChangeIndex.for_repository(self.labbook.root_dir,
+                                       reconcile_interval=change_index_config['reconcile_interval'],
+                                       max_paths=change_index_config['max_paths'])
+
+        # The git status used to build the last record, and the paths it was limited to (None if unscoped)
+        self._last_status: Optional[Dict[str, Any]] = None
+        self._last_status_paths: Optional[List[str]] = None
+
     def add_processor(self, processor_instance: ActivityProcessor) -> None:
         """
 
@@ -81,8 +93,16 @@ class ActivityMonitor(metaclass=abc.ABCMeta):
         Returns:
             str
         """
-        self.labbook.git.add_all()
+        if self._last_status is not None:
+            status, paths = self._last_status, self._last_status_paths
+        else:
+            status, paths = self.labbook.get_uncommitted_changes()
+        self._last_status = None
+        self._last_status_paths = None
+
+        self.labbook.stage_uncommitted_changes(status, paths)
         commit = self.labbook.git.commit("Auto-commit from activity monitoring")
+        self.labbook.mark_changes_committed(paths)
         return commit.hexsha
 
     def store_activity_record(self, linked_commit: str, activity_record: ActivityRecord) -> ActivityRecord:
@@ -117,8 +137,9 @@ class ActivityMonitor(metaclass=abc.ABCMeta):
         # Initialize empty record
         activity_record = ActivityRecord(activity_type=activity_type)
 
-        # Get git status for tracking file changes
-        status = self.labbook.git.status()
+        # Get git status for tracking file changes, limited to what changed if the working tree is being watched
+        status, self._last_status_paths = self.labbook.get_uncommitted_changes()
+        self._last_status = status
 
         # Run processors to populate the record
         for p in self.processors:
@@ -163,6 +184,14 @@ class ActivityMonitor(metaclass=abc.ABCMeta):
             # This should never stop more important operations
             logger.warning(f"An error occurred while setting the monitor busy state for {str(self.labbook )}: {err}")
 
+    def stop(self) -> None:
+        """Method called once the monitor has finished running, to release anything it holds for the lab book
+
+        Returns:
+            None
+        """
+        ChangeIndex.release(self.labbook.root_dir)
+
     def start(self, data: Dict[str, Any]) -> None:
         """Method called in a long running scheduled async worker that should monitor for activity, committing files
         and creating notes as needed.
@@ -0,0 +1,103 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import time
+from typing import Optional, Tuple
+
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# Flags and event masks from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+
+def inotify_init() -> Tuple[ctypes.CDLL, int]:
+    """Load libc and create a non-blocking inotify instance
+
+    Raises:
+        OSError: if inotify is not available
+
+    Returns:
+        (libc handle, inotify file descriptor)
+    """
+    libc_name = ctypes.util.find_library('c')
+    if not libc_name:
+        raise OSError(errno.ENOSYS, "libc not available, inotify cannot be used")
+
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        raise OSError(errno.ENOSYS, "inotify is not supported on this platform")
+
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        err = ctypes.get_errno()
+        raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+    return libc, fd
+
+
+class FileModificationWaiter(object):
+    """Blocks until a single file is written to, using inotify when available and stat() polling otherwise"""
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, path: str, use_inotify: bool = True) -> None:
+        self.path = path
+        self._libc: Optional[ctypes.CDLL] = None
+        self._fd = -1
+        if use_inotify:
+            try:
+                self._libc, self._fd = inotify_init()
+                if self._libc.inotify_add_watch(self._fd, os.fsencode(path), IN_MODIFY) < 0:
+                    err = ctypes.get_errno()
+                    raise OSError(err, f"inotify_add_watch failed on {path}: {os.strerror(err)}")
+            except OSError as err:
+                logger.warning(f"Falling back to polling for writes to {path}: {err}")
+                self.close()
+        self._last_stat = self._stat()
+
+    def _stat(self) -> Tuple[int, int]:
+        try:
+            st = os.stat(self.path)
+            return st.st_size, st.st_mtime_ns
+        except FileNotFoundError:
+            return -1, -1
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def wait(self, timeout: float) -> bool:
+        """Wait for the file to be modified
+
+        Args:
+            timeout: maximum number of seconds to wait
+
+        Returns:
+            True if the file was modified, False if the timeout expired
+        """
+        if self._fd >= 0:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+            if not ready:
+                return False
+            try:
+                while os.read(self._fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+            return True
+
+        deadline = time.time() + timeout
+        while True:
+            current = self._stat()
+            if current != self._last_stat:
+                self._last_stat = current
+                return True
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.POLL_INTERVAL, remaining))
@@ -0,0 +1,119 @@
+import os
+import re
+from typing import Any, BinaryIO, Callable, Dict, Iterator, NoReturn, Optional, cast
+
+from mitmproxy.exceptions import FlowReadException
+from mitmproxy.io import compat, tnetstring
+
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+
+class MitmLogTailer(object):
+    """Incrementally reads flows appended to a mitmproxy dump file
+
+    Each flow is a tnetstring (`<length>:<payload><type>`). We keep the offset of the last complete flow, so a flow
+    that is still being written when we read is simply picked up on the next call instead of being lost or parsed
+    twice. Flows are returned as their raw state dictionaries (the same structure as `Flow.get_state()`) without
+    building mitmproxy Flow objects, and an optional filter lets callers skip flows before any body is decoded.
+
+    If a corrupt frame is found, the offset is moved to the next position a flow could start at before raising
+    FlowReadException, so the next call continues with the flows after it.
+    """
+    # A length prefix is at most this many digits, plus the ':'
+    _MAX_HEADER_BYTES = 12
+
+    # Every flow is a dictionary, so its payload starts with the tnetstring of its first key
+    _FLOW_START = re.compile(rb'\d{1,11}:\d{1,11}:')
+
+    def __init__(self, logfile: BinaryIO,
+                 flow_filter: Optional[Callable[[Dict[str, Any]], bool]] = None) -> None:
+        """
+
+        Args:
+            logfile: file opened in binary mode. Reading starts at its current position.
+            flow_filter: optional callable that takes a flow state dict and returns False to skip it
+        """
+        self.logfile = logfile
+        self.flow_filter = flow_filter
+        self.offset = logfile.tell()
+
+    def _size(self) -> int:
+        try:
+            return os.fstat(self.logfile.fileno()).st_size
+        except (AttributeError, OSError, ValueError):
+            # e.g. io.BytesIO
+            position = self.logfile.tell()
+            size = self.logfile.seek(0, os.SEEK_END)
+            self.logfile.seek(position)
+            return size
+
+    def _skip_corrupt_frame(self, size: int) -> None:
+        """Move the offset past a corrupt frame, to the next position that looks like the start of a flow
+
+        If nothing that looks like a flow follows, the offset is moved to the end of the data written so far.
+        """
+        start = self.offset + 1
+        self.logfile.seek(start)
+        match = self._FLOW_START.search(self.logfile.read(max(size - start, 0)))
+        self.offset = start + match.start() if match else max(size, start)
+
+    def _raise_corrupt(self, size: int, message: str) -> NoReturn:
+        self._skip_corrupt_frame(size)
+        raise FlowReadException(message)
+
+    def _next_frame(self, size: int) -> Optional[bytes]:
+        """Read the next complete tnetstring frame, or return None if it hasn't been fully written yet"""
+        if self.offset >= size:
+            return None
+
+        self.logfile.seek(self.offset)
+        header = self.logfile.read(min(self._MAX_HEADER_BYTES, size - self.offset))
+        separator = header.find(b':')
+        if separator == -1:
+            if len(header) >= self._MAX_HEADER_BYTES or not header.isdigit():
+                self._raise_corrupt(size, f"Invalid flow header at offset {self.offset}")
+            return None
+        if separator == 0 or not header[:separator].isdigit():
+            self._raise_corrupt(size, f"Invalid flow header at offset {self.offset}")
+
+        # header + payload + trailing type character
+        frame_length = separator + 1 + int(header[:separator]) + 1
+        if self.offset + frame_length > size:
+            return None
+
+        self.logfile.seek(self.offset)
+        frame = self.logfile.read(frame_length)
+        if len(frame) < frame_length:
+            return None
+        return frame
+
+    def read_flows(self) -> Iterator[Dict[str, Any]]:
+        """Yield every complete flow appended since the last call
+
+        Returns:
+            iterator of flow state dicts
+        """
+        size = self._size()
+        while True:
+            frame = self._next_frame(size)
+            if frame is None:
+                break
+
+            try:
+                state = tnetstring.loads(frame)
+            except (ValueError, TypeError, IndexError) as err:
+                self._raise_corrupt(size, f"Invalid flow data at offset {self.offset}: {err}")
+            self.offset += len(frame)
+
+            if not isinstance(state, dict):
+                logger.warning(f"Skipping unexpected record in MITM log at offset {self.offset}")
+                continue
+
+            try:
+                flow_state = cast(Dict[str, Any], compat.migrate_flow(state))
+            except ValueError as err:
+                raise FlowReadException(err)
+            if self.flow_filter is None or self.flow_filter(flow_state):
+                yield flow_state
@@ -5,13 +5,14 @@ import time
 import json
 import pandas
 import redis
-import mitmproxy.io as mitmio
 from mitmproxy.exceptions import FlowReadException
-from typing import (Dict, List, Optional, BinaryIO)
+from typing import (Any, Dict, List, Optional, BinaryIO)
 
 from gtmcore.activity import ActivityType
 from gtmcore.activity.monitors.activity import ActivityMonitor
 from gtmcore.activity.monitors.devenv import DevEnvMonitor
+from gtmcore.activity.monitors.inotify import FileModificationWaiter
+from gtmcore.activity.monitors.mitmlog import MitmLogTailer
 from gtmcore.activity.monitors.rserver_exchange import RserverExchange
 from gtmcore.activity.processors.core import GenericFileChangeProcessor, ActivityShowBasicProcessor, \
     ActivityDetailLimitProcessor, ActivityDetailProgressProcessor
@@ -182,6 +183,12 @@ class RStudioServerMonitor(ActivityMonitor):
       1. Setting up activity processing for ExecutionData entries into ActivityRecords
       2. Actually parsing activity and creating the ExecutionData entries
     """
+    # JSON requests/responses we parse. Everything else (except images) is skipped before bodies are decoded.
+    MONITORED_PATHS = {b'/events/get_events', b'/rpc/console_input', b'/rpc/execute_notebook_chunks',
+                       b'/rpc/modify_document_properties', b'/rpc/save_document_diff', b'/rpc/open_document'}
+
+    # Upper bound on how long we wait for the MITM log to change before re-checking the shutdown flag
+    MAX_WAIT_SECONDS = 1.0
 
     def __init__(self, user: str, owner: str, labbook_name: str, monitor_key: str,
                  author_name: Optional[str] = None, author_email: Optional[str] = None) -> None:
@@ -226,6 +233,9 @@ class RStudioServerMonitor(ActivityMonitor):
         # The names of yet-unseen images that we saw in a get_events call
         self.expected_images: List[str] = []
 
+        # Incremental reader for the MITM log, created on the first call to process_activity()
+        self._log_tailer: Optional[MitmLogTailer] = None
+
     def register_processors(self) -> None:
         """Method to register processors
 
@@ -262,6 +272,8 @@ class RStudioServerMonitor(ActivityMonitor):
             logger.info(f"Failed to open RStudio log {logfile_path}")
             return
 
+        log_waiter = FileModificationWaiter(logfile_path)
+
         try:
             while True:
                 still_running = redis_conn.hget(self.monitor_key, "run")
@@ -275,8 +287,8 @@ class RStudioServerMonitor(ActivityMonitor):
                 # Read activity and update aggregated "cell" data
                 self.process_activity(mitmlog)
 
-                # Check for new records every second
-                time.sleep(1)
+                # Wake up as soon as new flows are written (or periodically, to check the shutdown flag)
+                log_waiter.wait(self.MAX_WAIT_SECONDS)
 
         except Exception as e:
             # This is rather verbose, but without the stack trace, it's almost completely useless as
@@ -284,6 +296,9 @@ class RStudioServerMonitor(ActivityMonitor):
             logger.error(f"Fatal error in RStudio Server Activity Monitor: {e}\n{traceback.format_exc()}")
             raise
         finally:
+            log_waiter.close()
+            mitmlog.close()
+
             # Delete the kernel monitor key so the dev env monitor will spin up a new process
             # You may lose some activity if this happens, but the next action will sweep up changes
             logger.info(f"Shutting down RStudio monitor {self.monitor_key}")
@@ -547,21 +562,46 @@ class RStudioServerMonitor(ActivityMonitor):
         if doc_id and fname:
             self.doc_properties.setdefault(doc_id, {})['name'] = fname.lstrip('/mnt/labbook/')
 
+    @classmethod
+    def is_monitored_flow(cls, flow_state: Dict[str, Any]) -> bool:
+        """Check if a raw MITM flow is one we process, without decoding its request or response body
+
+        Args:
+            flow_state: flow state dict as stored in the MITM log
+
+        Returns:
+            bool
+        """
+        request = flow_state.get('request')
+        response = flow_state.get('response')
+        if not request or not response:
+            return False
+
+        if request['path'] in cls.MONITORED_PATHS:
+            return True
+
+        return any(k == b'Content-Type' and v == b'image/png' for k, v in response['headers'])
+
     def process_activity(self, mitmlog: BinaryIO):
         """Collect tail of the activity log and turn into an activity record.
 
+        Only flows appended since the previous call are read.
+
         Args:
             mitmlog(file): open file object
 
         Returns:
             ar(): activity record
         """
+        if self._log_tailer is None or self._log_tailer.logfile is not mitmlog:
+            self._log_tailer = MitmLogTailer(mitmlog, flow_filter=self.is_monitored_flow)
+
         # get a generator object so we can handle exceptions in our loop
-        fstream = iter(mitmio.FlowReader(mitmlog).stream())
+        fstream = self._log_tailer.read_flows()
 
         while True:
             try:
-                mitm_message = next(fstream)
+                flow_state = next(fstream)
             except StopIteration:
                 break
             except FlowReadException as e:
@@ -570,7 +610,7 @@ class RStudioServerMonitor(ActivityMonitor):
                 break
 
             try:
-                rserver_exchange = RserverExchange(mitm_message.get_state())
+                rserver_exchange = RserverExchange(flow_state)
             except json.JSONDecodeError as je:
                 logger.info(f"Ignoring JSON Decoder Error for Rstudio message {je}.")
                 continue
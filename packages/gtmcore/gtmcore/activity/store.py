@@ -6,6 +6,7 @@ from typing import (Any, Dict, List, Tuple, Optional)
 from gtmcore.activity.detaildb import ActivityDetailDB
 from gtmcore.activity.records import ActivityDetailRecord, ActivityRecord
 from gtmcore.activity.utils import DetailRecordList
+from gtmcore.gitlib.partial_clone import deepen_history
 from gtmcore.logging import LMLogger
 
 logger = LMLogger.get_logger()
@@ -36,6 +37,9 @@ class ActivityStore(object):
         self.detaildb = ActivityDetailDB(repository.root_dir, repository.checkout_id,
                                          logfile_limit=repository.client_config.config['detaildb']['logfile_limit'])
 
+        # Number of older commits to fetch at a time when paging past the end of a shallow clone's history
+        self.deepen_increment: int = repository.client_config.config['git']['deepen_increment']
+
         # Note record commit messages follow a special structure
         self.note_regex = re.compile(r"(?s)_GTM_ACTIVITY_START_.*?_GTM_ACTIVITY_END_")
 
@@ -105,14 +109,27 @@ class ActivityStore(object):
         if after:
             path_info = after
 
+        # The log starting at `after` includes the `after` record itself
+        requested = None if first is None else first + (1 if after else 0)
+
         while True:
-            for entry in self.repository.git.log(path_info=path_info, **kwargs):
+            git_entries = self.repository.git.log(path_info=path_info, **kwargs)
+            for entry in git_entries:
                 m = self.note_regex.match(entry['message'])
                 if m:
                     log_entries.append((m.group(0), entry['commit'], entry['committed_on'],
                                         entry['author']['name'],
                                         entry['author']['email']))
 
+            history_exhausted = 'max_count' not in kwargs or len(git_entries) < kwargs['max_count']
+            if history_exhausted and (requested is None or len(log_entries) < requested):
+                # If this is a shallow clone, the end of the fetched history was reached. Fetch older commits (all
+                # of them if all records were requested) and load again.
+                if deepen_history(self.repository.root_dir,
+                                  commits=None if requested is None else self.deepen_increment):
+                    log_entries = list()
+                    continue
+
             if first is not None:
                 if first == -1:
                     # If you get here, you already tried to load more records. Give up
@@ -8,6 +8,7 @@ from gtmcore.fixtures import mock_labbook
 from gtmcore.activity import ActivityType, ActivityRecord
 from gtmcore.activity.monitors.activity import ActivityMonitor
 from gtmcore.activity.processors.processor import ActivityProcessor, ExecutionData
+from gtmcore.gitlib.change_index import ChangeIndex
 
 
 class ProblemProcessor(ActivityProcessor):
@@ -48,3 +49,18 @@ class TestActivityMonitor(object):
         #assert 'problem executing processor ProblemProcessor' in caplog.record_tuples[-1][2]
 
         assert ar.message == "Status Message"
+
+    def test_stop_releases_change_index(self, mock_redis_client, mock_labbook):
+        monitor_key = "dev_env_monitor:{}:{}:{}:{}:activity_monitor:{}".format('test',
+                                                                               'test',
+                                                                               'labbook1',
+                                                                               'jupyterlab-ubuntu1604',
+                                                                               uuid.uuid4())
+        monitor = ActivityMonitor('test',
+                                  'test',
+                                  mock_labbook[2].name,
+                                  monitor_key)
+        assert ChangeIndex.get(monitor.labbook.root_dir) is not None
+
+        monitor.stop()
+        assert ChangeIndex.get(monitor.labbook.root_dir) is None
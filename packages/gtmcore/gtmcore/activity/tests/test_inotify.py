@@ -0,0 +1,26 @@
+import os
+import time
+
+import pytest
+
+from gtmcore.activity.monitors.inotify import FileModificationWaiter
+
+
+class TestFileModificationWaiter(object):
+    @pytest.mark.parametrize('use_inotify', [True, False])
+    def test_wait(self, tmpdir, use_inotify):
+        filename = os.path.join(tmpdir, 'flows.dump')
+        with open(filename, 'wb'):
+            pass
+
+        waiter = FileModificationWaiter(filename, use_inotify=use_inotify)
+        try:
+            assert waiter.wait(0.2) is False
+
+            with open(filename, 'ab') as f:
+                f.write(b'data')
+            start = time.time()
+            assert waiter.wait(5) is True
+            assert time.time() - start < 1
+        finally:
+            waiter.close()
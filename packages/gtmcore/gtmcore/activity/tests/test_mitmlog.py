@@ -0,0 +1,76 @@
+import io
+import os
+
+import mitmproxy.io as mitmio
+import pytest
+from mitmproxy.exceptions import FlowReadException
+
+from gtmcore.activity.monitors.mitmlog import MitmLogTailer
+from gtmcore.activity.monitors.monitor_rserver import RStudioServerMonitor
+from gtmcore.activity.monitors.rserver_exchange import RserverExchange
+
+
+DUMP_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), '52f5a3a9.rserver.dump')
+
+
+@pytest.fixture()
+def dump_bytes():
+    with open(DUMP_FILE, 'rb') as f:
+        yield f.read()
+
+
+class TestMitmLogTailer(object):
+    def test_reads_same_flows_as_flowreader(self, dump_bytes):
+        expected = [f.get_state()['request']['path'] for f in mitmio.FlowReader(io.BytesIO(dump_bytes)).stream()]
+
+        tailer = MitmLogTailer(io.BytesIO(dump_bytes))
+        paths = [s['request']['path'] for s in tailer.read_flows()]
+
+        assert paths == expected
+        assert tailer.offset == len(dump_bytes)
+
+        # Nothing new has been written
+        assert list(tailer.read_flows()) == []
+
+    def test_resumes_after_partial_write(self, dump_bytes, tmpdir):
+        expected = [f.get_state()['request']['path'] for f in mitmio.FlowReader(io.BytesIO(dump_bytes)).stream()]
+        logfile = os.path.join(tmpdir, 'rserver.dump')
+
+        paths = list()
+        with open(logfile, 'wb') as writer, open(logfile, 'rb') as reader:
+            tailer = MitmLogTailer(reader)
+            # Write in chunks that split flows in the middle
+            chunk_size = 7919
+            for start in range(0, len(dump_bytes), chunk_size):
+                writer.write(dump_bytes[start:start + chunk_size])
+                writer.flush()
+                paths.extend([s['request']['path'] for s in tailer.read_flows()])
+
+        assert paths == expected
+
+    def test_filter_skips_flows(self, dump_bytes):
+        tailer = MitmLogTailer(io.BytesIO(dump_bytes), flow_filter=RStudioServerMonitor.is_monitored_flow)
+        states = list(tailer.read_flows())
+
+        assert 0 < len(states) < 126
+        for state in states:
+            exchange = RserverExchange(state)
+            assert exchange.path.encode() in RStudioServerMonitor.MONITORED_PATHS \
+                or exchange.response_type == 'image/png'
+
+    def test_corrupt_log(self):
+        tailer = MitmLogTailer(io.BytesIO(b'not a flow'))
+        with pytest.raises(FlowReadException):
+            list(tailer.read_flows())
+
+    @pytest.mark.parametrize('corrupt', [b'not a flow', b'5:abcdex'], ids=['header', 'payload'])
+    def test_skips_corrupt_frame(self, dump_bytes, corrupt):
+        expected = [f.get_state()['request']['path'] for f in mitmio.FlowReader(io.BytesIO(dump_bytes)).stream()]
+
+        tailer = MitmLogTailer(io.BytesIO(corrupt + dump_bytes))
+        with pytest.raises(FlowReadException):
+            list(tailer.read_flows())
+
+        paths = [s['request']['path'] for s in tailer.read_flows()]
+        assert paths == expected
+        assert tailer.offset == len(corrupt) + len(dump_bytes)
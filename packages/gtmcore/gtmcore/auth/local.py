@@ -9,6 +9,7 @@ import glob
 
 from gtmcore.auth.identity import IdentityManager, User, AuthenticationError
 from gtmcore.configuration import Configuration
+from gtmcore.locking import get_lock_redis_client
 
 from gtmcore.logging import LMLogger
 logger = LMLogger.get_logger()
@@ -190,9 +191,7 @@ class LocalIdentityManager(IdentityManager):
 
             # Get a redis client
             if not self._lock_redis_client:
-                self._lock_redis_client = StrictRedis(host=lock_config['redis']['host'],
-                                                      port=lock_config['redis']['port'],
-                                                      db=lock_config['redis']['db'])
+                self._lock_redis_client = get_lock_redis_client(lock_config)
 
             # Get a lock object
             lock = redis_lock.Lock(self._lock_redis_client, "filesystem_lock|cached_id_jwt_update",
@@ -1,12 +1,13 @@
-import hashlib
+import json
 import os
 import time
 from abc import ABC, abstractmethod
-from typing import Optional, Callable, List, Dict, Any
+from typing import Optional, Callable, List, Dict, Any, NamedTuple
 
 from gtmcore.configuration import Configuration
 from gtmcore.container.cuda import should_launch_with_cuda_support
 from gtmcore.dataset.cache import get_cache_manager_class
+from gtmcore.environment.fingerprint import EnvironmentFingerprint, get_environment_fingerprint, changed_groups
 from gtmcore.inventory.inventory import InventoryManager, InventoryException
 from gtmcore.logging import LMLogger
 from gtmcore.labbook import LabBook
@@ -16,11 +17,17 @@ from gtmcore.container.exceptions import ContainerException
 
 logger = LMLogger.get_logger()
 
+# A namedtuple for the result of comparing an environment to the one an image was last built from. `changed_groups`
+# lists the environment component groups that changed, see `gtmcore.environment.fingerprint`.
+EnvironmentChanges = NamedTuple('EnvironmentChanges', [('state', str), ('changed_groups', List[str])])
+
 
 class ContainerOperations(ABC):
     """Represents the interface to perform Docker-related operations for Gigantum projects.
     This includes, building, running, port-mapping, etc.
     """
+    # Where the fingerprint of the environment each image was built from is stored
+    IMAGE_CACHE_DIR = '/mnt/gigantum/.labmanager/image-cache'
 
     def __init__(self, username: str, labbook: Optional[LabBook] = None, path: Optional[str] = None,
                  override_image_name: Optional[str] = None):
@@ -326,53 +333,62 @@ class ContainerOperations(ABC):
     # TODO #1062 - this has nothing to do with (directly) managing comtainers except for a naming scheme. Can we move to
     #  ComponentManager or some more related location? Do AFTER the cloud API is implemented.
     @staticmethod
-    def check_cached_hash(image_tag: str, env_dir: str, update_cache=True) -> str:
-        """Determine if the environment changed since last we checked
+    def check_environment_changes(image_tag: str, env_dir: str, update_cache=True) -> EnvironmentChanges:
+        """Determine if and how the environment changed since last we checked
 
         NOTE - only call with update_cache=True in the context when the API requests building a new image! I.e., likely
-        only call from within .build_image(). Otherwise, the cached hash may be updated without updating the image
-        itself.
+        only call from within .build_image(). Otherwise, the cached fingerprint may be updated without updating the
+        image itself.
 
         Args:
-            image_tag: the "key" where we'll use to look up / store environment hashes
+            image_tag: the "key" where we'll use to look up / store environment fingerprints
             env_dir: a directory where we can find a gigantum environment specification
             update_cache: Update the cache stored on the filesystem?
 
         Returns:
-            'not cached', 'match', or 'changed'
+            EnvironmentChanges, with a state of 'not cached', 'match', or 'changed'
         """
-        cache_dir = '/mnt/gigantum/.labmanager/image-cache'
+        cache_dir = ContainerOperations.IMAGE_CACHE_DIR
         if not os.path.exists(cache_dir):
             logger.info(f"Making environment cache at {cache_dir}")
             os.makedirs(cache_dir, exist_ok=True)
         env_cache_path = os.path.join(cache_dir, f"{image_tag}.cache")
 
-        # Make a hash of the environment specification, by
-        m = hashlib.sha256()
-        for root, dirs, files in os.walk(env_dir):
-            for f in [n for n in files if '.yaml' in n]:
-                m.update(os.path.join(root, f).encode())
-                m.update(open(os.path.join(root, f)).read().encode())
-        env_cksum = m.hexdigest()
-        old_env_cksum: Optional[str] = None
-        if os.path.exists(env_cache_path):
-            old_env_cksum = open(env_cache_path).read()
+        fingerprint = get_environment_fingerprint(env_dir)
+        old_fingerprint: Optional[EnvironmentFingerprint] = None
+        cached = os.path.exists(env_cache_path)
+        if cached:
+            try:
+                with open(env_cache_path, 'rt') as cfile:
+                    data = json.load(cfile)
+                old_fingerprint = EnvironmentFingerprint(digest=data['digest'], groups=data['groups'])
+            except (ValueError, TypeError, KeyError):
+                # E.g. a checksum written by an earlier version, which can't be compared
+                logger.info(f"Ignoring outdated environment cache at {env_cache_path}")
+
+        if cached and old_fingerprint and old_fingerprint.digest == fingerprint.digest:
+            return EnvironmentChanges(state='match', changed_groups=[])
+
+        if not cached or update_cache:
+            with open(env_cache_path, 'wt') as cfile:
+                json.dump(fingerprint._asdict(), cfile)
         else:
-            with open(env_cache_path, 'w') as cfile:
-                cfile.write(env_cksum)
+            # Cached fingerprint is outdated. Remove it.
+            os.remove(env_cache_path)
 
-        if not old_env_cksum:
-            return 'not cached'
-        elif env_cksum == old_env_cksum:
-            return 'match'
+        if not cached:
+            return EnvironmentChanges(state='not cached', changed_groups=changed_groups(None, fingerprint))
         else:
-            # Env checksum hash is outdated. Remove it.
-            os.remove(env_cache_path)
-            if update_cache:
-                with open(env_cache_path, 'w') as cfile:
-                    cfile.write(env_cksum)
+            return EnvironmentChanges(state='changed', changed_groups=changed_groups(old_fingerprint, fingerprint))
 
-            return 'changed'
+    @staticmethod
+    def check_cached_hash(image_tag: str, env_dir: str, update_cache=True) -> str:
+        """Determine if the environment changed since last we checked. See `check_environment_changes()`.
+
+        Returns:
+            'not cached', 'match', or 'changed'
+        """
+        return ContainerOperations.check_environment_changes(image_tag, env_dir, update_cache).state
 
     @abstractmethod
     def get_gigantum_client_ip(self) -> Optional[str]:
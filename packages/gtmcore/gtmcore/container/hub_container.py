@@ -56,13 +56,15 @@ class HubProjectContainer(ContainerOperations):
         if not feedback_callback:
             feedback_callback = _dummy_feedback
 
-        cache_state = self.check_cached_hash(self.image_tag, self.env_dir)
-        if cache_state == 'match':
+        changes = self.check_environment_changes(self.image_tag, self.env_dir)
+        if changes.state == 'match':
             if self.image_available():
                 # No need to build!
                 logger.info(f"Reusing Docker image for {str(self.labbook)}")
                 feedback_callback(f"No environment changes detected. Reusing existing image.\n")
                 return
+        elif changes.state == 'changed':
+            feedback_callback(f"Environment changes detected: {', '.join(changes.changed_groups)}\n")
 
         build_feedback = f"Starting Project container build. Please wait.\n\n"
         feedback_callback(build_feedback)
@@ -66,12 +66,14 @@ class LocalProjectContainer(ContainerOperations):
         logger.info(f"Building docker image for {str(self.labbook or 'context without labbook')}, "
                     f"using name `{self.image_tag}`")
 
-        if (not self._image_id) and \
-                self.check_cached_hash(self.image_tag, self.env_dir) == 'match':
-            try:
-                self._image_id = self._client.images.get(name=self.image_tag).id
-            except docker.errors.ImageNotFound:
-                pass
+        changes = None
+        if not self._image_id:
+            changes = self.check_environment_changes(self.image_tag, self.env_dir)
+            if changes.state == 'match':
+                try:
+                    self._image_id = self._client.images.get(name=self.image_tag).id
+                except docker.errors.ImageNotFound:
+                    pass
 
         # Note: self._image_id is updated in the above conditional!
         if self._image_id:
@@ -80,12 +82,21 @@ class LocalProjectContainer(ContainerOperations):
                 feedback_callback(f"Reusing image {self._image_id}\n")
             return
 
+        # Only check the registry for a newer base image if the base changed. Otherwise the layers that did not
+        # change (see ImageBuilder) are reused from the local build cache.
+        pull = True
+        if changes and changes.state == 'changed':
+            logger.info(f"Environment changes for {str(self.labbook)}: {', '.join(changes.changed_groups)}")
+            if feedback_callback:
+                feedback_callback(f"Environment changes detected: {', '.join(changes.changed_groups)}\n")
+            pull = nocache or 'base' in changes.changed_groups
+
         # We need to build the image
         try:
             # From: https://docker-py.readthedocs.io/en/stable/api.html#docker.api.build.BuildApiMixin.build
             # This builds the image and generates output status text.
             status_counter = 0
-            for ldict in self._client.api.build(path=self.env_dir, tag=self.image_tag, pull=True, nocache=nocache,
+            for ldict in self._client.api.build(path=self.env_dir, tag=self.image_tag, pull=pull, nocache=nocache,
                                                 forcerm=True, decode=True):
                 stream = (ldict.get("stream") or "")
                 if feedback_callback:
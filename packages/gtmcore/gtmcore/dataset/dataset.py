@@ -22,6 +22,7 @@ class Dataset(Repository):
     _default_activity_type = ActivityType.DATASET
     _default_activity_detail_type = ActivityDetailType.DATASET
     _default_activity_section = "Dataset Root"
+    _metadata_files = [os.path.join('.gigantum', 'gigantum.yaml')]
 
     def __init__(self, namespace: Optional[str] = None,
                  author: Optional[GitAuthor] = None) -> None:
@@ -199,6 +200,7 @@ class Dataset(Repository):
         with open(os.path.join(self.root_dir, ".gigantum", "gigantum.yaml"), 'wt') as df:
             df.write(yaml.safe_dump(self._data, default_flow_style=False))
             df.flush()
+        self._invalidate_cache()
 
     def _load_gigantum_data(self) -> None:
         """Method to load the dataset YAML file to a dictionary
@@ -52,8 +52,9 @@ class BackgroundDownloadJob:
         if not self._job_status:
             return 0
 
-        if self._job_status.meta.get('completed_bytes'):
-            return int(self._job_status.meta['completed_bytes'])
+        progress = self._job_status.progress
+        if progress and progress.completed_bytes:
+            return int(progress.completed_bytes)
         else:
             return 0
 
@@ -129,8 +130,9 @@ class BackgroundUploadJob:
         if not self._job_status:
             return 0
 
-        if self._job_status.meta.get('completed_bytes'):
-            return int(self._job_status.meta['completed_bytes'])
+        progress = self._job_status.progress
+        if progress and progress.completed_bytes:
+            return int(progress.completed_bytes)
         else:
             return 0
 
@@ -1,6 +1,5 @@
 import os
 from typing import List, Callable, Optional, Tuple
-import subprocess
 import glob
 from natsort import natsorted
 from operator import attrgetter
@@ -43,12 +42,7 @@ class IOManager(object):
         Returns:
             bool
         """
-        try:
-            subprocess.run(['git', 'merge-base', '--is-ancestor', commit_hash, 'HEAD~1'], check=True,
-                           cwd=self.dataset.root_dir)
-            return True
-        except subprocess.CalledProcessError:
-            return False
+        return self.dataset.git.is_ancestor(commit_hash, 'HEAD~1')
 
     def objects_to_push(self, remove_duplicates: bool = False) -> List[PushObject]:
         """Return a list of named tuples of all objects that need to be pushed
@@ -1 +1,3 @@
-from gtmcore.dispatcher.dispatcher import Dispatcher, JobKey, JobStatus, default_redis_conn
+from gtmcore.dispatcher.dispatcher import Dispatcher, JobIndex, JobKey, JobStatus, default_redis_conn
+from gtmcore.dispatcher.progress import JobProgress, JobProgressRecord
+from gtmcore.dispatcher.accounting import JobAccounting, JobResourceMeter, JobStatistics, JobUsage
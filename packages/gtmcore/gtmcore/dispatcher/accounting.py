@@ -0,0 +1,171 @@
+import resource
+import time
+from typing import Dict, List, NamedTuple, Optional, Union
+
+import redis
+from rq.utils import as_text
+
+from gtmcore.dispatcher.dispatcher import default_redis_conn
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# Measurements recorded for every job, aggregated per method as a total and a maximum
+USAGE_FIELDS = ('queue_seconds', 'run_seconds', 'cpu_seconds', 'subprocess_seconds', 'peak_rss_kb', 'bytes_read',
+                'bytes_written')
+
+# A namedtuple for the resources used by one run of a background job. `queue_seconds` is the time between the job
+# being enqueued and started, `cpu_seconds` the CPU time of the job's process, `subprocess_seconds` the CPU time of the
+# processes it ran (e.g. git), and `peak_rss_kb` the largest resident set size of either. Bytes are counted from the
+# blocks read from and written to storage, so reads served from the page cache are not included.
+JobUsage = NamedTuple('JobUsage', [('method', str),
+                                   ('failed', bool),
+                                   ('queue_seconds', float),
+                                   ('run_seconds', float),
+                                   ('cpu_seconds', float),
+                                   ('subprocess_seconds', float),
+                                   ('peak_rss_kb', int),
+                                   ('bytes_read', int),
+                                   ('bytes_written', int)])
+
+# A namedtuple for the aggregated usage of a job method. `mean` and `max` map each of `USAGE_FIELDS` to its mean and
+# maximum over all runs, and `since` is the time the first run was recorded.
+JobStatistics = NamedTuple('JobStatistics', [('method', str),
+                                             ('count', int),
+                                             ('failed', int),
+                                             ('since', Optional[float]),
+                                             ('mean', Dict[str, float]),
+                                             ('max', Dict[str, float])])
+
+# Adds a run to the statistics of a method in one round trip.
+# KEYS: statistics hash, set of methods. ARGV: method, failed (0/1), now, then (field, value) pairs
+RECORD_SCRIPT = """
+redis.call('SADD', KEYS[2], ARGV[1])
+redis.call('HSETNX', KEYS[1], 'since', ARGV[3])
+redis.call('HINCRBY', KEYS[1], 'count', 1)
+redis.call('HINCRBY', KEYS[1], 'failed', ARGV[2])
+for i = 4, #ARGV, 2 do
+    local value = tonumber(ARGV[i + 1])
+    redis.call('HINCRBYFLOAT', KEYS[1], ARGV[i], value)
+    local current = redis.call('HGET', KEYS[1], ARGV[i] .. ':max')
+    if not current or tonumber(current) < value then
+        redis.call('HSET', KEYS[1], ARGV[i] .. ':max', value)
+    end
+end
+"""
+
+# Size of the blocks counted by getrusage, in bytes
+RUSAGE_BLOCK_SIZE = 512
+
+
+class JobResourceMeter(object):
+    """Measures the wall-clock time and resources used by the current process, and the processes it waits for, from
+    the time it is created
+
+    Background jobs run in a work horse process forked for the job, so the process totals are the job's own.
+    """
+    def __init__(self) -> None:
+        self._start = time.perf_counter()
+        self._self = resource.getrusage(resource.RUSAGE_SELF)
+        self._children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    def stop(self, method: str, failed: bool, queue_seconds: float) -> JobUsage:
+        """Method to get the usage since the meter was created
+
+        Args:
+            method: Name of the job method
+            failed: True if the job failed
+            queue_seconds: Time the job waited in its queue
+
+        Returns:
+            JobUsage
+        """
+        run_seconds = time.perf_counter() - self._start
+        usage_self = resource.getrusage(resource.RUSAGE_SELF)
+        usage_children = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        def delta(after: resource.struct_rusage, before: resource.struct_rusage, field: str) -> float:
+            return getattr(after, field) - getattr(before, field)
+
+        blocks_read = delta(usage_self, self._self, 'ru_inblock') + delta(usage_children, self._children, 'ru_inblock')
+        blocks_written = delta(usage_self, self._self, 'ru_oublock') + \
+            delta(usage_children, self._children, 'ru_oublock')
+        return JobUsage(method=method,
+                        failed=failed,
+                        queue_seconds=max(queue_seconds, 0.0),
+                        run_seconds=run_seconds,
+                        cpu_seconds=delta(usage_self, self._self, 'ru_utime') +
+                        delta(usage_self, self._self, 'ru_stime'),
+                        subprocess_seconds=delta(usage_children, self._children, 'ru_utime') +
+                        delta(usage_children, self._children, 'ru_stime'),
+                        # Reported in kilobytes on Linux
+                        peak_rss_kb=max(usage_self.ru_maxrss, usage_children.ru_maxrss),
+                        bytes_read=int(blocks_read) * RUSAGE_BLOCK_SIZE,
+                        bytes_written=int(blocks_written) * RUSAGE_BLOCK_SIZE)
+
+
+class JobAccounting(object):
+    """Aggregated resource usage of background jobs, per job method
+
+    The worker records the usage of every job it runs (see `GigantumWorker.perform_job`). Runs are aggregated in redis
+    into a hash per method holding the number of runs, the number of failures, and the total and maximum of each of
+    `USAGE_FIELDS`, so the statistics cover every worker process and survive restarts until `reset()` is called.
+    """
+    KEY_PREFIX = 'gigantum:job-stats'
+
+    def __init__(self, redis_conn: Optional[redis.Redis] = None) -> None:
+        self._redis_conn = redis_conn or default_redis_conn()
+        self._record_script = self._redis_conn.register_script(RECORD_SCRIPT)
+
+    @classmethod
+    def _methods_key(cls) -> str:
+        return f"{cls.KEY_PREFIX}:methods"
+
+    @classmethod
+    def _stats_key(cls, method: str) -> str:
+        return f"{cls.KEY_PREFIX}:{method}"
+
+    def record(self, usage: JobUsage) -> None:
+        """Add a job run to the statistics of its method
+
+        Args:
+            usage: Usage of the run
+
+        Returns:
+            None
+        """
+        args: List[Union[str, int, float]] = [usage.method, int(usage.failed), time.time()]
+        for field in USAGE_FIELDS:
+            args.extend([field, getattr(usage, field)])
+        self._record_script(keys=[self._stats_key(usage.method), self._methods_key()], args=args)
+
+    def statistics(self) -> List[JobStatistics]:
+        """Get the statistics of every job method that has been recorded
+
+        Returns:
+            list of JobStatistics, sorted by method
+        """
+        methods = sorted([as_text(m) for m in self._redis_conn.smembers(self._methods_key())])
+        with self._redis_conn.pipeline(transaction=False) as pipe:
+            for method in methods:
+                pipe.hgetall(self._stats_key(method))
+            stats_hashes = pipe.execute()
+
+        result = list()
+        for method, stats_hash in zip(methods, stats_hashes):
+            stats = {as_text(k): float(v) for k, v in stats_hash.items()}
+            count = int(stats.get('count', 0))
+            if count == 0:
+                continue
+            result.append(JobStatistics(method=method,
+                                        count=count,
+                                        failed=int(stats.get('failed', 0)),
+                                        since=stats.get('since'),
+                                        mean={f: stats.get(f, 0.0) / count for f in USAGE_FIELDS},
+                                        max={f: stats.get(f'{f}:max', 0.0) for f in USAGE_FIELDS}))
+        return result
+
+    def reset(self) -> None:
+        """Remove the statistics of all job methods, e.g. to start measuring after a configuration change"""
+        methods = [as_text(m) for m in self._redis_conn.smembers(self._methods_key())]
+        self._redis_conn.delete(self._methods_key(), *[self._stats_key(m) for m in methods])
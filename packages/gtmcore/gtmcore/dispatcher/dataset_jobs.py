@@ -1,7 +1,8 @@
 import copy
 import os
 import time
-from typing import Optional, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Optional, List
 
 from humanfriendly import format_size
 from rq import get_current_job
@@ -9,7 +10,7 @@ from rq import get_current_job
 from gtmcore.configuration import Configuration
 from gtmcore.dataset import Manifest
 from gtmcore.dataset.manifest.job import generate_bg_hash_job_list
-from gtmcore.dispatcher import Dispatcher
+from gtmcore.dispatcher import Dispatcher, JobProgress
 from gtmcore.gitlib import GitAuthor, RepoLocation
 from gtmcore.inventory.inventory import InventoryManager, InventoryException
 from gtmcore.logging import LMLogger
@@ -76,19 +77,12 @@ def complete_dataset_upload_transaction(logged_in_username: str, logged_in_email
 
     def update_feedback(msg: str, has_failures: Optional[bool] = None, failure_detail: Optional[str] = None,
                         percent_complete: Optional[float] = None):
-        """Method to update the job's metadata and provide feedback to the UI"""
-        current_job = get_current_job()
-        if not current_job:
+        """Method to update the job's progress and provide feedback to the UI"""
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        if has_failures:
-            current_job.meta['has_failures'] = has_failures
-        if failure_detail:
-            current_job.meta['failure_detail'] = failure_detail
-        if percent_complete:
-            current_job.meta['percent_complete'] = percent_complete
-
-        current_job.meta['feedback'] = msg
-        current_job.save_meta()
+        progress.update(has_failures=has_failures, failure_detail=failure_detail, percent_complete=percent_complete)
+        progress.set_feedback(msg)
 
     def schedule_bg_hash_job():
         """Method to check if a bg job should get scheduled and do so"""
@@ -213,6 +207,57 @@ def complete_dataset_upload_transaction(logged_in_username: str, logged_in_email
         raise GitLabException(err)
 
 
+def _import_linked_dataset(logged_in_username: str, dataset_owner: str, dataset_name: str, remote_url: str) -> bool:
+    """Method to import a linked dataset into the user's working directory if it is not there yet
+
+    Args:
+        logged_in_username: username for the currently logged in user
+        dataset_owner: Owner of the dataset
+        dataset_name: Name of the dataset
+        remote_url: URL of the dataset to import if needed
+
+    Returns:
+        True if the dataset was imported, False if it already existed
+    """
+    logger = LMLogger.get_logger()
+    im = InventoryManager()
+    try:
+        # Check for dataset already existing in the user's working directory
+        im.load_dataset(logged_in_username, dataset_owner, dataset_name)
+        logger.info(f"{logged_in_username}/{dataset_owner}/{dataset_name} exists. Skipping auto-import.")
+        return False
+    except InventoryException:
+        # Dataset not found, import it
+        logger.info(f"{logged_in_username}/{dataset_owner}/{dataset_name} not found. "
+                    f"Auto-importing remote dataset from {remote_url}")
+
+    remote = RepoLocation(remote_url, logged_in_username)
+    gitworkflows_utils.clone_repo(remote_url=remote.remote_location, username=logged_in_username,
+                                  owner=dataset_owner,
+                                  load_repository=im.load_dataset_from_directory,
+                                  put_repository=im.put_dataset)
+    logger.info(f"{logged_in_username}/{dataset_owner}/{dataset_name} auto-imported successfully")
+    return True
+
+
+def _configure_git_credentials(logged_in_username: str, remote_url: str, access_token: Optional[str],
+                               id_token: Optional[str]) -> None:
+    """Method to configure git credentials for a remote's host, if the user's tokens are available"""
+    # TODO gigantum/ideas#11: this token logic is NOT duplicated in the standard dataset or labbook flows. It
+    #  could be handled in gitworkflows_utils.clone_repo below, or somewhere in a git auth logic module/object.
+    #  Note that some complexity derives from the fact that we don't have access to the Flask session here.
+    if access_token:
+        if not id_token:
+            raise ValueError("Access and ID tokens are required to initialize git credentials")
+
+        # If the access token is set, git creds should be configured
+        remote = RepoLocation(remote_url, logged_in_username)
+        server_config = Configuration().get_server_configuration()
+        gl_mgr = GitLabManager(remote.host, hub_api=server_config.hub_api_url,
+                               access_token=access_token, id_token=id_token)
+        gl_mgr.configure_git_credentials(remote.host, logged_in_username)
+
+
 def check_and_import_dataset(logged_in_username: str, dataset_owner: str, dataset_name: str, remote_url: str,
                              access_token: Optional[str] = None, id_token: Optional[str] = None) -> None:
     """Job to check if a dataset exists in the user's working directory, and if not import it. This is primarily used
@@ -234,44 +279,76 @@ def check_and_import_dataset(logged_in_username: str, dataset_owner: str, datase
     logger.info(f"(Job {p}) Starting check_and_import_dataset(logged_in_username={logged_in_username},"
                 f"dataset_owner={dataset_owner}, dataset_name={dataset_name}")
 
-    remote = RepoLocation(remote_url, logged_in_username)
     try:
-        im = InventoryManager()
+        _configure_git_credentials(logged_in_username, remote_url, access_token, id_token)
+        _import_linked_dataset(logged_in_username, dataset_owner, dataset_name, remote_url)
+    except Exception as err:
+        logger.error(f"(Job {p}) Error in check_and_import_dataset job")
+        logger.exception(err)
+        raise GitLabException(err)
 
-        try:
-            # Check for dataset already existing in the user's working directory
-            im.load_dataset(logged_in_username, dataset_owner, dataset_name)
-            logger.info(f"{logged_in_username}/{dataset_owner}/{dataset_name} exists. Skipping auto-import.")
-            return
-        except InventoryException:
-            # Dataset not found, import it
-            logger.info(f"{logged_in_username}/{dataset_owner}/{dataset_name} not found. "
-                        f"Auto-importing remote dataset from {remote_url}")
-            config_obj = Configuration()
-            server_config = config_obj.get_server_configuration()
-
-            # TODO gigantum/ideas#11: this token logic is NOT duplicated in the standard dataset or labbook flows. It
-            #  could be handled in gitworkflows_utils.clone_repo below, or somewhere in a git auth logic module/object.
-            #  Note that some complexity derives from the fact that we don't have access to the Flask session here.
-            if access_token:
-                if not id_token:
-                    raise ValueError("Access and ID tokens are required to initialize git credentials")
-
-                # If the access token is set, git creds should be configured
-                gl_mgr = GitLabManager(remote.host, hub_api=server_config.hub_api_url,
-                                       access_token=access_token, id_token=id_token)
-                gl_mgr.configure_git_credentials(remote.host, logged_in_username)
-
-            gitworkflows_utils.clone_repo(remote_url=remote.remote_location, username=logged_in_username,
-                                          owner=dataset_owner,
-                                          load_repository=im.load_dataset_from_directory,
-                                          put_repository=im.put_dataset)
-            logger.info(f"{logged_in_username}/{dataset_owner}/{dataset_name} auto-imported successfully")
 
+def import_linked_datasets(logged_in_username: str, datasets: List[Dict[str, str]],
+                           access_token: Optional[str] = None, id_token: Optional[str] = None) -> None:
+    """Job to import the datasets linked to a project that are not yet in the user's working directory, as a single
+    job with bounded parallelism. Progress is reported per dataset.
+
+    Args:
+        logged_in_username: username for the currently logged in user
+        datasets: List of dicts with the `dataset_owner`, `dataset_name` and `remote_url` of each linked dataset
+        access_token: The current user's access token, needed to initialize git credentials in certain situations
+        id_token: The current user's id token, needed to initialize git credentials in certain situations
+
+    Returns:
+        None
+    """
+    logger = LMLogger.get_logger()
+    p = os.getpid()
+    logger.info(f"(Job {p}) Starting import_linked_datasets(logged_in_username={logged_in_username}, "
+                f"datasets={[d['dataset_owner'] + '/' + d['dataset_name'] for d in datasets]})")
+
+    progress = JobProgress.for_current_job()
+    failures = list()
+    try:
+        # Credentials are stored per host, so only need to be configured once per host
+        configured_hosts = set()
+        for d in datasets:
+            host = RepoLocation(d['remote_url'], logged_in_username).host
+            if host not in configured_hosts:
+                _configure_git_credentials(logged_in_username, d['remote_url'], access_token, id_token)
+                configured_hosts.add(host)
+
+        max_workers = Configuration().config['datasets']['linked_import_workers']
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(datasets)))) as pool:
+            futures = {pool.submit(_import_linked_dataset, logged_in_username, d['dataset_owner'],
+                                   d['dataset_name'], d['remote_url']): d for d in datasets}
+            for completed, future in enumerate(as_completed(futures), 1):
+                d = futures[future]
+                name = f"{d['dataset_owner']}/{d['dataset_name']}"
+                try:
+                    imported = future.result()
+                    message = f"Imported linked Dataset {name}" if imported else f"Linked Dataset {name} is available"
+                except Exception as err:
+                    logger.exception(f"(Job {p}) Failed to import linked Dataset {name}: {err}")
+                    failures.append(name)
+                    message = f"Failed to import linked Dataset {name}"
+
+                if progress:
+                    progress.add_line(message)
+                    progress.update(percent_complete=round(100 * completed / len(datasets), 1))
     except Exception as err:
-        logger.error(f"(Job {p}) Error in check_and_import_dataset job")
+        logger.error(f"(Job {p}) Error in import_linked_datasets job")
         logger.exception(err)
         raise GitLabException(err)
+    finally:
+        for d in datasets:
+            gitworkflows_utils.release_linked_dataset_import(logged_in_username, d['dataset_owner'],
+                                                              d['dataset_name'])
+
+    if failures:
+        if progress:
+            progress.update(has_failures=True, failure_detail=f"Failed to import: {', '.join(failures)}")
+        raise GitLabException(f"Failed to import {len(failures)} linked Dataset(s): {', '.join(failures)}")
 
 
 def push_dataset_objects(objs: List[PushObject], logged_in_username: str, access_token: str, id_token: str,
@@ -292,15 +369,11 @@ def push_dataset_objects(objs: List[PushObject], logged_in_username: str, access
     logger = LMLogger.get_logger()
 
     def progress_update_callback(completed_bytes: int) -> None:
-        """Method to update the job's metadata and provide feedback to the UI"""
-        current_job = get_current_job()
-        if not current_job:
+        """Method to update the job's progress and provide feedback to the UI"""
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        if 'completed_bytes' not in current_job.meta:
-            current_job.meta['completed_bytes'] = 0
-
-        current_job.meta['completed_bytes'] = int(current_job.meta['completed_bytes']) + completed_bytes
-        current_job.save_meta()
+        progress.increment('completed_bytes', completed_bytes)
 
     try:
         p = os.getpid()
@@ -353,15 +426,11 @@ def pull_objects(keys: List[str], logged_in_username: str, access_token: str, id
     logger = LMLogger.get_logger()
 
     def progress_update_callback(completed_bytes: int) -> None:
-        """Method to update the job's metadata and provide feedback to the UI"""
-        current_job = get_current_job()
-        if not current_job:
+        """Method to update the job's progress and provide feedback to the UI"""
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        if 'completed_bytes' not in current_job.meta:
-            current_job.meta['completed_bytes'] = 0
-
-        current_job.meta['completed_bytes'] = int(current_job.meta['completed_bytes']) + completed_bytes
-        current_job.save_meta()
+        progress.increment('completed_bytes', completed_bytes)
 
     try:
         p = os.getpid()
@@ -425,19 +494,12 @@ def download_dataset_files(logged_in_username: str, access_token: str, id_token:
 
     def update_feedback(msg: str, has_failures: Optional[bool] = None, failure_detail: Optional[str] = None,
                         percent_complete: Optional[float] = None) -> None:
-        """Method to update the job's metadata and provide feedback to the UI"""
-        current_job = get_current_job()
-        if not current_job:
+        """Method to update the job's progress and provide feedback to the UI"""
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        if has_failures:
-            current_job.meta['has_failures'] = has_failures
-        if failure_detail:
-            current_job.meta['failure_detail'] = failure_detail
-        if percent_complete:
-            current_job.meta['percent_complete'] = percent_complete
-
-        current_job.meta['feedback'] = msg
-        current_job.save_meta()
+        progress.update(has_failures=has_failures, failure_detail=failure_detail, percent_complete=percent_complete)
+        progress.set_feedback(msg)
     logger = LMLogger.get_logger()
 
     try:
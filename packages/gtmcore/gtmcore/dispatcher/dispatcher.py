@@ -1,18 +1,25 @@
 from enum import Enum
-from datetime import datetime
-from typing import (Any, Callable, Dict, List, Optional, Tuple, Union)
+from datetime import datetime, timezone
+from typing import (Any, Callable, Dict, List, Optional, Set, Tuple, Union, TYPE_CHECKING)
 import signal
 import time
 import os
+import zlib
 
 import redis
 import rq
 import rq_scheduler
 from rq import Worker
+from rq.job import unpickle
+from rq.registry import DeferredJobRegistry, FinishedJobRegistry, StartedJobRegistry
+from rq.utils import as_text, utcparse
 
 from gtmcore.logging import LMLogger
 from gtmcore.exceptions import GigantumException
 
+if TYPE_CHECKING:
+    from gtmcore.dispatcher.progress import JobProgressRecord
+
 logger = LMLogger.get_logger()
 
 
@@ -57,15 +64,31 @@ class JobStatus(object):
     """ Represents a background job known to the backend processing system. Represents the state of the background
         job at a particular point in time. Does not re-query to fetch fresher information (Because Jobs may be cleaned
         up in the backend and information may be lost) """
-    def __init__(self, job_key: JobKey) -> None:
-        # Fetch the RQ job. There needs to be a little processing done on it first.
-        rq_job = rq.job.Job.fetch(job_key.key_str.split(':')[-1],
-                                  connection=default_redis_conn())
+    def __init__(self, job_key: JobKey, job_hash: Optional[Dict[bytes, bytes]] = None) -> None:
+        """
 
+        Args:
+            job_key: Key of the job
+            job_hash: Optional raw job hash, as already returned by HGETALL (e.g., in a pipeline). If omitted the job
+                      is fetched from Redis.
+        """
         # Because this captures the state of the Job at a given point in time, it should
         # carry the timestamp of this snapshot.
         self.timestamp = datetime.now()
         self.job_key: JobKey = job_key
+
+        # Progress is read from the job's progress channel when first accessed
+        self._progress: Optional['JobProgressRecord'] = None
+        self._progress_loaded = False
+
+        if job_hash is not None:
+            self._load_hash(job_hash)
+            return
+
+        # Fetch the RQ job. There needs to be a little processing done on it first.
+        rq_job = rq.job.Job.fetch(job_key.key_str.split(':')[-1],
+                                  connection=default_redis_conn())
+
         self.status: Optional[str] = rq_job.get_status()
         self.result: Optional[object] = rq_job.result
         self.description: Optional[str] = rq_job.description
@@ -74,6 +97,61 @@ class JobStatus(object):
         self.started_at: Optional[datetime] = rq_job.started_at
         self.finished_at: Optional[datetime] = rq_job.ended_at
 
+    def _load_hash(self, job_hash: Dict[bytes, bytes]) -> None:
+        """Populate fields from a raw RQ job hash, decoding it the same way `rq.job.Job.refresh` does"""
+        def to_date(value: Optional[bytes]) -> Optional[datetime]:
+            return utcparse(as_text(value)) if value else None
+
+        def to_text(value: Optional[bytes], compressed: bool = False) -> Optional[str]:
+            if not value:
+                return None
+            if compressed:
+                try:
+                    value = zlib.decompress(value)
+                except zlib.error:
+                    # Fallback to uncompressed string
+                    pass
+            return as_text(value)
+
+        self.status = to_text(job_hash.get(b'status'))
+        self.result = unpickle(job_hash[b'result']) if job_hash.get(b'result') else None
+        self.description = to_text(job_hash.get(b'description'))
+        self.meta = unpickle(job_hash[b'meta']) if job_hash.get(b'meta') else {}
+        self.exc_info = to_text(job_hash.get(b'exc_info'), compressed=True)
+        self.started_at = to_date(job_hash.get(b'started_at'))
+        self.finished_at = to_date(job_hash.get(b'ended_at'))
+
+    @property
+    def job_id(self) -> str:
+        """The rq job id, without the `rq:job:` prefix"""
+        return self.job_key.key_str.split(':')[-1]
+
+    @property
+    def progress(self) -> Optional['JobProgressRecord']:
+        """Progress the job has reported to its progress channel, read the first time it is accessed"""
+        if not self._progress_loaded:
+            # Imported here to avoid a circular import, as the progress channel uses this module's redis connection
+            from gtmcore.dispatcher.progress import JobProgress
+            self._progress = JobProgress.read(self.job_id)
+            self._progress_loaded = True
+        return self._progress
+
+    @staticmethod
+    def prefetch_progress(job_statuses: List['JobStatus']) -> None:
+        """Read the progress of multiple jobs in one round trip, so accessing `progress` doesn't query each job
+
+        Args:
+            job_statuses: List of JobStatus
+
+        Returns:
+            None
+        """
+        from gtmcore.dispatcher.progress import JobProgress
+        records = JobProgress.read_many([j.job_id for j in job_statuses])
+        for job_status in job_statuses:
+            job_status._progress = records.get(job_status.job_id)
+            job_status._progress_loaded = True
+
     def __str__(self) -> str:
         return f'<BackgroundJob {str(self.job_key)}>'
 
@@ -89,6 +167,248 @@ class JobStatus(object):
             return None
 
 
+class JobIndex(object):
+    """Secondary index of background jobs by the repository they pertain to
+
+    Each labbook or dataset referenced in a job's metadata (`meta['labbook']` / `meta['dataset']`) gets a sorted set of
+    job ids scored by enqueue time, plus a hash of job id -> last known status. The index is written by
+    `Dispatcher.dispatch_task` and by the worker when a job starts and completes, so listing the jobs for a repository
+    only touches that repository's jobs instead of every job key in Redis.
+
+    Finished and failed jobs are scheduled for removal from the index `finished_ttl` seconds after they complete, and
+    any indexed job whose RQ hash has already expired is dropped the next time the index is read.
+
+    Jobs that were already in RQ before the index existed are added by `backfill()`, which runs once per Redis
+    database the first time the index is read.
+    """
+    KEY_PREFIX = 'gigantum:jobs'
+    REPOSITORY_TYPES = ('labbook', 'dataset')
+    COMPLETED_STATUSES = ('finished', 'failed')
+
+    # Matches the result TTL the workers are started with (see `worker.start_rq_worker`)
+    FINISHED_TTL = 60 * 60 * 24 * 7
+
+    # Set once this process has made sure the index was backfilled
+    _backfill_checked = False
+
+    def __init__(self, redis_conn: Optional[redis.Redis] = None, finished_ttl: int = FINISHED_TTL) -> None:
+        self._redis_conn = redis_conn or default_redis_conn()
+        self.finished_ttl = finished_ttl
+
+    @classmethod
+    def _jobs_key(cls, repository_type: str, repository_key: str) -> str:
+        return f"{cls.KEY_PREFIX}:{repository_type}:{repository_key}"
+
+    @classmethod
+    def _status_key(cls, repository_type: str, repository_key: str) -> str:
+        return f"{cls.KEY_PREFIX}:{repository_type}:{repository_key}:status"
+
+    @classmethod
+    def _expiring_key(cls) -> str:
+        return f"{cls.KEY_PREFIX}:expiring"
+
+    @classmethod
+    def _backfilled_key(cls) -> str:
+        return f"{cls.KEY_PREFIX}:backfilled"
+
+    @classmethod
+    def _indexed_repositories(cls, metadata: Optional[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """Return (repository type, repository key) pairs a job with the given metadata is indexed under"""
+        if not metadata:
+            return []
+        return [(t, str(metadata[t])) for t in cls.REPOSITORY_TYPES if metadata.get(t)]
+
+    def add(self, job_id: str, metadata: Optional[Dict[str, Any]], status: str,
+            pipeline: Optional[redis.client.Pipeline] = None) -> None:
+        """Index a newly enqueued job
+
+        Args:
+            job_id: RQ job id (without the `rq:job:` prefix)
+            metadata: Job metadata, used to look up the repositories the job pertains to
+            status: Initial job status
+            pipeline: Optional pipeline to add the commands to. If omitted, they are executed immediately.
+
+        Returns:
+            None
+        """
+        pipe = pipeline if pipeline is not None else self._redis_conn.pipeline()
+        for repository_type, repository_key in self._indexed_repositories(metadata):
+            pipe.zadd(self._jobs_key(repository_type, repository_key), {job_id: time.time()})
+            pipe.hset(self._status_key(repository_type, repository_key), job_id, status)
+        if pipeline is None:
+            pipe.execute()
+
+    def set_status(self, job_id: str, metadata: Optional[Dict[str, Any]], status: str,
+                   pipeline: Optional[redis.client.Pipeline] = None) -> None:
+        """Record a job status change, scheduling completed jobs for removal from the index
+
+        Args:
+            job_id: RQ job id (without the `rq:job:` prefix)
+            metadata: Job metadata, used to look up the repositories the job pertains to
+            status: New job status
+            pipeline: Optional pipeline to add the commands to. If omitted, they are executed immediately.
+
+        Returns:
+            None
+        """
+        pipe = pipeline if pipeline is not None else self._redis_conn.pipeline()
+        for repository_type, repository_key in self._indexed_repositories(metadata):
+            jobs_key = self._jobs_key(repository_type, repository_key)
+            pipe.hset(self._status_key(repository_type, repository_key), job_id, status)
+            if status in self.COMPLETED_STATUSES:
+                pipe.zadd(self._expiring_key(), {f"{jobs_key}|{job_id}": time.time() + self.finished_ttl})
+        if pipeline is None:
+            pipe.execute()
+
+    def _remove(self, jobs_key: str, job_ids: List[str], pipeline: redis.client.Pipeline) -> None:
+        pipeline.zrem(jobs_key, *job_ids)
+        pipeline.hdel(f"{jobs_key}:status", *job_ids)
+        pipeline.zrem(self._expiring_key(), *[f"{jobs_key}|{job_id}" for job_id in job_ids])
+
+    def backfill(self) -> int:
+        """Index the jobs currently in the RQ queues and registries, e.g. jobs enqueued before the index existed
+
+        Returns:
+            Number of jobs indexed under at least one repository
+        """
+        job_ids: Set[str] = set()
+        for queue_name in GigantumQueues:
+            queue = rq.Queue(queue_name.value, connection=self._redis_conn)
+            job_ids.update(queue.get_job_ids())
+            for registry_cls in (StartedJobRegistry, FinishedJobRegistry, DeferredJobRegistry):
+                job_ids.update(registry_cls(queue=queue).get_job_ids())
+        job_ids.update(rq.get_failed_queue(connection=self._redis_conn).get_job_ids())
+        if not job_ids:
+            return 0
+
+        ordered_ids = sorted(job_ids)
+        with self._redis_conn.pipeline(transaction=False) as pipe:
+            for job_id in ordered_ids:
+                pipe.hgetall(f"rq:job:{job_id}")
+            job_hashes = pipe.execute()
+
+        indexed = 0
+        with self._redis_conn.pipeline() as pipe:
+            for job_id, job_hash in zip(ordered_ids, job_hashes):
+                if not job_hash:
+                    continue
+                try:
+                    job = JobStatus(JobKey(f"rq:job:{job_id}"), job_hash=job_hash)
+                except Exception as e:
+                    logger.warning(f"Could not load background job {job_id}: {e}")
+                    continue
+
+                repositories = self._indexed_repositories(job.meta)
+                if not repositories or not job.status:
+                    continue
+
+                enqueued_at = job_hash.get(b'enqueued_at')
+                score = utcparse(as_text(enqueued_at)).replace(tzinfo=timezone.utc).timestamp() if enqueued_at \
+                    else time.time()
+                for repository_type, repository_key in repositories:
+                    pipe.zadd(self._jobs_key(repository_type, repository_key), {job_id: score})
+                self.set_status(job_id, job.meta, job.status, pipeline=pipe)
+                indexed += 1
+            pipe.execute()
+
+        logger.info(f"Indexed {indexed} existing background job(s)")
+        return indexed
+
+    def _ensure_backfilled(self) -> None:
+        """Backfill the index the first time it is read from any process"""
+        if JobIndex._backfill_checked:
+            return
+        if self._redis_conn.set(self._backfilled_key(), int(time.time()), nx=True):
+            self.backfill()
+        JobIndex._backfill_checked = True
+
+    def prune_expired(self) -> int:
+        """Remove completed jobs whose TTL has passed from the index
+
+        Returns:
+            Number of index entries removed
+        """
+        expired = self._redis_conn.zrangebyscore(self._expiring_key(), '-inf', time.time())
+        if not expired:
+            return 0
+
+        by_index: Dict[str, List[str]] = {}
+        for entry in expired:
+            jobs_key, job_id = as_text(entry).rsplit('|', 1)
+            by_index.setdefault(jobs_key, []).append(job_id)
+
+        with self._redis_conn.pipeline() as pipe:
+            for jobs_key, job_ids in by_index.items():
+                self._remove(jobs_key, job_ids, pipe)
+            pipe.execute()
+        return len(expired)
+
+    def get_jobs(self, repository_type: str, repository_key: str) -> List[JobStatus]:
+        """Return the jobs indexed for a repository, oldest first
+
+        The RQ job hashes are fetched in a single pipeline. Jobs that no longer exist in Redis are dropped from the
+        index, and the status summary is brought up to date with what was read.
+
+        Args:
+            repository_type: "labbook" or "dataset"
+            repository_key: Key stored in the job metadata for the repository
+
+        Returns:
+            list of JobStatus
+        """
+        self._ensure_backfilled()
+        self.prune_expired()
+
+        jobs_key = self._jobs_key(repository_type, repository_key)
+        job_ids = [as_text(j) for j in self._redis_conn.zrange(jobs_key, 0, -1)]
+        if not job_ids:
+            return []
+
+        with self._redis_conn.pipeline(transaction=False) as pipe:
+            for job_id in job_ids:
+                pipe.hgetall(f"rq:job:{job_id}")
+            job_hashes = pipe.execute()
+
+        jobs: List[JobStatus] = []
+        missing: List[str] = []
+        for job_id, job_hash in zip(job_ids, job_hashes):
+            if not job_hash:
+                missing.append(job_id)
+                continue
+            try:
+                jobs.append(JobStatus(JobKey(f"rq:job:{job_id}"), job_hash=job_hash))
+            except Exception as e:
+                logger.warning(f"Could not load background job {job_id}: {e}")
+
+        with self._redis_conn.pipeline() as pipe:
+            if missing:
+                logger.debug(f"Dropping {len(missing)} expired background job(s) from index {jobs_key}")
+                self._remove(jobs_key, missing, pipe)
+            statuses: Dict[Any, Any] = {j.job_id: j.status for j in jobs if j.status}
+            if statuses:
+                pipe.hmset(self._status_key(repository_type, repository_key), statuses)
+            pipe.execute()
+
+        return jobs
+
+    def status_summary(self, repository_type: str, repository_key: str) -> Dict[str, int]:
+        """Return the number of indexed jobs in each status for a repository, without fetching any jobs
+
+        Args:
+            repository_type: "labbook" or "dataset"
+            repository_key: Key stored in the job metadata for the repository
+
+        Returns:
+            dict of status -> count
+        """
+        self._ensure_backfilled()
+        summary: Dict[str, int] = {}
+        for status in self._redis_conn.hvals(self._status_key(repository_type, repository_key)):
+            status_str = as_text(status)
+            summary[status_str] = summary.get(status_str, 0) + 1
+        return summary
+
+
 class GigantumQueues(Enum):
     # Represents the default queue for all non-intense jobs. This queue may be bursted.
     default_queue = "gigantum-default-queue"
@@ -121,6 +441,7 @@ class Dispatcher(object):
 
     def __init__(self) -> None:
         self._redis_conn = default_redis_conn()
+        self._job_index = JobIndex(self._redis_conn)
         self._scheduler = rq_scheduler.Scheduler(queue_name=GigantumQueues.default_queue.value,
                                                  connection=self._redis_conn)
 
@@ -164,16 +485,29 @@ class Dispatcher(object):
         return [job for job in self.all_jobs if job.status == 'finished']
 
     def get_jobs_for_labbook(self, labbook_key: str) -> List[JobStatus]:
-        """Return all background job keys pertaining to the given labbook, as indexed by its root_directory. """
-        def is_match(job):
-            return job.meta and job.meta.get('labbook') == labbook_key
-
-        labbook_jobs = [job for job in self.all_jobs if is_match(job)]
+        """Return all background jobs pertaining to the given labbook, as indexed by its key. """
+        labbook_jobs = self._job_index.get_jobs('labbook', labbook_key)
         if not labbook_jobs:
             logger.debug(f"No background jobs found for labbook `{labbook_key}`")
 
         return labbook_jobs
 
+    def get_jobs_for_dataset(self, dataset_key: str) -> List[JobStatus]:
+        """Return all background jobs pertaining to the given dataset, as indexed by its key. """
+        dataset_jobs = self._job_index.get_jobs('dataset', dataset_key)
+        if not dataset_jobs:
+            logger.debug(f"No background jobs found for dataset `{dataset_key}`")
+
+        return dataset_jobs
+
+    def get_job_summary_for_labbook(self, labbook_key: str) -> Dict[str, int]:
+        """Return the number of background jobs in each status for the given labbook. """
+        return self._job_index.status_summary('labbook', labbook_key)
+
+    def get_job_summary_for_dataset(self, dataset_key: str) -> Dict[str, int]:
+        """Return the number of background jobs in each status for the given dataset. """
+        return self._job_index.status_summary('dataset', dataset_key)
+
     def query_task(self, job_key: JobKey) -> Optional[JobStatus]:
         """Return a JobStatus containing all info pertaining to background job.
 
@@ -300,6 +634,12 @@ class Dispatcher(object):
             logger.error("Cannot enqueue job `{}`: {}".format(method_reference.__name__, e))
             raise
 
+        try:
+            self._job_index.add(rq_job_ref.id, metadata, rq_job_ref.get_status())
+        except redis.exceptions.RedisError as e:
+            # The job has been enqueued, so a failure to index it should not fail the dispatch
+            logger.error(f"Cannot index job `{method_reference.__name__}`: {e}")
+
         rq_job_key_str = rq_job_ref.key.decode()
         logger.info(
             "Dispatched job `{}` to queue '{}', job={}".format(method_reference.__name__,
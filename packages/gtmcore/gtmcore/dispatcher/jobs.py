@@ -2,7 +2,7 @@ import importlib
 import json
 import os
 import time
-from typing import Optional
+from typing import Callable, List, Optional
 import shutil
 
 from rq import get_current_job
@@ -20,7 +20,11 @@ from gtmcore.environment import RepositoryManager
 from gtmcore.environment.repository import RepositoryLock
 from gtmcore.logging import LMLogger
 from gtmcore.workflows import ZipExporter, LabbookWorkflow, DatasetWorkflow, MergeOverride
-from gtmcore.workflows.gitworkflows_utils import handle_git_feedback
+from gtmcore.workflows.gitworkflows_utils import schedule_repository_maintenance
+from gtmcore.workflows.fetch_scheduler import FetchScheduler
+from gtmcore.dispatcher.progress import JobProgress
+from gtmcore.gitlib.maintenance import RepositoryMaintenance
+from gtmcore.exceptions import GigantumLockedException
 
 from gtmcore.dataset.storage.backend import UnmanagedStorageBackend
 
@@ -39,20 +43,12 @@ def publish_repository(repository: Repository, username: str, access_token: str,
 
     def update_feedback(msg: str, has_failures: Optional[bool] = None, failure_detail: Optional[str] = None,
                         percent_complete: Optional[float] = None):
-        """Method to update the job's metadata and provide feedback to the UI"""
-        current_job = get_current_job()
-        if not current_job:
+        """Method to update the job's progress and provide feedback to the UI"""
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        if has_failures:
-            current_job.meta['has_failures'] = has_failures
-        if failure_detail:
-            current_job.meta['failure_detail'] = failure_detail
-        if percent_complete:
-            current_job.meta['percent_complete'] = percent_complete
-
-        current_job.meta['feedback'] = handle_git_feedback(current_job.meta.get('feedback'), msg)
-
-        current_job.save_meta()
+        progress.update(has_failures=has_failures, failure_detail=failure_detail, percent_complete=percent_complete)
+        progress.add_git_feedback(msg)
 
     update_feedback("Publish task in queue")
     with repository.lock():
@@ -63,6 +59,9 @@ def publish_repository(repository: Repository, username: str, access_token: str,
         wf.publish(username=username, access_token=access_token, remote=remote or "origin",
                    public=public, feedback_callback=update_feedback, id_token=id_token)
 
+    # Maintenance is no longer done during the publish unless it has fallen far behind, so catch up once idle
+    schedule_repository_maintenance(repository)
+
 
 def sync_repository(repository: Repository, username: str, override: MergeOverride,
                     remote: str = "origin", access_token: str = None,
@@ -73,20 +72,12 @@ def sync_repository(repository: Repository, username: str, override: MergeOverri
 
     def update_feedback(msg: str, has_failures: Optional[bool] = None, failure_detail: Optional[str] = None,
                         percent_complete: Optional[float] = None):
-        """Method to update the job's metadata and provide feedback to the UI"""
-        current_job = get_current_job()
-        if not current_job:
+        """Method to update the job's progress and provide feedback to the UI"""
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        if has_failures:
-            current_job.meta['has_failures'] = has_failures
-        if failure_detail:
-            current_job.meta['failure_detail'] = failure_detail
-        if percent_complete:
-            current_job.meta['percent_complete'] = percent_complete
-
-        current_job.meta['feedback'] = handle_git_feedback(current_job.meta.get('feedback'), msg)
-
-        current_job.save_meta()
+        progress.update(has_failures=has_failures, failure_detail=failure_detail, percent_complete=percent_complete)
+        progress.add_git_feedback(msg)
 
     try:
         update_feedback("Sync task in queue")
@@ -99,6 +90,7 @@ def sync_repository(repository: Repository, username: str, override: MergeOverri
                           feedback_callback=update_feedback, access_token=access_token,
                           id_token=id_token, pull_only=pull_only)
         logger.info(f"(Job {p} Completed sync_repository with cnt={cnt}")
+        schedule_repository_maintenance(repository)
         return cnt
     except MergeError as err:
         # When sending the merge error up, we must set this special string so the
@@ -106,6 +98,71 @@ def sync_repository(repository: Repository, username: str, override: MergeOverri
         raise MergeError(err)
 
 
+def run_repository_maintenance(repository: Repository) -> List[str]:
+    """Method to run the incremental git maintenance tasks that are due on a repository
+
+    Maintenance only runs while the repository is idle. If a user operation holds the repository lock, it is skipped
+    and left for the next time it is scheduled.
+
+    Args:
+        repository: Subject Repository
+
+    Returns:
+        list of the maintenance tasks that completed
+    """
+    p = os.getpid()
+    logger = LMLogger.get_logger()
+    logger.info(f"(Job {p}) Starting run_repository_maintenance({str(repository)})")
+
+    maintenance = RepositoryMaintenance(repository.root_dir, config=repository.client_config)
+    try:
+        if not os.path.isdir(repository.root_dir):
+            logger.info(f"(Job {p}) {str(repository)} no longer exists, skipping git maintenance")
+            return []
+
+        with repository.lock(failfast=True):
+            completed = maintenance.maintain(idle=True)
+        logger.info(f"(Job {p}) Completed run_repository_maintenance({str(repository)}): {completed}")
+        return completed
+    except GigantumLockedException:
+        logger.info(f"(Job {p}) {str(repository)} is in use, skipping git maintenance")
+        return []
+    finally:
+        maintenance.release()
+
+
+def fetch_repository_remote(repository: Repository) -> bool:
+    """Method to fetch the remote of a recently viewed repository, so its ahead/behind counts are up to date
+
+    The fetch is skipped if a user operation (e.g. a sync, which fetches itself) holds the repository lock.
+
+    Args:
+        repository: Subject Repository
+
+    Returns:
+        True if a remote tracking branch changed
+    """
+    p = os.getpid()
+    logger = LMLogger.get_logger()
+    logger.info(f"(Job {p}) Starting fetch_repository_remote({str(repository)})")
+
+    scheduler = FetchScheduler(repository.client_config)
+    try:
+        if not os.path.isdir(repository.root_dir):
+            logger.info(f"(Job {p}) {str(repository)} no longer exists, skipping fetch")
+            return False
+
+        with repository.lock(failfast=True):
+            changed = scheduler.fetch(repository)
+        logger.info(f"(Job {p}) Completed fetch_repository_remote({str(repository)}), changed: {changed}")
+        return changed
+    except GigantumLockedException:
+        logger.info(f"(Job {p}) {str(repository)} is in use, skipping fetch")
+        return False
+    finally:
+        scheduler.release(repository)
+
+
 def import_labbook_from_remote(remote_url: str, username: str) -> str:
     """Return the root directory of the newly imported Project
 
@@ -123,13 +180,10 @@ def import_labbook_from_remote(remote_url: str, username: str) -> str:
     logger.info(f"(Job {p}) Starting import_labbook_from_remote({remote_url}, {username})")
 
     def update_meta(msg):
-        job = get_current_job()
-        if not job:
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-
-        job.meta['feedback'] = handle_git_feedback(job.meta.get('feedback'), msg)
-
-        job.save_meta()
+        progress.add_git_feedback(msg)
 
     remote = RepoLocation(remote_url, username)
     update_meta(f"Importing Project from {remote.owner_repo!r}...")
@@ -145,6 +199,25 @@ def import_labbook_from_remote(remote_url: str, username: str) -> str:
     return wf.labbook.root_dir
 
 
+def byte_progress_callback() -> Callable[[int, int], None]:
+    """Get a callback that reports the number of bytes processed by the current job as its progress
+
+    The job is resolved when the callback is created, as the callback may be called from other threads.
+
+    Returns:
+        Callable
+    """
+    progress = JobProgress.for_current_job()
+
+    def report(completed_bytes: int, total_bytes: int) -> None:
+        if not progress:
+            return
+        percent_complete = round(100 * completed_bytes / total_bytes, 1) if total_bytes else 100.0
+        progress.update(completed_bytes=completed_bytes, percent_complete=percent_complete)
+
+    return report
+
+
 def export_labbook_as_zip(labbook_path: str, lb_export_directory: str) -> str:
     """Return path to archive file of exported labbook. """
     p = os.getpid()
@@ -153,30 +226,42 @@ def export_labbook_as_zip(labbook_path: str, lb_export_directory: str) -> str:
 
     try:
         lb = InventoryManager().load_labbook_from_directory(labbook_path)
-        with lb.lock():
-            path = ZipExporter.export_labbook(lb.root_dir, lb_export_directory)
+        # The exporter only locks the Project while it is snapshotted
+        path = ZipExporter.export_labbook(lb.root_dir, lb_export_directory, progress_callback=byte_progress_callback())
 
-            # Replace path so it is host filesystem oriented
-            path = path.replace("/mnt/gigantum", os.environ['HOST_WORK_DIR'])
+        # Replace path so it is host filesystem oriented
+        path = path.replace("/mnt/gigantum", os.environ['HOST_WORK_DIR'])
         return path
     except Exception as e:
         logger.exception(f"(Job {p}) Error on export_labbook_as_zip: {e}")
         raise
 
 
-def export_dataset_as_zip(dataset_path: str, ds_export_directory: str) -> str:
-    """Return path to archive file of exported dataset. """
+def export_dataset_as_zip(dataset_path: str, ds_export_directory: str, username: Optional[str] = None,
+                          metadata_only: bool = False) -> str:
+    """Return path to archive file of exported dataset.
+
+    Args:
+        dataset_path: Root directory of the Dataset
+        ds_export_directory: Directory to write the archive to
+        username: Logged in username, used to include file contents from the object cache
+        metadata_only: If True, file contents are not included
+
+    Returns:
+        str
+    """
     p = os.getpid()
     logger = LMLogger.get_logger()
     logger.info(f"(Job {p}) Starting export_dataset_as_zip({dataset_path})")
 
     try:
         ds = InventoryManager().load_dataset_from_directory(dataset_path)
-        with ds.lock():
-            path = ZipExporter.export_dataset(ds.root_dir, ds_export_directory)
+        # The exporter only locks the Dataset while it is snapshotted
+        path = ZipExporter.export_dataset(ds.root_dir, ds_export_directory, progress_callback=byte_progress_callback(),
+                                          username=username, metadata_only=metadata_only)
 
-            # Replace path so it is host filesystem oriented
-            path = path.replace("/mnt/gigantum", os.environ['HOST_WORK_DIR'])
+        # Replace path so it is host filesystem oriented
+        path = path.replace("/mnt/gigantum", os.environ['HOST_WORK_DIR'])
         return path
     except Exception as e:
         logger.exception(f"(Job {p}) Error on export_dataset_as_zip: {e}")
@@ -196,11 +281,10 @@ def import_labboook_from_zip(archive_path: str, username: str, owner: str) -> st
     """
 
     def update_meta(msg):
-        job = get_current_job()
-        if not job:
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        job.meta['feedback'] = msg
-        job.save_meta()
+        progress.set_feedback(msg)
 
     p = os.getpid()
     logger = LMLogger.get_logger()
@@ -209,7 +293,7 @@ def import_labboook_from_zip(archive_path: str, username: str, owner: str) -> st
 
     try:
         lb = ZipExporter.import_labbook(archive_path, username, owner,
-                                        update_meta=update_meta)
+                                        update_meta=update_meta, progress_callback=byte_progress_callback())
         return lb.root_dir
     except Exception as e:
         logger.exception(f"(Job {p}) Error on import_labbook_from_zip({archive_path}): {e}")
@@ -232,11 +316,10 @@ def import_dataset_from_zip(archive_path: str, username: str, owner: str) -> str
     """
 
     def update_meta(msg):
-        job = get_current_job()
-        if not job:
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        job.meta['feedback'] = msg
-        job.save_meta()
+        progress.set_feedback(msg)
 
     p = os.getpid()
     logger = LMLogger.get_logger()
@@ -245,7 +328,7 @@ def import_dataset_from_zip(archive_path: str, username: str, owner: str) -> str
 
     try:
         lb = ZipExporter.import_dataset(archive_path, username, owner,
-                                        update_meta=update_meta)
+                                        update_meta=update_meta, progress_callback=byte_progress_callback())
         return lb.root_dir
     except Exception as e:
         logger.exception(f"(Job {p}) Error on import_dataset_from_zip({archive_path}): {e}")
@@ -278,12 +361,13 @@ def build_labbook_image(path: str, username: str, tag: Optional[str] = None, noc
             job.meta['pid'] = os.getpid()
             job.save_meta()
 
+        progress = JobProgress.for_current_job()
+
         def save_metadata_callback(line: str) -> None:
             try:
-                if not line:
+                if not line or not progress:
                     return
-                job.meta['feedback'] = (job.meta.get('feedback') or '') + line
-                job.save_meta()
+                progress.write(line)
             except Exception as e:
                 logger.error(e)
 
@@ -357,7 +441,10 @@ def start_and_run_activity_monitor(module_name, class_name, user, owner, labbook
                               author_name=author_name, author_email=author_email)
 
         # Start the monitor
-        monitor.start(session_metadata)
+        try:
+            monitor.start(session_metadata)
+        finally:
+            monitor.stop()
 
         return 0
     except Exception as e:
@@ -380,14 +467,10 @@ def update_unmanaged_dataset_from_remote(logged_in_username: str, access_token:
 
     """
     def update_meta(msg):
-        job = get_current_job()
-        if not job:
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        if 'feedback' not in job.meta:
-            job.meta['feedback'] = msg
-        else:
-            job.meta['feedback'] = job.meta['feedback'] + f'\n{msg}'
-        job.save_meta()
+        progress.add_line(msg)
 
     logger = LMLogger.get_logger()
 
@@ -433,15 +516,12 @@ def verify_dataset_contents(logged_in_username: str, access_token: str, id_token
         None
     """
     job = get_current_job()
+    progress = JobProgress.for_current_job()
 
     def update_meta(msg):
-        if not job:
+        if not progress:
             return
-        if 'feedback' not in job.meta:
-            job.meta['feedback'] = msg
-        else:
-            job.meta['feedback'] = job.meta['feedback'] + f'\n{msg}'
-        job.save_meta()
+        progress.add_line(msg)
 
     logger = LMLogger.get_logger()
 
@@ -487,14 +567,10 @@ def update_unmanaged_dataset_from_local(logged_in_username: str, access_token: s
 
     """
     def update_meta(msg):
-        job = get_current_job()
-        if not job:
+        progress = JobProgress.for_current_job()
+        if not progress:
             return
-        if 'feedback' not in job.meta:
-            job.meta['feedback'] = msg
-        else:
-            job.meta['feedback'] = job.meta['feedback'] + f'\n{msg}'
-        job.save_meta()
+        progress.add_line(msg)
 
     logger = LMLogger.get_logger()
 
@@ -606,6 +682,34 @@ def update_environment_repositories() -> None:
     lock.release()
 
 
+def refresh_package_metadata(module_name: str, class_name: str, package_list: List[str],
+                             labbook_path: Optional[str], username: str) -> None:
+    """Method to refresh stale package index lookups in the package metadata cache
+
+    Args:
+        module_name: Module of the package manager class
+        class_name: Name of the package manager class
+        package_list: List of package names to look up
+        labbook_path: Root directory of the labbook the lookup was made for
+        username: Username of the user the lookup was made for
+
+    Returns:
+        None
+    """
+    logger = LMLogger.get_logger()
+    logger.info(f"Refreshing {len(package_list)} package(s) with {class_name} in pid {os.getpid()}")
+
+    try:
+        m = importlib.import_module(module_name)
+        package_manager = getattr(m, class_name)()
+
+        labbook = InventoryManager().load_labbook_from_directory(labbook_path) if labbook_path else None
+        package_manager.get_package_records(package_list, labbook, username, refresh=True)
+    except Exception as err:
+        logger.error(f"Error refreshing package metadata in pid {os.getpid()}: {err}")
+        raise
+
+
 def index_labbook_filesystem():
     """To be implemented later. """
     raise NotImplemented
@@ -0,0 +1,392 @@
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+import redis
+from rq import get_current_job
+
+from gtmcore.dispatcher.dispatcher import default_redis_conn
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# A namedtuple for the progress of a background job, as last written to its progress channel. `feedback` holds the
+# most recent feedback lines joined by newlines. Fields that were never set are None.
+JobProgressRecord = NamedTuple('JobProgressRecord', [('feedback', Optional[str]),
+                                                     ('percent_complete', Optional[float]),
+                                                     ('completed_bytes', Optional[int]),
+                                                     ('has_failures', Optional[bool]),
+                                                     ('failure_detail', Optional[str]),
+                                                     ('updated_at', Optional[float])])
+
+# Git output lines that aren't useful to show to the user
+GIT_FEEDBACK_SKIP_PREFIXES = (".git/info/lfs.locksverify true",
+                              "Locking support detected on remote",
+                              "hint:")
+
+
+def is_git_progress_update(last_line: str, message: str) -> bool:
+    """Function to check if a line of git output updates the previous line (e.g. a progress indicator like
+    `Receiving objects:  45% (9/20)`), rather than being a new message
+
+    Args:
+        last_line: The previous feedback line
+        message: The new, stripped, line of git output
+
+    Returns:
+        bool
+    """
+    msg_parts = message.split(':')
+    if len(msg_parts) < 2:
+        return False
+
+    last_line_parts = last_line.split(':')
+    return len(msg_parts) == len(last_line_parts) and msg_parts[0] == last_line_parts[0]
+
+
+class JobProgress(object):
+    """Progress channel of a background job, for feedback that is shown to the user while the job runs
+
+    Feedback lines are kept in a bounded ring buffer of the `MAX_LINES` most recent lines, alongside structured
+    progress fields (`FIELDS`). Both are stored in redis under their own keys, separate from the job's pickled rq
+    metadata, so readers (e.g. the JobStatus GraphQL type) can fetch them with a single round trip.
+
+    Updates are coalesced in memory and written at most `MAX_WRITES_PER_SECOND` times a second, and each write only
+    sends the lines that changed since the previous one. Pending updates are written by a timer once the interval
+    has passed, and the worker closes the channels of a job when it completes, so the final state is always written.
+    """
+    KEY_PREFIX = 'gigantum:job-progress'
+
+    FIELDS = ('percent_complete', 'completed_bytes', 'has_failures', 'failure_detail')
+
+    MAX_LINES = 1000
+    MAX_WRITES_PER_SECOND = 4
+
+    # Matches JobIndex.FINISHED_TTL, the time finished jobs are kept
+    TTL = 60 * 60 * 24 * 7
+
+    # Open channels of the jobs running in this process, by job id
+    _channels: Dict[str, 'JobProgress'] = dict()
+    _channels_lock = threading.Lock()
+
+    def __init__(self, job_id: str, redis_conn: Optional[redis.Redis] = None, max_lines: int = MAX_LINES,
+                 max_writes_per_second: float = MAX_WRITES_PER_SECOND) -> None:
+        self.job_id = job_id
+        self.max_lines = max_lines
+        self._redis_conn = redis_conn or default_redis_conn()
+        self._min_interval = 1.0 / max_writes_per_second
+
+        self._lines: Deque[str] = deque(maxlen=max_lines)
+        # True if the last line is still being written to by `write`
+        self._open_line = False
+        # Counts of lines ever added, and of lines that had been added at the last flush
+        self._total_lines = 0
+        self._flushed_lines = 0
+        # Index (in lines ever added) of the first line changed since the last flush
+        self._dirty_from = 0
+        # True if all lines were replaced since the last flush
+        self._reset = False
+        self._fields: Dict[str, Any] = dict()
+        self._pending_fields: Dict[str, Any] = dict()
+
+        self._last_flush = 0.0
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def lines_key(cls, job_id: str) -> str:
+        return f"{cls.KEY_PREFIX}:{job_id}:lines"
+
+    @classmethod
+    def fields_key(cls, job_id: str) -> str:
+        return f"{cls.KEY_PREFIX}:{job_id}:fields"
+
+    @classmethod
+    def for_current_job(cls) -> Optional['JobProgress']:
+        """Method to get the progress channel of the job running in this process
+
+        Returns:
+            JobProgress, or None if not running in a background job
+        """
+        job = get_current_job()
+        if not job:
+            return None
+
+        with cls._channels_lock:
+            channel = cls._channels.get(job.id)
+            if channel is None:
+                channel = cls(job.id, redis_conn=job.connection)
+                cls._channels[job.id] = channel
+        return channel
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Method to write all pending updates of the channels open in this process and close them. Called by the
+        worker when a job completes.
+
+        Returns:
+            None
+        """
+        with cls._channels_lock:
+            channels = list(cls._channels.values())
+            cls._channels.clear()
+
+        for channel in channels:
+            channel.flush()
+
+    def _append(self, line: str) -> None:
+        self._lines.append(line)
+        self._total_lines += 1
+
+    def _replace_last(self, line: str) -> None:
+        self._lines[-1] = line
+        self._dirty_from = min(self._dirty_from, self._total_lines - 1)
+
+    def add_line(self, message: str) -> None:
+        """Method to add a feedback line
+
+        Args:
+            message: Feedback to show to the user
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._open_line = False
+            self._append(message)
+            self._changed()
+
+    def add_git_feedback(self, message: str) -> None:
+        """Method to add a line of git output as feedback. Progress indicators replace the previous line instead of
+        adding a line, and lines that aren't useful to the user are skipped.
+
+        Args:
+            message: A line of output from git (or a message formatted like one)
+
+        Returns:
+            None
+        """
+        message = message.strip()
+        with self._lock:
+            self._open_line = False
+            if self._lines:
+                if message.startswith(GIT_FEEDBACK_SKIP_PREFIXES):
+                    return
+                if is_git_progress_update(self._lines[-1], message):
+                    self._replace_last(message)
+                    self._changed()
+                    return
+
+            self._append(message)
+            self._changed()
+
+    def set_feedback(self, message: str) -> None:
+        """Method to replace all feedback with a single message
+
+        Args:
+            message: Feedback to show to the user
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._lines.clear()
+            self._open_line = False
+            self._reset = True
+            self._append(message)
+            self._changed()
+
+    def write(self, text: str) -> None:
+        """Method to add raw output as feedback, e.g. from a Docker build. Lines are split on newlines, and text
+        without a trailing newline is continued by the next write.
+
+        Args:
+            text: Output to show to the user
+
+        Returns:
+            None
+        """
+        if not text:
+            return
+
+        parts = text.split('\n')
+        with self._lock:
+            if self._open_line and self._lines:
+                self._replace_last(self._lines[-1] + parts[0])
+            else:
+                self._append(parts[0])
+            for part in parts[1:]:
+                self._append(part)
+            self._open_line = True
+            self._changed()
+
+    def update(self, **fields: Any) -> None:
+        """Method to update structured progress fields. Fields that are None are left unchanged.
+
+        Args:
+            **fields: Values of fields in `FIELDS`, e.g. `percent_complete=50.0`
+
+        Returns:
+            None
+        """
+        unknown = set(fields.keys()) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unsupported job progress fields: {', '.join(sorted(unknown))}")
+
+        with self._lock:
+            changed = False
+            for name, value in fields.items():
+                if value is not None and self._fields.get(name) != value:
+                    self._fields[name] = value
+                    self._pending_fields[name] = value
+                    changed = True
+            if changed:
+                self._changed()
+
+    def increment(self, field: str, amount: int) -> None:
+        """Method to add to a numeric progress field, e.g. `completed_bytes`
+
+        Args:
+            field: Name of a field in `FIELDS`
+            amount: Amount to add
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.update(**{field: (self._fields.get(field) or 0) + amount})
+
+    @property
+    def feedback(self) -> str:
+        """The current feedback lines, joined by newlines"""
+        with self._lock:
+            return '\n'.join(self._lines)
+
+    def _changed(self) -> None:
+        """Flush now if the write interval has passed, otherwise make sure a flush is scheduled"""
+        elapsed = time.time() - self._last_flush
+        if elapsed >= self._min_interval:
+            self._flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self._min_interval - elapsed, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Method to write pending updates to redis immediately
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._reset and self._dirty_from == self._total_lines and not self._pending_fields:
+            return
+
+        lines_key = self.lines_key(self.job_id)
+        fields_key = self.fields_key(self.job_id)
+        pipe = self._redis_conn.pipeline()
+
+        if self._reset:
+            pipe.delete(lines_key)
+            new_lines = list(self._lines)
+        else:
+            # Lines that were already written but have changed since (e.g. a progress indicator) are rewritten
+            for _ in range(self._flushed_lines - self._dirty_from):
+                pipe.rpop(lines_key)
+            changed_count = min(self._total_lines - self._dirty_from, len(self._lines))
+            new_lines = list(self._lines)[len(self._lines) - changed_count:]
+
+        if new_lines:
+            pipe.rpush(lines_key, *new_lines)
+            pipe.ltrim(lines_key, -self.max_lines, -1)
+
+        values: Dict[Any, Any] = {name: json.dumps(value) for name, value in self._pending_fields.items()}
+        values['updated_at'] = json.dumps(time.time())
+        pipe.hmset(fields_key, values)
+        pipe.expire(lines_key, self.TTL)
+        pipe.expire(fields_key, self.TTL)
+
+        try:
+            pipe.execute()
+        except redis.exceptions.RedisError as err:
+            # Feedback is best effort, and must never fail the job. Pending updates are retried on the next flush.
+            logger.warning(f"Failed to write progress of job {self.job_id}: {err}")
+            return
+
+        self._last_flush = time.time()
+        self._flushed_lines = self._total_lines
+        self._dirty_from = self._total_lines
+        self._reset = False
+        self._pending_fields = dict()
+
+    @classmethod
+    def read_many(cls, job_ids: List[str], redis_conn: Optional[redis.Redis] = None) -> Dict[str, JobProgressRecord]:
+        """Method to read the progress of multiple jobs in one round trip
+
+        Args:
+            job_ids: List of rq job ids (without the `rq:job:` prefix)
+            redis_conn: Optional redis connection to use
+
+        Returns:
+            dict of job id -> JobProgressRecord, only containing jobs that have reported progress
+        """
+        if not job_ids:
+            return dict()
+
+        pipe = (redis_conn or default_redis_conn()).pipeline()
+        for job_id in job_ids:
+            pipe.lrange(cls.lines_key(job_id), 0, -1)
+            pipe.hgetall(cls.fields_key(job_id))
+        results = pipe.execute()
+
+        records = dict()
+        for job_id, lines, raw_fields in zip(job_ids, results[0::2], results[1::2]):
+            if not lines and not raw_fields:
+                continue
+
+            fields = {k.decode(): json.loads(v) for k, v in raw_fields.items()}
+            records[job_id] = JobProgressRecord(feedback='\n'.join(l.decode() for l in lines) if lines else None,
+                                                percent_complete=fields.get('percent_complete'),
+                                                completed_bytes=fields.get('completed_bytes'),
+                                                has_failures=fields.get('has_failures'),
+                                                failure_detail=fields.get('failure_detail'),
+                                                updated_at=fields.get('updated_at'))
+        return records
+
+    @classmethod
+    def read(cls, job_id: str, redis_conn: Optional[redis.Redis] = None) -> Optional[JobProgressRecord]:
+        """Method to read the progress of a job
+
+        Args:
+            job_id: rq job id (without the `rq:job:` prefix)
+            redis_conn: Optional redis connection to use
+
+        Returns:
+            JobProgressRecord, or None if the job has not reported progress
+        """
+        return cls.read_many([job_id], redis_conn=redis_conn).get(job_id)
+
+    @staticmethod
+    def to_metadata(record: Optional[JobProgressRecord]) -> Dict[str, Any]:
+        """Method to convert progress to the keys it was historically stored under in the job's rq metadata
+
+        Args:
+            record: JobProgressRecord, or None
+
+        Returns:
+            dict containing only the fields that are set
+        """
+        if record is None:
+            return dict()
+        metadata = record._asdict()
+        del metadata['updated_at']
+        return {k: v for k, v in metadata.items() if v is not None}
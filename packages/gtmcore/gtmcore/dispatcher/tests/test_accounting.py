@@ -0,0 +1,76 @@
+import subprocess
+import time
+
+import pytest
+from rq import Queue, SimpleWorker
+
+from gtmcore.dispatcher import JobAccounting, JobResourceMeter, JobUsage, default_redis_conn
+from gtmcore.dispatcher.worker import GigantumWorker
+
+
+class SimpleGigantumWorker(GigantumWorker, SimpleWorker):
+    """GigantumWorker that runs jobs in its own process"""
+    pass
+
+
+def helper_job(fail: bool = False) -> int:
+    subprocess.run(['git', '--version'], check=True, stdout=subprocess.PIPE)
+    if fail:
+        raise ValueError("Failed")
+    return 1
+
+
+@pytest.fixture()
+def job_accounting():
+    accounting = JobAccounting()
+    accounting.reset()
+    yield accounting
+    accounting.reset()
+
+
+class TestJobAccounting(object):
+    def test_resource_meter(self):
+        meter = JobResourceMeter()
+        time.sleep(0.1)
+        subprocess.run(['git', '--version'], check=True, stdout=subprocess.PIPE)
+        usage = meter.stop('test_method', failed=False, queue_seconds=-1.0)
+
+        assert usage.method == 'test_method'
+        assert usage.queue_seconds == 0.0
+        assert usage.run_seconds >= 0.1
+        assert usage.subprocess_seconds > 0
+        assert usage.peak_rss_kb > 0
+
+    def test_statistics(self, job_accounting):
+        job_accounting.record(JobUsage('sync_repository', False, 1.0, 10.0, 2.0, 4.0, 1000, 512, 0))
+        job_accounting.record(JobUsage('sync_repository', True, 3.0, 20.0, 4.0, 8.0, 3000, 1536, 1024))
+        job_accounting.record(JobUsage('build_labbook_image', False, 0.5, 60.0, 1.0, 30.0, 500, 0, 2048))
+
+        statistics = job_accounting.statistics()
+        assert [s.method for s in statistics] == ['build_labbook_image', 'sync_repository']
+        sync = statistics[1]
+        assert (sync.count, sync.failed) == (2, 1)
+        assert sync.since <= time.time()
+        assert sync.mean['queue_seconds'] == 2.0
+        assert sync.max['queue_seconds'] == 3.0
+        assert sync.mean['run_seconds'] == 15.0
+        assert sync.max['peak_rss_kb'] == 3000
+        assert sync.mean['bytes_read'] == 1024
+        assert sync.max['bytes_written'] == 1024
+
+        job_accounting.reset()
+        assert job_accounting.statistics() == []
+
+    def test_worker_records_jobs(self, job_accounting):
+        queue = Queue('gigantum-test-accounting-queue', connection=default_redis_conn())
+        queue.empty()
+        queue.enqueue(helper_job)
+        queue.enqueue(helper_job, kwargs={'fail': True})
+        SimpleGigantumWorker([queue], connection=default_redis_conn()).work(burst=True)
+
+        statistics = job_accounting.statistics()
+        assert len(statistics) == 1
+        assert statistics[0].method == 'helper_job'
+        assert (statistics[0].count, statistics[0].failed) == (2, 1)
+        assert statistics[0].max['subprocess_seconds'] > 0
+        assert statistics[0].max['queue_seconds'] >= 0
@@ -24,10 +24,16 @@ from gtmcore.workflows.gitlab import GitLabException
 
 
 from gtmcore.inventory.inventory import InventoryManager, InventoryException
-from gtmcore.dispatcher.dispatcher import Dispatcher
+from gtmcore.dispatcher import Dispatcher, JobProgress, JobProgressRecord, default_redis_conn
 from gtmcore.dispatcher.tests import BG_SKIP_MSG, BG_SKIP_TEST
 
 
+def helper_progress(completed_bytes: int) -> JobProgressRecord:
+    """Progress of a background file transfer job, as reported to its progress channel"""
+    return JobProgressRecord(feedback=None, percent_complete=None, completed_bytes=completed_bytes, has_failures=None,
+                             failure_detail=None, updated_at=None)
+
+
 @pytest.fixture()
 def mock_dataset_head():
     """A pytest fixture that creates a dataset in a temp working dir. Deletes directory after test"""
@@ -321,6 +327,8 @@ class TestDatasetBackgroundJobs(object):
     def test_verify_contents(self, mock_dataset_with_local_dir):
         class JobMock():
             def __init__(self):
+                self.id = str(uuid.uuid4())
+                self.connection = default_redis_conn()
                 self.meta = dict()
             def save_meta(self):
                 pass
@@ -330,7 +338,8 @@ class TestDatasetBackgroundJobs(object):
         def get_current_job_mock():
             return CURRENT_JOB
 
-        with patch('gtmcore.dispatcher.jobs.get_current_job', side_effect=get_current_job_mock):
+        with patch('gtmcore.dispatcher.jobs.get_current_job', side_effect=get_current_job_mock), \
+                patch('gtmcore.dispatcher.progress.get_current_job', side_effect=get_current_job_mock):
             ds = mock_dataset_with_local_dir[0]
             m = Manifest(ds, 'tester')
             assert len(m.manifest.keys()) == 0
@@ -367,11 +376,14 @@ class TestDatasetBackgroundJobs(object):
 
             assert 'modified_keys' in job.meta
             assert job.meta['modified_keys'] == ["test1.txt"]
-            assert 'Validating contents of 3 files.' in job.meta['feedback']
+            JobProgress.close_all()
+            assert 'Validating contents of 3 files.' in JobProgress.read(job.id).feedback
 
     def test_verify_contents_linked_dataset(self, mock_dataset_with_local_dir):
         class JobMock():
             def __init__(self):
+                self.id = str(uuid.uuid4())
+                self.connection = default_redis_conn()
                 self.meta = dict()
             def save_meta(self):
                 pass
@@ -381,7 +393,8 @@ class TestDatasetBackgroundJobs(object):
         def get_current_job_mock():
             return CURRENT_JOB
 
-        with patch('gtmcore.dispatcher.jobs.get_current_job', side_effect=get_current_job_mock):
+        with patch('gtmcore.dispatcher.jobs.get_current_job', side_effect=get_current_job_mock), \
+                patch('gtmcore.dispatcher.progress.get_current_job', side_effect=get_current_job_mock):
             ds = mock_dataset_with_local_dir[0]
             im = InventoryManager()
 
@@ -421,7 +434,8 @@ class TestDatasetBackgroundJobs(object):
 
             assert 'modified_keys' in job.meta
             assert job.meta['modified_keys'] == ["test1.txt"]
-            assert 'Validating contents of 3 files.' in job.meta['feedback']
+            JobProgress.close_all()
+            assert 'Validating contents of 3 files.' in JobProgress.read(job.id).feedback
 
     def test_complete_dataset_upload_transaction_simple(self, mock_config_file_background_tests):
         im = InventoryManager()
@@ -627,11 +641,11 @@ class TestDatasetBackgroundJobs(object):
         assert 'zztest5.txt' not in m.manifest
         assert 'zztest4.txt' not in m.manifest
 
-        assert job_status.meta['has_failures'] is True
+        assert job_status.progress.has_failures is True
         assert 'The following files failed to hash. Try re-uploading the files again:\nzztest4.txt \nzztest5.txt' ==\
-               job_status.meta['failure_detail']
+               job_status.progress.failure_detail
         assert 'An error occurred while processing some files. Check details and re-upload.' == \
-               job_status.meta['feedback']
+               job_status.progress.feedback
 
     def test_complete_dataset_upload_transaction_prune_job(self, mock_config_file_background_tests):
         im = InventoryManager()
@@ -708,10 +722,57 @@ class TestDatasetBackgroundJobs(object):
         assert ds.name == 'dataset100'
         assert ds.namespace == 'default'
 
+    def test_import_linked_datasets(self, mock_config_file):
+        im = InventoryManager()
+        remote_urls = dict()
+        for name in ["dataset100", "dataset101", "dataset102"]:
+            ds = im.create_dataset('default', 'default', name, storage_type="gigantum_object_v1", description="100")
+            # Fake publish to a local bare repo
+            helper_create_remote_repo(ds, 'test', None, None)
+            remote_urls[name] = ds.remote
+        im.delete_dataset('default', 'default', "dataset100")
+        im.delete_dataset('default', 'default', "dataset101")
+
+        class JobMock():
+            def __init__(self):
+                self.id = str(uuid.uuid4())
+                self.connection = default_redis_conn()
+
+        job = JobMock()
+        datasets = [{'dataset_owner': 'default', 'dataset_name': name, 'remote_url': remote_urls[name]}
+                    for name in ["dataset100", "dataset101", "dataset102"]]
+        with patch('gtmcore.dispatcher.progress.get_current_job', return_value=job):
+            gtmcore.dispatcher.dataset_jobs.import_linked_datasets(logged_in_username='default', datasets=datasets)
+
+        for name in ["dataset100", "dataset101", "dataset102"]:
+            assert im.load_dataset('default', 'default', name).name == name
+
+        JobProgress.close_all()
+        progress = JobProgress.read(job.id)
+        assert progress.percent_complete == 100.0
+        assert "Imported linked Dataset default/dataset100" in progress.feedback
+        assert "Imported linked Dataset default/dataset101" in progress.feedback
+        assert "Linked Dataset default/dataset102 is available" in progress.feedback
+
+    def test_import_linked_datasets_failure(self, mock_config_file):
+        im = InventoryManager()
+        ds = im.create_dataset('default', 'default', "dataset100", storage_type="gigantum_object_v1", description="100")
+        helper_create_remote_repo(ds, 'test', None, None)
+        remote_url = ds.remote
+        im.delete_dataset('default', 'default', "dataset100")
+
+        datasets = [{'dataset_owner': 'default', 'dataset_name': 'dataset100', 'remote_url': remote_url},
+                    {'dataset_owner': 'default', 'dataset_name': 'missing', 'remote_url': '/tmp/not-a-repo.git'}]
+        with pytest.raises(GitLabException, match='default/missing'):
+            gtmcore.dispatcher.dataset_jobs.import_linked_datasets(logged_in_username='default', datasets=datasets)
+
+        # The other datasets are still imported
+        assert im.load_dataset('default', 'default', 'dataset100').name == 'dataset100'
+
     def test_download_dataset_files(self, mock_config_file_background_tests, mock_dataset_head):
         def dispatch_query_mock(self, job_key):
-            JobStatus = namedtuple("JobStatus", ['status', 'meta'])
-            return JobStatus(status='finished', meta={'completed_bytes': '500'})
+            JobStatus = namedtuple("JobStatus", ['status', 'meta', 'progress'])
+            return JobStatus(status='finished', meta={}, progress=helper_progress(500))
 
         def dispatch_mock(self, method_reference, kwargs, metadata, persist):
             with aioresponses() as mocked_responses:
@@ -782,8 +843,8 @@ class TestDatasetBackgroundJobs(object):
     def test_download_dataset_files_file_fail(self, mock_dataset_head, mock_config_file_background_tests):
         def dispatch_query_mock(self, job_key):
             # mock the job actually running and returning status
-            JobStatus = namedtuple("JobStatus", ['status', 'meta'])
-            return JobStatus(status='finished', meta={'completed_bytes': '0', 'failure_keys': 'test1.txt'})
+            JobStatus = namedtuple("JobStatus", ['status', 'meta', 'progress'])
+            return JobStatus(status='finished', meta={'failure_keys': 'test1.txt'}, progress=helper_progress(0))
 
         def dispatch_mock(self, method_reference, kwargs, metadata, persist):
                 gtmcore.dispatcher.dataset_jobs.pull_objects(**kwargs)
@@ -832,8 +893,8 @@ class TestDatasetBackgroundJobs(object):
     def test_download_dataset_files_job_fail(self, mock_dataset_head, mock_config_file_background_tests):
         def dispatch_query_mock(self, job_key):
             # mock the job actually running and returning status
-            JobStatus = namedtuple("JobStatus", ['status', 'meta'])
-            return JobStatus(status='failed', meta={'completed_bytes': '0'})
+            JobStatus = namedtuple("JobStatus", ['status', 'meta', 'progress'])
+            return JobStatus(status='failed', meta={}, progress=helper_progress(0))
 
         def dispatch_mock(self, method_reference, kwargs, metadata, persist):
                 gtmcore.dispatcher.dataset_jobs.pull_objects(**kwargs)
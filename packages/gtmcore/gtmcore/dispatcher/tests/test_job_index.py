@@ -0,0 +1,109 @@
+import time
+import uuid
+
+import pytest
+import rq
+
+from gtmcore.dispatcher import Dispatcher, JobIndex, default_redis_conn
+from gtmcore.dispatcher.dispatcher import GigantumQueues
+from gtmcore.dispatcher.worker import GigantumWorker
+import gtmcore.dispatcher.jobs as bg_jobs
+
+
+@pytest.fixture
+def labbook_key():
+    key = f"test|test|job-index-{uuid.uuid4().hex}"
+    yield key
+    conn = default_redis_conn()
+    conn.delete(JobIndex._jobs_key('labbook', key), JobIndex._status_key('labbook', key))
+
+
+def run_jobs_to_completion(job_keys, timeout: int = 30):
+    """Process the default queue in this process until the given jobs are complete"""
+    queue = rq.Queue(GigantumQueues.default_queue.value, connection=default_redis_conn())
+    start = time.time()
+    while time.time() - start < timeout:
+        GigantumWorker(queue, connection=default_redis_conn()).work(burst=True)
+        jobs = [Dispatcher().query_task(k) for k in job_keys]
+        if all(j is not None and j.status in ('finished', 'failed') for j in jobs):
+            return
+        time.sleep(0.1)
+    raise TimeoutError("Background jobs did not complete")
+
+
+class TestJobIndex(object):
+    def test_jobs_for_labbook(self, labbook_key):
+        d = Dispatcher()
+        assert d.get_jobs_for_labbook(labbook_key) == []
+
+        ok_key = d.dispatch_task(bg_jobs.test_exit_success, metadata={'labbook': labbook_key, 'method': 'ok'})
+        fail_key = d.dispatch_task(bg_jobs.test_exit_fail, metadata={'labbook': labbook_key, 'method': 'fail'})
+        other_key = d.dispatch_task(bg_jobs.test_exit_success, metadata={'labbook': f"{labbook_key}-other"})
+
+        jobs = d.get_jobs_for_labbook(labbook_key)
+        assert [j.job_key for j in jobs] == [ok_key, fail_key]
+        assert jobs[0].meta['method'] == 'ok'
+        assert d.get_job_summary_for_labbook(labbook_key) == {'queued': 2}
+
+        run_jobs_to_completion([ok_key, fail_key, other_key])
+
+        assert d.get_job_summary_for_labbook(labbook_key) == {'finished': 1, 'failed': 1}
+        jobs = {str(j.job_key): j for j in d.get_jobs_for_labbook(labbook_key)}
+        assert jobs[str(ok_key)].status == 'finished'
+        assert jobs[str(ok_key)].finished_at is not None
+        assert jobs[str(fail_key)].status == 'failed'
+        assert jobs[str(fail_key)].failure_message
+        assert len(d.get_jobs_for_labbook(f"{labbook_key}-other")) == 1
+
+        # Indexed JobStatus matches one fetched directly from RQ
+        direct = d.query_task(ok_key)
+        assert direct.meta == jobs[str(ok_key)].meta
+        assert direct.description == jobs[str(ok_key)].description
+        assert direct.result == jobs[str(ok_key)].result
+
+    def test_jobs_for_dataset(self):
+        d = Dispatcher()
+        dataset_key = f"test|test|job-index-{uuid.uuid4().hex}"
+        job_key = d.dispatch_task(bg_jobs.test_exit_success, metadata={'dataset': dataset_key})
+
+        assert [j.job_key for j in d.get_jobs_for_dataset(dataset_key)] == [job_key]
+        assert d.get_jobs_for_labbook(dataset_key) == []
+
+    def test_expired_jobs_are_dropped(self, labbook_key):
+        d = Dispatcher()
+        job_key = d.dispatch_task(bg_jobs.test_exit_success, metadata={'labbook': labbook_key})
+        assert len(d.get_jobs_for_labbook(labbook_key)) == 1
+
+        # Simulate RQ expiring the job hash
+        default_redis_conn().delete(job_key.key_str)
+        assert d.get_jobs_for_labbook(labbook_key) == []
+        assert d.get_job_summary_for_labbook(labbook_key) == {}
+
+    def test_finished_ttl(self, labbook_key):
+        d = Dispatcher()
+        job_key = d.dispatch_task(bg_jobs.test_exit_success, metadata={'labbook': labbook_key})
+        job_id = job_key.key_str.split(':')[-1]
+
+        index = JobIndex(finished_ttl=0)
+        index.set_status(job_id, {'labbook': labbook_key}, 'started')
+        assert index.prune_expired() == 0
+        assert len(index.get_jobs('labbook', labbook_key)) == 1
+
+        index.set_status(job_id, {'labbook': labbook_key}, 'finished')
+        time.sleep(0.01)
+        assert index.prune_expired() == 1
+        assert index.get_jobs('labbook', labbook_key) == []
+        assert index.status_summary('labbook', labbook_key) == {}
+
+    def test_backfill(self, labbook_key):
+        # Enqueue directly with RQ, as jobs enqueued before the index existed were
+        queue = rq.Queue(GigantumQueues.default_queue.value, connection=default_redis_conn())
+        job = queue.enqueue(bg_jobs.test_exit_success, meta={'labbook': labbook_key, 'method': 'backfilled'})
+        index = JobIndex()
+        assert index.get_jobs('labbook', labbook_key) == []
+
+        assert index.backfill() >= 1
+        jobs = index.get_jobs('labbook', labbook_key)
+        assert [j.job_id for j in jobs] == [job.id]
+        assert jobs[0].meta['method'] == 'backfilled'
+        assert index.status_summary('labbook', labbook_key) == {'queued': 1}
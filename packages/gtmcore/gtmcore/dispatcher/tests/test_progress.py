@@ -0,0 +1,124 @@
+import time
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from gtmcore.dispatcher import JobProgress, default_redis_conn
+
+
+@pytest.fixture()
+def job_id():
+    job_id = str(uuid.uuid4())
+    yield job_id
+    default_redis_conn().delete(JobProgress.lines_key(job_id), JobProgress.fields_key(job_id))
+
+
+class TestJobProgress(object):
+    def test_git_feedback(self, job_id):
+        messages = ["Preparing to publish", "Counting objects:  10% (1/10)", "Counting objects: 100% (10/10), done.",
+                    "hint: some hint", "Writing objects:  50% (5/10)", "Writing objects: 100% (10/10)",
+                    "Publish complete."]
+        progress = JobProgress(job_id)
+        for msg in messages:
+            progress.add_git_feedback(msg + '\n')
+        progress.flush()
+
+        expected = "Preparing to publish\nCounting objects: 100% (10/10), done.\nWriting objects: 100% (10/10)\n" \
+                   "Publish complete."
+        assert progress.feedback == expected
+        assert JobProgress.read(job_id).feedback == expected
+
+    def test_writes_are_coalesced(self, job_id):
+        progress = JobProgress(job_id, max_writes_per_second=1)
+        with patch.object(progress._redis_conn, 'pipeline', wraps=progress._redis_conn.pipeline) as mock_pipeline:
+            for i in range(500):
+                progress.add_git_feedback(f"Receiving objects: {i}%")
+                progress.update(percent_complete=i / 5)
+            # Only the first update is written immediately
+            assert mock_pipeline.call_count == 1
+            assert JobProgress.read(job_id).feedback == "Receiving objects: 0%"
+
+            # The rest are written by the timer once the interval has passed
+            time.sleep(1.5)
+            assert mock_pipeline.call_count == 2
+
+        record = JobProgress.read(job_id)
+        assert record.feedback == "Receiving objects: 499%"
+        assert record.percent_complete == 99.8
+
+    def test_ring_buffer(self, job_id):
+        progress = JobProgress(job_id, max_lines=10)
+        for i in range(25):
+            progress.add_line(f"line {i}")
+            progress.flush()
+
+        expected = '\n'.join(f"line {i}" for i in range(15, 25))
+        assert progress.feedback == expected
+        assert JobProgress.read(job_id).feedback == expected
+        assert default_redis_conn().llen(JobProgress.lines_key(job_id)) == 10
+
+    def test_only_changed_lines_are_rewritten(self, job_id):
+        progress = JobProgress(job_id)
+        progress.add_git_feedback("Pulling changes")
+        progress.add_git_feedback("Receiving objects: 10%")
+        progress.flush()
+
+        # Replacing a line that was already written
+        progress.add_git_feedback("Receiving objects: 100%")
+        progress.add_git_feedback("Resolving deltas: 100%")
+        progress.flush()
+        assert JobProgress.read(job_id).feedback == "Pulling changes\nReceiving objects: 100%\nResolving deltas: 100%"
+
+        progress.set_feedback("Done")
+        progress.flush()
+        assert JobProgress.read(job_id).feedback == "Done"
+
+    def test_write(self, job_id):
+        chunks = ["Build task in queue\n", "Step 1/3 : FROM ubuntu\n", " ---> abc", "123\n", "Step 2/3 : RUN true\n"]
+        progress = JobProgress(job_id)
+        for chunk in chunks:
+            progress.write(chunk)
+        progress.flush()
+
+        assert JobProgress.read(job_id).feedback == ''.join(chunks)
+
+    def test_fields(self, job_id):
+        progress = JobProgress(job_id)
+        progress.update(percent_complete=50.0, has_failures=False)
+        progress.increment('completed_bytes', 100)
+        progress.increment('completed_bytes', 28)
+        progress.flush()
+
+        record = JobProgress.read(job_id)
+        assert record.feedback is None
+        assert record.percent_complete == 50.0
+        assert record.completed_bytes == 128
+        assert record.has_failures is False
+        assert record.updated_at > 0
+        assert JobProgress.to_metadata(record) == {'percent_complete': 50.0, 'completed_bytes': 128,
+                                                   'has_failures': False}
+
+        with pytest.raises(ValueError):
+            progress.update(feedback='not a field')
+
+    def test_read_many(self, job_id):
+        progress = JobProgress(job_id)
+        progress.add_line("Started")
+        progress.flush()
+
+        records = JobProgress.read_many([job_id, str(uuid.uuid4())])
+        assert list(records.keys()) == [job_id]
+        assert records[job_id].feedback == "Started"
+        assert JobProgress.to_metadata(None) == {}
+
+    def test_close_all(self, job_id):
+        progress = JobProgress(job_id, max_writes_per_second=0.01)
+        JobProgress._channels[job_id] = progress
+        progress.add_line("first")
+        progress.add_line("last")
+        assert JobProgress.read(job_id).feedback == "first"
+
+        JobProgress.close_all()
+        assert JobProgress.read(job_id).feedback == "first\nlast"
+        assert job_id not in JobProgress._channels
@@ -9,7 +9,7 @@ from rq import Connection, Queue, Worker
 
 from gtmcore.logging import LMLogger
 from gtmcore.configuration import Configuration
-from gtmcore.dispatcher import default_redis_conn
+from gtmcore.dispatcher import JobAccounting, JobIndex, JobProgress, JobResourceMeter, default_redis_conn
 
 logger = LMLogger.get_logger()
 
@@ -19,6 +19,63 @@ QUEUE_PUBLISH = 'gigantum-publish-queue'
 DEFAULT_WORKER_DB = 13
 
 
+class GigantumWorker(Worker):
+    """RQ worker that keeps the `JobIndex` status summary current as jobs start and complete, writes any pending
+    job progress before a job is marked complete, and records the resources used by each job in `JobAccounting`. """
+
+    def _update_job_index(self, job, status: str) -> None:
+        try:
+            JobIndex(self.connection).set_status(job.id, job.meta, status)
+        except Exception as e:
+            # Never let bookkeeping interfere with job processing
+            logger.warning(f"Could not update job index for job {job.id}: {e}")
+
+    @staticmethod
+    def _close_job_progress() -> None:
+        try:
+            JobProgress.close_all()
+        except Exception as e:
+            logger.warning(f"Could not write job progress: {e}")
+
+    def _record_job_usage(self, job, meter: JobResourceMeter, failed: bool) -> None:
+        try:
+            queue_seconds = 0.0
+            if job.enqueued_at and job.started_at:
+                queue_seconds = (job.started_at - job.enqueued_at).total_seconds()
+            method = job.func_name.rsplit('.', 1)[-1]
+            usage = meter.stop(method, failed, queue_seconds)
+            JobAccounting(self.connection).record(usage)
+            logger.info(f"Job {job.id} ({method}) {'failed' if failed else 'finished'}: "
+                        f"queued {usage.queue_seconds:.1f}s, ran {usage.run_seconds:.1f}s, "
+                        f"cpu {usage.cpu_seconds:.1f}s, subprocesses {usage.subprocess_seconds:.1f}s, "
+                        f"peak rss {usage.peak_rss_kb}KB, read {usage.bytes_read}B, wrote {usage.bytes_written}B")
+        except Exception as e:
+            logger.warning(f"Could not record resource usage of job {job.id}: {e}")
+
+    def perform_job(self, job, queue, heartbeat_ttl=None):
+        meter = JobResourceMeter()
+        succeeded = False
+        try:
+            succeeded = super().perform_job(job, queue, heartbeat_ttl=heartbeat_ttl)
+            return succeeded
+        finally:
+            self._record_job_usage(job, meter, failed=not succeeded)
+
+    def prepare_job_execution(self, job, heartbeat_ttl=None):
+        super().prepare_job_execution(job, heartbeat_ttl=heartbeat_ttl)
+        self._update_job_index(job, 'started')
+
+    def handle_job_success(self, job, queue, started_job_registry):
+        self._close_job_progress()
+        super().handle_job_success(job, queue, started_job_registry)
+        self._update_job_index(job, 'finished')
+
+    def handle_job_failure(self, job, started_job_registry=None):
+        self._close_job_progress()
+        super().handle_job_failure(job, started_job_registry=started_job_registry)
+        self._update_job_index(job, 'failed')
+
+
 class WorkerService:
     """Represents the background job management "microservice". Handles
     allotment of queues and workers, as well as optional bursting of
@@ -130,12 +187,12 @@ def start_rq_worker(queue_name: str, burst: bool = False, db: int = DEFAULT_WORK
             logger.info(f"Starting {'bursted ' if burst else ''}"
                         f"RQ worker for in {queue_name}")
             if burst:
-                Worker(q).work(burst=True)
+                GigantumWorker(q).work(burst=True)
             else:
                 # This is to bypass a problem when the user closes their laptop
                 # (All the workers time out and die). This should prevent that up until a week.
                 wk_in_secs = 60 * 60 * 24 * 7
-                Worker(q, default_result_ttl=wk_in_secs, default_worker_ttl=wk_in_secs).work()
+                GigantumWorker(q, default_result_ttl=wk_in_secs, default_worker_ttl=wk_in_secs).work()
     except Exception as e:
         logger.exception("Worker in pid {} failed with exception {}".format(os.getpid(), e))
         raise
@@ -1,18 +1,25 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
+import shlex
 
-from gtmcore.environment.packagemanager import PackageManager, PackageResult, PackageMetadata
+from gtmcore.environment.packagemanager import PackageManager
+from gtmcore.environment.packagecache import PackageIndexRecord
 from gtmcore.container import container_for_context
 from gtmcore.labbook import LabBook
 from gtmcore.logging import LMLogger
 
 logger = LMLogger.get_logger()
 
+# Markers separating the output for each package in a batched apt-cache lookup
+_PACKAGE_MARKER = "@@GIGANTUM-PACKAGE@@ "
+_SEARCH_MARKER = "@@GIGANTUM-SEARCH@@"
+
 
 class AptPackageManager(PackageManager):
     """Class to implement the apt package manager
 
     Note: apt is somewhat limiting in the ability to access old versions of packages
     """
+    package_manager_name = "apt"
 
     def list_versions(self, package_name: str, labbook: LabBook, username: str) -> List[str]:
         """Method to list all available versions of a package based on the package name
@@ -25,23 +32,11 @@ class AptPackageManager(PackageManager):
         Returns:
             list(str): Version strings
         """
-        base_container = container_for_context(username, labbook=labbook)
-        result = base_container.run_container(cmd=f"apt-cache madison {package_name}",
-                                              image_name=self.base_image_tag(labbook),
-                                              wait_for_output=True)
-
-        package_versions: List[str] = []
-        if result:
-            lines = result.split('\n')
-            for l in lines:
-                if l:
-                    parts = l.split(" | ")
-                    if parts[1] not in package_versions:
-                        package_versions.append(parts[1].strip())
-        else:
+        record = self.get_package_records([package_name], labbook, username).get(package_name)
+        if not record:
             raise ValueError(f"Package {package_name} not found in apt.")
 
-        return package_versions
+        return record.versions
 
     def list_installed_packages(self, labbook: LabBook, username: str) -> List[Dict[str, str]]:
         """Method to get a list of all packages that are currently installed
@@ -69,94 +64,93 @@ class AptPackageManager(PackageManager):
 
         return packages
 
-    def validate_packages(self, package_list: List[Dict[str, str]], labbook: LabBook, username: str) \
-            -> List[PackageResult]:
-        """Method to validate a list of packages, and if needed fill in any missing versions
+    def package_cache_scope(self, labbook: LabBook) -> str:
+        """Method to get the name of the package index queried for this labbook, used to key cached lookups
 
-        Should check both the provided package name and version. If the version is omitted, it should be generated
-        from the latest version.
+        Available apt packages depend on the base image, so it is part of the scope
 
         Args:
-            package_list: A list of dictionaries of packages to validate
-            labbook: The labbook instance
-            username: The username for the logged in user
+            labbook: Subject LabBook
 
         Returns:
-            namedtuple: namedtuple indicating if the package and version are valid
+            str
         """
-        result = list()
-        for package in package_list:
-            pkg_result = PackageResult(package=package['package'], version=package.get('version'), error=True)
-
-            try:
-                version_list = self.list_versions(package['package'], labbook, username)
-            except ValueError:
-                result.append(pkg_result)
+        return f"apt|{self.base_image_tag(labbook)}"
+
+    @staticmethod
+    def _parse_package_records(result: str) -> Dict[str, Optional[PackageIndexRecord]]:
+        """Method to parse the output of the batched `apt-cache` command run by `fetch_package_records`"""
+        sections: Dict[str, Dict[str, List[str]]] = dict()
+        package = None
+        part = 'madison'
+        for line in result.split('\n'):
+            if line.startswith(_PACKAGE_MARKER):
+                package = line[len(_PACKAGE_MARKER):].strip()
+                part = 'madison'
+                sections[package] = {'madison': list(), 'search': list()}
+            elif line.strip() == _SEARCH_MARKER:
+                part = 'search'
+            elif package is not None and line:
+                sections[package][part].append(line)
+
+        records: Dict[str, Optional[PackageIndexRecord]] = dict()
+        for package, output in sections.items():
+            package_versions: List[str] = []
+            for line in output['madison']:
+                parts = line.split(" | ")
+                if len(parts) > 1 and parts[1].strip() not in package_versions:
+                    package_versions.append(parts[1].strip())
+
+            if not package_versions:
+                records[package] = None
                 continue
 
-            if not version_list:
-                # If here, no versions found for the package...so invalid
-                result.append(pkg_result)
-            else:
-                if package.get('version'):
-                    if package.get('version') in version_list:
-                        # Both package name and version are valid
-                        result.append(PackageResult(package=package['package'],
-                                                    version=package.get('version'),
-                                                    error=False))
-
-                    else:
-                        # The package version is not in the list, so invalid
-                        result.append(pkg_result)
-
-                else:
-                    # You need to set the latest version
-                    result.append(PackageResult(package=package['package'],
-                                                version=version_list[0],
-                                                error=False))
-        return result
-
-    def get_packages_metadata(self, package_list: List[str], labbook: LabBook, username: str) -> List[PackageMetadata]:
-        """Method to get package metadata
+            description = None
+            for line in output['search']:
+                if " - " in line:
+                    pkg_name, pkg_description = line.split(" - ", 1)
+                    if pkg_name == package:
+                        description = pkg_description.strip()
+                        break
+
+            records[package] = PackageIndexRecord(versions=package_versions, latest_version=package_versions[0],
+                                                  description=description, docs_url=None)
+
+        return records
+
+    def fetch_package_records(self, package_list: List[str], labbook: LabBook, username: str) \
+            -> Dict[str, Optional[PackageIndexRecord]]:
+        """Method to look up packages in the base image's apt cache, bypassing the metadata cache
+
+        All packages are looked up in a single container run.
 
         Args:
             package_list: List of package names
-            labbook(str): The labbook instance
-            username(str): The username for the logged in user
+            labbook: Subject LabBook
+            username: Username of current user
 
         Returns:
-            list
+            dict of package name -> PackageIndexRecord, or None if the package does not exist
         """
-        results = list()
+        if not package_list:
+            return dict()
+
+        commands = list()
         for package in package_list:
-            base_container = container_for_context(username, labbook=labbook)
-            result = base_container.run_container(cmd=f"apt-cache search {package}",
-                                                  image_name=self.base_image_tag(labbook),
-                                                  wait_for_output=True)
-            description = None
-            latest_version = None
-            if result:
-                lines = result.split('\n')
-                for l in lines:
-                    if l:
-                        pkg_name, pkg_description = l.split(" - ", 1)
-                        if pkg_name == package:
-                            description = pkg_description.strip()
-                            break
-
-            # Get the latest version of the package
-            try:
-                versions = self.list_versions(package, labbook, username)
-                if versions:
-                    latest_version = versions[0]
-            except ValueError:
-                # If package isn't found, just set to None
-                pass
-
-            results.append(PackageMetadata(package_manager="apt", package=package, latest_version=latest_version,
-                                           description=description, docs_url=None))
-
-        return results
+            quoted = shlex.quote(package)
+            commands.append(f"echo {shlex.quote(_PACKAGE_MARKER + package)}; apt-cache madison {quoted}; "
+                            f"echo {_SEARCH_MARKER}; apt-cache search {quoted}")
+
+        base_container = container_for_context(username, labbook=labbook)
+        result = base_container.run_container(cmd=f"sh -c {shlex.quote('; '.join(commands))}",
+                                              image_name=self.base_image_tag(labbook),
+                                              wait_for_output=True)
+        if not result:
+            logger.warning(f"Failed to query apt for packages {', '.join(package_list)}")
+            return dict()
+
+        records = self._parse_package_records(result)
+        return {package: records[package] for package in package_list if package in records}
 
     def generate_docker_install_snippet(self, packages: List[Dict[str, str]], single_line: bool = False) -> List[str]:
         """Method to generate a docker snippet to install 1 or more packages
@@ -4,13 +4,13 @@ import datetime
 import os
 import yaml
 from typing import (Any, List, Dict, Tuple)
-import glob
 
 from typing import Optional
 
 
 from gtmcore.labbook import LabBook
 from gtmcore.environment.repository import BaseRepository  # type: ignore
+from gtmcore.environment.snapshot import EnvironmentSnapshotCache, get_environment_snapshot
 from gtmcore.logging import LMLogger
 from gtmcore.activity import ActivityStore, ActivityType, ActivityRecord, ActivityDetailType, ActivityDetailRecord, \
     ActivityAction
@@ -110,6 +110,10 @@ class ComponentManager(object):
         """The environment directory in the given labbook"""
         return os.path.join(self.labbook.root_dir, '.gigantum', 'env')
 
+    def _invalidate_snapshot(self) -> None:
+        """Method to drop the cached parsed environment after modifying it, see `gtmcore.environment.snapshot`"""
+        EnvironmentSnapshotCache.invalidate(self.env_dir)
+
     def _initialize_env_dir(self) -> None:
         """Method to populate the environment directory if any content is missing
 
@@ -169,6 +173,7 @@ class ComponentManager(object):
         yaml_dump = yaml.safe_dump(file_data, default_flow_style=False)
         with open(docker_file, 'w') as df:
             df.write(yaml_dump)
+        self._invalidate_snapshot()
 
         logger.info(f"Wrote custom Docker snippet `{name}` to {str(self.labbook)}")
         short_message = f"Wrote custom Docker snippet `{name}`"
@@ -206,6 +211,7 @@ class ComponentManager(object):
             raise ValueError(f'Docker snippet name `{name}` does not exist')
 
         self.labbook.git.remove(docker_file, keep_file=False)
+        self._invalidate_snapshot()
         short_message = f"Removed custom Docker snippet `{name}`"
         logger.info(short_message)
         commit = self.labbook.git.commit(short_message)
@@ -288,6 +294,8 @@ class ComponentManager(object):
             detail_objects.append(adr)
             logger.info("Added package {} to labbook at {}".format(pkg["package"], self.labbook.root_dir))
 
+        self._invalidate_snapshot()
+
         # Set activity message
         ar_msg = ""
         if add_cnt > 0:
@@ -350,6 +358,7 @@ class ComponentManager(object):
                 raise ValueError(f"Failed to remove package.")
 
             self.labbook.git.remove(package_yaml_path)
+            self._invalidate_snapshot()
 
             # Create detail record
             adr = ActivityDetailRecord(ActivityDetailType.ENVIRONMENT,
@@ -408,6 +417,7 @@ class ComponentManager(object):
 
         with open(base_final_path, 'wt') as cf:
             cf.write(yaml.safe_dump(base_data, default_flow_style=False))
+        self._invalidate_snapshot()
 
         # We construct records of packages installed by the user grouped by package manager
         # This can happen, for example, when we're changing bases
@@ -551,6 +561,7 @@ class ComponentManager(object):
         # .gigantum/env/base/gigantum_base-images_r-tidyverse.yaml
         repo, base_name = base_fname.stem.rsplit('_', 1)
         self.labbook.git.remove(str(base_fname), keep_file=False)
+        self._invalidate_snapshot()
 
         # Create detail record
         long_message = "\n".join((f"Removed base {base_name}\n",
@@ -581,6 +592,7 @@ class ComponentManager(object):
         """
         for base_fname in base_paths:
             self.labbook.git.remove(str(base_fname), keep_file=False)
+            self._invalidate_snapshot()
             # The repository includes an underscore where the slash is for e.g.,
             # .gigantum/env/base/gigantum_base-images_r-tidyverse.yaml
             curr_repo, curr_base_name = base_fname.stem.rsplit('_', 1)
@@ -610,29 +622,20 @@ class ComponentManager(object):
         if not os.path.exists(component_dir):
             raise ValueError("No components found for component class: {}".format(component_class))
 
-        # Get all YAML files in dir
-        yaml_files = glob.glob(os.path.join(component_dir, "*.yaml"))
-        yaml_files = sorted(yaml_files)
-        data = []
-
-        # Read YAML files and write data to dictionary
-        for yf in yaml_files:
-            with open(yf, 'rt') as yf_file:
-                yaml_data = yaml.safe_load(yf_file)
-                data.append(yaml_data)
+        # Get the parsed YAML files in dir, shared with other readers of this environment
+        data = get_environment_snapshot(self.env_dir).file_data(component_class)
         return sorted(data, key=lambda elt: elt.get('id') or elt.get('manager'))
 
     @property
     def base_fields(self) -> Dict[str, Any]:
         """Load the base data for this LabBook from disk"""
-        base_yaml_file = glob.glob(os.path.join(self.env_dir, 'base', '*.yaml'))
+        base_data = get_environment_snapshot(self.env_dir).file_data('base')
 
-        if len(base_yaml_file) != 1:
-            raise ValueError(f"Project misconfigured. Found {len(base_yaml_file)} base configurations.")
+        if len(base_data) != 1:
+            raise ValueError(f"Project misconfigured. Found {len(base_data)} base configurations.")
 
-        # If you got 1 base, load from disk
-        with open(base_yaml_file[0], 'rt') as bf:
-            data = yaml.safe_load(bf)
+        # If you got 1 base, use the parsed file
+        data = base_data[0]
 
         if not data:
             raise ValueError(f"Project misconfigured. Found empty base configuration.")
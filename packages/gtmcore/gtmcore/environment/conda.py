@@ -1,8 +1,9 @@
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 from gtmcore.http import ConcurrentRequestManager, ConcurrentRequest
 
-from gtmcore.environment.packagemanager import PackageManager, PackageResult, PackageMetadata
+from gtmcore.environment.packagemanager import PackageManager
+from gtmcore.environment.packagecache import PackageIndexRecord
 from gtmcore.container import container_for_context
 from gtmcore.labbook import LabBook
 from gtmcore.logging import LMLogger
@@ -13,6 +14,10 @@ logger = LMLogger.get_logger()
 class CondaPackageManagerBase(PackageManager):
     """Class to implement the conda package manager
     """
+    package_manager_name = "conda"
+
+    INDEX_URL = "https://api.anaconda.org/package"
+
     def __init__(self):
         # String to be set in child classes indicating which python version you are checking. Typically should be either
         # python 3.6* or python 2.7*
@@ -37,27 +42,11 @@ class CondaPackageManagerBase(PackageManager):
         Returns:
             list(str): Version strings
         """
-        # Check for package in channels, picking out version by priority
-        request_list = list()
-        for channel in self.channel_priority:
-            request_list.append(ConcurrentRequest(f"https://api.anaconda.org/package/{channel}/{package_name}",
-                                                  headers={'Accept': 'application/json'}))
-
-        responses = self.request_mgr.resolve_many(request_list)
-
-        versions = None
-        for response in responses:
-            if response.status_code != 200:
-                continue
-
-            versions = response.json.get('versions')
-            break
-
-        if not versions:
+        record = self.get_package_records([package_name], labbook, username).get(package_name)
+        if not record or not record.versions:
             raise ValueError(f"Package {package_name} not found in channels {' ,'.join(self.channel_priority)}.")
 
-        versions.reverse()
-        return versions
+        return record.versions
 
     def list_installed_packages(self, labbook: LabBook, username: str) -> List[Dict[str, str]]:
         """Method to get a list of all packages that are currently installed
@@ -80,117 +69,60 @@ class CondaPackageManagerBase(PackageManager):
         else:
             return []
 
-    def validate_packages(self, package_list: List[Dict[str, str]], labbook: LabBook, username: str) \
-            -> List[PackageResult]:
-        """Method to validate a list of packages, and if needed fill in any missing versions
-
-        Should check both the provided package name and version. If the version is omitted, it should be generated
-        from the latest version.
+    def package_cache_scope(self, labbook: LabBook) -> str:
+        """Method to get the name of the package index queried for this labbook, used to key cached lookups
 
         Args:
-            package_list(list): A list of dictionaries of packages to validate
-            labbook(str): The labbook instance
-            username(str): The username for the logged in user
+            labbook: Subject LabBook
 
         Returns:
-            namedtuple: namedtuple indicating if the package and version are valid
+            str
         """
-        result = list()
+        return f"conda|{','.join(self.channel_priority)}"
 
-        # Check for package in channels, picking out version by priority
-        request_list = list()
-        for pkg in package_list:
-            for channel in self.channel_priority:
-                request_list.append(ConcurrentRequest(f"https://api.anaconda.org/package/{channel}/{pkg['package']}",
-                                                      headers={'Accept': 'application/json'}))
-
-        responses = self.request_mgr.resolve_many(request_list)
-
-        # Repack into groups by package
-        responses_per_package = list(zip(*(iter(responses),) * len(self.channel_priority)))
-
-        for package, responses in zip(package_list, responses_per_package):
-            versions = None
-            latest_version = None
-            for response in responses:
-                if response.status_code != 200:
-                    continue
-                versions = response.json.get('versions')
-                latest_version = response.json.get('latest_version')
-                break
-
-            if not versions:
-                # Package is not found
-                result.append(PackageResult(package=package['package'], version=package.get('version'), error=True))
-                continue
-
-            if package.get('version'):
-                # Package has been set, so validate it
-                if package.get('version') in versions:
-                    # Both package name and version are valid
-                    result.append(PackageResult(package=package['package'], version=package.get('version'),
-                                                error=False))
-
-                else:
-                    # The package version is not in the list, so invalid
-                    result.append(PackageResult(package=package['package'], version=package.get('version'), error=True))
-
-            else:
-                # You need to look up the latest version since not included
-                result.append(PackageResult(package=package['package'], version=str(latest_version),
-                                            error=False))
-
-        return result
-
-    def get_packages_metadata(self, package_list: List[str], labbook: LabBook, username: str) -> List[PackageMetadata]:
-        """Method to get package metadata
+    def fetch_package_records(self, package_list: List[str], labbook: LabBook, username: str) \
+            -> Dict[str, Optional[PackageIndexRecord]]:
+        """Method to look up packages in the package index, bypassing the cache
 
         Args:
             package_list: List of package names
-            labbook(str): The labbook instance
-            username(str): The username for the logged in user
+            labbook: Subject LabBook
+            username: username of current user
 
         Returns:
-            list
+            dict of package name -> PackageIndexRecord, or None if the package does not exist
         """
-        def _extract_metadata(data):
-            """Extraction method to pull out the docs URL and description"""
-            latest_val = data.get('latest_version')
-            description_val = data.get('summary').strip()
-
-            docs_val = data.get('doc_url')
-            if not docs_val:
-                docs_val = data.get('html_url')
-
-            return latest_val, description_val, docs_val
+        def _extract_record(data: dict) -> PackageIndexRecord:
+            """Extraction method to pull out the versions, docs URL and description"""
+            versions = list(data.get('versions') or list())
+            versions.reverse()
+            latest_version = data.get('latest_version')
+            return PackageIndexRecord(versions=versions,
+                                      latest_version=str(latest_version) if latest_version is not None else None,
+                                      description=(data.get('summary') or '').strip(),
+                                      docs_url=data.get('doc_url') or data.get('html_url'))
 
         # Check for package in channels, picking out version by priority
         request_list = list()
         for pkg in package_list:
             for channel in self.channel_priority:
-                request_list.append(ConcurrentRequest(f"https://api.anaconda.org/package/{channel}/{pkg}",
+                request_list.append(ConcurrentRequest(f"{self.INDEX_URL}/{channel}/{pkg}",
                                                       headers={'Accept': 'application/json'},
-                                                      extraction_function=_extract_metadata))
+                                                      extraction_function=_extract_record))
         responses = self.request_mgr.resolve_many(request_list)
 
         # Repack into groups by package
         responses_per_package = list(zip(*(iter(responses),) * len(self.channel_priority)))
 
-        result = list()
-        for package, responses in zip(package_list, responses_per_package):
-            data = None
-            for response in responses:
-                if response.status_code == 200:
-                    data = response.extracted_json
-                    break
-
-            if data:
-                latest_version, description, docs_url = data
-                result.append(PackageMetadata(package_manager="conda", package=package, latest_version=latest_version,
-                                              description=description, docs_url=docs_url))
+        result: Dict[str, Optional[PackageIndexRecord]] = dict()
+        for package, package_responses in zip(package_list, responses_per_package):
+            found = [r for r in package_responses if r.status_code == 200 and r.json]
+            if found:
+                result[package] = found[0].extracted_json
+            elif all(r.status_code == 404 for r in package_responses):
+                result[package] = None
             else:
-                result.append(PackageMetadata(package_manager="conda", package=package, latest_version=None,
-                                              description=None, docs_url=None))
+                logger.warning(f"Failed to query channels for conda package {package}")
 
         return result
 
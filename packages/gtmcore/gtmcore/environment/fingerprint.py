@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from gtmcore.environment.snapshot import get_environment_snapshot
+
+# A namedtuple for the fingerprint of a Project environment. `groups` maps each component group (e.g. `base`,
+# `package_manager`, `docker`, `bundled_apps`, `dockerfile`) to a digest of its normalized contents, and `digest` is
+# a digest of all groups.
+EnvironmentFingerprint = NamedTuple('EnvironmentFingerprint', [('digest', str), ('groups', Dict[str, str])])
+
+# Normalized contents of the Dockerfile and bundled apps file, keyed by absolute path, along with the (mtime_ns, size)
+# they were read at
+_file_cache: Dict[str, Tuple[Tuple[int, int], Any]] = dict()
+_file_cache_lock = threading.Lock()
+_MAX_CACHED_FILES = 10000
+
+
+def _normalize_base(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Keep only the base image fields that affect the image, so e.g. description edits don't trigger a rebuild"""
+    return {'id': data.get('id'),
+            'repository': data.get('repository'),
+            'revision': data.get('revision'),
+            'image': data.get('image'),
+            'development_tools': sorted(data.get('development_tools') or [])}
+
+
+def _normalize_package(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {'manager': data.get('manager'),
+            'package': str(data.get('package')),
+            'version': str(data.get('version')),
+            'from_base': bool(data.get('from_base'))}
+
+
+def _normalize_docker_snippet(data: Dict[str, Any]) -> Dict[str, Any]:
+    # The description and timestamp are only written to Dockerfile comments
+    return {'name': data.get('name'), 'content': data.get('content')}
+
+
+def _load_bundled_app_ports(path: str) -> List[int]:
+    # Only the ports are built into the image, names and commands are used when apps are started
+    with open(path, 'rt') as f:
+        return sorted(int(app['port']) for app in json.load(f).values())
+
+
+def _load_dockerfile(path: str) -> List[str]:
+    # Imported here to avoid a circular import, since the image builder depends on the container package
+    from gtmcore.imagebuilder.layers import dockerfile_instructions
+
+    # Comments (e.g. the generation timestamp) don't affect the build
+    with open(path, 'rt') as f:
+        return dockerfile_instructions(f.read())
+
+
+_YAML_NORMALIZERS: Dict[str, Callable[[Dict[str, Any]], Any]] = {'base': _normalize_base,
+                                                                 'package_manager': _normalize_package,
+                                                                 'docker': _normalize_docker_snippet}
+
+
+def _read_cached(path: str, loader: Callable[[str], Any]) -> Any:
+    """Load and normalize a file, reusing the previous result if the file is unchanged
+
+    Args:
+        path: Absolute path to the file
+        loader: Function to load and normalize the file
+
+    Returns:
+        The normalized contents
+    """
+    st = os.stat(path)
+    file_state = (st.st_mtime_ns, st.st_size)
+    with _file_cache_lock:
+        cached = _file_cache.get(path)
+    if cached and cached[0] == file_state:
+        return cached[1]
+
+    value = loader(path)
+    with _file_cache_lock:
+        if len(_file_cache) >= _MAX_CACHED_FILES:
+            _file_cache.clear()
+        _file_cache[path] = (file_state, value)
+    return value
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_environment_fingerprint(env_dir: str) -> EnvironmentFingerprint:
+    """Compute a fingerprint of a Project environment from its parsed and normalized components
+
+    Cosmetic changes, such as the `# Generated on:` comments in component files or the timestamp in the Dockerfile,
+    don't change the fingerprint. YAML files are read from the shared environment snapshot, and other files are only
+    re-read if their mtime or size changed since the last call.
+
+    Args:
+        env_dir: The Project's `.gigantum/env` directory
+
+    Returns:
+        EnvironmentFingerprint
+    """
+    components: Dict[str, Dict[str, Any]] = dict()
+    for rel_path, data in get_environment_snapshot(env_dir).all_files().items():
+        group = rel_path.split(os.path.sep)[0] if os.path.sep in rel_path else 'env'
+        normalizer = _YAML_NORMALIZERS.get(group)
+        if normalizer and isinstance(data, dict):
+            data = normalizer(data)
+        components.setdefault(group, dict())[rel_path] = data
+
+    dockerfile = os.path.join(env_dir, 'Dockerfile')
+    if os.path.isfile(dockerfile):
+        components['dockerfile'] = {'Dockerfile': _read_cached(dockerfile, _load_dockerfile)}
+
+    apps_file = os.path.join(os.path.dirname(env_dir), 'apps.json')
+    if os.path.isfile(apps_file):
+        components['bundled_apps'] = {'ports': _read_cached(apps_file, _load_bundled_app_ports)}
+
+    groups = {group: _digest(value) for group, value in components.items()}
+    return EnvironmentFingerprint(digest=_digest(groups), groups=groups)
+
+
+def changed_groups(previous: Optional[EnvironmentFingerprint], current: EnvironmentFingerprint) -> List[str]:
+    """Get the component groups that differ between two fingerprints
+
+    Args:
+        previous: The fingerprint the image was last built from, or None if unknown
+        current: The current fingerprint
+
+    Returns:
+        sorted list of group names, all groups if the previous fingerprint is unknown
+    """
+    if previous is None:
+        return sorted(current.groups.keys())
+
+    all_groups = set(previous.groups.keys()) | set(current.groups.keys())
+    return sorted(g for g in all_groups if previous.groups.get(g) != current.groups.get(g))
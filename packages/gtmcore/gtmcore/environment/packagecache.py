@@ -0,0 +1,152 @@
+import json
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+import redis
+
+from gtmcore.configuration import Configuration
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# A namedtuple for the information the package managers look up in a package index. `versions` is ordered latest first.
+PackageIndexRecord = NamedTuple('PackageIndexRecord', [('versions', List[str]), ('latest_version', Optional[str]),
+                                                       ('description', Optional[str]), ('docs_url', Optional[str])])
+
+# A namedtuple for a cached lookup. `record` is None if the package was not found in the index.
+CachedPackage = NamedTuple('CachedPackage', [('record', Optional[PackageIndexRecord]), ('is_stale', bool)])
+
+
+class PackageMetadataCache(object):
+    """Class to cache package index lookups in redis so they are shared between requests and processes
+
+    Entries are keyed by a scope (the index that was queried, e.g. `pip` or `apt|<base image>`) and the package name.
+    Lookups that found the package are fresh for `ttl` seconds and may then be served stale for another `stale_ttl`
+    seconds while they are refreshed in the background. Lookups that did not find the package are cached for
+    `negative_ttl` seconds. Failed lookups (e.g. network errors) are never cached.
+    """
+    KEY_PREFIX = "PACKAGE-METADATA-CACHE"
+
+    # Seconds a background refresh of a package is considered in progress, so it is not dispatched again
+    REFRESH_CLAIM_TIMEOUT = 300
+
+    def __init__(self, config: Optional[Configuration] = None) -> None:
+        cache_config = (config or Configuration()).config['package_cache']
+        self.ttl: int = cache_config['ttl']
+        self.negative_ttl: int = cache_config['negative_ttl']
+        self.stale_ttl: int = cache_config['stale_ttl']
+
+        self._redis_client: Optional[redis.StrictRedis] = None
+
+    @property
+    def redis_client(self) -> redis.StrictRedis:
+        """Property to get a redis client for package metadata caching
+
+        Returns:
+            redis.StrictRedis
+        """
+        if not self._redis_client:
+            self._redis_client = redis.StrictRedis(db=1)
+        return self._redis_client
+
+    def _key(self, scope: str, package: str) -> str:
+        return f"{self.KEY_PREFIX}|{scope}|{package}"
+
+    def _refresh_key(self, scope: str, package: str) -> str:
+        return f"{self._key(scope, package)}|refresh"
+
+    def get_many(self, scope: str, packages: List[str]) -> Dict[str, CachedPackage]:
+        """Method to look up cached package records
+
+        Args:
+            scope: Index the packages were looked up in
+            packages: List of package names
+
+        Returns:
+            dict of package name -> CachedPackage, containing only the packages found in the cache
+        """
+        if not packages:
+            return dict()
+
+        try:
+            values = self.redis_client.mget([self._key(scope, p) for p in packages])
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to read package metadata cache: {err}")
+            return dict()
+
+        now = time.time()
+        results = dict()
+        for package, value in zip(packages, values):
+            if value is None:
+                continue
+            try:
+                data = json.loads(value)
+                record = PackageIndexRecord(**data['record']) if data['record'] is not None else None
+            except (ValueError, TypeError, KeyError):
+                logger.warning(f"Ignoring invalid package metadata cache entry for {scope} package {package}")
+                continue
+
+            max_age = self.ttl if record is not None else self.negative_ttl
+            results[package] = CachedPackage(record=record, is_stale=now - data['fetched_at'] >= max_age)
+
+        return results
+
+    def set_many(self, scope: str, records: Dict[str, Optional[PackageIndexRecord]]) -> None:
+        """Method to cache package lookups
+
+        Args:
+            scope: Index the packages were looked up in
+            records: dict of package name -> PackageIndexRecord, or None if the package was not found
+
+        Returns:
+            None
+        """
+        if not records:
+            return
+
+        now = time.time()
+        try:
+            with self.redis_client.pipeline() as pipe:
+                for package, record in records.items():
+                    value = json.dumps({'fetched_at': now,
+                                        'record': record._asdict() if record is not None else None})
+                    expire = self.ttl + self.stale_ttl if record is not None else self.negative_ttl
+                    pipe.set(self._key(scope, package), value, ex=max(int(expire), 1))
+                    pipe.delete(self._refresh_key(scope, package))
+                pipe.execute()
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to write package metadata cache: {err}")
+
+    def claim_refresh(self, scope: str, packages: List[str]) -> List[str]:
+        """Method to mark packages as being refreshed in the background
+
+        Args:
+            scope: Index the packages were looked up in
+            packages: List of package names with stale cache entries
+
+        Returns:
+            list of the packages that were not already being refreshed, which the caller should now refresh
+        """
+        if not packages:
+            return list()
+
+        try:
+            with self.redis_client.pipeline() as pipe:
+                for package in packages:
+                    pipe.set(self._refresh_key(scope, package), 1, nx=True, ex=self.REFRESH_CLAIM_TIMEOUT)
+                claimed = pipe.execute()
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to claim package metadata refresh: {err}")
+            return list()
+
+        return [package for package, is_claimed in zip(packages, claimed) if is_claimed]
+
+    def clear(self) -> None:
+        """Method to remove all cached package lookups
+
+        Returns:
+            None
+        """
+        keys = list(self.redis_client.scan_iter(match=f"{self.KEY_PREFIX}|*"))
+        if keys:
+            self.redis_client.delete(*keys)
@@ -2,8 +2,12 @@ import abc
 from typing import (List, Dict, Optional, NamedTuple)
 
 from gtmcore.labbook import LabBook
+from gtmcore.environment.packagecache import PackageMetadataCache, PackageIndexRecord
+from gtmcore.logging import LMLogger
 import gtmcore.environment
 
+logger = LMLogger.get_logger()
+
 # A namedtuple for the result of package validation
 PackageResult = NamedTuple('PackageResult', [('package', str), ('version', Optional[str]), ('error', bool)])
 
@@ -15,7 +19,14 @@ PackageMetadata = NamedTuple('PackageMetadata', [('package_manager', str), ('pac
 
 class PackageManager(abc.ABC):
     """Class to implement the standard interface for all available Package Managers
+
+    Package index lookups go through `get_package_records`, which caches them in a `PackageMetadataCache`. Subclasses
+    implement `package_cache_scope` and `fetch_package_records` to define how their index is queried.
     """
+    # Name reported in PackageMetadata results
+    package_manager_name: str = ''
+
+    _package_cache: Optional[PackageMetadataCache] = None
 
     @staticmethod
     def base_image_tag(labbook: LabBook) -> str:
@@ -53,7 +64,6 @@ class PackageManager(abc.ABC):
         """
         raise NotImplemented
 
-    @abc.abstractmethod
     def validate_packages(self, package_list: List[Dict[str, str]], labbook: LabBook, username: str) \
             -> List[PackageResult]:
         """Method to validate a list of packages, and if needed fill in any missing versions
@@ -69,9 +79,34 @@ class PackageManager(abc.ABC):
         Returns:
             namedtuple: namedtuple indicating if the package and version are valid
         """
-        raise NotImplemented
+        def is_valid(package: Dict[str, str], record: Optional[PackageIndexRecord]) -> bool:
+            if record is None or not record.versions:
+                return False
+            return not package.get('version') or package['version'] in record.versions
+
+        records = self.get_package_records([p['package'] for p in package_list], labbook, username)
+
+        # A cached lookup can predate a newly published package or version, so confirm failures against the index
+        recheck = [p['package'] for p in package_list if not is_valid(p, records.get(p['package']))]
+        if recheck:
+            records.update(self.get_package_records(recheck, labbook, username, refresh=True))
+
+        result = list()
+        for package in package_list:
+            record = records.get(package['package'])
+            if record is None or not is_valid(package, record):
+                result.append(PackageResult(package=package['package'], version=package.get('version'), error=True))
+            elif package.get('version'):
+                # Both package name and version are valid
+                result.append(PackageResult(package=package['package'], version=package['version'], error=False))
+            else:
+                # You need to look up the latest version since not included. Versions are listed newest first, so
+                # fall back to the first one if the index didn't report a latest version.
+                latest_version = record.latest_version if record.latest_version is not None else record.versions[0]
+                result.append(PackageResult(package=package['package'], version=latest_version, error=False))
+
+        return result
 
-    @abc.abstractmethod
     def get_packages_metadata(self, package_list: List[str], labbook: LabBook, username: str) -> List[PackageMetadata]:
         """Method to get package metadata. Currently this is the latest version, description and a url for docs
 
@@ -83,8 +118,139 @@ class PackageManager(abc.ABC):
         Returns:
             list
         """
+        records = self.get_package_records(package_list, labbook, username)
+
+        result = list()
+        for package in package_list:
+            record = records.get(package)
+            if record is None:
+                result.append(PackageMetadata(package_manager=self.package_manager_name, package=package,
+                                              latest_version=None, description=None, docs_url=None))
+            else:
+                result.append(PackageMetadata(package_manager=self.package_manager_name, package=package,
+                                              latest_version=record.latest_version,
+                                              description=record.description, docs_url=record.docs_url))
+
+        return result
+
+    @property
+    def package_cache(self) -> PackageMetadataCache:
+        """Property to get the package metadata cache"""
+        if not self._package_cache:
+            self._package_cache = PackageMetadataCache()
+        return self._package_cache
+
+    @abc.abstractmethod
+    def package_cache_scope(self, labbook: LabBook) -> str:
+        """Method to get the name of the package index queried for this labbook, used to key cached lookups
+
+        Args:
+            labbook: Subject LabBook
+
+        Returns:
+            str
+        """
         raise NotImplemented
 
+    @abc.abstractmethod
+    def fetch_package_records(self, package_list: List[str], labbook: LabBook, username: str) \
+            -> Dict[str, Optional[PackageIndexRecord]]:
+        """Method to look up packages in the package index, bypassing the cache
+
+        Args:
+            package_list: List of package names
+            labbook: Subject LabBook
+            username: username of current user
+
+        Returns:
+            dict of package name -> PackageIndexRecord, or None if the package does not exist. Packages that could
+            not be looked up (e.g. the index could not be reached) are omitted.
+        """
+        raise NotImplemented
+
+    def get_package_records(self, package_list: List[str], labbook: LabBook, username: str,
+                            refresh: bool = False) -> Dict[str, Optional[PackageIndexRecord]]:
+        """Method to look up packages, using cached lookups where available
+
+        All packages missing from the cache are fetched in a single batch. Stale cache entries are returned as-is and
+        refreshed by a background job.
+
+        Args:
+            package_list: List of package names
+            labbook: Subject LabBook
+            username: username of current user
+            refresh: If True, ignore cached lookups and query the index for every package
+
+        Returns:
+            dict of package name -> PackageIndexRecord, or None if the package does not exist. Packages that could
+            not be looked up are omitted.
+        """
+        scope = self.package_cache_scope(labbook)
+        package_names = list(dict.fromkeys(package_list))
+
+        records: Dict[str, Optional[PackageIndexRecord]] = dict()
+        stale: List[str] = list()
+        if not refresh:
+            for package, cached in self.package_cache.get_many(scope, package_names).items():
+                if cached.is_stale and cached.record is None:
+                    # Don't keep serving an expired "not found"; look it up again now
+                    continue
+                records[package] = cached.record
+                if cached.is_stale:
+                    stale.append(package)
+
+        missing = [p for p in package_names if p not in records]
+        if missing:
+            fetched = self.fetch_package_records(missing, labbook, username)
+            self.package_cache.set_many(scope, fetched)
+            records.update(fetched)
+
+        if stale:
+            self._dispatch_refresh(scope, stale, labbook, username)
+
+        return records
+
+    def prefetch_package_records(self, package_list: List[str], labbook: LabBook, username: str) -> None:
+        """Method to look up packages that are not cached (or are stale) in a background job, so later requests for
+        them are served from the cache
+
+        Args:
+            package_list: List of package names
+            labbook: Subject LabBook
+            username: username of current user
+
+        Returns:
+            None
+        """
+        scope = self.package_cache_scope(labbook)
+        package_names = list(dict.fromkeys(package_list))
+        cached = self.package_cache.get_many(scope, package_names)
+        uncached = [p for p in package_names if p not in cached or cached[p].is_stale]
+        if uncached:
+            self._dispatch_refresh(scope, uncached, labbook, username)
+
+    def _dispatch_refresh(self, scope: str, package_list: List[str], labbook: LabBook, username: str) -> None:
+        """Method to refresh stale cache entries in a background job"""
+        claimed = self.package_cache.claim_refresh(scope, package_list)
+        if not claimed:
+            return
+
+        # Imported here to avoid a circular import, as background jobs depend on this package
+        from gtmcore.dispatcher import Dispatcher
+        import gtmcore.dispatcher.jobs as jobs
+
+        try:
+            job_kwargs = {'module_name': type(self).__module__,
+                          'class_name': type(self).__name__,
+                          'package_list': claimed,
+                          'labbook_path': labbook.root_dir if labbook else None,
+                          'username': username}
+            job_metadata = {'method': 'refresh_package_metadata'}
+            Dispatcher().dispatch_task(jobs.refresh_package_metadata, kwargs=job_kwargs, metadata=job_metadata)
+        except Exception as err:
+            # Stale lookups are still returned, so just leave them to be refreshed on a later request
+            logger.warning(f"Failed to dispatch package metadata refresh for {scope}: {err}")
+
     @abc.abstractmethod
     def generate_docker_install_snippet(self, packages: List[Dict[str, str]], single_line: bool = False) -> List[str]:
         """Method to generate a docker snippet to install 1 or more packages
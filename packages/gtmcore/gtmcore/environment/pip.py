@@ -1,19 +1,26 @@
-from typing import List, Dict
-import requests
+from typing import List, Dict, Optional
 import json
 
 from gtmcore.container import container_for_context
 from gtmcore.labbook import LabBook
 from gtmcore.http import ConcurrentRequestManager, ConcurrentRequest
+from gtmcore.logging import LMLogger
 
 from packaging import version
 
-from gtmcore.environment.packagemanager import PackageManager, PackageResult, PackageMetadata
+from gtmcore.environment.packagemanager import PackageManager
+from gtmcore.environment.packagecache import PackageIndexRecord
+
+logger = LMLogger.get_logger()
 
 
 class PipPackageManager(PackageManager):
     """Class to implement the pip package manager
     """
+    package_manager_name = "pip"
+
+    INDEX_URL = "https://pypi.python.org/pypi"
+
     def __init__(self):
         self.request_mgr = ConcurrentRequestManager()
 
@@ -40,15 +47,15 @@ class PipPackageManager(PackageManager):
         Returns:
             list(str): Version strings
         """
-        url = f"https://pypi.python.org/pypi/{package_name}/json"
-        result = requests.get(url)
-        if result.status_code == 404:
+        records = self.get_package_records([package_name], labbook, username)
+        if package_name not in records:
+            raise IOError("Failed to query package index for package versions. Check internet connection.")
+        record = records[package_name]
+        if record is None:
             # Didn't find the package
             raise ValueError("Package not found in package index")
-        if result.status_code != 200:
-            raise IOError("Failed to query package index for package versions. Check internet connection.")
 
-        return self._extract_versions(result.json())
+        return record.versions
 
     def list_installed_packages(self, labbook: LabBook, username: str) -> List[Dict[str, str]]:
         """Method to get a list of all packages that are currently installed
@@ -68,96 +75,53 @@ class PipPackageManager(PackageManager):
         else:
             return []
 
-    def validate_packages(self, package_list: List[Dict[str, str]], labbook: LabBook, username: str) \
-            -> List[PackageResult]:
-        """Method to validate a list of packages, and if needed fill in any missing versions
-
-        Should check both the provided package name and version. If the version is omitted, it should be generated
-        from the latest version.
+    def package_cache_scope(self, labbook: LabBook) -> str:
+        """Method to get the name of the package index queried for this labbook, used to key cached lookups
 
         Args:
-            package_list(list): A list of dictionaries of packages to validate
-            labbook(str): The labbook instance
-            username(str): The username for the logged in user
+            labbook: Subject LabBook
 
         Returns:
-            namedtuple: namedtuple indicating if the package and version are valid
+            str
         """
-        result = list()
-
-        # Run async version lookups
-        request_list = list()
-        for pkg in package_list:
-            request_list.append(ConcurrentRequest(f"https://pypi.python.org/pypi/{pkg['package']}/json",
-                                                  headers={'Accept': 'application/json'}))
-        responses = self.request_mgr.resolve_many(request_list)
-
-        for package, response in zip(package_list, responses):
-            if response.status_code != 200:
-                result.append(PackageResult(package=package['package'], version=package.get('version'), error=True))
-                continue
-
-            if package.get('version'):
-                # Package has been set, so validate it
-                if package.get('version') in self._extract_versions(response.json):
-                    # Both package name and version are valid
-                    result.append(PackageResult(package=package['package'], version=package.get('version'),
-                                                error=False))
+        return "pip"
 
-                else:
-                    # The package version is not in the list, so invalid
-                    result.append(PackageResult(package=package['package'], version=package.get('version'), error=True))
-
-            else:
-                # You need to look up the latest version since not included
-                result.append(PackageResult(package=package['package'], version=response.json['info']['version'],
-                                            error=False))
-
-        return result
-
-    def get_packages_metadata(self, package_list: List[str], labbook: LabBook, username: str) -> List[PackageMetadata]:
-        """Method to get package metadata
+    def fetch_package_records(self, package_list: List[str], labbook: LabBook, username: str) \
+            -> Dict[str, Optional[PackageIndexRecord]]:
+        """Method to look up packages in the package index, bypassing the cache
 
         Args:
             package_list: List of package names
-            labbook(str): The labbook instance
-            username(str): The username for the logged in user
+            labbook: Subject LabBook
+            username: username of current user
 
         Returns:
-            list
+            dict of package name -> PackageIndexRecord, or None if the package does not exist
         """
-        def _extract_metadata(data):
-            """Extraction method to pull out the docs URL and description"""
-            latest_val = None
-            description_val = None
-            docs_val = None
-
-            info = data.get('info')
-            if info:
-                latest_val = info.get('version')
-                description_val = info.get('summary').strip()
-                docs_val = info.get('docs_url')
-
-                if not docs_val:
-                    docs_val = info.get('home_page')
-
-            return latest_val, description_val, docs_val
-
-        result = list()
+        def _extract_record(data: dict) -> PackageIndexRecord:
+            """Extraction method to pull out the versions, docs URL and description"""
+            info = data.get('info') or dict()
+            return PackageIndexRecord(versions=self._extract_versions(data),
+                                      latest_version=info.get('version'),
+                                      description=(info.get('summary') or '').strip(),
+                                      docs_url=info.get('docs_url') or info.get('home_page'))
+
+        # Run async lookups
         request_list = list()
         for pkg in package_list:
-            request_list.append(ConcurrentRequest(f"https://pypi.python.org/pypi/{pkg}/json",
+            request_list.append(ConcurrentRequest(f"{self.INDEX_URL}/{pkg}/json",
                                                   headers={'Accept': 'application/json'},
-                                                  extraction_function=_extract_metadata))
+                                                  extraction_function=_extract_record))
         responses = self.request_mgr.resolve_many(request_list)
+
+        result: Dict[str, Optional[PackageIndexRecord]] = dict()
         for package, response in zip(package_list, responses):
-            if response.status_code != 200:
-                result.append(PackageMetadata(package_manager="pip", package=package, latest_version=None,
-                                              description=None, docs_url=None))
+            if response.status_code == 404:
+                result[package] = None
+            elif response.status_code == 200 and response.json:
+                result[package] = response.extracted_json
             else:
-                latest_version, description, docs_url = response.extracted_json
-                result.append(PackageMetadata(package_manager="pip", package=package, latest_version=latest_version,
-                                              description=description, docs_url=docs_url))
+                logger.warning(f"Failed to query package index for pip package {package}: {response.status_code}")
 
         return result
 
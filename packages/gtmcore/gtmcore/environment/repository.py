@@ -10,6 +10,7 @@ from redis import StrictRedis
 from gtmcore.logging import LMLogger
 from gtmcore.configuration import Configuration
 from gtmcore.exceptions import GigantumLockedException
+from gtmcore.locking import get_lock_redis_client
 
 
 class RepositoryLock(object):
@@ -75,9 +76,7 @@ class RepositoryLock(object):
 
         # Get a redis client
         if not self._lock_redis_client:
-            self._lock_redis_client = StrictRedis(host=config['redis']['host'],
-                                                  port=config['redis']['port'],
-                                                  db=config['redis']['db'])
+            self._lock_redis_client = get_lock_redis_client(config)
 
         # Get a lock object
         self.lock = redis_lock.Lock(self._lock_redis_client, self.lock_key)
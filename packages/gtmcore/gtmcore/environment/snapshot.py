@@ -0,0 +1,178 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+import yaml
+
+# Use the C-accelerated loader if PyYAML was built with libyaml
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+# (relative path, mtime_ns, size) of each YAML file in an environment directory
+SnapshotSignature = Tuple[Tuple[str, int, int], ...]
+
+
+def load_yaml_file(path: str) -> Any:
+    """Function to parse a YAML file with the fastest available safe loader
+
+    Args:
+        path: Absolute path to the file
+
+    Returns:
+        The parsed contents
+    """
+    with open(path, 'rt') as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+class EnvironmentSnapshot(object):
+    """The parsed YAML files of a Project's environment directory, as they were when the snapshot was taken
+
+    Data is handed out as copies, so callers can't modify the snapshot shared with other readers.
+    """
+    def __init__(self, env_dir: str, signature: SnapshotSignature, files: Dict[str, Any]) -> None:
+        self.env_dir = env_dir
+        self.signature = signature
+        # Parsed contents, keyed by path relative to the environment directory and sorted by path
+        self._files = files
+
+    def file_names(self, component_class: str) -> List[str]:
+        """Method to get the YAML file names of a component class
+
+        Args:
+            component_class: The class of component (i.e. the environment subdirectory), e.g. `package_manager`
+
+        Returns:
+            sorted list of file names
+        """
+        prefix = component_class + os.path.sep
+        return [p[len(prefix):] for p in self._files if p.startswith(prefix) and os.path.sep not in p[len(prefix):]]
+
+    def file_data(self, component_class: str) -> List[Any]:
+        """Method to get the parsed YAML files of a component class
+
+        Args:
+            component_class: The class of component (i.e. the environment subdirectory), e.g. `package_manager`
+
+        Returns:
+            list of the parsed contents of each file, sorted by file name
+        """
+        return [copy.deepcopy(self._files[os.path.join(component_class, n)]) for n in self.file_names(component_class)]
+
+    def all_files(self) -> Dict[str, Any]:
+        """Method to get all parsed YAML files in the environment directory, including nested directories
+
+        Returns:
+            OrderedDict of path relative to the environment directory -> parsed contents
+        """
+        return copy.deepcopy(self._files)
+
+
+class EnvironmentSnapshotCache(object):
+    """Process-wide cache of parsed environment directories, keyed by environment directory
+
+    A snapshot is reused as long as no YAML file in the environment directory was added, removed or changed (by
+    mtime and size). `ComponentManager` also invalidates the snapshot whenever it modifies the environment.
+    """
+    MAX_ENTRIES = 64
+
+    _lock = threading.Lock()
+    _snapshots: 'OrderedDict[str, EnvironmentSnapshot]' = OrderedDict()
+
+    @staticmethod
+    def _signature(env_dir: str) -> SnapshotSignature:
+        signature: List[Tuple[str, int, int]] = list()
+        for root, dirs, files in os.walk(env_dir):
+            dirs.sort()
+            for f in sorted(files):
+                if not f.endswith('.yaml'):
+                    continue
+                path = os.path.join(root, f)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                signature.append((os.path.relpath(path, env_dir), st.st_mtime_ns, st.st_size))
+        return tuple(signature)
+
+    @classmethod
+    def get(cls, env_dir: str) -> EnvironmentSnapshot:
+        """Method to get the current snapshot of an environment directory
+
+        Args:
+            env_dir: Absolute path to the environment directory
+
+        Returns:
+            EnvironmentSnapshot
+        """
+        env_dir = os.path.abspath(env_dir)
+        signature = cls._signature(env_dir)
+        with cls._lock:
+            snapshot = cls._snapshots.get(env_dir)
+            if snapshot is not None and snapshot.signature == signature:
+                cls._snapshots.move_to_end(env_dir)
+                return snapshot
+
+        # Reuse the parsed contents of unchanged files from the previous snapshot
+        previous: Dict[str, Tuple[Tuple[int, int], Any]] = dict()
+        if snapshot is not None:
+            previous = {p: ((m, s), snapshot._files[p]) for p, m, s in snapshot.signature}
+
+        files: Dict[str, Any] = OrderedDict()
+        loaded: List[Tuple[str, int, int]] = list()
+        for rel_path, mtime_ns, size in signature:
+            cached = previous.get(rel_path)
+            if cached is not None and cached[0] == (mtime_ns, size):
+                files[rel_path] = cached[1]
+            else:
+                try:
+                    files[rel_path] = load_yaml_file(os.path.join(env_dir, rel_path))
+                except FileNotFoundError:
+                    # Removed while the snapshot was being taken
+                    continue
+            loaded.append((rel_path, mtime_ns, size))
+
+        snapshot = EnvironmentSnapshot(env_dir, tuple(loaded), files)
+        with cls._lock:
+            cls._snapshots[env_dir] = snapshot
+            cls._snapshots.move_to_end(env_dir)
+            while len(cls._snapshots) > cls.MAX_ENTRIES:
+                cls._snapshots.popitem(last=False)
+
+        return snapshot
+
+    @classmethod
+    def invalidate(cls, env_dir: str) -> None:
+        """Method to remove an environment directory from the cache
+
+        Args:
+            env_dir: Absolute path to the environment directory
+
+        Returns:
+            None
+        """
+        with cls._lock:
+            cls._snapshots.pop(os.path.abspath(env_dir), None)
+
+    @classmethod
+    def clear(cls) -> None:
+        """Method to remove all environment directories from the cache
+
+        Returns:
+            None
+        """
+        with cls._lock:
+            cls._snapshots.clear()
+
+
+def get_environment_snapshot(env_dir: str) -> EnvironmentSnapshot:
+    """Function to get the current snapshot of a Project's environment directory
+
+    Args:
+        env_dir: Absolute path to the `.gigantum/env` directory
+
+    Returns:
+        EnvironmentSnapshot
+    """
+    return EnvironmentSnapshotCache.get(env_dir)
@@ -0,0 +1,107 @@
+import os
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from gtmcore.container.container import ContainerOperations
+from gtmcore.environment.bundledapp import BundledAppManager
+from gtmcore.environment.fingerprint import get_environment_fingerprint, changed_groups
+from gtmcore.fixtures import mock_config_file
+from gtmcore.inventory.inventory import InventoryManager
+
+
+def write_package(lb, manager, package, version, comment='# Generated on: 2019-01-01 00:00:00.000000'):
+    path = os.path.join(lb.root_dir, '.gigantum', 'env', 'package_manager', f'{manager}_{package}.yaml')
+    with open(path, 'wt') as pf:
+        pf.write(os.linesep.join([comment, f'manager: {manager}', f'package: {package}', f"version: '{version}'",
+                                  'from_base: false', 'schema: 1']))
+
+
+@pytest.fixture()
+def mock_environment(mock_config_file, tmpdir):
+    lb = InventoryManager().create_labbook('test', 'test', 'labbook1', description='my first labbook')
+    write_package(lb, 'pip', 'requests', '2.18.4')
+    write_package(lb, 'apt', 'vim', 'latest')
+    with open(os.path.join(lb.root_dir, '.gigantum', 'env', 'base', 'base.yaml'), 'wt') as bf:
+        yaml.safe_dump({'id': 'python3-minimal', 'revision': 1, 'repository': 'gigantum_base-images',
+                        'description': 'A base', 'development_tools': ['jupyterlab'],
+                        'image': {'server': 'hub.docker.com', 'namespace': 'gigantum',
+                                  'repository': 'python3-minimal', 'tag': 'abc'}}, bf)
+
+    with patch.object(ContainerOperations, 'IMAGE_CACHE_DIR', str(tmpdir)):
+        yield lb, os.path.join(lb.root_dir, '.gigantum', 'env')
+
+
+class TestEnvironmentFingerprint(object):
+    def test_cosmetic_changes(self, mock_environment):
+        lb, env_dir = mock_environment
+        fingerprint = get_environment_fingerprint(env_dir)
+        assert {'base', 'package_manager'} <= set(fingerprint.groups.keys())
+
+        # Regenerated package files and base descriptions don't change the fingerprint
+        write_package(lb, 'pip', 'requests', '2.18.4', comment='# Generated on: 2020-06-01 12:00:00.000000')
+        base_file = os.path.join(env_dir, 'base', 'base.yaml')
+        with open(base_file, 'rt') as bf:
+            data = yaml.safe_load(bf)
+        data['description'] = 'A longer description of the base'
+        with open(base_file, 'wt') as bf:
+            yaml.safe_dump(data, bf)
+
+        assert get_environment_fingerprint(env_dir) == fingerprint
+
+    def test_changed_groups(self, mock_environment):
+        lb, env_dir = mock_environment
+        fingerprint = get_environment_fingerprint(env_dir)
+
+        write_package(lb, 'pip', 'requests', '2.22.0')
+        updated = get_environment_fingerprint(env_dir)
+        assert updated.digest != fingerprint.digest
+        assert changed_groups(fingerprint, updated) == ['package_manager']
+
+        BundledAppManager(lb).add_bundled_app(9000, 'dash', 'a demo dash app', 'python app.py')
+        with open(os.path.join(env_dir, 'Dockerfile'), 'wt') as df:
+            df.write('# Generated now\nFROM ubuntu\nEXPOSE 9000\n')
+        assert changed_groups(updated, get_environment_fingerprint(env_dir)) == ['bundled_apps', 'dockerfile']
+        assert changed_groups(None, updated) == sorted(updated.groups.keys())
+
+    def test_memoized_per_file(self, mock_environment):
+        lb, env_dir = mock_environment
+        get_environment_fingerprint(env_dir)
+
+        with patch('yaml.load', side_effect=yaml.load) as mock_load:
+            get_environment_fingerprint(env_dir)
+            assert mock_load.call_count == 0
+
+            write_package(lb, 'pip', 'numpy', '1.16.0')
+            get_environment_fingerprint(env_dir)
+            assert mock_load.call_count == 1
+
+    def test_check_environment_changes(self, mock_environment):
+        lb, env_dir = mock_environment
+        tag = 'gmlb-test-test-labbook1'
+
+        assert ContainerOperations.check_environment_changes(tag, env_dir).state == 'not cached'
+        assert ContainerOperations.check_cached_hash(tag, env_dir) == 'match'
+
+        write_package(lb, 'pip', 'requests', '2.18.4', comment='# Generated on: 2020-06-01 12:00:00.000000')
+        assert ContainerOperations.check_cached_hash(tag, env_dir) == 'match'
+
+        write_package(lb, 'apt', 'vim', '2')
+        changes = ContainerOperations.check_environment_changes(tag, env_dir, update_cache=False)
+        assert changes.state == 'changed'
+        assert changes.changed_groups == ['package_manager']
+        # The outdated fingerprint is removed even though the cache wasn't updated
+        assert not os.path.exists(os.path.join(ContainerOperations.IMAGE_CACHE_DIR, f'{tag}.cache'))
+        assert ContainerOperations.check_cached_hash(tag, env_dir) == 'not cached'
+        assert ContainerOperations.check_cached_hash(tag, env_dir) == 'match'
+
+        write_package(lb, 'apt', 'vim', '3')
+        assert ContainerOperations.check_cached_hash(tag, env_dir) == 'changed'
+        assert ContainerOperations.check_cached_hash(tag, env_dir) == 'match'
+
+        # A checksum written by an earlier version is replaced
+        with open(os.path.join(ContainerOperations.IMAGE_CACHE_DIR, f'{tag}.cache'), 'wt') as cf:
+            cf.write('0123456789abcdef')
+        assert ContainerOperations.check_cached_hash(tag, env_dir) == 'changed'
+        assert ContainerOperations.check_cached_hash(tag, env_dir) == 'match'
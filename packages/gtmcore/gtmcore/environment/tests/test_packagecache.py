@@ -0,0 +1,223 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import pytest
+
+from gtmcore.dispatcher import Dispatcher
+import gtmcore.dispatcher.jobs as jobs
+from gtmcore.environment.apt import AptPackageManager
+from gtmcore.environment.conda import Conda3PackageManager, CondaPackageManagerBase
+from gtmcore.environment.packagecache import PackageMetadataCache
+from gtmcore.environment.pip import PipPackageManager
+from gtmcore.fixtures import mock_config_file
+
+
+class StandInIndex(object):
+    """A local HTTP server standing in for PyPI and anaconda.org"""
+    def __init__(self):
+        self.pypi = dict()
+        self.anaconda = dict()
+        self.requests = list()
+        self.fail = False
+
+        index = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                index.requests.append(self.path)
+                parts = self.path.strip('/').split('/')
+                data = None
+                if parts[0] == 'pypi':
+                    data = index.pypi.get(parts[1])
+                elif parts[0] == 'package':
+                    data = index.anaconda.get((parts[1], parts[2]))
+
+                if index.fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                if data is None:
+                    self.send_response(404)
+                    self.send_header('Content-Type', 'application/json')
+                    self.end_headers()
+                    self.wfile.write(b'{"message": "Not Found"}')
+                    return
+
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def add_pip_package(self, name, versions, summary='A package'):
+        self.pypi[name] = {'info': {'version': versions[-1], 'summary': summary, 'docs_url': None,
+                                    'home_page': f'https://example.com/{name}'},
+                           'releases': {v: [] for v in versions}}
+
+
+@pytest.fixture()
+def stand_in_index(mock_config_file):
+    index = StandInIndex()
+    thread = threading.Thread(target=index.server.serve_forever, daemon=True)
+    thread.start()
+    PackageMetadataCache().clear()
+
+    with patch.object(PipPackageManager, 'INDEX_URL', f"{index.url}/pypi"), \
+            patch.object(CondaPackageManagerBase, 'INDEX_URL', f"{index.url}/package"), \
+            patch.object(Dispatcher, 'dispatch_task') as mock_dispatch:
+        index.mock_dispatch = mock_dispatch
+        yield index
+
+    index.server.shutdown()
+    index.server.server_close()
+    PackageMetadataCache().clear()
+
+
+class TestPackageMetadataCache(object):
+    def test_metadata_is_cached(self, stand_in_index):
+        stand_in_index.add_pip_package('gtmunit1', ['0.1.0', '0.2.0'], summary=' Unit test package ')
+        stand_in_index.add_pip_package('gtmunit2', ['1.0.0'])
+
+        mgr = PipPackageManager()
+        result = mgr.get_packages_metadata(['gtmunit1', 'gtmunit2'], None, 'test')
+        assert result[0].latest_version == '0.2.0'
+        assert result[0].description == 'Unit test package'
+        assert result[0].docs_url == 'https://example.com/gtmunit1'
+        assert result[1].latest_version == '1.0.0'
+        assert len(stand_in_index.requests) == 2
+
+        # A new manager instance (e.g. the next request) is served from the cache
+        result = PipPackageManager().get_packages_metadata(['gtmunit1', 'gtmunit2'], None, 'test')
+        assert [r.latest_version for r in result] == ['0.2.0', '1.0.0']
+        assert PipPackageManager().list_versions('gtmunit1', None, 'test') == ['0.2.0', '0.1.0']
+        assert len(stand_in_index.requests) == 2
+
+    def test_negative_caching(self, stand_in_index):
+        mgr = PipPackageManager()
+        with pytest.raises(ValueError):
+            mgr.list_versions('not-a-package', None, 'test')
+        with pytest.raises(ValueError):
+            mgr.list_versions('not-a-package', None, 'test')
+        assert len(stand_in_index.requests) == 1
+
+        # Once the negative TTL passes the package is looked up again, rather than served stale
+        stand_in_index.add_pip_package('not-a-package', ['1.0'])
+        mgr.package_cache.negative_ttl = 0
+        assert mgr.list_versions('not-a-package', None, 'test') == ['1.0']
+        assert len(stand_in_index.requests) == 2
+        stand_in_index.mock_dispatch.assert_not_called()
+
+    def test_failures_are_not_cached(self, stand_in_index):
+        stand_in_index.add_pip_package('gtmunit1', ['0.1.0'])
+        stand_in_index.fail = True
+
+        mgr = PipPackageManager()
+        with pytest.raises(IOError):
+            mgr.list_versions('gtmunit1', None, 'test')
+        assert mgr.get_packages_metadata(['gtmunit1'], None, 'test')[0].latest_version is None
+
+        stand_in_index.fail = False
+        assert mgr.list_versions('gtmunit1', None, 'test') == ['0.1.0']
+
+    def test_stale_while_revalidate(self, stand_in_index):
+        stand_in_index.add_pip_package('gtmunit1', ['0.1.0'])
+        mgr = PipPackageManager()
+        assert mgr.get_packages_metadata(['gtmunit1'], None, 'test')[0].latest_version == '0.1.0'
+
+        stand_in_index.add_pip_package('gtmunit1', ['0.1.0', '0.2.0'])
+        mgr.package_cache.ttl = 0
+        time.sleep(0.01)
+
+        # The stale value is returned immediately and a single refresh is dispatched
+        assert mgr.get_packages_metadata(['gtmunit1'], None, 'test')[0].latest_version == '0.1.0'
+        assert mgr.get_packages_metadata(['gtmunit1'], None, 'test')[0].latest_version == '0.1.0'
+        assert len(stand_in_index.requests) == 1
+        assert stand_in_index.mock_dispatch.call_count == 1
+
+        args, kwargs = stand_in_index.mock_dispatch.call_args
+        assert args[0] == jobs.refresh_package_metadata
+        assert kwargs['kwargs']['package_list'] == ['gtmunit1']
+
+        # Run the background job
+        args[0](**kwargs['kwargs'])
+        assert len(stand_in_index.requests) == 2
+        mgr.package_cache.ttl = 3600
+        assert mgr.get_packages_metadata(['gtmunit1'], None, 'test')[0].latest_version == '0.2.0'
+
+    def test_prefetch(self, stand_in_index):
+        stand_in_index.add_pip_package('gtmunit1', ['0.1.0'])
+        mgr = PipPackageManager()
+        mgr.get_packages_metadata(['gtmunit1'], None, 'test')
+
+        mgr.prefetch_package_records(['gtmunit1', 'gtmunit2', 'gtmunit3'], None, 'test')
+        assert stand_in_index.mock_dispatch.call_count == 1
+        _, kwargs = stand_in_index.mock_dispatch.call_args
+        assert kwargs['kwargs']['package_list'] == ['gtmunit2', 'gtmunit3']
+
+    def test_validate_rechecks_cached_misses(self, stand_in_index):
+        stand_in_index.add_pip_package('gtmunit1', ['0.1.0'])
+        mgr = PipPackageManager()
+        result = mgr.validate_packages([{'package': 'gtmunit1'}, {'package': 'gtmunit2'}], None, 'test')
+        assert result[0].version == '0.1.0'
+        assert result[0].error is False
+        assert result[1].error is True
+
+        # Newly published packages and versions are found even though the cache predates them
+        stand_in_index.add_pip_package('gtmunit1', ['0.1.0', '0.2.0'])
+        stand_in_index.add_pip_package('gtmunit2', ['1.0.0'])
+        result = mgr.validate_packages([{'package': 'gtmunit1', 'version': '0.2.0'},
+                                        {'package': 'gtmunit1', 'version': '0.1.0'},
+                                        {'package': 'gtmunit2'}], None, 'test')
+        assert [(r.version, r.error) for r in result] == [('0.2.0', False), ('0.1.0', False), ('1.0.0', False)]
+
+    def test_validate_without_latest_version(self, stand_in_index):
+        stand_in_index.add_pip_package('gtmunit1', ['0.1.0', '0.2.0'])
+        stand_in_index.pypi['gtmunit1']['info']['version'] = None
+        result = PipPackageManager().validate_packages([{'package': 'gtmunit1'}], None, 'test')
+        assert [(r.version, r.error) for r in result] == [('0.2.0', False)]
+
+    def test_conda_channel_priority(self, stand_in_index):
+        stand_in_index.anaconda[('anaconda', 'numpy')] = {'versions': ['1.0', '1.1'], 'latest_version': '1.1',
+                                                          'summary': 'anaconda numpy', 'html_url': 'x'}
+        stand_in_index.anaconda[('conda-forge', 'numpy')] = {'versions': ['1.0', '1.1', '1.2'],
+                                                             'latest_version': '1.2', 'summary': 'forge numpy',
+                                                             'doc_url': 'https://numpy.org'}
+        stand_in_index.anaconda[('anaconda', 'mkl')] = {'versions': ['2019'], 'latest_version': '2019',
+                                                        'summary': 'mkl', 'html_url': 'https://anaconda.org/mkl'}
+
+        mgr = Conda3PackageManager()
+        result = mgr.get_packages_metadata(['numpy', 'mkl', 'not-a-package'], None, 'test')
+        assert (result[0].latest_version, result[0].description, result[0].docs_url) == \
+            ('1.2', 'forge numpy', 'https://numpy.org')
+        assert (result[1].latest_version, result[1].docs_url) == ('2019', 'https://anaconda.org/mkl')
+        assert result[2].latest_version is None
+        assert mgr.list_versions('numpy', None, 'test') == ['1.2', '1.1', '1.0']
+        assert len(stand_in_index.requests) == 6
+
+
+class TestAptPackageRecords(object):
+    def test_parse_package_records(self):
+        output = "@@GIGANTUM-PACKAGE@@ curl\n" \
+                 "      curl | 7.58.0-2ubuntu3.8 | http://archive.ubuntu.com/ubuntu bionic-updates/main amd64 Packages\n" \
+                 "      curl | 7.58.0-2ubuntu3 | http://archive.ubuntu.com/ubuntu bionic/main amd64 Packages\n" \
+                 "@@GIGANTUM-SEARCH@@\n" \
+                 "curlftpfs - filesystem to access FTP hosts based on FUSE and cURL\n" \
+                 "curl - command line tool for transferring data with URL syntax\n" \
+                 "@@GIGANTUM-PACKAGE@@ not-a-package\n" \
+                 "@@GIGANTUM-SEARCH@@\n"
+
+        records = AptPackageManager._parse_package_records(output)
+        assert records['curl'].versions == ['7.58.0-2ubuntu3.8', '7.58.0-2ubuntu3']
+        assert records['curl'].latest_version == '7.58.0-2ubuntu3.8'
+        assert records['curl'].description == 'command line tool for transferring data with URL syntax'
+        assert records['not-a-package'] is None
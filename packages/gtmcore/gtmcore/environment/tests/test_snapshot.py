@@ -0,0 +1,104 @@
+import os
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from gtmcore.environment import ComponentManager
+from gtmcore.environment.snapshot import EnvironmentSnapshotCache, YamlLoader, get_environment_snapshot
+from gtmcore.fixtures import mock_config_file
+from gtmcore.imagebuilder import ImageBuilder
+from gtmcore.inventory.inventory import InventoryManager
+
+
+def write_package(lb, manager, package, version):
+    path = os.path.join(lb.root_dir, '.gigantum', 'env', 'package_manager', f'{manager}_{package}.yaml')
+    with open(path, 'wt') as pf:
+        pf.write(os.linesep.join([f'manager: {manager}', f'package: {package}', f"version: '{version}'",
+                                  'from_base: false', 'schema: 1']))
+
+
+def count_yaml_loads():
+    return patch('yaml.load', side_effect=yaml.load)
+
+
+@pytest.fixture()
+def mock_environment(mock_config_file):
+    EnvironmentSnapshotCache.clear()
+    lb = InventoryManager().create_labbook('test', 'test', 'labbook1', description='my first labbook')
+    write_package(lb, 'pip', 'requests', '2.18.4')
+    write_package(lb, 'apt', 'vim', 'latest')
+    yield lb, os.path.join(lb.root_dir, '.gigantum', 'env')
+    EnvironmentSnapshotCache.clear()
+
+
+class TestEnvironmentSnapshot(object):
+    def test_loader(self):
+        if hasattr(yaml, 'CSafeLoader'):
+            assert YamlLoader is yaml.CSafeLoader
+        else:
+            assert YamlLoader is yaml.SafeLoader
+
+    def test_shared_between_readers(self, mock_environment):
+        lb, env_dir = mock_environment
+        packages = ComponentManager(lb).get_component_list('package_manager')
+        assert [p['package'] for p in packages] == ['vim', 'requests']
+
+        with count_yaml_loads() as mock_load:
+            assert ComponentManager(lb).get_component_list('package_manager') == packages
+            assert len([l for l in ImageBuilder(lb)._load_packages() if l.startswith('RUN')]) == 3
+            assert get_environment_snapshot(env_dir).file_names('package_manager') == ['apt_vim.yaml',
+                                                                                     'pip_requests.yaml']
+            assert mock_load.call_count == 0
+
+        # Callers get copies
+        packages[0]['package'] = 'emacs'
+        assert ComponentManager(lb).get_component_list('package_manager')[0]['package'] == 'vim'
+
+    def test_external_changes(self, mock_environment):
+        lb, env_dir = mock_environment
+        cm = ComponentManager(lb)
+        cm.get_component_list('package_manager')
+
+        with count_yaml_loads() as mock_load:
+            write_package(lb, 'pip', 'requests', '2.22.0')
+            write_package(lb, 'pip', 'numpy', '1.16.0')
+            packages = cm.get_component_list('package_manager')
+            # Only the changed and new files are parsed
+            assert mock_load.call_count == 2
+
+        assert [(p['package'], p['version']) for p in packages] == [('vim', 'latest'), ('numpy', '1.16.0'),
+                                                                    ('requests', '2.22.0')]
+
+        os.remove(os.path.join(env_dir, 'package_manager', 'pip_numpy.yaml'))
+        assert len(cm.get_component_list('package_manager')) == 2
+
+    def test_invalidated_by_mutations(self, mock_environment):
+        lb, env_dir = mock_environment
+        cm = ComponentManager(lb)
+        assert cm.get_component_list('docker') == []
+
+        cm.add_docker_snippet('snippet', ['RUN true'])
+        assert [d['content'] for d in cm.get_component_list('docker')] == [['RUN true']]
+
+        with patch.object(EnvironmentSnapshotCache, 'invalidate',
+                          side_effect=EnvironmentSnapshotCache.invalidate) as mock_invalidate:
+            cm.remove_docker_snippet('snippet')
+            assert mock_invalidate.call_count == 1
+        assert cm.get_component_list('docker') == []
+
+    def test_base_fields(self, mock_environment):
+        lb, env_dir = mock_environment
+        cm = ComponentManager(lb)
+        with pytest.raises(ValueError):
+            cm.base_fields
+
+        with open(os.path.join(env_dir, 'base', 'gigantum_base-images_python3-minimal.yaml'), 'wt') as bf:
+            yaml.safe_dump({'id': 'python3-minimal', 'revision': 1, '###repository###': 'gigantum_base-images',
+                            'development_tools': ['jupyterlab']}, bf)
+
+        assert cm.base_fields['repository'] == 'gigantum_base-images'
+        with count_yaml_loads() as mock_load:
+            assert cm.base_fields['id'] == 'python3-minimal'
+            assert ImageBuilder(lb)._import_baseimage_fields()['development_tools'] == ['jupyterlab']
+            assert mock_load.call_count == 0
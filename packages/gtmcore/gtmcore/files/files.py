@@ -1,6 +1,6 @@
 import shutil
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from gtmcore.labbook import LabBook
 from gtmcore.logging import LMLogger
@@ -8,6 +8,7 @@ from gtmcore.activity import (ActivityDetailRecord, ActivityRecord,
                                ActivityStore, ActivityAction)
 from gtmcore.activity.utils import ImmutableList, DetailRecordList, TextData
 from gtmcore.configuration.utils import call_subprocess
+from gtmcore.gitlib.ignore import GitIgnoreMatcher
 
 logger = LMLogger.get_logger()
 
@@ -42,6 +43,26 @@ class FileOperations(object):
                 total_bytes += os.path.getsize(fp)
         return total_bytes
 
+    @classmethod
+    def ignored_paths(cls, labbook: LabBook, section: str, dst_paths: List[str]) -> List[str]:
+        """Get the destination paths that match an ignore pattern, and so can't be put into a section
+
+        Paths inside an ignored directory (e.g. `untracked`) are allowed, as long as the file itself doesn't match a
+        pattern.
+
+        Args:
+            labbook: Subject LabBook
+            section: Section name (code, input, output)
+            dst_paths: Paths within the section
+
+        Returns:
+            the ignored paths, as given in `dst_paths`
+        """
+        section_paths = [os.path.join(section, _make_path_relative(p)) for p in dst_paths]
+        ignored = set(GitIgnoreMatcher.for_repository(labbook.root_dir).filter_ignored(section_paths,
+                                                                                      check_parents=False))
+        return [p for p, section_path in zip(dst_paths, section_paths) if section_path in ignored]
+
     @classmethod
     def put_file(cls, labbook: LabBook, section: str, src_file: str,
                  dst_path: str, txid: Optional[str] = None) -> Dict[str, Any]:
@@ -66,9 +87,7 @@ class FileOperations(object):
             raise ValueError(f"Source file does not exist at `{src_file}`")
 
         labbook.validate_section(section)
-        r = call_subprocess(['git', 'check-ignore', os.path.basename(dst_path)],
-                            cwd=labbook.root_dir, check=False)
-        if dst_path and r and os.path.basename(dst_path) in r:
+        if dst_path and cls.ignored_paths(labbook, section, [dst_path]):
             logger.warning(f"File {dst_path} matches gitignore; "
                            f"not put into {str(labbook)}")
             raise FileOperationsException(f"`{dst_path}` matches "
@@ -177,11 +196,11 @@ class FileOperations(object):
 
     @classmethod
     def delete_files(cls, labbook: LabBook, section: str, relative_paths: List[str]) -> None:
-        """Delete file (or directory) from inside lb section.
-
-        The list of paths is deleted in series. Only provide "parent" nodes in the file tree. This is because deletes
-        on directories will remove all child objects, so subsequent deletes of individual files will then fail.
+        """Delete files (or directories) from inside lb section.
 
+        All paths are checked before anything is deleted. They are removed from the git index with a single command,
+        and the deletions are committed with a single sweep and activity record. Paths inside a directory that is also
+        being deleted are skipped.
 
         Args:
             labbook: Subject LabBook
@@ -196,36 +215,45 @@ class FileOperations(object):
         if not isinstance(relative_paths, list):
             raise ValueError("Must provide list of paths to remove")
 
+        target_paths = list()
         for file_path in relative_paths:
             relative_path = LabBook.make_path_relative(file_path)
             target_path = os.path.join(labbook.root_dir, section, relative_path)
             if not os.path.exists(target_path):
                 raise ValueError(f"Attempted to delete non-existent path at `{target_path}`")
-            else:
-                labbook.git.remove(target_path, force=True, keep_file=False)
-                if os.path.exists(target_path):
-                    raise IOError(f"Failed to delete path: {target_path}")
+            target_paths.append(target_path)
+
+        logger.info(f"Deleting {len(target_paths)} path(s) from {str(labbook)}")
+        labbook.git.remove_paths([os.path.relpath(p, labbook.root_dir) for p in target_paths])
+        for target_path in target_paths:
+            if os.path.isdir(target_path):
+                shutil.rmtree(target_path)
+            elif os.path.exists(target_path):
+                os.remove(target_path)
+
+            if os.path.exists(target_path):
+                raise IOError(f"Failed to delete path: {target_path}")
         labbook.sweep_uncommitted_changes(show=True)
 
     @classmethod
-    def _make_move_activity_record(cls, labbook: LabBook, section: str, dst_abs_path: str,
-                                   commit_msg: str) -> None:
-        if os.path.isdir(dst_abs_path):
-            did_add = labbook.git.add_all(dst_abs_path)
-        else:
-            did_add = labbook.git.add(dst_abs_path)
-
-        if not did_add:
-            # We don't (and can't!) create activity records for untracked files
+    def _make_move_activity_record(cls, labbook: LabBook, section: str, dst_abs_paths: List[str],
+                                   messages: List[str]) -> None:
+        # We don't (and can't!) create activity records for untracked files
+        dst_rel_paths = [os.path.relpath(p, labbook.root_dir) for p in dst_abs_paths]
+        ignored = set(GitIgnoreMatcher.for_repository(labbook.root_dir).filter_ignored(dst_rel_paths))
+        to_add = [p for p in dst_rel_paths if p not in ignored]
+        if not to_add:
             return
 
+        labbook.git.add_paths(to_add)
+        commit_msg = messages[0] if len(messages) == 1 else f"Moved {len(messages)} files and directories"
         commit = labbook.git.commit(commit_msg)
         activity_type, activity_detail_type, section_str = labbook.get_activity_type_from_section(section)
         adr = ActivityDetailRecord(activity_detail_type,
                                    show=False,
                                    importance=0,
                                    action=ActivityAction.EDIT,
-                                   data=TextData('markdown', commit_msg))
+                                   data=TextData('markdown', '\n'.join(messages)))
 
         ar = ActivityRecord(activity_type,
                             message=commit_msg,
@@ -239,67 +267,101 @@ class FileOperations(object):
         ars.create_activity_record(ar)
 
     @classmethod
-    def move_file(cls, labbook: LabBook, section: str, src_rel_path: str, dst_rel_path: str) \
-            -> List[Dict[str, Any]]:
+    def _moved_file_info(cls, labbook: LabBook, section: str, final_dest: str) -> List[Dict[str, Any]]:
+        """Get the file info of a moved file, or of a moved directory and everything inside it"""
+        t = final_dest.replace(os.path.join(labbook.root_dir, section), '')
+        if os.path.isfile(final_dest):
+            return [cls.get_file_info(labbook, section, t or "/")]
+
+        moved_files = list()
+        moved_files.append(cls.get_file_info(labbook, section, t or "/"))
+        for root, dirs, files in os.walk(final_dest):
+            rt = root.replace(os.path.join(labbook.root_dir, section), '')
+            rt = _make_path_relative(rt)
+            for d in sorted(dirs):
+                dinfo = cls.get_file_info(labbook, section, os.path.join(rt, d))
+                moved_files.append(dinfo)
+            for f in filter(lambda n: n != '.gitkeep', sorted(files)):
+                finfo = cls.get_file_info(labbook, section, os.path.join(rt, f))
+                moved_files.append(finfo)
+        return moved_files
 
-        """Move a file or directory within a labbook, but not outside of it. Wraps
-        underlying "mv" call.
+    @classmethod
+    def move_files(cls, labbook: LabBook, section: str, moves: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """Move files or directories within a labbook, but not outside of it.
+
+        All sources are checked before anything is moved. The sources are removed from the git index with a single
+        command, and the moves are committed together with a single activity record.
 
         Args:
             labbook: Subject LabBook
             section(str): Section name (code, input, output)
-            src_rel_path(str): Source file or directory
-            dst_rel_path(str): Target file name and/or directory
-        """
+            moves(list): (source, target) pairs. If a directory, the target should include the trailing slash
 
+        Returns:
+            list of the file info of the moved files and directories
+        """
         # Start with Validations
         labbook.validate_section(section)
-        if not src_rel_path:
-            raise ValueError("src_rel_path cannot be None or empty")
 
-        if dst_rel_path is None:
-            raise ValueError("dst_rel_path cannot be None or empty")
+        resolved = list()
+        for src_rel_path, dst_rel_path in moves:
+            if not src_rel_path:
+                raise ValueError("src_rel_path cannot be None or empty")
+
+            if dst_rel_path is None:
+                raise ValueError("dst_rel_path cannot be None or empty")
 
-        src_rel_path = LabBook.make_path_relative(src_rel_path)
-        dst_rel_path = LabBook.make_path_relative(dst_rel_path)
+            src_rel_path = LabBook.make_path_relative(src_rel_path)
+            dst_rel_path = LabBook.make_path_relative(dst_rel_path)
 
-        src_abs_path = os.path.join(labbook.root_dir, section, src_rel_path.replace('..', ''))
-        dst_abs_path = os.path.join(labbook.root_dir, section, dst_rel_path.replace('..', ''))
+            src_abs_path = os.path.join(labbook.root_dir, section, src_rel_path.replace('..', ''))
+            dst_abs_path = os.path.join(labbook.root_dir, section, dst_rel_path.replace('..', ''))
 
-        if not os.path.exists(src_abs_path):
-            raise ValueError(f"No src file exists at `{src_abs_path}`")
+            if not os.path.exists(src_abs_path):
+                raise ValueError(f"No src file exists at `{src_abs_path}`")
+            resolved.append((src_rel_path, dst_rel_path, src_abs_path, dst_abs_path))
+
+        if not resolved:
+            return []
 
         try:
-            src_type = 'directory' if os.path.isdir(src_abs_path) else 'file'
-            logger.info(f"Moving {src_type} `{src_abs_path}` to `{dst_abs_path}`")
-            labbook.git.remove(src_abs_path, keep_file=True)
-            final_dest = shutil.move(src_abs_path, dst_abs_path)
-            commit_msg = f"Moved {src_type} `{src_rel_path}` to `{dst_rel_path}`"
-            cls._make_move_activity_record(labbook, section, final_dest, commit_msg)
-
-            if os.path.isfile(final_dest):
-                t = final_dest.replace(os.path.join(labbook.root_dir, section), '')
-                return [cls.get_file_info(labbook, section, t or "/")]
-            else:
-                moved_files = list()
-                t = final_dest.replace(os.path.join(labbook.root_dir, section), '')
-                moved_files.append(cls.get_file_info(labbook, section, t or "/"))
-                for root, dirs, files in os.walk(final_dest):
-                    rt = root.replace(os.path.join(labbook.root_dir, section), '')
-                    rt = _make_path_relative(rt)
-                    for d in sorted(dirs):
-                        dinfo = cls.get_file_info(labbook, section, os.path.join(rt, d))
-                        moved_files.append(dinfo)
-                    for f in filter(lambda n: n != '.gitkeep', sorted(files)):
-                        finfo = cls.get_file_info(labbook, section, os.path.join(rt, f))
-                        moved_files.append(finfo)
-                return moved_files
+            labbook.git.remove_paths([os.path.relpath(r[2], labbook.root_dir) for r in resolved])
+
+            destinations = list()
+            messages = list()
+            for src_rel_path, dst_rel_path, src_abs_path, dst_abs_path in resolved:
+                src_type = 'directory' if os.path.isdir(src_abs_path) else 'file'
+                logger.info(f"Moving {src_type} `{src_abs_path}` to `{dst_abs_path}`")
+                destinations.append(shutil.move(src_abs_path, dst_abs_path))
+                messages.append(f"Moved {src_type} `{src_rel_path}` to `{dst_rel_path}`")
+            cls._make_move_activity_record(labbook, section, destinations, messages)
+
+            moved_files = list()
+            for final_dest in destinations:
+                moved_files.extend(cls._moved_file_info(labbook, section, final_dest))
+            return moved_files
 
         except Exception as e:
             logger.critical("Failed moving file in labbook. Repository may be in corrupted state.")
             logger.exception(e)
             raise
 
+    @classmethod
+    def move_file(cls, labbook: LabBook, section: str, src_rel_path: str, dst_rel_path: str) \
+            -> List[Dict[str, Any]]:
+
+        """Move a file or directory within a labbook, but not outside of it. Wraps
+        underlying "mv" call.
+
+        Args:
+            labbook: Subject LabBook
+            section(str): Section name (code, input, output)
+            src_rel_path(str): Source file or directory
+            dst_rel_path(str): Target file name and/or directory
+        """
+        return cls.move_files(labbook, section, [(src_rel_path, dst_rel_path)])
+
     @classmethod
     def makedir(cls, labbook: LabBook, relative_path: str, create_activity_record: bool = False) -> None:
         """Make a new directory inside the labbook directory.
@@ -1,8 +1,8 @@
 import redis_lock
 from contextlib import contextmanager
-from redis import StrictRedis
 
 from gtmcore.configuration import Configuration
+from gtmcore.locking import get_lock_redis_client
 from gtmcore.logging import LMLogger
 
 
@@ -16,9 +16,7 @@ class FileWriteLock:
         self.filename = filename
 
         # Redis instance for the LabBook lock
-        self._lock_redis_client = StrictRedis(host=self.config['redis']['host'],
-                                              port=self.config['redis']['port'],
-                                              db=self.config['redis']['db'])
+        self._lock_redis_client = get_lock_redis_client(self.config)
 
     @contextmanager
     def lock(self):
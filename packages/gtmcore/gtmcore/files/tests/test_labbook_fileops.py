@@ -4,7 +4,8 @@ import os
 import pprint
 
 from gtmcore.labbook import LabBook
-from gtmcore.files import FileOperations as FO
+from gtmcore.files import FileOperations as FO, FileOperationsException
+
 from gtmcore.fixtures import mock_config_file, mock_labbook, remote_labbook_repo, sample_src_file
 
 
@@ -75,6 +76,24 @@ class TestLabbookFileOperations(object):
         # Make sure the inserted file that doesn't match wasn't added.
         assert '.DS_Store' not in os.listdir(os.path.join(lb.root_dir, 'input'))
 
+    def test_put_file_ignored_paths(self, mock_labbook, sample_src_file):
+        lb = mock_labbook[2]
+        assert FO.ignored_paths(lb, 'code', ['.DS_Store', 'a/b/module.pyc', 'a/notebook.ipynb', 'untracked',
+                                             'untracked/data.csv', '/untracked/.DS_Store']) == \
+            ['.DS_Store', 'a/b/module.pyc', 'untracked', '/untracked/.DS_Store']
+
+        with pytest.raises(FileOperationsException):
+            FO.put_file(lb, 'code', sample_src_file, 'nested/compiled.pyc')
+
+        # Files can be put into untracked directories, unless the file itself is ignored
+        finfo = FO.put_file(lb, 'code', sample_src_file, 'untracked/data.csv')
+        assert finfo['key'] == 'untracked/data.csv'
+
+        # Changes to a .gitignore are picked up
+        with open(os.path.join(lb.root_dir, 'code', '.gitignore'), 'wt') as f:
+            f.write('*.csv\n')
+        assert FO.ignored_paths(lb, 'code', ['other.csv', 'other.txt']) == ['other.csv']
+
     def test_remove_file_success(self, mock_labbook, sample_src_file):
         lb = mock_labbook[2]
         new_file_data = FO.insert_file(lb, "code", sample_src_file)
@@ -143,6 +162,35 @@ class TestLabbookFileOperations(object):
         for test_file in test_files:
             assert not os.path.exists(os.path.join(lb.root_dir, 'code', test_file))
 
+    def test_remove_files_single_commit(self, mock_labbook, sample_src_file):
+        lb = mock_labbook[2]
+        FO.makedir(lb, 'code/testdir', create_activity_record=True)
+        FO.insert_file(lb, 'code', sample_src_file, 'testdir')
+        for test_file in ['a.txt', 'b.txt', 'untracked.txt']:
+            with open(os.path.join(lb.root_dir, 'code', test_file), 'wt') as sample_f:
+                sample_f.write("blah")
+        lb.git.add_paths(['code/a.txt', 'code/b.txt'])
+        lb.git.commit("making test data")
+        num_commits = len(lb.git.log())
+
+        # A path inside a directory that is also deleted is skipped
+        FO.delete_files(lb, 'code', ['a.txt', 'b.txt', 'untracked.txt', 'testdir',
+                                     f'testdir/{os.path.basename(sample_src_file)}'])
+
+        for test_file in ['a.txt', 'b.txt', 'untracked.txt', 'testdir']:
+            assert not os.path.exists(os.path.join(lb.root_dir, 'code', test_file))
+        assert lb.is_repo_clean
+        # The sweep and its activity record
+        assert len(lb.git.log()) == num_commits + 2
+
+    def test_remove_files_validated_first(self, mock_labbook, sample_src_file):
+        lb = mock_labbook[2]
+        new_file_data = FO.insert_file(lb, "code", sample_src_file)
+        with pytest.raises(ValueError):
+            FO.delete_files(lb, 'code', [new_file_data['key'], 'invalid.txt'])
+        assert os.path.exists(os.path.join(lb.root_dir, 'code', new_file_data['key']))
+        assert lb.is_repo_clean
+
     def test_untracked_file_operations(selfself, mock_labbook):
         lb = mock_labbook[2]
         for base in ['output', 'input', 'code']:
@@ -246,6 +294,32 @@ class TestLabbookFileOperations(object):
         results = FO.move_file(lb, 'code', 'level_1', 'target_dir')
         assert len(results) == 4
 
+    def test_move_files(self, mock_labbook, mock_config_file, sample_src_file):
+        lb = mock_labbook[2]
+        FO.makedir(lb, 'code/source_dir', create_activity_record=True)
+        FO.makedir(lb, 'code/target_dir', create_activity_record=True)
+        f = FO.insert_file(lb, 'code', sample_src_file)['key']
+        with open(os.path.join(lb.root_dir, 'code', 'source_dir', 'data.txt'), 'wt') as sample_f:
+            sample_f.write("blah")
+        lb.git.add_paths(['code/source_dir/data.txt'])
+        lb.git.commit("making test data")
+        num_commits = len(lb.git.log())
+
+        results = FO.move_files(lb, 'code', [(f, 'target_dir'), ('source_dir', 'target_dir/renamed_dir')])
+        assert [r['key'] for r in results] == [f'target_dir/{f}', 'target_dir/renamed_dir/',
+                                               'target_dir/renamed_dir/data.txt']
+        assert not os.path.exists(os.path.join(lb.root_dir, 'code', f))
+        assert not os.path.exists(os.path.join(lb.root_dir, 'code', 'source_dir'))
+        assert lb.is_repo_clean
+
+        # One commit for the moves and one for the activity record
+        assert len(lb.git.log()) == num_commits + 2
+        assert lb.git.log_entry(lb.git.commit_hash)['message'].startswith('_GTM_ACTIVITY_START_**\nmsg:Moved 2 files')
+
+        with pytest.raises(ValueError):
+            FO.move_files(lb, 'code', [(f'target_dir/{f}', f), ('missing.txt', 'other.txt')])
+        assert os.path.exists(os.path.join(lb.root_dir, 'code', 'target_dir', f))
+
     def test_makedir_simple(self, mock_labbook):
         # Note that "score" refers to the count of .gitkeep files.
         lb = mock_labbook[2]
@@ -0,0 +1,298 @@
+import ctypes
+import errno
+import os
+import struct
+import time
+from threading import Lock
+from typing import Dict, List, Optional, Set, Tuple, Union
+
+from gtmcore.activity.monitors.inotify import inotify_init
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+
+class ChangeWatcherException(Exception):
+    pass
+
+
+class _InotifyWatcher(object):
+    """Recursive, non-blocking inotify watch over a working tree
+
+    Events are left in the kernel queue until `drain()` is called, so no background thread is required. The `.git`
+    directory is never watched.
+    """
+    IN_MODIFY = 0x00000002
+    IN_ATTRIB = 0x00000004
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | \
+        IN_DELETE_SELF | IN_MOVE_SELF
+
+    _EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, root_dir: str) -> None:
+        self.root_dir = root_dir
+        self._libc, self._fd = inotify_init()
+
+        # Watch descriptor -> directory path relative to the root dir ('' is the root)
+        self._watches: Dict[int, str] = dict()
+        try:
+            self._add_tree('')
+        except Exception:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+            self._watches = dict()
+
+    def _add_watch(self, relative_dir: str) -> None:
+        path = os.path.join(self.root_dir, relative_dir) if relative_dir else self.root_dir
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), self.WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR):
+                # Removed before we got to it. The parent event already marked it dirty.
+                return
+            raise ChangeWatcherException(f"inotify_add_watch failed on {path}: {os.strerror(err)}")
+        self._watches[wd] = relative_dir
+
+    def _add_tree(self, relative_dir: str) -> List[str]:
+        """Watch a directory and everything below it
+
+        Returns:
+            relative paths of all files found, since changes to them may have been missed before the watch existed
+        """
+        found = list()
+        self._add_watch(relative_dir)
+        start = os.path.join(self.root_dir, relative_dir) if relative_dir else self.root_dir
+        for dirpath, dirnames, filenames in os.walk(start):
+            rel_dirpath = os.path.relpath(dirpath, self.root_dir)
+            rel_dirpath = '' if rel_dirpath == '.' else rel_dirpath
+            if '.git' in dirnames and rel_dirpath == '':
+                dirnames.remove('.git')
+            for d in dirnames:
+                self._add_watch(os.path.join(rel_dirpath, d))
+            found.extend([os.path.join(rel_dirpath, f) for f in filenames])
+        return found
+
+    def drain(self) -> Tuple[Set[str], bool]:
+        """Read every queued event
+
+        Returns:
+            (set of changed relative paths, True if the kernel queue overflowed and events were lost)
+        """
+        changed: Set[str] = set()
+        overflow = False
+        while True:
+            try:
+                buf = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not buf:
+                break
+
+            offset = 0
+            while offset < len(buf):
+                wd, mask, _, name_len = self._EVENT_HEADER.unpack_from(buf, offset)
+                offset += self._EVENT_HEADER.size
+                name = os.fsdecode(buf[offset:offset + name_len].rstrip(b'\0'))
+                offset += name_len
+
+                if mask & self.IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+
+                if mask & self.IN_IGNORED:
+                    self._watches.pop(wd, None)
+                    continue
+
+                parent = self._watches.get(wd)
+                if parent is None:
+                    continue
+                if not name:
+                    # Event on the watched directory itself (e.g. deleted or moved)
+                    if parent:
+                        changed.add(parent)
+                    continue
+                if parent == '' and name == '.git':
+                    continue
+
+                relative_path = os.path.join(parent, name) if parent else name
+                changed.add(relative_path)
+                if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    changed.update(self._add_tree(relative_path))
+
+        return changed, overflow
+
+
+class _PollingWatcher(object):
+    """Fallback watcher that diffs stat() snapshots of the working tree
+
+    This still walks the tree, but only stats files instead of hashing content and comparing against the git index.
+    """
+    def __init__(self, root_dir: str) -> None:
+        self.root_dir = root_dir
+        self._snapshot = self._scan()
+
+    def close(self) -> None:
+        self._snapshot = dict()
+
+    def _scan(self) -> Dict[str, Tuple[int, int, int]]:
+        snapshot = dict()
+        for dirpath, dirnames, filenames in os.walk(self.root_dir):
+            if dirpath == self.root_dir and '.git' in dirnames:
+                dirnames.remove('.git')
+            rel_dirpath = os.path.relpath(dirpath, self.root_dir)
+            for f in filenames:
+                try:
+                    st = os.lstat(os.path.join(dirpath, f))
+                except FileNotFoundError:
+                    continue
+                relative_path = f if rel_dirpath == '.' else os.path.join(rel_dirpath, f)
+                snapshot[relative_path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        return snapshot
+
+    def drain(self) -> Tuple[Set[str], bool]:
+        current = self._scan()
+        changed = set(current.keys()).symmetric_difference(self._snapshot.keys())
+        changed.update([p for p, s in current.items() if p in self._snapshot and self._snapshot[p] != s])
+        self._snapshot = current
+        return changed, False
+
+
+class ChangeIndex(object):
+    """Tracks paths in a repository working tree that changed since they were last committed
+
+    Callers ask for `pending_paths()` to scope `git status`/`git add` to what actually changed. When the index can't
+    vouch for completeness (nothing committed since it started, lost events, or `reconcile_interval` elapsed) it
+    returns None and the caller must do a full scan, then call `mark_clean()` with no paths.
+
+    Indexes are registered per process and per repository root, so any code running in the same process as an
+    activity monitor (e.g. `Repository.sweep_uncommitted_changes`) shares the monitor's index.
+    """
+    _registry: Dict[str, 'ChangeIndex'] = dict()
+    _registry_lock = Lock()
+
+    def __init__(self, root_dir: str, reconcile_interval: int = 300, max_paths: int = 2000,
+                 use_inotify: bool = True) -> None:
+        """
+
+        Args:
+            root_dir: absolute path to the repository root
+            reconcile_interval: seconds after which a full scan is required again
+            max_paths: if more paths than this are dirty, report a full scan instead of a (long) pathspec
+            use_inotify: set to False to always use the polling watcher
+        """
+        self.root_dir = root_dir
+        self.reconcile_interval = reconcile_interval
+        self.max_paths = max_paths
+
+        self._lock = Lock()
+        self._dirty: Set[str] = set()
+        self._needs_reconcile = True
+        self._last_reconcile = 0.0
+
+        self._watcher: Optional[Union[_InotifyWatcher, _PollingWatcher]] = None
+        if use_inotify:
+            try:
+                self._watcher = _InotifyWatcher(root_dir)
+            except (ChangeWatcherException, OSError) as err:
+                logger.warning(f"Falling back to polling for changes in {root_dir}: {err}")
+        if self._watcher is None:
+            self._watcher = _PollingWatcher(root_dir)
+
+    @classmethod
+    def for_repository(cls, root_dir: str, **kwargs) -> 'ChangeIndex':
+        """Get or create the index for a repository root in this process"""
+        with cls._registry_lock:
+            index = cls._registry.get(root_dir)
+            if index is None:
+                index = cls(root_dir, **kwargs)
+                cls._registry[root_dir] = index
+            return index
+
+    @classmethod
+    def get(cls, root_dir: str) -> Optional['ChangeIndex']:
+        """Get the index for a repository root if one is active in this process"""
+        return cls._registry.get(root_dir)
+
+    @classmethod
+    def release(cls, root_dir: str) -> None:
+        """Stop watching a repository root and drop its index"""
+        with cls._registry_lock:
+            index = cls._registry.pop(root_dir, None)
+        if index:
+            index.close()
+
+    @property
+    def is_inotify(self) -> bool:
+        return isinstance(self._watcher, _InotifyWatcher)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._watcher:
+                self._watcher.close()
+                self._watcher = None
+            self._needs_reconcile = True
+
+    def _drain(self) -> None:
+        if self._watcher is None:
+            self._needs_reconcile = True
+            return
+
+        try:
+            changed, overflow = self._watcher.drain()
+        except (ChangeWatcherException, OSError) as err:
+            logger.warning(f"Change watcher for {self.root_dir} failed, falling back to polling: {err}")
+            self._watcher.close()
+            self._watcher = _PollingWatcher(self.root_dir)
+            changed, overflow = set(), True
+
+        if overflow:
+            logger.warning(f"Change events lost for {self.root_dir}, forcing a full reconcile")
+            self._needs_reconcile = True
+        self._dirty.update(changed)
+
+    def pending_paths(self) -> Optional[List[str]]:
+        """Get the relative paths changed since they were last marked clean
+
+        Returns:
+            sorted list of relative paths, or None if a full scan of the working tree is required
+        """
+        with self._lock:
+            self._drain()
+            if self._needs_reconcile or (time.time() - self._last_reconcile) > self.reconcile_interval:
+                return None
+            if len(self._dirty) > self.max_paths:
+                return None
+            return sorted(self._dirty)
+
+    def mark_clean(self, paths: Optional[List[str]] = None) -> None:
+        """Mark paths as committed
+
+        Args:
+            paths: the list returned by `pending_paths()`. None indicates a full scan was done and everything
+                   seen so far is clean.
+        """
+        with self._lock:
+            if paths is None:
+                # Keep anything that arrived after the caller's scan started
+                self._dirty = set()
+                self._drain()
+                self._needs_reconcile = False
+                self._last_reconcile = time.time()
+            else:
+                self._dirty.difference_update(paths)
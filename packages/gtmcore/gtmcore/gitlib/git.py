@@ -272,18 +272,24 @@ class GitRepoInterface(metaclass=abc.ABCMeta):
 
     # LOCAL CHANGE METHODS
     @abc.abstractmethod
-    def status(self) -> Dict[str, List[Tuple[str, str]]]:
+    def status(self, paths: Optional[List[str]] = None,
+               untracked_files: str = 'all') -> Dict[str, List[Tuple[str, str]]]:
         """Get the status of a repo
 
         Should return a dictionary of lists of tuples of the following format:
 
             {
-                "staged_new": [(filename, status), ...],
+                "staged": [(filename, status), ...],
                 "unstaged": [(filename, status), ...],
                 "untracked": [filename, ...]
             }
 
-            status is the status of the file (new, modified, deleted)
+            status is the status of the file (added, deleted, modified, renamed, unmerged)
+
+        Args:
+            paths(list): Optional list of relative paths (files or directories) to limit the status to
+            untracked_files(str): `all` to list every untracked file, `normal` to list a directory containing only
+                                  untracked files once (with a trailing slash), or `no` to skip untracked files
 
         Returns:
             (dict(list))
@@ -314,6 +320,31 @@ class GitRepoInterface(metaclass=abc.ABCMeta):
         """
         pass
 
+    @abc.abstractmethod
+    def add_paths(self, paths: List[str]) -> None:
+        """Add changes (including deletions) for a list of paths, using a single `git add -A` command
+
+        Args:
+            paths(list): Relative paths (from the root_dir) to add
+
+        Returns:
+            None
+        """
+        pass
+
+    @abc.abstractmethod
+    def remove_paths(self, paths: List[str]) -> None:
+        """Remove a list of files and directories from the index, keeping them in the working tree, using a single
+        `git rm` command
+
+        Args:
+            paths(list): Relative paths (from the root_dir) to remove
+
+        Returns:
+            None
+        """
+        pass
+
     @abc.abstractmethod
     def remove(self, filename, force=False, keep_file=True):
         """Remove a file from tracking
@@ -479,6 +510,44 @@ class GitRepoInterface(metaclass=abc.ABCMeta):
             list(dict)
         """
         pass
+
+    @abc.abstractmethod
+    def resolve_commit(self, revision: str) -> Optional[str]:
+        """Method to resolve a revision (branch, tag, `HEAD~1`, abbreviated hash...) to a commit hash
+
+        Args:
+            revision: Revision to resolve
+
+        Returns:
+            The full commit hash, or None if the revision does not name a commit
+        """
+        pass
+
+    @abc.abstractmethod
+    def is_ancestor(self, ancestor: str, revision: str) -> bool:
+        """Method to check if a commit is in the history of another revision
+
+        Args:
+            ancestor: Revision of the possible ancestor
+            revision: Revision of the descendant
+
+        Returns:
+            True if `ancestor` is reachable from `revision`, False if not or if either revision doesn't exist
+        """
+        pass
+
+    @abc.abstractmethod
+    def count_ahead_behind(self, revision: str, other: str) -> Tuple[int, int]:
+        """Method to count the commits that are in one revision's history but not another's, and vice versa
+
+        Args:
+            revision: Revision to count from, e.g. a local branch
+            other: Revision to compare to, e.g. the remote branch
+
+        Returns:
+            (number of commits ahead of `other`, number of commits behind `other`)
+        """
+        pass
     # HISTORY METHODS
 
     # BRANCH METHODS
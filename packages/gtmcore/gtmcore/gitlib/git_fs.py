@@ -1,11 +1,14 @@
 from gtmcore.gitlib.git import GitRepoInterface
+from gtmcore.gitlib.object_pool import GitObjectPool
 from git import Repo, Head, RemoteReference
-from git import InvalidGitRepositoryError, BadName
+from git import InvalidGitRepositoryError
 import os
 import re
 import shutil
+import subprocess
+import tempfile
 
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from gtmcore.logging import LMLogger
 
@@ -16,6 +19,11 @@ class GitFsException(Exception):
     pass
 
 
+# Change codes of `git status --porcelain=v2`, for changes staged in the index and for changes in the working tree
+STAGED_STATUS = {'A': 'added', 'C': 'added', 'D': 'deleted', 'M': 'modified', 'T': 'modified', 'R': 'renamed'}
+UNSTAGED_STATUS = {'A': 'added', 'D': 'deleted', 'M': 'modified', 'T': 'modified', 'R': 'renamed'}
+
+
 class GitFilesystem(GitRepoInterface):
 
     def __init__(self, config_dict, author=None, committer=None):
@@ -43,11 +51,12 @@ class GitFilesystem(GitRepoInterface):
         self.repo = None
         self.set_working_directory(self.config["working_directory"])
 
-    def set_working_directory(self, directory):
+    def set_working_directory(self, directory, repo=None):
         """Method to change the current working directory. Will reset the self.repo reference
 
         Args:
             directory(str): Absolute path to the working dir
+            repo(Repo): Optional already open Repo for the working dir, to use instead of opening a new one
 
         Returns:
             None
@@ -58,6 +67,10 @@ class GitFilesystem(GitRepoInterface):
         # Update the working dir
         self.working_directory = directory
 
+        if repo is not None:
+            self.repo = repo
+            return
+
         # Check to see if the working dir is already a repository
         try:
             self.repo = Repo(directory)
@@ -105,6 +118,17 @@ class GitFilesystem(GitRepoInterface):
         """
         return self.repo.active_branch.path
 
+    @property
+    def object_pool(self) -> GitObjectPool:
+        """Get the pool of persistent `git cat-file` processes for the working directory
+
+        Returns:
+            GitObjectPool
+        """
+        return GitObjectPool.for_repository(self.working_directory,
+                                            max_repositories=self.config.get('object_pool_repositories', 32),
+                                            size=self.config.get('object_pool_size', 2))
+
     def get_current_branch_name(self):
         """Method to get the current branch name
 
@@ -130,7 +154,36 @@ class GitFilesystem(GitRepoInterface):
         self.repo = Repo.init(self.working_directory, bare=bare)
 
     # LOCAL CHANGE METHODS
-    def status(self) -> Dict[str, List[Tuple[str, str]]]:
+    def _status_records(self, args: List[str]) -> Iterator[str]:
+        """Run `git status --porcelain=v2 -z` and yield its NUL separated records as they are read
+
+        Args:
+            args: additional arguments, e.g. the untracked files mode and pathspecs
+
+        Returns:
+            iterator of records
+        """
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(['git', 'status', '--porcelain=v2', '-z', *args], cwd=self.working_directory,
+                                       stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                buffer = b''
+                for chunk in iter(lambda: process.stdout.read(65536), b''):  # type: ignore
+                    buffer += chunk
+                    *records, buffer = buffer.split(b'\0')
+                    for record in records:
+                        yield record.decode('utf-8', 'surrogateescape')
+            finally:
+                process.stdout.close()  # type: ignore
+                returncode = process.wait()
+
+            if returncode != 0:
+                stderr.seek(0)
+                raise GitFsException(f"git status failed in {self.working_directory}: "
+                                     f"{stderr.read().decode().strip()}")
+
+    def status(self, paths: Optional[List[str]] = None,
+               untracked_files: str = 'all') -> Dict[str, List[Tuple[str, str]]]:
         """Get the status of a repo
 
         Should return a dictionary of lists of tuples of the following format:
@@ -141,49 +194,58 @@ class GitFilesystem(GitRepoInterface):
                 "untracked": [filename, ...]
             }
 
-            status is the status of the file (new, modified, deleted)
+            status is the status of the file (added, deleted, modified, renamed, unmerged). Renamed files are reported
+            with their new name.
+
+        Args:
+            paths(list): Optional list of relative paths (files or directories) to limit the status to
+            untracked_files(str): `all` to list every untracked file, `normal` to list a directory containing only
+                                  untracked files once (with a trailing slash) instead of listing its contents, or `no`
+                                  to skip looking for untracked files
 
         Returns:
             (dict(list))
         """
-        result = {"untracked": self.repo.untracked_files}
-
-        # staged
-        staged = []
-        for f in self.repo.index.diff("HEAD"):
-            if f.change_type == "D":
-                # delete and new are flipped here, due to how comparison is done
-                staged.append((f.b_path, "added"))
-            elif f.change_type == "A":
-                staged.append((f.b_path, "deleted"))
-            elif f.change_type == "M":
-                staged.append((f.b_path, "modified"))
-            elif f.change_type == "R":
-                staged.append((f.b_path, "renamed"))
-            elif f.change_type == "U":
-                staged.append((f.b_path, "unmerged"))
-            else:
-                raise ValueError("Unsupported change type: {}".format(f.change_type))
-
-        # unstaged
-        unstaged = []
-        for f in self.repo.index.diff(None):
-            if f.change_type == "D":
-                # delete and new are flipped here, due to how comparison is done
-                unstaged.append((f.b_path, "deleted"))
-            elif f.change_type == "A":
-                unstaged.append((f.b_path, "added"))
-            elif f.change_type == "M":
-                unstaged.append((f.b_path, "modified"))
-            elif f.change_type == "R":
-                unstaged.append((f.b_path, "renamed"))
-            elif f.change_type == "U":
-                staged.append((f.b_path, "unmerged"))
+        if untracked_files not in ('all', 'normal', 'no'):
+            raise ValueError(f"Unsupported untracked files mode `{untracked_files}`")
+
+        result: Dict[str, List] = {"untracked": [], "staged": [], "unstaged": []}
+        args = [f'--untracked-files={untracked_files}']
+        if paths is not None:
+            if not paths:
+                return result
+            # Literal pathspecs, so file names containing glob characters are not expanded
+            args.append('--')
+            args.extend([f":(literal){p}" for p in paths])
+
+        records = self._status_records(args)
+        for record in records:
+            kind = record[:1]
+            if kind == '?':
+                result["untracked"].append(record[2:])
+                continue
+            elif kind == 'u':
+                result["staged"].append((record.split(' ', 10)[10], "unmerged"))
+                continue
+            elif kind == '1':
+                fields = record.split(' ', 8)
+            elif kind == '2':
+                fields = record.split(' ', 9)
+                # The original path of a rename or copy follows as a separate record
+                next(records)
             else:
-                raise ValueError("Unsupported change type: {}".format(f.change_type))
-
-        result["staged"] = staged
-        result["unstaged"] = unstaged
+                # Ignored files and headers are not requested
+                continue
+
+            index_status, worktree_status = fields[1][0], fields[1][1]
+            if index_status != '.':
+                if index_status not in STAGED_STATUS:
+                    raise ValueError("Unsupported change type: {}".format(index_status))
+                result["staged"].append((fields[-1], STAGED_STATUS[index_status]))
+            if worktree_status != '.':
+                if worktree_status not in UNSTAGED_STATUS:
+                    raise ValueError("Unsupported change type: {}".format(worktree_status))
+                result["unstaged"].append((fields[-1], UNSTAGED_STATUS[worktree_status]))
 
         return result
 
@@ -384,39 +446,24 @@ class GitFilesystem(GitRepoInterface):
         Returns:
             list(dict)
         """
-        kwargs = {}
+        options = []
 
         if max_count:
-            kwargs["max_count"] = max_count
-
-        if filename:
-            kwargs["paths"] = [filename]
+            options.append(f"--max-count={max_count}")
 
         if skip:
-            kwargs["skip"] = skip
+            options.append(f"--skip={skip}")
 
         if since:
-            kwargs["since"] = since.strftime("%B %d %Y")
+            options.append(f"--since={since.strftime('%B %d %Y')}")
 
         if author:
-            kwargs["author"] = author
-
-        if path_info:
-            commits = list(self.repo.iter_commits(path_info, **kwargs))
-        else:
-            commits = list(self.repo.iter_commits(self.get_current_branch_name(), **kwargs))
+            options.append(f"--author={author}")
 
-        result = []
-        for c in commits:
-            result.append({
-                            "commit": c.hexsha,
-                            "author":  {"name": c.author.name, "email": c.author.email},
-                            "committer": {"name": c.committer.name, "email": c.committer.email},
-                            "committed_on": c.committed_datetime,
-                            "message": c.message
-                          })
+        revision = str(path_info) if path_info else self.get_current_branch_name()
+        commits = self.object_pool.rev_list(revision, options=options, paths=[filename] if filename else None)
 
-        return result
+        return [self.log_entry(c) for c in commits]
 
     def log_entry(self, commit):
         """Method to get single commit records
@@ -443,20 +490,54 @@ class GitFilesystem(GitRepoInterface):
         if not commit:
             raise ValueError("commit cannot be None or empty")
 
-        try:
-            entry = self.repo.commit(commit)
-        except BadName:
-            logger.error("Commit hash {} not found: {}".format(commit, BadName))
+        entry = self.object_pool.read_commit(commit)
+        if entry is None:
+            logger.error("Commit hash {} not found".format(commit))
             raise ValueError("Commit {} not found".format(commit))
 
         return {
-                 "commit": entry.hexsha,
-                 "author":  {"name": entry.author.name, "email": entry.author.email},
-                 "committer": {"name": entry.committer.name, "email": entry.committer.email},
-                 "committed_on": entry.committed_datetime,
-                 "message": entry.message
+                 "commit": entry["commit"],
+                 "author": dict(entry["author"]),
+                 "committer": dict(entry["committer"]),
+                 "committed_on": entry["committed_on"],
+                 "message": entry["message"]
                }
 
+    def resolve_commit(self, revision: str) -> Optional[str]:
+        """Method to resolve a revision (branch, tag, `HEAD~1`, abbreviated hash...) to a commit hash
+
+        Args:
+            revision: Revision to resolve
+
+        Returns:
+            The full commit hash, or None if the revision does not name a commit
+        """
+        return self.object_pool.resolve(revision)
+
+    def is_ancestor(self, ancestor: str, revision: str) -> bool:
+        """Method to check if a commit is in the history of another revision
+
+        Args:
+            ancestor: Revision of the possible ancestor
+            revision: Revision of the descendant
+
+        Returns:
+            True if `ancestor` is reachable from `revision`, False if not or if either revision doesn't exist
+        """
+        return self.object_pool.is_ancestor(ancestor, revision)
+
+    def count_ahead_behind(self, revision: str, other: str) -> Tuple[int, int]:
+        """Method to count the commits that are in one revision's history but not another's, and vice versa
+
+        Args:
+            revision: Revision to count from, e.g. a local branch
+            other: Revision to compare to, e.g. the remote branch
+
+        Returns:
+            (number of commits ahead of `other`, number of commits behind `other`)
+        """
+        return self.object_pool.count_ahead_behind(revision, other)
+
     def blame(self, filename):
         """Method to get the revision and author for each line of a file
 
@@ -88,6 +88,43 @@ class GitFilesystemShimmed(GitFilesystem):
 
         return True
 
+    def add_paths(self, paths: List[str]) -> None:
+        """Add changes (including deletions) for a list of paths, using a single `git add -A` command
+
+        Paths are passed on stdin, so there is no limit on the number of paths, and matched literally.
+
+        Args:
+            paths(list): Relative paths (from the root_dir) to add
+
+        Returns:
+            None
+        """
+        if not paths:
+            return
+
+        logger.info(f"Adding {len(paths)} path(s) to Git repository in {self.working_directory}")
+        self._run(['git', '--literal-pathspecs', 'add', '-A', '--pathspec-from-file=-', '--pathspec-file-nul'],
+                  stdin='\0'.join(paths))
+
+    def remove_paths(self, paths: List[str]) -> None:
+        """Remove a list of files and directories from the index, keeping them in the working tree, using a single
+        `git rm` command
+
+        Paths are passed on stdin and matched literally. Paths that are not tracked (e.g. ignored files) are skipped.
+
+        Args:
+            paths(list): Relative paths (from the root_dir) to remove
+
+        Returns:
+            None
+        """
+        if not paths:
+            return
+
+        logger.info(f"Removing {len(paths)} path(s) from Git repository in {self.working_directory}")
+        self._run(['git', '--literal-pathspecs', 'rm', '-r', '--cached', '--force', '--ignore-unmatch', '--quiet',
+                   '--pathspec-from-file=-', '--pathspec-file-nul'], stdin='\0'.join(paths))
+
     def reset(self, branch_name: str):
         """git reset --hard current branch to the treeish specified by branch_name
 
@@ -105,13 +142,15 @@ class GitFilesystemShimmed(GitFilesystem):
         """
         self._run(['git', 'remote', 'set-branches', remote_name] + branch_names)
 
-    def _run(self, command: List[str], working_directory: Optional[str] = None, check=True) -> str:
+    def _run(self, command: List[str], working_directory: Optional[str] = None, check=True,
+             stdin: Optional[str] = None) -> str:
         """subprocess.run wrapped in a try block for error reporting
 
         Args:
             command: what to run with subprocess.run()
             working_directory: usually a path within a Git repo. Defaults to the instance working_directory
             check: Raise an exception on non-zero return code?
+            stdin: Optional text to send to the process on stdin
 
         Returns:
             The stdout from the process as a string
@@ -120,7 +159,8 @@ class GitFilesystemShimmed(GitFilesystem):
             working_directory = self.working_directory
 
         try:
-            result = subprocess.run(command, capture_output=True, text=True, check=check, cwd=working_directory)
+            result = subprocess.run(command, capture_output=True, text=True, check=check, cwd=working_directory,
+                                    input=stdin)
         except subprocess.CalledProcessError as x:
             logger.error(f'{x.stdout}, {x.stderr}')
             raise
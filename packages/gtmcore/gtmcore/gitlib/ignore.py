@@ -0,0 +1,298 @@
+import os
+import re
+from threading import Lock
+from typing import Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from gtmcore.gitlib.partial_clone import _git_dir
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# A compiled gitignore pattern. `basename` patterns (no slash) match the last path component at any depth, others
+# match the whole path relative to the directory of the ignore file.
+IgnorePattern = NamedTuple('IgnorePattern', [('pattern', str), ('regex', Pattern), ('negate', bool),
+                                             ('dir_only', bool), ('basename', bool)])
+
+_POSIX_CLASSES = {'alnum': 'a-zA-Z0-9', 'alpha': 'a-zA-Z', 'blank': ' \\t', 'cntrl': '\\x00-\\x1f\\x7f',
+                  'digit': '0-9', 'graph': '!-~', 'lower': 'a-z', 'print': ' -~',
+                  'punct': '!-/:-@\\[-`{-~', 'space': ' \\t\\n\\r\\f\\v', 'upper': 'A-Z', 'xdigit': '0-9A-Fa-f'}
+
+
+def _translate_bracket(pattern: str, start: int) -> Tuple[Optional[str], int]:
+    """Translate a `[...]` bracket expression starting at `start` to a regex character class
+
+    Returns:
+        (regex, index after the closing bracket), or (None, ...) if the bracket is not terminated
+    """
+    i = start + 1
+    negate = i < len(pattern) and pattern[i] in '!^'
+    if negate:
+        i += 1
+
+    members = ''
+    first = True
+    while i < len(pattern):
+        c = pattern[i]
+        if c == ']' and not first:
+            # Like git, a bracket never matches a slash
+            if negate:
+                return f'[^{members}/]', i + 1
+            return f'(?!/)[{members}]', i + 1
+        first = False
+
+        if c == '[' and pattern.startswith('[:', i):
+            end = pattern.find(':]', i + 2)
+            if end != -1 and pattern[i + 2:end] in _POSIX_CLASSES:
+                members += _POSIX_CLASSES[pattern[i + 2:end]]
+                i = end + 2
+                continue
+
+        if c == '\\' and i + 1 < len(pattern):
+            i += 1
+            c = pattern[i]
+        if c in '\\]^-[':
+            members += '\\' + c
+        else:
+            members += c
+
+        # Range, e.g. `a-z`
+        if i + 2 < len(pattern) and pattern[i + 1] == '-' and pattern[i + 2] != ']':
+            end_char = pattern[i + 2]
+            if end_char == '\\' and i + 3 < len(pattern):
+                end_char = pattern[i + 3]
+                i += 1
+            members += '-' + ('\\' + end_char if end_char in '\\]^-[' else end_char)
+            i += 3
+        else:
+            i += 1
+    return None, i
+
+
+def translate_pattern(pattern: str) -> Optional[str]:
+    """Translate a gitignore glob (without the `!` prefix or trailing slash) to a regular expression
+
+    `*` and `?` don't match a slash. `**/` matches zero or more directories, a trailing `/**` matches everything
+    inside a directory, and other consecutive asterisks are treated as a single `*`.
+
+    Args:
+        pattern: glob, with a leading slash already removed
+
+    Returns:
+        regular expression source, or None if the pattern can never match (e.g. an unterminated bracket)
+    """
+    regex = ''
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == '*':
+            j = i
+            while j < n and pattern[j] == '*':
+                j += 1
+            if j - i >= 2 and (i == 0 or pattern[i - 1] == '/'):
+                if j == n:
+                    regex += '.*'
+                    i = j
+                    continue
+                if pattern[j] == '/':
+                    regex += '(?:.*/)?'
+                    i = j + 1
+                    continue
+            regex += '[^/]*'
+            i = j
+        elif c == '?':
+            regex += '[^/]'
+            i += 1
+        elif c == '[':
+            bracket, i = _translate_bracket(pattern, i)
+            if bracket is None:
+                return None
+            regex += bracket
+        elif c == '\\':
+            if i + 1 == n:
+                # A trailing backslash is an invalid pattern
+                return None
+            regex += re.escape(pattern[i + 1])
+            i += 2
+        else:
+            regex += re.escape(c)
+            i += 1
+    return regex
+
+
+def parse_ignore_lines(lines: List[str]) -> List[IgnorePattern]:
+    """Compile the lines of a gitignore file
+
+    Args:
+        lines: lines of the file
+
+    Returns:
+        list of IgnorePattern, in file order
+    """
+    patterns = list()
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line or line.startswith('#'):
+            continue
+
+        # Trailing spaces are removed unless escaped with a backslash
+        stripped = line.rstrip(' ')
+        if stripped.endswith('\\') and len(stripped) < len(line):
+            stripped += ' '
+        line = stripped
+        if not line:
+            continue
+
+        negate = line.startswith('!')
+        if negate:
+            line = line[1:]
+
+        dir_only = line.endswith('/')
+        if dir_only:
+            line = line[:-1]
+
+        basename = '/' not in line
+        if line.startswith('/'):
+            line = line[1:]
+        if not line:
+            continue
+
+        regex = translate_pattern(line)
+        if regex is None:
+            logger.debug(f"Skipping invalid gitignore pattern `{line}`")
+            continue
+        patterns.append(IgnorePattern(pattern=line, regex=re.compile(regex, re.DOTALL), negate=negate,
+                                      dir_only=dir_only, basename=basename))
+    return patterns
+
+
+class GitIgnoreMatcher(object):
+    """Decides whether paths are ignored by a repository's ignore rules without running `git check-ignore`
+
+    Rules are read from the global excludes file (`$XDG_CONFIG_HOME/git/ignore`), `.git/info/exclude` and the
+    `.gitignore` file of every directory, with git's precedence: deeper `.gitignore` files override shallower ones,
+    which override `info/exclude` and the global file, and the last matching line of a file wins. As in git, a path
+    inside an ignored directory is ignored even if a pattern re-includes it.
+
+    Ignore files are compiled once and re-read only when their modification time, size or inode changes. Like
+    `git check-ignore --no-index`, whether a path is tracked is not considered. Matchers are registered per process
+    and per repository root.
+    """
+    _registry: Dict[str, 'GitIgnoreMatcher'] = dict()
+    _registry_lock = Lock()
+
+    def __init__(self, root_dir: str) -> None:
+        """
+
+        Args:
+            root_dir: absolute path to the repository root
+        """
+        self.root_dir = root_dir
+        self._lock = Lock()
+        # Ignore file path -> (stat signature, compiled patterns)
+        self._files: Dict[str, Tuple[Optional[Tuple[int, int, int]], List[IgnorePattern]]] = dict()
+
+    @classmethod
+    def for_repository(cls, root_dir: str) -> 'GitIgnoreMatcher':
+        """Get or create the matcher for a repository root in this process"""
+        with cls._registry_lock:
+            matcher = cls._registry.get(root_dir)
+            if matcher is None:
+                matcher = cls(root_dir)
+                cls._registry[root_dir] = matcher
+            return matcher
+
+    @staticmethod
+    def _global_excludes_file() -> str:
+        config_home = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+        return os.path.join(config_home, 'git', 'ignore')
+
+    def _load(self, path: str) -> List[IgnorePattern]:
+        """Get the compiled patterns of an ignore file, re-reading it if it changed"""
+        try:
+            st = os.stat(path)
+            signature: Optional[Tuple[int, int, int]] = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except OSError:
+            signature = None
+
+        cached = self._files.get(path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        patterns: List[IgnorePattern] = list()
+        if signature is not None:
+            try:
+                with open(path, 'rt', encoding='utf-8', errors='surrogateescape') as f:
+                    patterns = parse_ignore_lines(f.read().split('\n'))
+            except (OSError, IsADirectoryError):
+                patterns = list()
+        self._files[path] = (signature, patterns)
+        return patterns
+
+    def _rule_sets(self, directory: str) -> List[Tuple[str, List[IgnorePattern]]]:
+        """Get the (base directory, patterns) that apply to entries of a directory, lowest precedence first"""
+        rule_sets = [('', self._load(self._global_excludes_file())),
+                     ('', self._load(os.path.join(_git_dir(self.root_dir), 'info', 'exclude')))]
+        parts = directory.split('/') if directory else []
+        for depth in range(len(parts) + 1):
+            base = '/'.join(parts[:depth])
+            rule_sets.append((base, self._load(os.path.join(self.root_dir, base, '.gitignore'))))
+        return rule_sets
+
+    def _match(self, path: str, is_dir: bool, rule_sets: List[Tuple[str, List[IgnorePattern]]]) -> bool:
+        """Apply the patterns of the ignore files to a single path, ignoring the status of its parent directories"""
+        name = path.rsplit('/', 1)[-1]
+        for base, patterns in reversed(rule_sets):
+            relative = path[len(base) + 1:] if base else path
+            for p in reversed(patterns):
+                if p.dir_only and not is_dir:
+                    continue
+                if p.regex.fullmatch(name if p.basename else relative):
+                    return not p.negate
+        return False
+
+    def _is_ignored(self, path: str, is_dir: bool, check_parents: bool, dir_results: Dict[str, bool],
+                    rule_cache: Dict[str, List[Tuple[str, List[IgnorePattern]]]]) -> bool:
+        def rules(directory: str) -> List[Tuple[str, List[IgnorePattern]]]:
+            if directory not in rule_cache:
+                rule_cache[directory] = self._rule_sets(directory)
+            return rule_cache[directory]
+
+        parts = path.split('/')
+        if check_parents:
+            for depth in range(1, len(parts)):
+                parent = '/'.join(parts[:depth])
+                if parent not in dir_results:
+                    dir_results[parent] = self._match(parent, True, rules('/'.join(parts[:depth - 1])))
+                if dir_results[parent]:
+                    return True
+        return self._match(path, is_dir, rules('/'.join(parts[:-1])))
+
+    def filter_ignored(self, paths: List[str], check_parents: bool = True) -> List[str]:
+        """Get the paths that are ignored, as `git check-ignore` would report them
+
+        Args:
+            paths: paths relative to the repository root. A trailing slash marks a directory, otherwise a path is a
+                   directory if one exists at that location.
+            check_parents: if False, only the patterns matching a path itself are considered, so e.g. a new file
+                           inside an ignored directory is not reported
+
+        Returns:
+            the ignored paths, in the order given
+        """
+        ignored = list()
+        # Ignore files are checked for changes once per call
+        dir_results: Dict[str, bool] = dict()
+        rule_cache: Dict[str, List[Tuple[str, List[IgnorePattern]]]] = dict()
+        with self._lock:
+            for path in paths:
+                normalized = path.strip('/')
+                if not normalized:
+                    continue
+                is_dir = path.endswith('/') or os.path.isdir(os.path.join(self.root_dir, normalized))
+                if self._is_ignored(normalized, is_dir, check_parents, dir_results, rule_cache):
+                    ignored.append(path)
+        return ignored
+
+    def is_ignored(self, path: str, check_parents: bool = True) -> bool:
+        """Check if a single path is ignored. See `filter_ignored()`"""
+        return bool(self.filter_ignored([path], check_parents=check_parents))
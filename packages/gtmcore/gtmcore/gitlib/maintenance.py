@@ -0,0 +1,330 @@
+import glob
+import json
+import os
+import subprocess
+import time
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+import redis
+
+from gtmcore.configuration import Configuration
+from gtmcore.configuration.utils import call_subprocess
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# A namedtuple for the object database statistics of a repository, as reported by `git count-objects -v`. Sizes are
+# in KiB.
+RepositoryStats = NamedTuple('RepositoryStats', [('loose_objects', int), ('loose_size', int), ('packed_objects', int),
+                                                 ('packs', int), ('pack_size', int), ('garbage', int),
+                                                 ('has_commit_graph', bool), ('has_multi_pack_index', bool)])
+
+
+class RepositoryMaintenance(object):
+    """Class to run incremental maintenance on a repository, in place of a full `git gc`
+
+    Maintenance is split into tasks that each only touch a small part of the object database:
+
+        * `loose-objects`: pack loose objects into a new pack and remove them
+        * `incremental-repack`: update the multi-pack-index, delete packs it no longer references and combine small
+          packs into one
+        * `commit-graph`: incrementally update the commit-graph, which speeds up history walks (log, merge-base,
+          ahead/behind counts)
+        * `prune`: delete unreachable loose objects older than `prune_expire`
+
+    Tasks are due based on the repository's object statistics, and for `commit-graph` and `prune` the time since
+    they last ran, which is stored in redis. When idle (e.g. in a background job) the regular thresholds apply. When
+    not idle (e.g. during a publish or sync) only the much higher foreground thresholds apply, so maintenance is
+    only done in the foreground if it has fallen far behind.
+
+    Note!! Running tasks assumes the repository has already been locked!
+    """
+    KEY_PREFIX = "GIT-MAINTENANCE"
+
+    LOOSE_OBJECTS = 'loose-objects'
+    INCREMENTAL_REPACK = 'incremental-repack'
+    COMMIT_GRAPH = 'commit-graph'
+    PRUNE = 'prune'
+    TASKS = [LOOSE_OBJECTS, INCREMENTAL_REPACK, COMMIT_GRAPH, PRUNE]
+
+    # Seconds a scheduled background maintenance job is considered in progress, so it is not dispatched again
+    CLAIM_TIMEOUT = 3600
+
+    def __init__(self, root_dir: str, config: Optional[Configuration] = None) -> None:
+        self.root_dir = root_dir
+
+        maintenance_config = (config or Configuration()).config['git_maintenance']
+        self.enabled: bool = maintenance_config['enabled']
+        self.loose_object_threshold: int = maintenance_config['loose_object_threshold']
+        self.foreground_loose_object_threshold: int = maintenance_config['foreground_loose_object_threshold']
+        self.pack_threshold: int = maintenance_config['pack_threshold']
+        self.foreground_pack_threshold: int = maintenance_config['foreground_pack_threshold']
+        self.max_repack_batch_size: int = maintenance_config['max_repack_batch_size']
+        self.commit_graph_interval: int = maintenance_config['commit_graph_interval']
+        self.prune_interval: int = maintenance_config['prune_interval']
+        self.prune_expire: str = maintenance_config['prune_expire']
+
+        self._redis_client: Optional[redis.StrictRedis] = None
+        self._git_dir: Optional[str] = None
+
+    @property
+    def redis_client(self) -> redis.StrictRedis:
+        """Property to get a redis client for maintenance state
+
+        Returns:
+            redis.StrictRedis
+        """
+        if not self._redis_client:
+            self._redis_client = redis.StrictRedis(db=1)
+        return self._redis_client
+
+    @property
+    def git_dir(self) -> str:
+        """Property to get the repository's git directory, which is not in the working tree for submodules
+
+        Returns:
+            str
+        """
+        if not self._git_dir:
+            git_dir = os.path.join(self.root_dir, '.git')
+            if not os.path.isdir(git_dir):
+                git_dir = call_subprocess(['git', 'rev-parse', '--absolute-git-dir'], cwd=self.root_dir).strip()
+            self._git_dir = git_dir
+        return self._git_dir
+
+    def _key(self) -> str:
+        return f"{self.KEY_PREFIX}|{os.path.abspath(self.root_dir)}"
+
+    def _claim_key(self) -> str:
+        return f"{self._key()}|claim"
+
+    def get_stats(self) -> RepositoryStats:
+        """Method to get the current object database statistics of the repository
+
+        Returns:
+            RepositoryStats
+        """
+        output = call_subprocess(['git', 'count-objects', '-v'], cwd=self.root_dir)
+        counts: Dict[str, int] = dict()
+        for line in output.splitlines():
+            name, _, value = line.partition(':')
+            try:
+                counts[name.strip()] = int(value.strip())
+            except ValueError:
+                continue
+
+        objects_dir = os.path.join(self.git_dir, 'objects')
+        has_commit_graph = os.path.exists(os.path.join(objects_dir, 'info', 'commit-graph')) or \
+            os.path.isdir(os.path.join(objects_dir, 'info', 'commit-graphs'))
+
+        return RepositoryStats(loose_objects=counts.get('count', 0),
+                               loose_size=counts.get('size', 0),
+                               packed_objects=counts.get('in-pack', 0),
+                               packs=counts.get('packs', 0),
+                               pack_size=counts.get('size-pack', 0),
+                               garbage=counts.get('garbage', 0),
+                               has_commit_graph=has_commit_graph,
+                               has_multi_pack_index=os.path.exists(os.path.join(objects_dir, 'pack',
+                                                                                'multi-pack-index')))
+
+    def last_run(self) -> Dict[str, float]:
+        """Method to get when each task last ran on the repository
+
+        Returns:
+            dict of task name -> unix timestamp, only containing tasks that have run
+        """
+        try:
+            values = self.redis_client.hgetall(self._key())
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to read git maintenance state for {self.root_dir}: {err}")
+            return dict()
+
+        last_run = dict()
+        for key, value in values.items():
+            task = key.decode() if isinstance(key, bytes) else key
+            if task in self.TASKS:
+                last_run[task] = float(value)
+        return last_run
+
+    def last_stats(self) -> Optional[RepositoryStats]:
+        """Method to get the repository statistics recorded after maintenance last ran
+
+        Returns:
+            RepositoryStats, or None if maintenance has not run on the repository
+        """
+        try:
+            value = self.redis_client.hget(self._key(), 'stats')
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to read git maintenance state for {self.root_dir}: {err}")
+            return None
+
+        return RepositoryStats(**json.loads(value)) if value else None
+
+    def due_tasks(self, stats: RepositoryStats, idle: bool = True) -> List[str]:
+        """Method to get the tasks that should run on the repository
+
+        Args:
+            stats: Current statistics of the repository
+            idle: If True, use the regular thresholds and include time based tasks. If False only tasks past their
+                  foreground thresholds are due.
+
+        Returns:
+            list of task names, in the order they should run
+        """
+        if not self.enabled:
+            return list()
+
+        tasks = list()
+        loose_threshold = self.loose_object_threshold if idle else self.foreground_loose_object_threshold
+        if stats.loose_objects > loose_threshold:
+            tasks.append(self.LOOSE_OBJECTS)
+
+        pack_threshold = self.pack_threshold if idle else self.foreground_pack_threshold
+        if stats.packs > pack_threshold:
+            tasks.append(self.INCREMENTAL_REPACK)
+
+        if idle:
+            last_run = self.last_run()
+            now = time.time()
+            if self.LOOSE_OBJECTS in tasks or not stats.has_commit_graph or \
+                    now - last_run.get(self.COMMIT_GRAPH, 0) >= self.commit_graph_interval:
+                tasks.append(self.COMMIT_GRAPH)
+            if now - last_run.get(self.PRUNE, 0) >= self.prune_interval:
+                tasks.append(self.PRUNE)
+
+        return tasks
+
+    def _repack_batch_size(self) -> str:
+        """Method to get the batch size for an incremental repack
+
+        As `git maintenance` does, the batch size is just larger than the second largest pack, so all packs except
+        the largest are combined. It is capped at `max_repack_batch_size` MiB.
+        """
+        pack_sizes = sorted((os.path.getsize(p) for p in glob.glob(os.path.join(self.git_dir, 'objects', 'pack',
+                                                                                '*.pack'))), reverse=True)
+        if len(pack_sizes) < 2:
+            return '0'
+
+        return str(min(pack_sizes[1] + 1, self.max_repack_batch_size * 1024 * 1024))
+
+    def _task_commands(self, task: str) -> List[List[str]]:
+        if task == self.LOOSE_OBJECTS:
+            # Without `-a` only loose objects are packed, and `-d` removes them once packed
+            return [['git', 'repack', '-d', '-q'],
+                    ['git', 'prune-packed', '-q']]
+        elif task == self.INCREMENTAL_REPACK:
+            # Packs combined by the repack are deleted by the expire of the next run, so processes that are
+            # reading them now are not interrupted
+            return [['git', 'multi-pack-index', 'write'],
+                    ['git', 'multi-pack-index', 'expire'],
+                    ['git', 'multi-pack-index', 'repack', f'--batch-size={self._repack_batch_size()}']]
+        elif task == self.COMMIT_GRAPH:
+            return [['git', 'commit-graph', 'write', '--reachable', '--split']]
+        elif task == self.PRUNE:
+            return [['git', 'prune', f'--expire={self.prune_expire}']]
+        else:
+            raise ValueError(f"Unsupported git maintenance task `{task}`")
+
+    def run(self, tasks: List[str], feedback_callback: Optional[Callable[[str], None]] = None) -> List[str]:
+        """Method to run maintenance tasks on the repository
+
+        A task that fails is logged and skipped, since maintenance never changes the content of a repository.
+
+        Args:
+            tasks: List of task names to run, in order
+            feedback_callback: Optional callback to give user-facing feedback
+
+        Returns:
+            list of the tasks that completed
+        """
+        completed = list()
+        for task in tasks:
+            if feedback_callback:
+                feedback_callback(f"Optimizing repository ({task})")
+            logger.info(f"Running git maintenance task `{task}` in {self.root_dir}")
+
+            start_time = time.time()
+            try:
+                for cmd_tokens in self._task_commands(task):
+                    call_subprocess(cmd_tokens, cwd=self.root_dir)
+            except subprocess.CalledProcessError:
+                logger.warning(f"Ignoring failed git maintenance task `{task}` in {self.root_dir}")
+                continue
+
+            logger.info(f"Finished git maintenance task `{task}` in {self.root_dir} in {time.time()-start_time:.2f}s")
+            completed.append(task)
+
+        self._record(completed)
+        return completed
+
+    def _record(self, completed: List[str]) -> None:
+        """Method to store the time tasks completed and the resulting statistics"""
+        try:
+            stats = self.get_stats()
+        except subprocess.CalledProcessError:
+            return
+
+        now = time.time()
+        values: Dict[Any, Any] = {task: str(now) for task in completed}
+        values['stats'] = json.dumps(stats._asdict())
+        try:
+            self.redis_client.hmset(self._key(), values)
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to store git maintenance state for {self.root_dir}: {err}")
+
+    def maintain(self, idle: bool = True, feedback_callback: Optional[Callable[[str], None]] = None) -> List[str]:
+        """Method to run the tasks that are currently due on the repository
+
+        Args:
+            idle: If True, use the regular thresholds. If False only run tasks past their foreground thresholds.
+            feedback_callback: Optional callback to give user-facing feedback
+
+        Returns:
+            list of the tasks that completed
+        """
+        try:
+            tasks = self.due_tasks(self.get_stats(), idle=idle)
+        except subprocess.CalledProcessError:
+            logger.warning(f"Could not get object statistics for {self.root_dir}, skipping git maintenance")
+            return list()
+
+        if not tasks:
+            return list()
+        return self.run(tasks, feedback_callback=feedback_callback)
+
+    def claim(self) -> bool:
+        """Method to mark background maintenance of the repository as scheduled
+
+        Returns:
+            True if maintenance was not already scheduled, and the caller should now schedule it
+        """
+        if not self.enabled:
+            return False
+
+        try:
+            return bool(self.redis_client.set(self._claim_key(), 1, nx=True, ex=self.CLAIM_TIMEOUT))
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to claim git maintenance for {self.root_dir}: {err}")
+            return False
+
+    def release(self) -> None:
+        """Method to mark scheduled background maintenance of the repository as finished
+
+        Returns:
+            None
+        """
+        try:
+            self.redis_client.delete(self._claim_key())
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to release git maintenance claim for {self.root_dir}: {err}")
+
+    def clear(self) -> None:
+        """Method to remove all stored maintenance state of the repository
+
+        Returns:
+            None
+        """
+        try:
+            self.redis_client.delete(self._key(), self._claim_key())
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to clear git maintenance state for {self.root_dir}: {err}")
@@ -0,0 +1,428 @@
+import datetime
+import os
+import subprocess
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Condition, Lock
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from gtmcore.gitlib.partial_clone import _git_dir
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+
+class GitObjectPoolException(Exception):
+    pass
+
+
+class _CatFileProcess(object):
+    """A long-lived `git cat-file --batch` (or `--batch-check`) process
+
+    Each query writes one object name to the process and reads the object header (and contents) back, so any number of
+    lookups cost a single fork. Object names are resolved by git, so any revision expression (`HEAD~1`,
+    `origin/master`, `<sha>^{commit}`) can be queried.
+    """
+    def __init__(self, root_dir: str, contents: bool) -> None:
+        self.contents = contents
+        self._process = subprocess.Popen(['git', 'cat-file', '--batch' if contents else '--batch-check'],
+                                         cwd=root_dir, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.DEVNULL)
+
+    @property
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def query(self, name: str) -> Optional[Tuple[str, str, int, Optional[bytes]]]:
+        """Look up an object
+
+        Args:
+            name: object name or revision expression
+
+        Returns:
+            (hexsha, object type, size, contents or None if this is a `--batch-check` process), or None if the
+            object does not exist
+        """
+        if self._process.stdin is None or self._process.stdout is None:
+            raise GitObjectPoolException("cat-file process is not connected")
+
+        self._process.stdin.write(name.encode() + b'\n')
+        self._process.stdin.flush()
+        header = self._process.stdout.readline()
+        if not header:
+            raise GitObjectPoolException("cat-file process exited unexpectedly")
+
+        fields = header.decode().split()
+        if len(fields) != 3:
+            # `<name> missing` or `<name> ambiguous`
+            return None
+
+        hexsha, object_type, size = fields[0], fields[1], int(fields[2])
+        data = None
+        if self.contents:
+            data = self._process.stdout.read(size)
+            # Contents are followed by a newline
+            self._process.stdout.read(1)
+        return hexsha, object_type, size, data
+
+    def close(self) -> None:
+        for stream in (self._process.stdin, self._process.stdout):
+            if stream:
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+
+def _parse_identity(value: str) -> Tuple[str, str, datetime.datetime]:
+    """Parse an `author` or `committer` header of a commit object
+
+    Args:
+        value: header value, e.g. `Jane Doe <jane@example.com> 1577836800 -0500`
+
+    Returns:
+        (name, email, timezone aware datetime)
+    """
+    name_email, timestamp, tz = value.rsplit(' ', 2)
+    name, email = name_email.rsplit(' <', 1)
+    sign = -1 if tz[0] == '-' else 1
+    offset = datetime.timedelta(hours=int(tz[1:3]), minutes=int(tz[3:5])) * sign
+    committed = datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone(offset))
+    return name, email.rstrip('>'), committed
+
+
+def _parse_commit(hexsha: str, data: bytes) -> Dict:
+    """Parse a raw commit object into the log entry format of `GitRepoInterface.log_entry()`"""
+    header, _, message = data.partition(b'\n\n')
+    headers: Dict[str, str] = dict()
+    parents: List[str] = list()
+    key = None
+    for line in header.decode('utf-8', 'replace').split('\n'):
+        if line.startswith(' ') and key:
+            # Continuation of a multi-line header (e.g. `gpgsig`)
+            headers[key] += '\n' + line[1:]
+            continue
+        key, _, value = line.partition(' ')
+        if key == 'parent':
+            parents.append(value)
+        else:
+            headers[key] = value
+
+    author_name, author_email, _ = _parse_identity(headers['author'])
+    committer_name, committer_email, committed_on = _parse_identity(headers['committer'])
+    return {"commit": hexsha,
+            "author": {"name": author_name, "email": author_email},
+            "committer": {"name": committer_name, "email": committer_email},
+            "committed_on": committed_on,
+            "message": message.decode(headers.get('encoding', 'utf-8'), 'replace'),
+            "parents": parents}
+
+
+class GitObjectPool(object):
+    """Per-repository pool of persistent `git cat-file` processes, with caches for commit history queries
+
+    Reading refs and commits through the pool costs no fork once a process is running. History queries (`rev_list`,
+    `is_ancestor`, `count_ahead_behind`) are cached by the resolved commit hashes they start from, since the history
+    behind a commit never changes. The only exception is a shallow clone that fetches older history, so cached
+    results are also keyed by the state of the `shallow` file.
+
+    Pools are registered per process and per repository root. A pool is replaced if the repository at its root is
+    deleted and re-created, and the least recently used pool is closed when more than `max_repositories` are open.
+    """
+    _registry: 'OrderedDict[str, GitObjectPool]' = OrderedDict()
+    _registry_lock = Lock()
+    _registry_pid = os.getpid()
+
+    def __init__(self, root_dir: str, size: int = 2, cache_size: int = 256) -> None:
+        """
+
+        Args:
+            root_dir: absolute path to the repository root
+            size: maximum number of processes of each kind (`--batch`/`--batch-check`) for concurrent callers
+            cache_size: maximum number of commits and history query results to keep cached
+        """
+        self.root_dir = root_dir
+        self.size = size
+        self.cache_size = cache_size
+        self.git_dir_id = self._git_dir_id(root_dir)
+
+        self._condition = Condition()
+        self._idle: Dict[bool, List[_CatFileProcess]] = {True: list(), False: list()}
+        self._running: Dict[bool, int] = {True: 0, False: 0}
+        self._closed = False
+
+        self._cache_lock = Lock()
+        self._commits: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._history: 'OrderedDict[Tuple, object]' = OrderedDict()
+
+    @staticmethod
+    def _git_dir_id(root_dir: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(_git_dir(root_dir))
+        except OSError:
+            return None
+        return st.st_dev, st.st_ino
+
+    @classmethod
+    def for_repository(cls, root_dir: str, max_repositories: int = 32, **kwargs) -> 'GitObjectPool':
+        """Get or create the pool for a repository root in this process
+
+        Args:
+            root_dir: absolute path to the repository root
+            max_repositories: maximum number of pools to keep open in this process
+            **kwargs: passed to the constructor when a pool is created
+
+        Returns:
+            GitObjectPool
+        """
+        evicted: List[GitObjectPool] = list()
+        with cls._registry_lock:
+            if cls._registry_pid != os.getpid():
+                # Forked (e.g. a job worker). The parent's processes can't be shared, so start over without closing
+                # them, which would interfere with the parent.
+                cls._registry = OrderedDict()
+                cls._registry_pid = os.getpid()
+
+            pool = cls._registry.get(root_dir)
+            if pool is not None and pool.git_dir_id != cls._git_dir_id(root_dir):
+                evicted.append(cls._registry.pop(root_dir))
+                pool = None
+
+            if pool is None:
+                pool = cls(root_dir, **kwargs)
+                cls._registry[root_dir] = pool
+            else:
+                cls._registry.move_to_end(root_dir)
+
+            while len(cls._registry) > max_repositories:
+                evicted.append(cls._registry.popitem(last=False)[1])
+
+        for p in evicted:
+            p.close()
+        return pool
+
+    @classmethod
+    def release(cls, root_dir: str) -> None:
+        """Close the processes of a repository root and drop its pool"""
+        with cls._registry_lock:
+            pool = cls._registry.pop(root_dir, None)
+        if pool:
+            pool.close()
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            processes = self._idle[True] + self._idle[False]
+            self._idle = {True: list(), False: list()}
+            self._condition.notify_all()
+        for process in processes:
+            process.close()
+
+    @contextmanager
+    def _process(self, contents: bool) -> Iterator[_CatFileProcess]:
+        """Check out a process, starting one if all running processes are busy and the pool isn't full"""
+        with self._condition:
+            while not self._idle[contents] and self._running[contents] >= self.size and not self._closed:
+                self._condition.wait()
+            if self._idle[contents]:
+                process: Optional[_CatFileProcess] = self._idle[contents].pop()
+            else:
+                process = None
+                self._running[contents] += 1
+
+        try:
+            if process is None:
+                process = _CatFileProcess(self.root_dir, contents)
+        except Exception:
+            with self._condition:
+                self._running[contents] -= 1
+                self._condition.notify()
+            raise
+
+        healthy = False
+        try:
+            yield process
+            healthy = process.alive
+        finally:
+            with self._condition:
+                if healthy and not self._closed:
+                    self._idle[contents].append(process)
+                else:
+                    self._running[contents] -= 1
+                self._condition.notify()
+            if not healthy or self._closed:
+                process.close()
+
+    def _query(self, name: str, contents: bool) -> Optional[Tuple[str, str, int, Optional[bytes]]]:
+        if not name or '\n' in name:
+            return None
+
+        for attempt in range(2):
+            try:
+                with self._process(contents) as process:
+                    # A failed process is closed when it is checked back in, and the query retried on a new one
+                    return process.query(name)
+            except (OSError, ValueError, GitObjectPoolException) as err:
+                if attempt:
+                    raise GitObjectPoolException(f"Failed to read `{name}` in {self.root_dir}: {err}")
+                logger.warning(f"Restarting cat-file process for {self.root_dir}: {err}")
+        return None
+
+    def resolve(self, revision: str) -> Optional[str]:
+        """Resolve a revision (branch, remote branch, tag, `HEAD~1`, abbreviated hash...) to a commit hash
+
+        Args:
+            revision: revision expression
+
+        Returns:
+            full commit hash, or None if the revision does not name a commit
+        """
+        result = self._query(f"{revision}^{{commit}}", contents=False)
+        return result[0] if result else None
+
+    def object_type(self, revision: str) -> Optional[str]:
+        """Get the type of the object a revision names (`commit`, `tree`, `blob` or `tag`), or None if it doesn't
+        exist"""
+        result = self._query(revision, contents=False)
+        return result[1] if result else None
+
+    def read_commit(self, revision: str) -> Optional[Dict]:
+        """Read a commit
+
+        Args:
+            revision: revision expression
+
+        Returns:
+            dict in the format of `GitRepoInterface.log_entry()`, with an additional `parents` list, or None if the
+            revision does not name a commit
+        """
+        with self._cache_lock:
+            if revision in self._commits:
+                self._commits.move_to_end(revision)
+                return self._commits[revision]
+
+        result = self._query(f"{revision}^{{commit}}", contents=True)
+        if result is None or result[3] is None:
+            return None
+        entry = _parse_commit(result[0], result[3])
+
+        with self._cache_lock:
+            # Commits are immutable, so they are cached by hash only
+            self._commits[entry['commit']] = entry
+            while len(self._commits) > self.cache_size:
+                self._commits.popitem(last=False)
+        return entry
+
+    def _shallow_state(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(os.path.join(_git_dir(self.root_dir), 'shallow'))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _cached_history(self, key: Tuple, command: List[str], returncodes: Sequence[int] = (0,)) -> Tuple[int, str]:
+        """Run a git history query, or get its result from the cache
+
+        Args:
+            key: cache key, which must include the resolved commit hashes the query starts from
+            command: git command to run
+            returncodes: exit codes that are results rather than failures
+
+        Returns:
+            (exit code, output)
+        """
+        key = key + (self._shallow_state(),)
+        with self._cache_lock:
+            if key in self._history:
+                self._history.move_to_end(key)
+                return self._history[key]  # type: ignore
+
+        result = subprocess.run(command, cwd=self.root_dir, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode not in returncodes:
+            raise GitObjectPoolException(f"`{' '.join(command)}` failed in {self.root_dir}: "
+                                         f"{result.stderr.decode().strip()}")
+        output = (result.returncode, result.stdout.decode())
+
+        with self._cache_lock:
+            self._history[key] = output
+            while len(self._history) > self.cache_size:
+                self._history.popitem(last=False)
+        return output
+
+    def rev_list(self, revision: str, options: Optional[List[str]] = None, paths: Optional[List[str]] = None) -> \
+            List[str]:
+        """List the commits reachable from a revision, newest first, as `git rev-list` does
+
+        Args:
+            revision: revision expression, or a range `<rev>..<rev>`
+            options: additional `git rev-list` options (e.g. `--max-count=10`)
+            paths: optional paths to limit the history to
+
+        Returns:
+            list of commit hashes
+        """
+        options = options or list()
+        paths = paths or list()
+        if '..' in revision:
+            exclude, include = revision.split('..', 1)
+            resolved = [self.resolve(exclude or 'HEAD'), self.resolve(include or 'HEAD')]
+            if None in resolved:
+                raise ValueError(f"Revision range {revision} not found")
+            spec = f"{resolved[0]}..{resolved[1]}"
+        else:
+            tip = self.resolve(revision)
+            if tip is None:
+                raise ValueError(f"Revision {revision} not found")
+            spec = tip
+
+        _, output = self._cached_history(('rev-list', spec, tuple(options), tuple(paths)),
+                                         ['git', 'rev-list', *options, spec, '--', *paths])
+        return output.split()
+
+    def is_ancestor(self, ancestor: str, revision: str) -> bool:
+        """Check if a commit is in the history of another, as `git merge-base --is-ancestor` does
+
+        Args:
+            ancestor: revision expression of the possible ancestor
+            revision: revision expression of the descendant
+
+        Returns:
+            True if `ancestor` is reachable from `revision`. False if not, or if either doesn't name a commit.
+        """
+        ancestor_commit = self.resolve(ancestor)
+        commit = self.resolve(revision)
+        if ancestor_commit is None or commit is None:
+            return False
+        if ancestor_commit == commit:
+            return True
+
+        returncode, _ = self._cached_history(('is-ancestor', ancestor_commit, commit),
+                                             ['git', 'merge-base', '--is-ancestor', ancestor_commit, commit],
+                                             returncodes=(0, 1))
+        return returncode == 0
+
+    def count_ahead_behind(self, revision: str, other: str) -> Tuple[int, int]:
+        """Count the commits in one revision's history but not another's, and vice versa
+
+        Args:
+            revision: revision expression, e.g. a local branch
+            other: revision expression to compare to, e.g. the remote branch
+
+        Returns:
+            (commits only in `revision`, commits only in `other`)
+        """
+        commit, other_commit = self.resolve(revision), self.resolve(other)
+        if commit is None or other_commit is None:
+            raise ValueError(f"Cannot compare {revision} and {other}: revision not found")
+        if commit == other_commit:
+            return 0, 0
+
+        _, output = self._cached_history(('ahead-behind', commit, other_commit),
+                                         ['git', 'rev-list', '--left-right', '--count', f"{commit}...{other_commit}"])
+        ahead, behind = output.split()
+        return int(ahead), int(behind)
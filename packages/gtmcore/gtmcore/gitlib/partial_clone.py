@@ -0,0 +1,115 @@
+import os
+import subprocess
+from typing import List, Optional
+
+from gtmcore.configuration.utils import call_subprocess
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# Clone modes for importing repositories. A `full` clone fetches all history including every version of every file.
+# A `blobless` (partial) clone fetches all commits and trees, but only fetches file contents when git needs them
+# (e.g. on checkout). A `shallow` clone is also blobless, and only fetches the most recent commits of each branch.
+# Older history is fetched on demand with `deepen_history`.
+CLONE_MODE_FULL = 'full'
+CLONE_MODE_BLOBLESS = 'blobless'
+CLONE_MODE_SHALLOW = 'shallow'
+CLONE_MODES = [CLONE_MODE_FULL, CLONE_MODE_BLOBLESS, CLONE_MODE_SHALLOW]
+
+
+def clone_arguments(clone_mode: str, depth: Optional[int] = None) -> List[str]:
+    """Get the `git clone` arguments for a clone mode
+
+    Filters and depth are ignored by git for clones of local paths, so a local remote must be given as a `file://`
+    url to be cloned partially. If the remote does not support filters the clone falls back to a full clone.
+
+    Args:
+        clone_mode: One of CLONE_MODES
+        depth: Number of commits to fetch for a shallow clone
+
+    Returns:
+        list of arguments
+    """
+    if clone_mode == CLONE_MODE_FULL:
+        return list()
+    elif clone_mode == CLONE_MODE_BLOBLESS:
+        return ['--filter=blob:none']
+    elif clone_mode == CLONE_MODE_SHALLOW:
+        if not depth or depth < 1:
+            raise ValueError("A shallow clone requires a depth of at least 1")
+        # `--depth` implies `--single-branch`, but all branches are needed to list and switch branches
+        return ['--filter=blob:none', f'--depth={depth}', '--no-single-branch']
+    else:
+        raise ValueError(f"Unsupported clone mode `{clone_mode}`")
+
+
+def _git_dir(root_dir: str) -> str:
+    """Get the git directory of a repository, following the `gitdir:` link of submodules"""
+    git_dir = os.path.join(root_dir, '.git')
+    if os.path.isfile(git_dir):
+        with open(git_dir, 'rt') as f:
+            link = f.read().strip()
+        if link.startswith('gitdir:'):
+            git_dir = os.path.normpath(os.path.join(root_dir, link[len('gitdir:'):].strip()))
+    return git_dir
+
+
+def is_shallow(root_dir: str) -> bool:
+    """Check if a repository is a shallow clone, i.e. older history has not been fetched
+
+    Args:
+        root_dir: Root directory of the repository
+
+    Returns:
+        bool
+    """
+    return os.path.exists(os.path.join(_git_dir(root_dir), 'shallow'))
+
+
+def deepen_history(root_dir: str, commits: Optional[int] = None, remote: str = 'origin') -> bool:
+    """Fetch older history into a shallow clone
+
+    Fetch failures (e.g. when offline) are logged, and callers continue with the history that is available.
+
+    Args:
+        root_dir: Root directory of the repository
+        commits: Number of additional commits to fetch from the current shallow boundary. If None, all remaining
+                 history is fetched.
+        remote: Name of the remote to fetch from
+
+    Returns:
+        True if history was fetched, False if the repository was not shallow or the fetch failed
+    """
+    if not is_shallow(root_dir):
+        return False
+
+    depth_arg = f'--deepen={commits}' if commits else '--unshallow'
+    logger.info(f"Fetching older history ({depth_arg}) into shallow clone {root_dir}")
+    try:
+        call_subprocess(['git', 'fetch', '-q', depth_arg, remote], cwd=root_dir)
+    except subprocess.CalledProcessError:
+        logger.warning(f"Failed to fetch older history into shallow clone {root_dir}")
+        return False
+    return True
+
+
+def deepen_to_merge_base(root_dir: str, rev_a: str, rev_b: str, increment: int, remote: str = 'origin') -> None:
+    """Fetch older history into a shallow clone until two revisions have a common ancestor, as needed to count or
+    merge the commits between them
+
+    Args:
+        root_dir: Root directory of the repository
+        rev_a: A revision, e.g. a branch name
+        rev_b: Another revision, e.g. `origin/<branch name>`
+        increment: Number of commits to fetch at a time
+        remote: Name of the remote to fetch from
+
+    Returns:
+        None
+    """
+    while is_shallow(root_dir):
+        merge_base = subprocess.run(['git', 'merge-base', rev_a, rev_b], cwd=root_dir, capture_output=True)
+        if merge_base.returncode == 0:
+            return
+        if not deepen_history(root_dir, commits=increment, remote=remote):
+            return
@@ -355,6 +355,37 @@ class GitInterfaceMixin(object):
         assert len(status["unstaged"]) == 2
         assert len(status["untracked"]) == 1
 
+    def test_status_untracked_modes(self, mock_initialized):
+        """Test scoping the status and the untracked files modes"""
+        git = mock_initialized[0]
+        working_directory = mock_initialized[1]
+
+        write_file(git, "committed.txt", "File number 1\n", commit_msg="initial commit")
+        write_file(git, "with space é.txt", "unicode\n", add=False)
+        os.makedirs(os.path.join(working_directory, "new_dir", "nested"))
+        write_file(git, os.path.join("new_dir", "nested", "a.txt"), "a", add=False)
+        write_file(git, os.path.join("new_dir", "b.txt"), "b", add=False)
+        git.repo.git.mv("committed.txt", "moved.txt")
+
+        status = git.status()
+        assert status["staged"] == [("moved.txt", "renamed")]
+        assert status["unstaged"] == []
+        assert status["untracked"] == ["new_dir/b.txt", "new_dir/nested/a.txt", "with space é.txt"]
+
+        status = git.status(untracked_files='normal')
+        assert status["untracked"] == ["new_dir/", "with space é.txt"]
+
+        status = git.status(untracked_files='no')
+        assert status["untracked"] == []
+        assert status["staged"] == [("moved.txt", "renamed")]
+
+        status = git.status(paths=["new_dir/nested", "with space é.txt"])
+        assert status == {"untracked": ["new_dir/nested/a.txt", "with space é.txt"], "staged": [], "unstaged": []}
+        assert git.status(paths=[]) == {"untracked": [], "staged": [], "unstaged": []}
+
+        with pytest.raises(ValueError):
+            git.status(untracked_files='everything')
+
     def test_add(self, mock_initialized):
         """Test adding a file to a repository"""
         git = mock_initialized[0]
@@ -0,0 +1,114 @@
+import os
+import shutil
+import time
+
+import pytest
+
+from gtmcore.gitlib.change_index import ChangeIndex
+from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.fixtures import mock_config_file
+
+
+@pytest.fixture(params=[True, False], ids=['inotify', 'polling'])
+def mock_watched_lb(mock_config_file, request):
+    im = InventoryManager()
+    lb = im.create_labbook('test', 'test', 'change-index-test', description='watching')
+    ChangeIndex._registry[lb.root_dir] = ChangeIndex(lb.root_dir, use_inotify=request.param)
+    yield lb
+    ChangeIndex.release(lb.root_dir)
+
+
+def helper_write_file(lb, relative_path: str, content: str):
+    filename = os.path.join(lb.root_dir, relative_path)
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, 'wt') as f:
+        f.write(content)
+
+
+class TestChangeIndex(object):
+    def test_requires_full_scan_until_reconciled(self, mock_watched_lb):
+        index = ChangeIndex.get(mock_watched_lb.root_dir)
+        assert index.pending_paths() is None
+
+        index.mark_clean()
+        assert index.pending_paths() == []
+
+    def test_tracks_changes(self, mock_watched_lb):
+        index = ChangeIndex.get(mock_watched_lb.root_dir)
+        index.mark_clean()
+
+        helper_write_file(mock_watched_lb, 'code/f1.txt', 'cat')
+        helper_write_file(mock_watched_lb, 'output/a/b/f2.txt', 'dog')
+        time.sleep(0.05)
+
+        pending = index.pending_paths()
+        assert 'code/f1.txt' in pending
+        assert 'output/a/b/f2.txt' in pending
+        assert not [p for p in pending if p.startswith('.git/')]
+
+        index.mark_clean(pending)
+        assert index.pending_paths() == []
+
+        os.remove(os.path.join(mock_watched_lb.root_dir, 'code', 'f1.txt'))
+        assert index.pending_paths() == ['code/f1.txt']
+
+    def test_reconcile_interval(self, mock_watched_lb):
+        index = ChangeIndex.get(mock_watched_lb.root_dir)
+        index.mark_clean()
+        assert index.pending_paths() == []
+
+        index.reconcile_interval = 0
+        time.sleep(0.01)
+        assert index.pending_paths() is None
+
+    def test_max_paths(self, mock_watched_lb):
+        index = ChangeIndex.get(mock_watched_lb.root_dir)
+        index.mark_clean()
+        index.max_paths = 2
+
+        for i in range(3):
+            helper_write_file(mock_watched_lb, f'input/f{i}.txt', 'cat')
+        assert index.pending_paths() is None
+
+    def test_scoped_status_matches_full_status(self, mock_watched_lb):
+        lb = mock_watched_lb
+        index = ChangeIndex.get(lb.root_dir)
+        index.mark_clean()
+
+        helper_write_file(lb, 'code/f1.txt', 'cat')
+        helper_write_file(lb, 'code/f2.txt', 'cat')
+        lb.sweep_uncommitted_changes()
+        assert 'code/f1.txt' not in index.pending_paths()
+
+        helper_write_file(lb, 'code/f1.txt', 'modified')
+        os.remove(os.path.join(lb.root_dir, 'code', 'f2.txt'))
+        helper_write_file(lb, 'output/new dir/[f3].txt', 'new')
+        helper_write_file(lb, 'output/untracked/ignored.pyc', 'ignored')
+
+        status, paths = lb.get_uncommitted_changes()
+        assert paths is not None
+        full_status = lb.git.status()
+        assert sorted(status['untracked']) == sorted(full_status['untracked'])
+        assert sorted(status['unstaged']) == sorted(full_status['unstaged'])
+        assert sorted(status['staged']) == sorted(full_status['staged'])
+        assert 'output/new dir/[f3].txt' in status['untracked']
+
+    def test_sweep_stages_only_changed_paths(self, mock_watched_lb):
+        lb = mock_watched_lb
+        index = ChangeIndex.get(lb.root_dir)
+        lb.sweep_uncommitted_changes()
+        assert index.pending_paths() is not None
+
+        helper_write_file(lb, 'code/f1.txt', 'cat')
+        helper_write_file(lb, 'input/data/f2.txt', 'dog')
+        lb.sweep_uncommitted_changes()
+
+        assert lb.is_repo_clean
+        # Only the activity record written after the sweep commit should be left to check
+        assert not [p for p in index.pending_paths() if not p.startswith('.gigantum')]
+
+        shutil.rmtree(os.path.join(lb.root_dir, 'input', 'data'))
+        lb.sweep_uncommitted_changes()
+        assert lb.is_repo_clean
+        assert not os.path.exists(os.path.join(lb.root_dir, 'input', 'data'))
+
@@ -39,6 +39,18 @@ class TestGitFilesystem(GitInterfaceMixin):
             # We are back to the previous commit
             assert not Path(scratch_working_dir, unwanted_fname).exists()
 
+    def test_add_paths_literal(self, mock_initialized):
+        git, working_dir = mock_initialized
+        write_file(git, 'a*', 'glob', commit_msg='glob-like name')
+        os.remove(os.path.join(working_dir, 'a*'))
+        write_file(git, 'ab', 'unrelated', add=False)
+
+        # `a*` is a file name, not a pattern matching `ab`
+        git.add_paths(['a*'])
+        status = git.status()
+        assert status['staged'] == [('a*', 'deleted')]
+        assert status['untracked'] == ['ab']
+
     def test_remote_set_branches(self, mock_initialized_remote):
         bare_working_dir = mock_initialized_remote[3]
         with tempfile.TemporaryDirectory() as scratch_working_dir:
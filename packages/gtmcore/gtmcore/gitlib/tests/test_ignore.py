@@ -0,0 +1,139 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import uuid
+
+import pytest
+
+from gtmcore.gitlib.ignore import GitIgnoreMatcher, translate_pattern
+
+ROOT_IGNORE = """# Comment
+*.log
+!important.log
+/build
+doc/*.txt
+**/logs
+logs/**/debug.log
+foo/**
+a/**/b
+[Dd]ebug?
+[!a-c]x
+*.py[cod]
+\\#hash
+\\!bang
+trailing\\ 
+README   
+dir_only/
+**/cache/
+x[[:digit:]]y
+*~
+abc**
+**foo
+q/**bar
+unterminated[
+"""
+
+SUB_IGNORE = """!*.log
+/local
+*.tmp
+"""
+
+INNER_IGNORE = """*.log
+!keep.tmp
+"""
+
+EXCLUDE = """secret*
+!secret.ok
+"""
+
+DIRS = ['', 'sub/', 'sub/inner/', 'doc/', 'logs/', 'a/x/', 'other/logs/', 'build/', 'foo/', 'dir_only/', 'sub/cache/',
+        'q/', 'sub/local/']
+NAMES = ['x.log', 'important.log', 'build', 'a.txt', 'debug.log', 'Debug1', 'dx', 'ax', 'm.pyc', '#hash', '!bang',
+         'trailing ', 'dir_only', 'cache', 'local', 'x.tmp', 'keep.tmp', 'secret.txt', 'secret.ok', 'x5y', 'file~',
+         'abcdef', 'barfoo', 'zbar', 'b', 'README', 'unterminated[']
+
+
+@pytest.fixture()
+def mock_ignore_repo(monkeypatch):
+    """A repository with nested .gitignore files and info/exclude, isolated from the user's global git config"""
+    root_dir = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex)
+    os.makedirs(root_dir)
+    config_home = os.path.join(root_dir, '.config-home')
+    os.makedirs(os.path.join(config_home, 'git'))
+    monkeypatch.setenv('XDG_CONFIG_HOME', config_home)
+    monkeypatch.setenv('GIT_CONFIG_GLOBAL', os.devnull)
+
+    subprocess.run(['git', 'init', '-q'], cwd=root_dir, check=True)
+    for directory in ['sub/inner', 'dir_only', 'cache', 'sub/cache', 'logs', 'build']:
+        os.makedirs(os.path.join(root_dir, directory), exist_ok=True)
+    for path, content in [('.gitignore', ROOT_IGNORE), ('sub/.gitignore', SUB_IGNORE),
+                          ('sub/inner/.gitignore', INNER_IGNORE), ('.git/info/exclude', EXCLUDE)]:
+        with open(os.path.join(root_dir, path), 'wt') as f:
+            f.write(content)
+
+    yield root_dir
+    shutil.rmtree(root_dir)
+
+
+def helper_check_ignore(root_dir: str, paths):
+    result = subprocess.run(['git', 'check-ignore', '--no-index', '--stdin', '-z'], cwd=root_dir, check=False,
+                            input='\0'.join(paths).encode(), stdout=subprocess.PIPE)
+    return [p for p in result.stdout.decode().split('\0') if p]
+
+
+class TestGitIgnoreMatcher(object):
+    def test_translate_pattern(self):
+        assert translate_pattern('*.txt') == '[^/]*\\.txt'
+        assert translate_pattern('**/logs') == '(?:.*/)?logs'
+        assert translate_pattern('logs/**') == 'logs/.*'
+        assert translate_pattern('a[') is None
+        assert translate_pattern('a\\') is None
+
+    def test_conformance_with_git(self, mock_ignore_repo):
+        paths = [f"{d}{n}" for d in DIRS for n in NAMES]
+        expected = helper_check_ignore(mock_ignore_repo, paths)
+        # Sanity check the fixture exercises both outcomes
+        assert 0 < len(expected) < len(paths)
+
+        matcher = GitIgnoreMatcher(mock_ignore_repo)
+        assert matcher.filter_ignored(paths) == expected
+
+    def test_conformance_directories(self, mock_ignore_repo):
+        paths = ['cache', 'cache/', 'sub/cache', 'dir_only', 'dir_only/', 'not_a_dir/', 'logs', 'logs/', 'sub/inner/']
+        expected = helper_check_ignore(mock_ignore_repo, paths)
+        assert GitIgnoreMatcher(mock_ignore_repo).filter_ignored(paths) == expected
+
+    def test_check_parents(self, mock_ignore_repo):
+        matcher = GitIgnoreMatcher(mock_ignore_repo)
+        assert matcher.is_ignored('build/notes.md') is True
+        # Only the path's own name and location are matched
+        assert matcher.is_ignored('build/notes.md', check_parents=False) is False
+        assert matcher.is_ignored('build/x.log', check_parents=False) is True
+
+    def test_ignore_file_changes(self, mock_ignore_repo):
+        matcher = GitIgnoreMatcher.for_repository(mock_ignore_repo)
+        assert GitIgnoreMatcher.for_repository(mock_ignore_repo) is matcher
+        assert matcher.is_ignored('sub/inner/data.csv') is False
+
+        time.sleep(0.01)
+        with open(os.path.join(mock_ignore_repo, 'sub', 'inner', '.gitignore'), 'at') as f:
+            f.write('*.csv\n')
+        assert matcher.is_ignored('sub/inner/data.csv') is True
+
+        os.remove(os.path.join(mock_ignore_repo, 'sub', 'inner', '.gitignore'))
+        assert matcher.is_ignored('sub/inner/data.csv') is False
+        assert matcher.is_ignored('sub/inner/x.log') is False
+
+        with open(os.path.join(mock_ignore_repo, 'sub', '.gitignore'), 'wt') as f:
+            f.write('inner/\n')
+        assert matcher.is_ignored('sub/inner/data.csv') is True
+        assert helper_check_ignore(mock_ignore_repo, ['sub/inner/data.csv']) == ['sub/inner/data.csv']
+
+    def test_batch_is_fast(self, mock_ignore_repo):
+        paths = [f"input/batch/dir{i % 50}/file{i}.{'log' if i % 7 == 0 else 'csv'}" for i in range(5000)]
+        start = time.time()
+        ignored = GitIgnoreMatcher(mock_ignore_repo).filter_ignored(paths)
+        assert time.time() - start < 5
+        assert ignored == helper_check_ignore(mock_ignore_repo, paths)
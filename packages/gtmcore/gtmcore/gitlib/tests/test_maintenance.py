@@ -0,0 +1,152 @@
+import os
+import time
+
+import pytest
+
+from gtmcore.configuration.utils import call_subprocess
+from gtmcore.dispatcher import jobs
+from gtmcore.gitlib.maintenance import RepositoryMaintenance
+from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.workflows.gitworkflows_utils import maintain_repository
+from gtmcore.fixtures import mock_config_file
+
+
+@pytest.fixture()
+def mock_maintained_lb(mock_config_file):
+    lb = InventoryManager().create_labbook('test', 'test', 'maintenance-test', description='maintenance')
+    maintenance = RepositoryMaintenance(lb.root_dir)
+    maintenance.clear()
+    yield lb, maintenance
+    maintenance.clear()
+
+
+def helper_commit_files(lb, prefix: str, count: int):
+    for i in range(count):
+        with open(os.path.join(lb.root_dir, 'code', f'{prefix}{i}.txt'), 'wt') as f:
+            f.write(f'{prefix} {i}')
+    call_subprocess(['git', 'add', '-A'], cwd=lb.root_dir)
+    call_subprocess(['git', 'commit', '-m', f'{prefix}'], cwd=lb.root_dir)
+
+
+def helper_pack_files(lb):
+    return set(f for f in os.listdir(os.path.join(lb.root_dir, '.git', 'objects', 'pack')) if f.endswith('.pack'))
+
+
+class TestRepositoryMaintenance(object):
+    def test_get_stats(self, mock_maintained_lb):
+        lb, maintenance = mock_maintained_lb
+        helper_commit_files(lb, 'loose', 5)
+
+        stats = maintenance.get_stats()
+        # At least the 5 blobs, plus trees and commits
+        assert stats.loose_objects > 5
+        assert stats.packs == 0
+        assert stats.has_commit_graph is False
+        assert stats.has_multi_pack_index is False
+
+    def test_due_tasks_thresholds(self, mock_maintained_lb):
+        lb, maintenance = mock_maintained_lb
+        stats = maintenance.get_stats()._replace(loose_objects=500, packs=20, has_commit_graph=True)
+
+        # Nothing has run yet, so the time based tasks are due
+        assert maintenance.due_tasks(stats) == ['loose-objects', 'incremental-repack', 'commit-graph', 'prune']
+        # The foreground thresholds are much higher
+        assert maintenance.due_tasks(stats, idle=False) == []
+        assert maintenance.due_tasks(stats._replace(loose_objects=10000, packs=100), idle=False) == \
+            ['loose-objects', 'incremental-repack']
+
+        maintenance.enabled = False
+        assert maintenance.due_tasks(stats) == []
+
+    def test_loose_objects_and_commit_graph(self, mock_maintained_lb):
+        lb, maintenance = mock_maintained_lb
+        maintenance.loose_object_threshold = 10
+        helper_commit_files(lb, 'loose', 20)
+        commit_hash = lb.git.commit_hash
+
+        completed = maintenance.maintain()
+        assert completed == ['loose-objects', 'commit-graph', 'prune']
+
+        stats = maintenance.get_stats()
+        assert stats.loose_objects == 0
+        assert stats.packs >= 1
+        assert stats.has_commit_graph is True
+        assert maintenance.last_stats() == stats
+        assert set(maintenance.last_run().keys()) == set(completed)
+
+        # Content is unchanged
+        assert lb.git.commit_hash == commit_hash
+        call_subprocess(['git', 'fsck', '--no-progress'], cwd=lb.root_dir)
+
+        # Nothing is due again until more objects are written or the intervals pass
+        assert maintenance.maintain() == []
+
+    def test_incremental_repack(self, mock_maintained_lb):
+        lb, maintenance = mock_maintained_lb
+        maintenance.pack_threshold = 3
+        for i in range(6):
+            helper_commit_files(lb, f'pack{i}-', 3)
+            call_subprocess(['git', 'repack', '-d', '-q'], cwd=lb.root_dir)
+        original_packs = helper_pack_files(lb)
+        assert len(original_packs) == 6
+
+        assert 'incremental-repack' in maintenance.maintain()
+        assert maintenance.get_stats().has_multi_pack_index is True
+        repacked = helper_pack_files(lb)
+        assert len(repacked - original_packs) == 1
+        assert original_packs < repacked
+
+        # Combined packs are only deleted by the next run, so readers of the old packs are not interrupted
+        maintenance.run(['incremental-repack'])
+        assert len(helper_pack_files(lb)) < len(repacked)
+        assert repacked - original_packs <= helper_pack_files(lb)
+        call_subprocess(['git', 'fsck', '--no-progress'], cwd=lb.root_dir)
+
+    def test_claim(self, mock_maintained_lb):
+        lb, maintenance = mock_maintained_lb
+        assert maintenance.claim() is True
+        assert RepositoryMaintenance(lb.root_dir).claim() is False
+
+        maintenance.release()
+        assert maintenance.claim() is True
+
+    def test_foreground_maintenance(self, mock_maintained_lb):
+        lb, maintenance = mock_maintained_lb
+        helper_commit_files(lb, 'loose', 20)
+        messages = list()
+
+        # Below the foreground thresholds, nothing runs
+        assert maintain_repository(lb, feedback_callback=messages.append) == []
+        assert messages == []
+
+        lb.client_config.config['git_maintenance']['foreground_loose_object_threshold'] = 10
+        assert maintain_repository(lb, feedback_callback=messages.append) == ['loose-objects']
+        assert messages == ['Optimizing repository (loose-objects)']
+        assert maintenance.get_stats().loose_objects == 0
+
+    def test_commit_graph_interval(self, mock_maintained_lb):
+        lb, maintenance = mock_maintained_lb
+        helper_commit_files(lb, 'loose', 2)
+        maintenance.run(['commit-graph'])
+        stats = maintenance.get_stats()
+        assert 'commit-graph' not in maintenance.due_tasks(stats)
+
+        maintenance.commit_graph_interval = 1
+        time.sleep(1.1)
+        assert 'commit-graph' in maintenance.due_tasks(stats)
+
+    def test_background_job(self, mock_maintained_lb):
+        lb, maintenance = mock_maintained_lb
+        lb.client_config.config['git_maintenance']['loose_object_threshold'] = 10
+        helper_commit_files(lb, 'loose', 20)
+
+        # Skipped while a user operation holds the lock
+        assert maintenance.claim() is True
+        with lb.lock():
+            assert jobs.run_repository_maintenance(lb) == []
+        assert maintenance.get_stats().loose_objects > 10
+        assert maintenance.claim() is True
+
+        assert jobs.run_repository_maintenance(lb) == ['loose-objects', 'commit-graph', 'prune']
+        assert maintenance.get_stats().loose_objects == 0
+        assert maintenance.claim() is True
@@ -0,0 +1,202 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+import git.cmd
+import pytest
+
+from gtmcore.configuration.utils import call_subprocess
+from gtmcore.gitlib import get_git_interface
+from gtmcore.gitlib.object_pool import GitObjectPool
+
+
+@pytest.fixture()
+def mock_history_repo():
+    """A repository with 10 commits on master and a branch `feature` forked from the 6th commit with 3 more commits"""
+    root_dir = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex)
+    os.makedirs(root_dir)
+
+    def commit(i: int, filename: str = 'file.txt') -> None:
+        with open(os.path.join(root_dir, filename), 'wt') as f:
+            f.write(f'revision {i}\n')
+        call_subprocess(['git', 'add', '-A'], cwd=root_dir)
+        call_subprocess(['git', '-c', 'user.name=Jane Doe', '-c', 'user.email=jane@test.com', 'commit', '-q', '-m',
+                         f'commit {i}\n\nDetails of {i}'], cwd=root_dir)
+
+    call_subprocess(['git', 'init', '-q', '-b', 'master'], cwd=root_dir)
+    for i in range(10):
+        commit(i)
+        if i == 5:
+            call_subprocess(['git', 'branch', 'feature'], cwd=root_dir)
+    call_subprocess(['git', 'checkout', '-q', 'feature'], cwd=root_dir)
+    for i in range(3):
+        commit(i, 'feature.txt')
+    call_subprocess(['git', 'checkout', '-q', 'master'], cwd=root_dir)
+
+    yield root_dir
+    GitObjectPool.release(root_dir)
+    shutil.rmtree(root_dir)
+
+
+class GitForkCounter(object):
+    """Counts the git processes started (by GitPython or subprocess) while active"""
+    def __init__(self, monkeypatch) -> None:
+        self.commands: List[List[str]] = list()
+        counter = self
+
+        class CountingPopen(subprocess.Popen):
+            def __init__(self, args, *popen_args, **kwargs):
+                if isinstance(args, (list, tuple)) and args and os.path.basename(str(args[0])) == 'git':
+                    counter.commands.append(list(args))
+                super().__init__(args, *popen_args, **kwargs)
+
+        monkeypatch.setattr(subprocess, 'Popen', CountingPopen)
+        monkeypatch.setattr(git.cmd, 'Popen', CountingPopen)
+
+    @property
+    def count(self) -> int:
+        return len(self.commands)
+
+
+def helper_git(root_dir: str, *args: str) -> str:
+    return call_subprocess(['git', *args], cwd=root_dir).strip()
+
+
+class TestGitObjectPool(object):
+    def test_resolve(self, mock_history_repo):
+        pool = GitObjectPool(mock_history_repo)
+        try:
+            head = helper_git(mock_history_repo, 'rev-parse', 'HEAD')
+            assert pool.resolve('HEAD') == head
+            assert pool.resolve('master') == head
+            assert pool.resolve(head[:8]) == head
+            assert pool.resolve('HEAD~1') == helper_git(mock_history_repo, 'rev-parse', 'HEAD~1')
+            assert pool.resolve('feature') == helper_git(mock_history_repo, 'rev-parse', 'feature')
+            assert pool.resolve('does-not-exist') is None
+            assert pool.resolve('HEAD:file.txt') is None
+            assert pool.resolve('bad\nname') is None
+            assert pool.object_type('HEAD:file.txt') == 'blob'
+
+            # Refs are read fresh on every lookup
+            call_subprocess(['git', '-c', 'user.name=a', '-c', 'user.email=a@b.c', 'commit', '-q', '--allow-empty',
+                             '-m', 'new'], cwd=mock_history_repo)
+            assert pool.resolve('HEAD~1') == head
+        finally:
+            pool.close()
+
+    def test_log_entry_matches_gitpython(self, mock_history_repo):
+        git_fs = get_git_interface({'backend': 'filesystem-shim', 'working_directory': mock_history_repo})
+        for commit in git_fs.repo.iter_commits('feature'):
+            entry = git_fs.log_entry(commit.hexsha)
+            assert entry == {"commit": commit.hexsha,
+                             "author": {"name": commit.author.name, "email": commit.author.email},
+                             "committer": {"name": commit.committer.name, "email": commit.committer.email},
+                             "committed_on": commit.committed_datetime,
+                             "message": commit.message}
+            assert entry['committed_on'].utcoffset() == commit.committed_datetime.utcoffset()
+
+        with pytest.raises(ValueError):
+            git_fs.log_entry('0' * 40)
+
+    def test_log(self, mock_history_repo):
+        git_fs = get_git_interface({'backend': 'filesystem-shim', 'working_directory': mock_history_repo})
+        assert [e['commit'] for e in git_fs.log()] == helper_git(mock_history_repo, 'rev-list', 'master').split()
+        assert [e['commit'] for e in git_fs.log(path_info='master..feature')] == \
+            helper_git(mock_history_repo, 'rev-list', 'master..feature').split()
+        assert [e['commit'] for e in git_fs.log(path_info='feature', filename='feature.txt', max_count=2, skip=1)] == \
+            helper_git(mock_history_repo, 'rev-list', '--max-count=2', '--skip=1', 'feature', '--',
+                       'feature.txt').split()
+        assert len(git_fs.log(author='Nobody')) == 0
+
+    def test_ancestry_and_counts(self, mock_history_repo):
+        git_fs = get_git_interface({'backend': 'filesystem-shim', 'working_directory': mock_history_repo})
+        assert git_fs.is_ancestor('HEAD~3', 'HEAD') is True
+        assert git_fs.is_ancestor('HEAD', 'HEAD~3') is False
+        assert git_fs.is_ancestor('feature', 'master') is False
+        assert git_fs.is_ancestor('feature~3', 'master') is True
+        assert git_fs.is_ancestor('not-a-commit', 'HEAD') is False
+
+        assert git_fs.count_ahead_behind('master', 'feature') == (4, 3)
+        assert git_fs.count_ahead_behind('feature', 'master') == (3, 4)
+        assert git_fs.count_ahead_behind('master', 'master') == (0, 0)
+        with pytest.raises(ValueError):
+            git_fs.count_ahead_behind('master', 'origin/master')
+
+        # Moving a ref is picked up, as results are cached by commit hash
+        call_subprocess(['git', 'merge', '-q', '--no-edit', 'feature'], cwd=mock_history_repo)
+        assert git_fs.count_ahead_behind('master', 'feature') == (5, 0)
+        assert git_fs.is_ancestor('feature', 'master') is True
+
+    def test_concurrent_use(self, mock_history_repo):
+        pool = GitObjectPool(mock_history_repo, size=2)
+        commits = helper_git(mock_history_repo, 'rev-list', '--all').split()
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                results = list(executor.map(lambda c: pool.read_commit(f"{c}^{{commit}}")['commit'], commits * 20))
+            assert results == commits * 20
+            assert pool._running[True] <= 2
+        finally:
+            pool.close()
+
+    def test_recovers_from_dead_process(self, mock_history_repo):
+        pool = GitObjectPool(mock_history_repo)
+        try:
+            assert pool.resolve('HEAD') is not None
+            process = pool._idle[False][0]
+            process._process.kill()
+            process._process.wait()
+            assert pool.resolve('HEAD') == helper_git(mock_history_repo, 'rev-parse', 'HEAD')
+        finally:
+            pool.close()
+
+    def test_registry(self, mock_history_repo):
+        pool = GitObjectPool.for_repository(mock_history_repo)
+        assert GitObjectPool.for_repository(mock_history_repo) is pool
+        pool.resolve('HEAD')
+
+        # A repository re-created at the same path gets a new pool
+        os.rename(os.path.join(mock_history_repo, '.git'), os.path.join(mock_history_repo, '.git-old'))
+        call_subprocess(['git', 'init', '-q', '-b', 'master'], cwd=mock_history_repo)
+        new_pool = GitObjectPool.for_repository(mock_history_repo)
+        assert new_pool is not pool
+        assert new_pool.resolve('HEAD') is None
+        assert pool._closed is True
+
+    def test_fork_count_benchmark(self, mock_history_repo, monkeypatch):
+        """Count the git processes forked by the reads a typical GraphQL request makes: comparing a branch with its
+        upstream, checking if commits are in the current branch, and loading a page of log entries"""
+        GitObjectPool.release(mock_history_repo)
+        git_fs = get_git_interface({'backend': 'filesystem-shim', 'working_directory': mock_history_repo})
+        push_revisions = helper_git(mock_history_repo, 'rev-list', 'feature').split()
+
+        def request() -> None:
+            assert git_fs.count_ahead_behind('master', 'feature')[1] == 3
+            for revision in push_revisions:
+                git_fs.is_ancestor(revision, 'HEAD~1')
+            assert len(git_fs.log(max_count=5)) == 5
+            for entry in git_fs.log(path_info='feature'):
+                git_fs.log_entry(entry['commit'])
+
+        forks = GitForkCounter(monkeypatch)
+        request()
+        first_request = forks.count
+        # 2 cat-file processes, 1 rev-list per log page and ahead/behind count, and 1 merge-base per ancestry check
+        assert first_request == 2 + 3 + len(push_revisions)
+        assert len([c for c in forks.commands if c[1] == 'merge-base']) == len(push_revisions)
+        assert len([c for c in forks.commands if c[1] == 'cat-file']) == 2
+
+        request()
+        request()
+        # With no ref changes, repeated requests are served from the cache and the running cat-file processes
+        assert forks.count == first_request
+
+        # A new commit only re-runs the queries that start from the moved ref, the `feature` log is still cached
+        call_subprocess(['git', '-c', 'user.name=a', '-c', 'user.email=a@b.c', 'commit', '-q', '--allow-empty',
+                         '-m', 'new'], cwd=mock_history_repo)
+        before = forks.count
+        request()
+        assert forks.count - before == 2 + len(push_revisions)
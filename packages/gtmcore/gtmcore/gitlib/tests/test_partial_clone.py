@@ -0,0 +1,166 @@
+import os
+import shutil
+import tempfile
+import uuid
+
+import pytest
+
+from gtmcore.activity import ActivityStore, ActivityRecord, ActivityType
+from gtmcore.configuration import Configuration
+from gtmcore.configuration.utils import call_subprocess
+from gtmcore.gitlib.partial_clone import clone_arguments, deepen_history, deepen_to_merge_base, is_shallow
+from gtmcore.inventory.branching import BranchManager
+from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.workflows.gitworkflows_utils import _clone, clone_repo
+from gtmcore.fixtures import mock_config_file
+
+
+@pytest.fixture()
+def mock_remote_repo():
+    """A bare repository with 20 commits on master, served over `file://`. Branch `feature` forks from the 10th
+    commit."""
+    root = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex)
+    source = os.path.join(root, 'source')
+    bare = os.path.join(root, 'remote.git')
+    os.makedirs(source)
+
+    call_subprocess(['git', 'init', '-q', '-b', 'master'], cwd=source)
+    for i in range(20):
+        with open(os.path.join(source, 'notebook.ipynb'), 'wt') as f:
+            f.write(f'revision {i}\n' * 100)
+        call_subprocess(['git', 'add', '-A'], cwd=source)
+        call_subprocess(['git', '-c', 'user.name=test', '-c', 'user.email=test@test.com', 'commit', '-q', '-m',
+                         f'commit {i}'], cwd=source)
+        if i == 9:
+            call_subprocess(['git', 'branch', 'feature'], cwd=source)
+
+    call_subprocess(['git', 'clone', '-q', '--bare', source, bare], cwd=root)
+    # Allow filtered fetches, as the Hub does
+    call_subprocess(['git', 'config', 'uploadpack.allowFilter', 'true'], cwd=bare)
+    call_subprocess(['git', 'config', 'uploadpack.allowAnySHA1InWant', 'true'], cwd=bare)
+
+    yield f"file://{bare}", root
+    shutil.rmtree(root)
+
+
+def helper_clone(remote_url: str, clone_mode: str) -> str:
+    working_dir = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex)
+    os.makedirs(working_dir)
+    return _clone(remote_url, working_dir, clone_mode=clone_mode)
+
+
+def helper_commit_count(root_dir: str, rev: str = 'HEAD') -> int:
+    return int(call_subprocess(['git', 'rev-list', '--count', rev], cwd=root_dir).strip())
+
+
+def helper_set_git_config(**values):
+    config = Configuration()
+    config.config['git'].update(values)
+    config.clear_cached_configuration()
+    config.save_to_cache(config.config)
+
+
+class TestPartialClone(object):
+    def test_clone_arguments(self):
+        assert clone_arguments('full') == []
+        assert clone_arguments('blobless') == ['--filter=blob:none']
+        assert clone_arguments('shallow', depth=5) == ['--filter=blob:none', '--depth=5', '--no-single-branch']
+
+        with pytest.raises(ValueError):
+            clone_arguments('shallow')
+        with pytest.raises(ValueError):
+            clone_arguments('sparse')
+
+    def test_blobless_clone(self, mock_config_file, mock_remote_repo):
+        remote_url, _ = mock_remote_repo
+        path = helper_clone(remote_url, 'blobless')
+
+        assert call_subprocess(['git', 'config', 'remote.origin.promisor'], cwd=path).strip() == 'true'
+        assert is_shallow(path) is False
+        assert helper_commit_count(path) == 20
+
+        # Only the checked out version of the file was fetched
+        missing = call_subprocess(['git', 'rev-list', '--objects', '--missing=print', 'HEAD'], cwd=path)
+        assert len([line for line in missing.splitlines() if line.startswith('?')]) == 19
+
+        # Old versions are fetched on demand
+        assert call_subprocess(['git', 'show', 'HEAD~10:notebook.ipynb'], cwd=path).startswith('revision 9\n')
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_full_clone(self, mock_config_file, mock_remote_repo):
+        remote_url, _ = mock_remote_repo
+        path = helper_clone(remote_url, 'full')
+
+        missing = call_subprocess(['git', 'rev-list', '--objects', '--missing=print', 'HEAD'], cwd=path)
+        assert not [line for line in missing.splitlines() if line.startswith('?')]
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_shallow_clone_deepen(self, mock_config_file, mock_remote_repo):
+        remote_url, _ = mock_remote_repo
+        helper_set_git_config(clone_depth=3)
+        path = helper_clone(remote_url, 'shallow')
+
+        assert is_shallow(path) is True
+        assert helper_commit_count(path) == 3
+        # All branches are cloned
+        assert 'origin/feature' in call_subprocess(['git', 'branch', '-r'], cwd=path)
+
+        assert deepen_history(path, commits=5) is True
+        assert helper_commit_count(path) == 8
+
+        assert deepen_history(path) is True
+        assert is_shallow(path) is False
+        assert helper_commit_count(path) == 20
+        assert deepen_history(path) is False
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_deepen_to_merge_base(self, mock_config_file, mock_remote_repo):
+        remote_url, _ = mock_remote_repo
+        helper_set_git_config(clone_depth=2)
+        path = helper_clone(remote_url, 'shallow')
+
+        with pytest.raises(Exception):
+            call_subprocess(['git', 'merge-base', 'master', 'origin/feature'], cwd=path)
+
+        deepen_to_merge_base(path, 'master', 'origin/feature', increment=5)
+        merge_base = call_subprocess(['git', 'merge-base', 'master', 'origin/feature'], cwd=path).strip()
+        assert merge_base == call_subprocess(['git', 'rev-parse', 'origin/feature'], cwd=path).strip()
+        # Only as much history as needed was fetched
+        assert is_shallow(path) is True
+        assert helper_commit_count(path) < 20
+        shutil.rmtree(os.path.dirname(path))
+
+    def test_shallow_project_history_on_demand(self, mock_config_file):
+        im = InventoryManager()
+        lb = im.create_labbook('test', 'test', 'shallow-history', description='shallow')
+        store = ActivityStore(lb)
+        for i in range(10):
+            with open(os.path.join(lb.root_dir, 'code', f'file{i}.txt'), 'wt') as f:
+                f.write(f'{i}')
+            lb.git.add_all()
+            commit = lb.git.commit(f"change {i}")
+            store.create_activity_record(ActivityRecord(ActivityType.CODE, show=True, message=f"change {i}",
+                                                        importance=50, linked_commit=commit.hexsha))
+
+        bare = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex, 'remote.git')
+        call_subprocess(['git', 'clone', '-q', '--bare', lb.root_dir, bare], cwd=lb.root_dir)
+        call_subprocess(['git', 'config', 'uploadpack.allowFilter', 'true'], cwd=bare)
+        call_subprocess(['git', 'config', 'uploadpack.allowAnySHA1InWant', 'true'], cwd=bare)
+
+        helper_set_git_config(clone_depth=4, deepen_increment=4)
+        clone = clone_repo(f"file://{bare}", username='test', owner='other',
+                           load_repository=im.load_labbook_from_directory, put_repository=im.put_labbook,
+                           clone_mode='shallow')
+        assert is_shallow(clone.root_dir) is True
+        assert helper_commit_count(clone.root_dir) == 4
+
+        # Paging the activity feed past the fetched history deepens the clone
+        records = ActivityStore(clone).get_activity_records(first=8)
+        assert [r.message for r in records] == [f"change {i}" for i in range(9, 1, -1)]
+        assert is_shallow(clone.root_dir) is True
+
+        # Counting commits to compare with the remote deepens the clone to the merge base
+        call_subprocess(['git', 'reset', '-q', '--hard', 'HEAD~6'], cwd=clone.root_dir)
+        assert BranchManager(clone).get_commits_behind() == 3
+
+        shutil.rmtree(os.path.dirname(bare))
@@ -5,13 +5,12 @@ import shutil
 import os
 from string import Template
 
-import yaml
-from gtmcore.environment.componentmanager import ComponentManager
+from gtmcore.environment.snapshot import EnvironmentSnapshot, get_environment_snapshot
 from typing import (Any, Dict, List)
 
 from gtmcore.labbook import LabBook
 from gtmcore.logging import LMLogger
-from gtmcore.environment.utils import get_package_manager
+from gtmcore.imagebuilder.layers import LayerPlanner
 from gtmcore.mitmproxy.mitmproxy import CURRENT_MITMPROXY_TAG
 from gtmcore.environment.bundledapp import BundledAppManager
 
@@ -33,16 +32,9 @@ class ImageBuilder(object):
             raise IOError("Labbook directory {} does not exist.".format(self.labbook.root_dir))
         self._validate_labbook_tree()
 
-    def _get_yaml_files(self, directory: str) -> List[str]:
-        """Method to get all YAML files in a directory
-
-        Args:
-            directory(str): Directory to search
-
-        Returns:
-            list
-        """
-        return [x for x in glob.glob("{}{}*.yaml".format(directory, os.path.sep))]
+    def _environment_snapshot(self) -> EnvironmentSnapshot:
+        """Get the parsed environment files, shared with other readers of this environment"""
+        return get_environment_snapshot(os.path.join(self.labbook.root_dir, '.gigantum', 'env'))
 
     def _validate_labbook_tree(self) -> None:
         """Throw exception if labbook directory structure not in expected format. """
@@ -59,8 +51,7 @@ class ImageBuilder(object):
     def _extra_base_images(self) -> List[str]:
         """Add other needed images via multi-stage build"""
         docker_lines = []
-        cm = ComponentManager(self.labbook)
-        if 'rstudio' in cm.base_fields['development_tools']:
+        if 'rstudio' in self._import_baseimage_fields()['development_tools']:
                 docker_lines.append("FROM gigantum/mitmproxy_proxy:" + CURRENT_MITMPROXY_TAG)
 
         return docker_lines
@@ -68,17 +59,15 @@ class ImageBuilder(object):
     def _import_baseimage_fields(self) -> Dict[str, Any]:
         """Load fields from base_image yaml file into a convenient dict. """
         root_dir = os.path.join(self.labbook.root_dir, '.gigantum', 'env', 'base')
-        base_images = self._get_yaml_files(root_dir)
+        snapshot = self._environment_snapshot()
+        base_images = snapshot.file_names('base')
 
         logger.debug("Searching {} for base image file".format(root_dir))
         if len(base_images) != 1:
             raise ValueError(f"There should only be one base image in {root_dir}, found {len(base_images)}")
 
         logger.info("Using {} as base image file for labbook at {}.".format(base_images[0], self.labbook.root_dir))
-        with open(base_images[0]) as base_image_file:
-            fields = yaml.safe_load(base_image_file)
-
-        return fields
+        return snapshot.file_data('base')[0]
 
     def _load_baseimage(self) -> List[str]:
         """Search expected directory structure to find the base image. Only one should exist. """
@@ -162,29 +151,11 @@ class ImageBuilder(object):
         return docker_lines
 
     def _load_packages(self) -> List[str]:
-        """Load packages from yaml files in expected location in directory tree. """
-        root_dir = os.path.join(self.labbook.root_dir, '.gigantum', 'env', 'package_manager')
-        package_files = [os.path.join(root_dir, n) for n in os.listdir(root_dir) if 'yaml' in n]
-        docker_lines = ['## Adding individual packages']
-        apt_updated = False
-
-        for package in sorted(package_files):
-            pkg_fields: Dict[str, Any] = {}
-
-            with open(package) as package_content:
-                pkg_fields.update(yaml.safe_load(package_content))
-
-            # Generate the appropriate docker command for the given package info
-            pkg_info = {"name": str(pkg_fields['package']),
-                        "version": str(pkg_fields.get('version'))}
-            if not pkg_fields.get('from_base'):
-                if pkg_fields['manager'] == 'apt' and not apt_updated:
-                    docker_lines.append('RUN apt-get -y update')
-                    apt_updated = True
-
-                docker_lines.extend(
-                    get_package_manager(pkg_fields['manager']).generate_docker_install_snippet([pkg_info]))
-
+        """Load packages from yaml files in expected location in directory tree, grouped into layers that can
+        mostly be reused from the build cache when packages are edited. """
+        package_fields: List[Dict[str, Any]] = self._environment_snapshot().file_data('package_manager')
+        docker_lines = ['## Adding packages']
+        docker_lines.extend(LayerPlanner.render(LayerPlanner().plan_packages(package_fields)))
         return docker_lines
 
     def _load_docker_snippets(self) -> List[str]:
@@ -194,8 +165,7 @@ class ImageBuilder(object):
             logger.warning(f"No `docker` subdirectory for environment in labbook")
             return []
 
-        for snippet_file in [f for f in os.listdir(root_dir) if '.yaml' in f]:
-            docker_data = yaml.safe_load(open(os.path.join(root_dir, snippet_file)))
+        for docker_data in self._environment_snapshot().file_data('docker'):
             docker_lines.append(f'# Custom Docker: {docker_data["name"]} - {len(docker_data["content"])}'
                                 f'line(s) - (Created {docker_data["timestamp_utc"]})')
             docker_lines.extend(docker_data['content'])
@@ -246,13 +216,15 @@ class ImageBuilder(object):
         Returns:
             str - Content of Dockerfile in single string using os.linesep as line separator.
         """
+        # Steps are ordered from least to most frequently changed, since a change invalidates the build cache for
+        # every layer that follows it
         assembly_pipeline = [self._extra_base_images,
                              self._load_baseimage,
                              self._install_user_defined_ca,
-                             self._load_packages,
-                             self._load_docker_snippets,
                              self._enable_iframes,
                              self._post_image_hook,
+                             self._load_packages,
+                             self._load_docker_snippets,
                              self._load_bundled_apps,
                              self._entrypoint_hooks]
 
@@ -0,0 +1,166 @@
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple
+
+from gtmcore.environment.utils import get_package_manager
+
+
+# A namedtuple for a planned group of Dockerfile instructions. `digest` is a hash of the instructions, so a layer with
+# the same digest as in a previous build can be served from the Docker build cache if all layers before it can be too.
+Layer = NamedTuple('Layer', [('name', str), ('lines', List[str]), ('digest', str)])
+
+
+class LayerPlanner(object):
+    """Class to plan the package install layers of a Project's Dockerfile
+
+    Docker reuses a cached layer only if the instruction and every instruction before it are unchanged, so packages
+    are grouped by manager and the managers are ordered from least to most frequently edited (apt, then conda, then
+    pip). Within a manager, packages are sorted by name and split into layers at boundaries chosen by a hash of the
+    package name. A boundary doesn't depend on the other packages, so adding, removing or changing the version of a
+    package only changes the layer it falls in, and all layers before it are reused. On average a layer holds
+    `TARGET_LAYER_SIZE` packages, and never more than `MAX_LAYER_SIZE`.
+    """
+    MANAGER_ORDER = ['apt', 'conda', 'pip']
+
+    TARGET_LAYER_SIZE = 8
+    MAX_LAYER_SIZE = 32
+
+    @staticmethod
+    def _manager_type(manager: str) -> str:
+        """Method to map the manager name stored in a package file to its position in the layer order"""
+        if manager in ['apt', 'apt-get']:
+            return 'apt'
+        elif manager.startswith('conda'):
+            return 'conda'
+        elif manager.startswith('pip'):
+            return 'pip'
+        else:
+            raise ValueError(f"Unsupported package manager `{manager}`")
+
+    @staticmethod
+    def _digest(lines: List[str]) -> str:
+        return hashlib.sha256('\n'.join(lines).encode()).hexdigest()[:12]
+
+    def _is_boundary(self, package_name: str) -> bool:
+        """Method to check if a layer should end after a package"""
+        name_hash = int(hashlib.sha256(package_name.encode()).hexdigest()[:8], 16)
+        return name_hash % self.TARGET_LAYER_SIZE == 0
+
+    def _split(self, packages: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        """Method to split a manager's packages into layers
+
+        Args:
+            packages: List of package dicts with `name` and `version` keys
+
+        Returns:
+            list of lists of package dicts
+        """
+        chunks: List[List[Dict[str, str]]] = [[]]
+        for pkg in sorted(packages, key=lambda p: (p['name'].lower(), p['name'])):
+            chunks[-1].append(pkg)
+            if self._is_boundary(pkg['name']) or len(chunks[-1]) >= self.MAX_LAYER_SIZE:
+                chunks.append([])
+
+        return [c for c in chunks if c]
+
+    def plan_packages(self, package_fields: List[Dict[str, Any]]) -> List[Layer]:
+        """Method to plan the layers that install a Project's packages
+
+        Args:
+            package_fields: List of the contents of the Project's package files
+
+        Returns:
+            list of Layer, in the order they should appear in the Dockerfile
+        """
+        # Group by the manager name as stored, since it selects the install command
+        by_manager: Dict[str, List[Dict[str, str]]] = OrderedDict()
+        for fields in package_fields:
+            if fields.get('from_base'):
+                continue
+            by_manager.setdefault(fields['manager'], list()).append({"name": str(fields['package']),
+                                                                     "version": str(fields.get('version'))})
+
+        managers = sorted(by_manager.keys(), key=lambda m: (self.MANAGER_ORDER.index(self._manager_type(m)), m))
+
+        layers: List[Layer] = list()
+        apt_updated = False
+        for manager in managers:
+            package_manager = get_package_manager(manager)
+            for index, chunk in enumerate(self._split(by_manager[manager])):
+                lines = list()
+                if self._manager_type(manager) == 'apt' and not apt_updated:
+                    lines.append('RUN apt-get -y update')
+                    apt_updated = True
+                lines.extend(package_manager.generate_docker_install_snippet(chunk, single_line=True))
+                layers.append(Layer(name=f"{manager}-{index}", lines=lines, digest=self._digest(lines)))
+
+        return layers
+
+    @staticmethod
+    def render(layers: List[Layer]) -> List[str]:
+        """Method to render planned layers as Dockerfile lines
+
+        Args:
+            layers: List of Layer
+
+        Returns:
+            list
+        """
+        docker_lines = list()
+        for layer in layers:
+            docker_lines.append(f"# Layer {layer.name} ({layer.digest})")
+            docker_lines.extend(layer.lines)
+        return docker_lines
+
+
+def dockerfile_instructions(dockerfile: str) -> List[str]:
+    """Function to get the instructions of a Dockerfile, without comments, blank lines or line continuations
+
+    Args:
+        dockerfile: Content of a Dockerfile
+
+    Returns:
+        list
+    """
+    instructions = list()
+    current = ''
+    for line in dockerfile.splitlines():
+        stripped = line.strip()
+        if not current and (not stripped or stripped.startswith('#')):
+            continue
+
+        if stripped.endswith('\\'):
+            current += stripped[:-1] + ' '
+        else:
+            instructions.append(' '.join((current + stripped).split()))
+            current = ''
+
+    if current:
+        instructions.append(' '.join(current.split()))
+
+    return instructions
+
+
+def count_invalidated_layers(previous_dockerfile: str, dockerfile: str) -> int:
+    """Function to count the instructions of a Dockerfile that can't be served from the build cache of a previous one
+
+    Docker reuses the cached result of an instruction only if it and all instructions before it are identical, so
+    everything after the first difference is rebuilt.
+
+    Args:
+        previous_dockerfile: Content of the Dockerfile that was last built
+        dockerfile: Content of the Dockerfile to build
+
+    Returns:
+        int
+    """
+    previous = dockerfile_instructions(previous_dockerfile)
+    current = dockerfile_instructions(dockerfile)
+
+    reused = 0
+    for previous_instruction, instruction in zip(previous, current):
+        if previous_instruction != instruction:
+            break
+        reused += 1
+
+    return len(current) - reused
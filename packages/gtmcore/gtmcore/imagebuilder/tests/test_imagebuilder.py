@@ -5,6 +5,7 @@ import git
 import shutil
 
 from gtmcore.imagebuilder import ImageBuilder
+from gtmcore.imagebuilder.layers import LayerPlanner
 from gtmcore.environment import ComponentManager, RepositoryManager
 from gtmcore.fixtures import mock_config_file, mock_config_with_repo, mock_labbook, \
     ENV_UNIT_TEST_BASE, ENV_UNIT_TEST_REPO, ENV_UNIT_TEST_REV, mock_enabled_iframes
@@ -147,13 +148,23 @@ class TestImageBuilder(object):
             dockerfile_text = ib.assemble_dockerfile(write=False)
             dockerfile.write(dockerfile_text)
 
-        test_lines = ['## Adding individual packages',
-                      'RUN apt-get -y --no-install-recommends install docker',
-                      'RUN pip install docker==2.0.1',
-                      'RUN pip install requests==2.18.4']
-
-        for line in test_lines:
-            assert line in dockerfile_text.split(os.linesep)
+        # Where the pip packages are split depends on a hash of their names, so compare against the planned layout
+        package_fields = list()
+        for filename in ['pip3_docker.yaml', 'apt_docker.yaml', 'pip3_requests.yaml']:
+            with open(os.path.join(package_manager_dir, filename), 'rt') as pf:
+                package_fields.append(yaml.safe_load(pf))
+        layers = LayerPlanner().plan_packages(package_fields)
+
+        assert layers[0].name == 'apt-0'
+        assert all(layer.name.startswith('pip3-') for layer in layers[1:])
+        assert layers[0].lines == ['RUN apt-get -y update', 'RUN apt-get -y --no-install-recommends install docker']
+        pip_lines = [line for layer in layers[1:] for line in layer.lines]
+        assert ' '.join(pip_lines).index('docker==2.0.1') < ' '.join(pip_lines).index('requests==2.18.4')
+
+        dockerfile_lines = dockerfile_text.split(os.linesep)
+        start = dockerfile_lines.index('## Adding packages') + 1
+        rendered = LayerPlanner.render(layers)
+        assert dockerfile_lines[start:start + len(rendered)] == rendered
 
     def test_docker_snippet(self, mock_labbook):
         lb = mock_labbook[2]
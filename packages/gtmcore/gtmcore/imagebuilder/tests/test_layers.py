@@ -0,0 +1,120 @@
+import os
+
+from gtmcore.environment import ComponentManager
+from gtmcore.environment.utils import get_package_manager
+from gtmcore.imagebuilder import ImageBuilder
+from gtmcore.imagebuilder.layers import LayerPlanner, count_invalidated_layers, dockerfile_instructions
+from gtmcore.fixtures import mock_labbook
+
+
+def pip_packages(count, prefix='pkg'):
+    return [{"manager": "pip", "package": f"{prefix}{i}", "version": "1.0"} for i in range(count)]
+
+
+def write_packages(lb, packages):
+    """Write package files directly, since adding them with the ComponentManager needs the base image index"""
+    for pkg in packages:
+        path = os.path.join(lb.root_dir, '.gigantum', 'env', 'package_manager', f"{pkg['manager']}_{pkg['package']}.yaml")
+        with open(path, 'wt') as pf:
+            pf.write(os.linesep.join([f"manager: {pkg['manager']}", f"package: {pkg['package']}",
+                                      f"version: '{pkg['version']}'", 'from_base: false']))
+
+
+def assemble(lb):
+    """The parts of the Dockerfile that depend on the Project environment, since the mock labbook has no base"""
+    ib = ImageBuilder(lb)
+    return '\n'.join(ib._load_packages() + ib._load_docker_snippets() + ib._load_bundled_apps())
+
+
+def assemble_per_package(lb):
+    """The previous layout, with one layer per package in file name order, to compare against"""
+    lines = list()
+    for pkg in ComponentManager(lb).get_component_list('package_manager'):
+        lines.extend(get_package_manager(pkg['manager']).generate_docker_install_snippet(
+            [{"name": str(pkg['package']), "version": str(pkg['version'])}]))
+    return '\n'.join(lines + ImageBuilder(lb)._load_docker_snippets())
+
+
+class TestLayerPlanner(object):
+    def test_grouped_and_ordered(self):
+        packages = [{"manager": "pip3", "package": "requests", "version": "2.18.4"},
+                    {"manager": "conda3", "package": "numpy", "version": "1.16"},
+                    {"manager": "apt", "package": "vim", "version": "1"},
+                    {"manager": "pip", "package": "gtmunit1", "version": "0.1", "from_base": True}]
+        lines = LayerPlanner.render(LayerPlanner().plan_packages(packages))
+        instructions = [l for l in lines if not l.startswith('#')]
+        assert instructions == ['RUN apt-get -y update',
+                                'RUN apt-get -y --no-install-recommends install vim',
+                                'RUN conda install -yq numpy=1.16',
+                                'RUN pip install requests==2.18.4']
+
+    def test_layer_count(self):
+        layers = LayerPlanner().plan_packages(pip_packages(60))
+        assert 1 < len(layers) < 20
+        assert all(len(l.lines) == 1 for l in layers)
+        assert sum(len(l.lines[0].split()) - 3 for l in layers) == 60
+
+        big_layers = LayerPlanner().plan_packages(pip_packages(200, prefix='a'))
+        assert max(len(l.lines[0].split()) - 3 for l in big_layers) <= LayerPlanner.MAX_LAYER_SIZE
+
+    def test_plan_is_stable(self):
+        packages = pip_packages(30)
+        layers = LayerPlanner().plan_packages(packages)
+        assert LayerPlanner().plan_packages(list(reversed(packages))) == layers
+
+        # Changing one version only changes the layer containing the package
+        packages[17]['version'] = '2.0'
+        changed = LayerPlanner().plan_packages(packages)
+        assert len(changed) == len(layers)
+        assert len([1 for a, b in zip(layers, changed) if a.digest != b.digest]) == 1
+
+    def test_dockerfile_instructions(self):
+        dockerfile = "# comment\nFROM ubuntu\n\nRUN apt-get update && \\\n    apt-get install -y vim\n  # indented\n" \
+                     "EXPOSE 8888"
+        assert dockerfile_instructions(dockerfile) == ['FROM ubuntu', 'RUN apt-get update && apt-get install -y vim',
+                                                       'EXPOSE 8888']
+        assert count_invalidated_layers(dockerfile, dockerfile.replace('# comment', '# Generated now')) == 0
+        assert count_invalidated_layers(dockerfile, dockerfile.replace('vim', 'emacs')) == 2
+        assert count_invalidated_layers('', dockerfile) == 3
+
+
+class TestLayerInvalidation(object):
+    def test_edit_sequence(self, mock_labbook):
+        """Count the layers rebuilt by typical edits to a Project with many packages"""
+        lb = mock_labbook[2]
+        write_packages(lb, [{"manager": "apt", "package": "vim", "version": "1"},
+                            {"manager": "conda3", "package": "numpy", "version": "1.16"}] + pip_packages(60))
+        package_dir = os.path.join(lb.root_dir, '.gigantum', 'env', 'package_manager')
+
+        layered = [assemble(lb)]
+        per_package = [assemble_per_package(lb)]
+        total_layers = len(dockerfile_instructions(layered[0]))
+        assert total_layers < len(dockerfile_instructions(per_package[0])) / 3
+
+        edits = [lambda: write_packages(lb, [{"manager": "pip", "package": "pkg30a", "version": "1.0"}]),
+                 lambda: write_packages(lb, [{"manager": "pip", "package": "pkg5", "version": "2.0"}]),
+                 lambda: os.remove(os.path.join(package_dir, 'pip_pkg42.yaml')),
+                 lambda: ComponentManager(lb).add_docker_snippet('snippet', ['RUN true'])]
+        for edit in edits:
+            edit()
+            layered.append(assemble(lb))
+            per_package.append(assemble_per_package(lb))
+
+        layered_rebuilds = [count_invalidated_layers(a, b) for a, b in zip(layered, layered[1:])]
+        per_package_rebuilds = [count_invalidated_layers(a, b) for a, b in zip(per_package, per_package[1:])]
+
+        # Package edits rebuild at most the pip layers, and never the apt and conda layers
+        assert all(0 < n < total_layers - 3 for n in layered_rebuilds[:3])
+        # Adding a docker snippet reuses every package layer
+        assert layered_rebuilds[3] == 1
+        assert sum(layered_rebuilds) < sum(per_package_rebuilds)
+
+    def test_docker_snippets_are_ordered(self, mock_labbook):
+        lb = mock_labbook[2]
+        cm = ComponentManager(lb)
+        cm.add_docker_snippet('zzz', ['RUN echo zzz'])
+        cm.add_docker_snippet('aaa', ['RUN echo aaa'])
+
+        instructions = dockerfile_instructions(assemble(lb))
+        assert instructions == sorted(instructions)
+        assert os.path.exists(os.path.join(lb.root_dir, '.gigantum', 'env', 'docker', 'zzz.yaml'))
@@ -7,7 +7,9 @@ from gtmcore.exceptions import GigantumException
 from gtmcore.logging import LMLogger
 from gtmcore.inventory import Repository
 from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.inventory.refs import RefSnapshot, get_ref_snapshot
 from gtmcore.configuration.utils import call_subprocess
+from gtmcore.gitlib.partial_clone import deepen_to_merge_base
 
 logger = LMLogger.get_logger()
 
@@ -71,18 +73,18 @@ class BranchManager(object):
         """
         return 'master'
 
+    @property
+    def refs(self) -> RefSnapshot:
+        """Return the current branches and remotes of the repository, shared with other callers until they change"""
+        return get_ref_snapshot(self.repository)
+
     @property
     def branches_remote(self) -> List[str]:
-        if self.repository.has_remote:
-            return sorted([b.replace('origin/', '')
-                           for b in self.repository.get_branches()['remote']
-                           if b != 'HEAD' and b != 'origin/HEAD'])
-        else:
-            return []
+        return self.refs.branches_remote
 
     @property
     def branches_local(self) -> List[str]:
-        return sorted(self.repository.get_branches()['local'])
+        return self.refs.branches_local
 
     def fetch(self) -> None:
         """Perform a git fetch"""
@@ -109,11 +111,8 @@ class BranchManager(object):
 
         self.repository.sweep_uncommitted_changes()
         if revision:
-            # The following call prints "commit" if {revision} exists in git history.
-            result = subprocess.check_output(f'git cat-file -t {revision} || echo "invalid"',
-                                             cwd=self.repository.root_dir, shell=True)
-            if result.decode().strip() != 'commit':
-                logger.error(result.decode().strip())
+            if self.repository.git.resolve_commit(revision) is None:
+                logger.error(f"Revision {revision} not found in {str(self.repository)}")
                 raise InvalidBranchName(f'Revision {revision} does not exist in {str(self.repository)};'
                                         f'cannot create branch {title}')
             # Should be in a detached-head, and then make branch from there.
@@ -186,6 +185,12 @@ class BranchManager(object):
             logger.error(e)
             raise BranchException(e)
 
+    def _ensure_merge_base(self, rev_a: str, rev_b: str) -> None:
+        """If the repository is a shallow clone, fetch older history until the two revisions have a common
+        ancestor, so they can be compared or merged"""
+        deepen_to_merge_base(self.repository.root_dir, rev_a, rev_b,
+                             increment=self.repository.client_config.config['git']['deepen_increment'])
+
     def _infer_conflicted_files(self, merge_output: str):
         return [l.split()[-1] for l in merge_output.split('\n')
                 if 'CONFLICT' in l and 'Merge conflict in ' in l]
@@ -203,6 +208,7 @@ class BranchManager(object):
         checkpoint = self.repository.git.commit_hash
         try:
             self.repository.sweep_uncommitted_changes()
+            self._ensure_merge_base(self.active_branch, other_branch)
             try:
                 call_subprocess(f'git merge {other_branch}'.split(), cwd=self.repository.root_dir)
             except subprocess.CalledProcessError as merge_error:
@@ -215,6 +221,7 @@ class BranchManager(object):
 
     def merge_use_ours(self, other_branch: str):
         self.repository.sweep_uncommitted_changes()
+        self._ensure_merge_base(self.active_branch, other_branch)
         ot = call_subprocess(f'git merge {other_branch}'.split(), cwd=self.repository.root_dir, check=False)
         conf_files = self._infer_conflicted_files(ot)
         if conf_files:
@@ -224,6 +231,7 @@ class BranchManager(object):
 
     def merge_use_theirs(self, other_branch: str):
         self.repository.sweep_uncommitted_changes()
+        self._ensure_merge_base(self.active_branch, other_branch)
         ot = call_subprocess(f'git merge {other_branch}'.split(), cwd=self.repository.root_dir, check=False)
         conf_files = self._infer_conflicted_files(ot)
         if conf_files:
@@ -231,39 +239,42 @@ class BranchManager(object):
                             cwd=self.repository.root_dir)
         self.repository.sweep_uncommitted_changes(extra_msg=f"Merged {other_branch} using theirs.")
 
-    def get_commits_ahead(self, branch_name: Optional[str] = None, remote_name: str = "origin") -> int:
-        """Return to number of local commits not present in remote branch.
+    def get_commits_ahead_behind(self, branch_name: Optional[str] = None,
+                                 remote_name: str = "origin") -> Tuple[int, int]:
+        """Return the number of local commits not present in the remote branch, and vice versa.
 
-        Note! It is important to call fetch to ensure correct behavior here."""
-        if not self.repository.remote:
-            return 0
+        Counts are memoized on the ref snapshot, so they are only computed again once a ref changes.
+
+        Note! It is important to call fetch to ensure correct behavior here. This is done via the FetchLoader so
+        one fetch per branch occurs in the API"""
+        refs = self.refs
+        if not refs.has_remote:
+            return 0, 0
 
         bname = branch_name or self.active_branch
-        if not (bname in self.branches_remote and bname in self.branches_local):
-            return 0
+        if not (bname in refs.branches_remote and bname in refs.branches_local):
+            return 0, 0
 
-        git_cmd = f'git rev-list {remote_name}/{bname}..{bname} --count'
-        result = call_subprocess(git_cmd.split(), cwd=self.repository.root_dir).strip()
-        if result.isdigit():
-            return int(math.ceil(float(result)/2.0))
-        else:
-            raise BranchException(f"Unclear commits_ahead result: {result}")
+        counts = refs.ahead_behind.get((bname, remote_name))
+        if counts is None:
+            self._ensure_merge_base(bname, f'{remote_name}/{bname}')
+            try:
+                ahead, behind = self.repository.git.count_ahead_behind(bname, f'{remote_name}/{bname}')
+            except ValueError as err:
+                raise BranchException(f"Unable to count commits ahead and behind: {err}")
+            counts = (int(math.ceil(float(ahead)/2.0)), int(math.ceil(float(behind)/2.0)))
+            refs.ahead_behind[(bname, remote_name)] = counts
+        return counts
+
+    def get_commits_ahead(self, branch_name: Optional[str] = None, remote_name: str = "origin") -> int:
+        """Return to number of local commits not present in remote branch.
+
+        Note! It is important to call fetch to ensure correct behavior here."""
+        return self.get_commits_ahead_behind(branch_name, remote_name)[0]
 
     def get_commits_behind(self, branch_name: Optional[str] = None, remote_name: str = "origin") -> int:
         """Return to number of local commits not present in remote branch.
 
         Note! It is important to call fetch to ensure correct behavior here. This is done via the FetchLoader so
         one fetch per branch occurs in the API"""
-        if not self.repository.remote:
-            return 0
-
-        bname = branch_name or self.active_branch
-        if not (bname in self.branches_remote and bname in self.branches_local):
-            return 0
-
-        git_cmd = f'git rev-list {bname}..{remote_name}/{bname} --count'
-        result = call_subprocess(git_cmd.split(), cwd=self.repository.root_dir).strip()
-        if result.isdigit():
-            return int(math.ceil(float(result)/2.0))
-        else:
-            raise BranchException(f"Unclear commits_behind result: {result}")
+        return self.get_commits_ahead_behind(branch_name, remote_name)[1]
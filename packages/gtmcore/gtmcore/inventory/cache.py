@@ -0,0 +1,227 @@
+import copy
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from gtmcore.configuration import Configuration
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# (path, mtime_ns, size, inode) for each file a cached repository depends on, None if a file does not exist
+CacheSignature = Tuple[Tuple[str, Optional[Tuple[int, int, int]]], ...]
+
+
+class _CacheEntry(object):
+    """A cached repository: its validated metadata, plus the git repo handle of the thread that loaded it"""
+    def __init__(self, signature: CacheSignature, data: Dict[str, Any], git_repo: Any) -> None:
+        self.signature = signature
+        self.data = data
+        self.git_repo = git_repo
+        self.thread_id = threading.get_ident()
+
+
+class RepositoryCache(object):
+    """Process-wide LRU cache of loaded repositories, keyed by root directory
+
+    Loading a repository parses and validates its metadata yaml file and opens a GitPython Repo. The cache keeps the
+    validated metadata (handed out as a copy, so callers can't modify the cached version) and the Repo handle, which
+    is only reused by the thread that opened it since Repo objects are not thread safe.
+
+    Each Repo handle keeps persistent `git cat-file` processes, so they are stopped when an entry is evicted or
+    invalidated. Stopping them interrupts any command in progress, so it is done by the thread that opened the handle
+    (on its next call into the cache) unless that thread has exited. A repository still using the handle starts new
+    processes the next time it needs them.
+
+    An entry is only used if the metadata files, `.git/HEAD` and the ref it points to are unchanged since the entry
+    was created, so commits, checkouts and edits made by other processes are picked up. Code that writes the
+    metadata in this process also invalidates the entry explicitly, in case the file is rewritten within the
+    filesystem's timestamp granularity.
+    """
+    _instance: Optional['RepositoryCache'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, _CacheEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Thread id -> dropped entries whose git processes that thread still has to stop
+        self._pending_release: Dict[int, List[_CacheEntry]] = dict()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_instance(cls, config: Optional[Configuration] = None) -> Optional['RepositoryCache']:
+        """Method to get the cache for this process
+
+        Args:
+            config: Optional Configuration instance
+
+        Returns:
+            RepositoryCache, or None if the cache is disabled
+        """
+        cache_config = (config or Configuration()).config['repository_cache']
+        if not cache_config['enabled']:
+            return None
+
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(max_entries=cache_config['max_entries'])
+            return cls._instance
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    @classmethod
+    def signature(cls, root_dir: str, metadata_files: List[str]) -> Optional[CacheSignature]:
+        """Method to compute the state a cached repository must match to be reused
+
+        Args:
+            root_dir: Root directory of the repository
+            metadata_files: Paths of the metadata files, relative to the root directory
+
+        Returns:
+            The signature, or None if the repository can't be cached (e.g. it is not a regular git checkout)
+        """
+        git_dir = os.path.join(root_dir, '.git')
+        if not os.path.isdir(git_dir):
+            return None
+
+        paths = [os.path.join(root_dir, f) for f in metadata_files]
+        head_path = os.path.join(git_dir, 'HEAD')
+        try:
+            with open(head_path, 'rt') as hf:
+                head = hf.read().strip()
+        except FileNotFoundError:
+            return None
+
+        paths.append(head_path)
+        if head.startswith('ref: '):
+            # The current branch may be a loose ref or packed
+            paths.append(os.path.join(git_dir, *head[5:].split('/')))
+            paths.append(os.path.join(git_dir, 'packed-refs'))
+
+        return tuple((p, cls._stat(p)) for p in paths)
+
+    def _release(self, entries: List[_CacheEntry]) -> None:
+        """Stop the persistent git processes held by the git repo handles of entries dropped from the cache
+
+        Handles opened by another live thread are left for that thread to release on its next call into the cache.
+        """
+        current = threading.get_ident()
+        if not entries and current not in self._pending_release:
+            return
+
+        release = list()
+        live_threads: Optional[Set[Optional[int]]] = None
+        with self._lock:
+            release.extend(self._pending_release.pop(current, []))
+            for entry in entries:
+                if entry.git_repo is None:
+                    continue
+                if entry.thread_id != current:
+                    if live_threads is None:
+                        live_threads = {t.ident for t in threading.enumerate()}
+                    if entry.thread_id in live_threads:
+                        self._pending_release.setdefault(entry.thread_id, []).append(entry)
+                        continue
+                release.append(entry)
+
+        for entry in release:
+            try:
+                entry.git_repo.git.clear_cache()
+            except Exception as err:
+                logger.warning(f"Failed to release git processes for a cached repository: {err}")
+
+    def get(self, root_dir: str, signature: CacheSignature) -> Optional[Tuple[Dict[str, Any], Any]]:
+        """Method to get a cached repository
+
+        Args:
+            root_dir: Root directory of the repository
+            signature: The current signature of the repository
+
+        Returns:
+            (copy of the metadata, git repo handle or None if it can't be shared with this thread), or None if there
+            is no valid entry
+        """
+        with self._lock:
+            entry = self._entries.get(root_dir)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(root_dir)
+                self.hits += 1
+                git_repo = entry.git_repo if entry.thread_id == threading.get_ident() else None
+                data = entry.data
+            else:
+                if entry is not None:
+                    del self._entries[root_dir]
+                self.misses += 1
+                data = None
+
+        self._release([entry] if data is None and entry is not None else [])
+        if data is None:
+            return None
+
+        return copy.deepcopy(data), git_repo
+
+    def put(self, root_dir: str, signature: CacheSignature, data: Dict[str, Any], git_repo: Any) -> None:
+        """Method to cache a loaded repository
+
+        Args:
+            root_dir: Root directory of the repository
+            signature: The signature of the repository, computed before it was loaded
+            data: The validated metadata
+            git_repo: The git repo handle
+
+        Returns:
+            None
+        """
+        entry = _CacheEntry(signature, copy.deepcopy(data), git_repo)
+        dropped = list()
+        with self._lock:
+            replaced = self._entries.get(root_dir)
+            if replaced is not None and replaced.git_repo is not git_repo:
+                dropped.append(replaced)
+            self._entries[root_dir] = entry
+            self._entries.move_to_end(root_dir)
+            while len(self._entries) > self.max_entries:
+                dropped.append(self._entries.popitem(last=False)[1])
+        self._release(dropped)
+
+    def invalidate(self, root_dir: str) -> None:
+        """Method to remove a repository from the cache
+
+        Args:
+            root_dir: Root directory of the repository
+
+        Returns:
+            None
+        """
+        with self._lock:
+            entry = self._entries.pop(root_dir, None)
+        if entry is not None:
+            self._release([entry])
+
+    def clear(self) -> None:
+        """Method to remove all repositories from the cache
+
+        Returns:
+            None
+        """
+        with self._lock:
+            dropped = list(self._entries.values())
+            self._entries.clear()
+        self._release(dropped)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, root_dir: str) -> bool:
+        return root_dir in self._entries
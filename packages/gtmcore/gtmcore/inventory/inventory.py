@@ -23,6 +23,7 @@ from gtmcore.labbook import SecretStore, LabBook
 from gtmcore.labbook.labbook import LabBook
 from gtmcore.dataset.dataset import Dataset
 from gtmcore.inventory import Repository
+from gtmcore.inventory.cache import RepositoryCache
 from gtmcore.dataset import storage
 from gtmcore.activity import ActivityStore, ActivityDetailRecord, ActivityDetailType, ActivityRecord, ActivityType, \
     ActivityAction
@@ -57,6 +58,7 @@ class InventoryManager(object):
         config = Configuration()
         server_config = config.get_server_configuration()
         self.inventory_root = os.path.join(config.server_data_dir, server_config.id)
+        self.repository_cache = RepositoryCache.get_instance(config)
 
     def __str__(self) -> str:
         return f'<InventoryManager: {self.inventory_root}>'
@@ -184,15 +186,29 @@ class InventoryManager(object):
             lb = LabBook()
             lbroot = os.path.join(self.inventory_root, username,
                                   owner, 'labbooks', labbook_name)
-            lb._set_root_dir(lbroot)
-            lb._load_gigantum_data()
-            lb._validate_gigantum_data()
+            lb._load_from_root_dir(lbroot, cache=self.repository_cache)
             lb.author = author
             return lb
         except Exception as e:
             raise InventoryException(f"Cannot retrieve "
                                      f"({username}, {owner}, {labbook_name}): {e}")
 
+    def invalidate_cached_repository(self, username: str, owner: str, repository_name: str) -> None:
+        """Remove the Project and Dataset with the given owner and name from the in-process repository cache
+
+        Args:
+            username: Active username
+            owner: Namespace of the repository
+            repository_name: Name of the repository
+
+        Returns:
+            None
+        """
+        if self.repository_cache is not None:
+            for repository_type in ('labbooks', 'datasets'):
+                self.repository_cache.invalidate(os.path.join(self.inventory_root, username, owner,
+                                                              repository_type, repository_name))
+
     def list_repository_ids(self, username: str, repository_type: str) -> List[Tuple[str, str, str]]:
         """Return a list of (username, owner, labbook or dataset name) tuples corresponding
            to all repositories (labbook or datasets) whose existence is inferred. Since this method does not
@@ -449,6 +465,7 @@ class InventoryManager(object):
         """
         lb = self.load_labbook(username, owner, labbook_name)
         target_dir = lb.root_dir
+        lb._invalidate_cache()
 
         # Get list of datasets and cache roots to schedule for cleanup
         datasets = self.get_linked_datasets(lb)
@@ -616,6 +633,7 @@ class InventoryManager(object):
         """
         ds = self.load_dataset(username, owner, dataset_name)
         target_dir = ds.root_dir
+        ds._invalidate_cache()
 
         # Delete dataset contents from file cache
         m = Manifest(ds, username)
@@ -686,9 +704,7 @@ class InventoryManager(object):
 
             ds_root = os.path.join(self.inventory_root, username,
                                    owner, 'datasets', dataset_name)
-            ds._set_root_dir(ds_root)
-            ds._load_gigantum_data()
-            ds._validate_gigantum_data()
+            ds._load_from_root_dir(ds_root, cache=self.repository_cache)
             return ds
         except Exception as e:
             raise InventoryException(f"Cannot retrieve ({username}, {owner}, {dataset_name}): {e}")
@@ -876,11 +892,64 @@ class InventoryManager(object):
         ars = ActivityStore(labbook)
         ars.create_activity_record(ar)
 
+    @staticmethod
+    def _submodule_git(labbook: LabBook, submodules: Dict[str, str], command: List[str]) -> List[str]:
+        """Run a git submodule command for several linked datasets at once, falling back to one at a time if the
+        batched command fails, so one broken submodule doesn't prevent updating the others
+
+        Args:
+            labbook: The labbook containing the submodules
+            submodules: Dict of submodule name to relative submodule directory
+            command: The git command, without the paths to run it for
+
+        Returns:
+            list of the names of the submodules the command failed for
+        """
+        if not submodules:
+            return []
+
+        try:
+            call_subprocess(command + ['--', *submodules.values()], cwd=labbook.root_dir, check=True)
+            return []
+        except subprocess.CalledProcessError:
+            failed = list()
+            for submodule, rel_submodule_dir in submodules.items():
+                try:
+                    call_subprocess(command + ['--', rel_submodule_dir], cwd=labbook.root_dir, check=True)
+                except subprocess.CalledProcessError:
+                    failed.append(submodule)
+            return failed
+
+    @staticmethod
+    def _stale_submodules(labbook: LabBook, submodules: Dict[str, str]) -> List[str]:
+        """Get the linked datasets that are not checked out at the revision the labbook references, using a single
+        `git submodule status` for all of them
+
+        Args:
+            labbook: The labbook containing the submodules
+            submodules: Dict of submodule name to relative submodule directory
+
+        Returns:
+            list of submodule names
+        """
+        try:
+            status = call_subprocess(['git', 'submodule', 'status', '--', *submodules.values()],
+                                     cwd=labbook.root_dir, check=True)
+        except subprocess.CalledProcessError:
+            return list(submodules.keys())
+
+        # Each line is `<state><commit> <path>[ (<description>)]`, and the state is a space if the submodule is
+        # checked out at the referenced commit
+        up_to_date = {line[1:].split(' ')[1] for line in status.splitlines() if line.startswith(' ')}
+        return [submodule for submodule, rel_dir in submodules.items() if rel_dir not in up_to_date]
+
     @staticmethod
     def update_linked_datasets(labbook: LabBook, username: str) -> None:
         """Method to initialize or update all git submodule references for linked datasets.
 
-        This is used when loading and initializing linked datasets
+        This is used when loading and initializing linked datasets. Git is run once for all linked datasets where
+        possible, and only datasets that are not at the referenced revision (or whose files have not been linked into
+        the object cache) are updated and relinked.
 
         Args:
             labbook: The labbook instance to inspect
@@ -890,35 +959,57 @@ class InventoryManager(object):
             None
         """
         submodules = labbook.git.list_submodules()
-        for submodule in submodules:
+        submodule_dirs = {submodule: os.path.join('.gigantum', 'datasets', *submodule.split("&"))
+                          for submodule in submodules if len(submodule.split("&")) == 2}
+        for submodule in set(submodules) - set(submodule_dirs):
+            logger.warning(f"Failed to initialize linked Dataset (submodule reference): {submodule}. "
+                           f"Unexpected submodule name")
+
+        # The following commands may be null-ops, but they're local operations that should be very fast
+        failed = set(InventoryManager._submodule_git(labbook, submodule_dirs, ['git', 'submodule', 'init']))
+
+        # We update the URL in our .gitconfig to include the username
+        # This shouldn't have a username in it, but it's OK if it does
+        try:
+            url_config = call_subprocess(['git', 'config', '--get-regexp', r'^submodule\..*\.url$'],
+                                         cwd=labbook.root_dir, check=True)
+        except subprocess.CalledProcessError:
+            url_config = ''
+        for line in url_config.splitlines():
+            key, anon_url = line.split(' ', 1)
+            submodule = key[len('submodule.'):-len('.url')]
+            if submodule not in submodule_dirs:
+                continue
+            user_remote = RepoLocation(anon_url.strip(), username)
+            if user_remote.remote_location != anon_url.strip():
+                call_subprocess(['git', 'config', f"submodule.{submodule}.url", user_remote.remote_location],
+                                cwd=labbook.root_dir, check=True)
+
+        stale = [s for s in InventoryManager._stale_submodules(labbook, submodule_dirs) if s not in failed]
+        failed.update(InventoryManager._submodule_git(labbook, {s: submodule_dirs[s] for s in stale},
+                                                      ['git', 'submodule', 'update']))
+
+        for submodule, rel_submodule_dir in submodule_dirs.items():
+            if submodule in failed:
+                logger.warning(f"Failed to initialize linked Dataset (submodule reference): {submodule}. "
+                               f"This may be an actual error or simply due to repository permissions")
+                continue
+
             try:
                 namespace, dataset_name = submodule.split("&")
-                rel_submodule_dir = os.path.join('.gigantum', 'datasets', namespace, dataset_name)
                 submodule_dir = os.path.join(labbook.root_dir, rel_submodule_dir)
 
-                # The following three commands may be null-ops, but they're local operations that should be very fast
-                call_subprocess(['git', 'submodule', 'init', '--', rel_submodule_dir],
-                                cwd=labbook.root_dir, check=True)
-
-                if os.environ.get('WINDOWS_HOST'):
+                if os.environ.get('WINDOWS_HOST') and submodule in stale:
                     logger.info(f"Dataset {submodule} imported on Windows host as a submodule - set fileMode to false")
                     call_subprocess(shlex.split("git config core.fileMode false"),
                                     cwd=submodule_dir)
 
-                # We update the URL in our .gitconfig to include the username
-                # This shouldn't have a username in it, but it's OK if it does
-                anon_url = call_subprocess(['git', 'config', f"submodule.{submodule}.url"],
-                                           cwd=labbook.root_dir, check=True)
-                user_remote = RepoLocation(anon_url.strip(), username)
-                call_subprocess(['git', 'config', f"submodule.{submodule}.url", user_remote.remote_location],
-                                cwd=labbook.root_dir, check=True)
-
-                call_subprocess(['git', 'submodule', 'update', '--', rel_submodule_dir],
-                                cwd=labbook.root_dir, check=True)
-
                 ds = InventoryManager().load_dataset_from_directory(submodule_dir)
                 ds.namespace = namespace
                 manifest = Manifest(ds, username)
+                if submodule not in stale and os.path.isdir(manifest.cache_mgr.current_revision_dir):
+                    # Already checked out and linked
+                    continue
                 manifest.force_reload()
                 manifest.link_revision()
 
@@ -960,9 +1051,9 @@ class InventoryManager(object):
         original_revision = ds.git.repo.head.object.hexsha
         ds.git.fetch()
 
-        latest_revision = call_subprocess(['git', 'rev-list', 'origin/master', '--max-count=1'],
-                                          cwd=ds.root_dir, check=True)
-        latest_revision = latest_revision.strip()
+        latest_revision = ds.git.resolve_commit('origin/master')
+        if latest_revision is None:
+            raise ValueError(f"Dataset {dataset_namespace}/{dataset_name} has no remote master branch")
 
         # If the submodule has changed, commit the changes.
         if original_revision != latest_revision:
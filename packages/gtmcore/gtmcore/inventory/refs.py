@@ -0,0 +1,297 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from gtmcore.configuration import Configuration
+from gtmcore.configuration.utils import call_subprocess
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# Stat of HEAD, packed-refs and config, plus (relative path, inode, mtime_ns) of every loose branch ref
+RefSignature = Tuple[Tuple[Any, ...], ...]
+
+# Ref namespaces included in a snapshot
+REF_NAMESPACES = ('refs/heads', 'refs/remotes')
+
+# Files in the git directory a snapshot depends on, in addition to the loose refs
+SIGNATURE_FILES = ('HEAD', 'packed-refs', 'config')
+
+
+class RefSnapshot(object):
+    """The branches, remotes and HEAD of a repository at one point in time
+
+    Snapshots are shared by every caller in the process until the refs change, so they must not be modified.
+    Ahead/behind counts depend only on the refs, so they are memoized on the snapshot once computed.
+    """
+    def __init__(self, head: Optional[str], active_branch: Optional[str], local: Dict[str, str],
+                 remote: Dict[str, str], remotes: List[Dict[str, str]],
+                 signature: Optional[RefSignature] = None) -> None:
+        """
+
+        Args:
+            head: commit HEAD points to, or None if unknown (e.g. a repository without commits)
+            active_branch: checked out branch, or None if HEAD is detached
+            local: local branch name -> commit
+            remote: remote tracking branch name (e.g. `origin/master`) -> commit
+            remotes: list of {"name": <remote name>, "url": <remote location>}, as returned by `list_remotes()`
+            signature: state of the ref files the snapshot was read from
+        """
+        self.head = head
+        self.active_branch = active_branch
+        self.local = local
+        self.remote = remote
+        self.remotes = remotes
+        self.signature = signature
+
+        self.ahead_behind: Dict[Tuple[str, str], Tuple[int, int]] = dict()
+
+    @property
+    def has_remote(self) -> bool:
+        return len(self.remotes) > 0
+
+    @property
+    def branches_local(self) -> List[str]:
+        return sorted(self.local.keys())
+
+    @property
+    def branches_remote(self) -> List[str]:
+        """Names of the remote branches, without the `origin/` prefix"""
+        if not self.has_remote:
+            return []
+        return sorted([b.replace('origin/', '') for b in self.remote.keys() if b != 'HEAD' and b != 'origin/HEAD'])
+
+
+def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _loose_refs(git_dir: str) -> List[Tuple[str, int, int]]:
+    """Walk the loose branch refs
+
+    Git updates a ref by renaming a new file over it, so the inode changes with every update even if the mtime
+    doesn't (e.g. two updates within the filesystem's timestamp granularity).
+
+    Returns:
+        sorted list of (ref name, inode, mtime_ns)
+    """
+    refs = list()
+    pending = list(REF_NAMESPACES)
+    while pending:
+        ref_dir = pending.pop()
+        try:
+            entries = list(os.scandir(os.path.join(git_dir, ref_dir)))
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        for entry in entries:
+            name = f"{ref_dir}/{entry.name}"
+            if entry.is_dir(follow_symlinks=False):
+                pending.append(name)
+            elif not entry.name.endswith('.lock'):
+                try:
+                    refs.append((name, entry.inode(), entry.stat(follow_symlinks=False).st_mtime_ns))
+                except FileNotFoundError:
+                    # Removed while walking, the next signature will differ
+                    pass
+    return sorted(refs)
+
+
+def ref_signature(root_dir: str) -> Optional[RefSignature]:
+    """Method to compute the state a cached snapshot must match to be reused
+
+    Args:
+        root_dir: Root directory of the repository
+
+    Returns:
+        The signature, or None if the refs can't be read directly (e.g. `.git` is not a directory)
+    """
+    git_dir = os.path.join(root_dir, '.git')
+    if not os.path.isdir(git_dir):
+        return None
+
+    files = tuple((f, _stat(os.path.join(git_dir, f))) for f in SIGNATURE_FILES)
+    return files + tuple(_loose_refs(git_dir))
+
+
+def _read_packed_refs(git_dir: str) -> Dict[str, str]:
+    refs = dict()
+    try:
+        with open(os.path.join(git_dir, 'packed-refs'), 'rt') as f:
+            for line in f:
+                # Skip the header and peeled tag lines
+                if line.startswith('#') or line.startswith('^'):
+                    continue
+                parts = line.split()
+                if len(parts) == 2:
+                    refs[parts[1]] = parts[0]
+    except FileNotFoundError:
+        pass
+    return refs
+
+
+def _read_remotes(root_dir: str) -> List[Dict[str, str]]:
+    # Exits with 1 if there are no remotes
+    output = call_subprocess(['git', 'config', '--get-regexp', r'^remote\..*\.url$'], cwd=root_dir, check=False)
+    remotes: List[Dict[str, str]] = list()
+    for line in output.splitlines():
+        key, _, url = line.partition(' ')
+        name = key[len('remote.'):-len('.url')]
+        if name not in [r['name'] for r in remotes]:
+            remotes.append({"name": name, "url": url})
+    return remotes
+
+
+def read_ref_snapshot(root_dir: str, signature: RefSignature) -> RefSnapshot:
+    """Method to read the refs of a repository from its `.git` directory
+
+    Args:
+        root_dir: Root directory of the repository
+        signature: Signature computed before reading
+
+    Returns:
+        RefSnapshot
+    """
+    git_dir = os.path.join(root_dir, '.git')
+    refs = _read_packed_refs(git_dir)
+    symbolic_refs = dict()
+    for name, _, _ in signature[len(SIGNATURE_FILES):]:
+        try:
+            with open(os.path.join(git_dir, *name.split('/')), 'rt') as f:
+                value = f.read().strip()
+        except FileNotFoundError:
+            continue
+        if value.startswith('ref: '):
+            # e.g. refs/remotes/origin/HEAD
+            symbolic_refs[name] = value[5:]
+        else:
+            refs[name] = value
+    for name, target in symbolic_refs.items():
+        if target in refs:
+            refs[name] = refs[target]
+
+    with open(os.path.join(git_dir, 'HEAD'), 'rt') as f:
+        head_value = f.read().strip()
+    if head_value.startswith('ref: '):
+        head_ref = head_value[5:]
+        active_branch = head_ref[len('refs/heads/'):] if head_ref.startswith('refs/heads/') else None
+        head = refs.get(head_ref)
+    else:
+        active_branch = None
+        head = head_value
+
+    local = {name[len('refs/heads/'):]: commit for name, commit in refs.items() if name.startswith('refs/heads/')}
+    remote = {name[len('refs/remotes/'):]: commit for name, commit in refs.items()
+              if name.startswith('refs/remotes/')}
+    return RefSnapshot(head, active_branch, local, remote, _read_remotes(root_dir), signature)
+
+
+class RefSnapshotCache(object):
+    """Process-wide LRU cache of ref snapshots, keyed by root directory
+
+    Resolving a page of branch information used to list the refs, and run `git remote` to check for a remote, once
+    for every field. A cached snapshot is reused as long as HEAD, `packed-refs`, the config and the loose refs are
+    unchanged, so checkouts, commits and fetches done by other processes are picked up.
+    """
+    _instance: Optional['RefSnapshotCache'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = 64) -> None:
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, RefSnapshot]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_instance(cls, config: Optional[Configuration] = None) -> Optional['RefSnapshotCache']:
+        """Method to get the cache for this process
+
+        Args:
+            config: Optional Configuration instance
+
+        Returns:
+            RefSnapshotCache, or None if the repository cache is disabled
+        """
+        cache_config = (config or Configuration()).config['repository_cache']
+        if not cache_config['enabled']:
+            return None
+
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(max_entries=cache_config['max_entries'])
+            return cls._instance
+
+    def get(self, root_dir: str) -> Optional[RefSnapshot]:
+        """Method to get the current snapshot of a repository, reading it if the cached one is out of date
+
+        Args:
+            root_dir: Root directory of the repository
+
+        Returns:
+            RefSnapshot, or None if the refs can't be read directly
+        """
+        signature = ref_signature(root_dir)
+        if signature is None:
+            return None
+
+        with self._lock:
+            snapshot = self._entries.get(root_dir)
+            if snapshot is not None and snapshot.signature == signature:
+                self._entries.move_to_end(root_dir)
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+
+        snapshot = read_ref_snapshot(root_dir, signature)
+        with self._lock:
+            self._entries[root_dir] = snapshot
+            self._entries.move_to_end(root_dir)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, root_dir: str) -> None:
+        """Method to remove a repository from the cache"""
+        with self._lock:
+            self._entries.pop(root_dir, None)
+
+    def clear(self) -> None:
+        """Method to remove all repositories from the cache"""
+        with self._lock:
+            self._entries.clear()
+
+
+def get_ref_snapshot(repository: Any) -> RefSnapshot:
+    """Get the current ref snapshot of a repository, from the process-wide cache when possible
+
+    Args:
+        repository: Repository instance
+
+    Returns:
+        RefSnapshot
+    """
+    cache = RefSnapshotCache.get_instance(repository.client_config)
+    snapshot = cache.get(repository.root_dir) if cache else None
+    if snapshot is not None:
+        return snapshot
+
+    # Read through git if the refs can't be validated or caching is disabled
+    branches = repository.git.list_branches()
+    try:
+        head: Optional[str] = repository.git.commit_hash
+    except ValueError:
+        # No commits yet
+        head = None
+    try:
+        active_branch: Optional[str] = repository.git.get_current_branch_name()
+    except TypeError:
+        # Detached HEAD
+        active_branch = None
+    return RefSnapshot(head, active_branch, {b: '' for b in branches['local']}, {b: '' for b in branches['remote']},
+                       repository.git.list_remotes())
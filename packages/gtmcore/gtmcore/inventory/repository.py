@@ -1,18 +1,18 @@
 import os
 import uuid
 import yaml
-import time
 import datetime
 import gitdb
-import redis_lock
 from contextlib import contextmanager
-from redis import StrictRedis
-from typing import (Any, Dict, List, Optional, Tuple)
+from typing import (Any, Callable, Dict, List, Optional, Tuple)
 
 from gtmcore.configuration import Configuration
-from gtmcore.exceptions import GigantumLockedException, GigantumException
+from gtmcore.exceptions import GigantumException
 from gtmcore.configuration.utils import call_subprocess
 from gtmcore.gitlib import get_git_interface, GitAuthor, GitRepoInterface
+from gtmcore.gitlib.change_index import ChangeIndex
+from gtmcore.inventory.cache import RepositoryCache
+from gtmcore.locking import ReadWriteLock, caller_operation
 from gtmcore.logging import LMLogger
 from gtmcore.activity import ActivityStore, ActivityType, ActivityRecord, ActivityDetailType, ActivityDetailRecord, \
     ActivityAction
@@ -35,7 +35,8 @@ def check_git_tracked(repo: GitRepoInterface) -> None:
         logger.info("Not checking Git status, appears to be uninitialized.")
         return
 
-    result_status = repo.status()
+    # Only emptiness matters, so untracked directories need not be walked
+    result_status = repo.status(untracked_files='normal')
     # status_key is one of "staged", "unstaged", "untracked"
     for status_key in result_status.keys():
         n = result_status.get(status_key)
@@ -53,6 +54,9 @@ class Repository(object):
     _default_activity_detail_type = ActivityDetailType.LABBOOK
     _default_activity_section = "Default Section"
 
+    # Metadata files (relative to the root dir) the loaded repository depends on, used to validate cached copies
+    _metadata_files: List[str] = []
+
     def __init__(self, author: Optional[GitAuthor] = None) -> None:
         self.client_config: Configuration = Configuration()
 
@@ -68,9 +72,6 @@ class Repository(object):
         self._data: Dict[str, Any] = {}
         self._checkout_id: Optional[str] = None
 
-        # Redis instance for the LabBook lock
-        self._lock_redis_client: Optional[StrictRedis] = None
-
     def __eq__(self, other):
         return type(other) == type(self) and other.root_dir == self.root_dir
 
@@ -101,7 +102,8 @@ class Repository(object):
         return __validator
 
     @contextmanager
-    def lock(self, lock_key: Optional[str] = None, failfast: bool = False):
+    def lock(self, lock_key: Optional[str] = None, failfast: bool = False, shared: bool = False,
+             operation: Optional[str] = None):
         """A context manager for locking labbook operations that is decorator compatible
 
         Manages the lock process along with catching and logging exceptions that may occur
@@ -110,47 +112,23 @@ class Repository(object):
             lock_key: The lock key to override the default value.
             failfast: Raise LabbookLockedException right away if labbook
                       is already locked. Do not block.
+            shared: Take a shared lock, for operations that only read the repository. Any number of shared locks
+                    can be held at once, but not at the same time as the exclusive lock.
+            operation: Name of the operation taking the lock, reported when other operations wait for it. Defaults
+                       to the calling method.
 
         """
-        lock: redis_lock.Lock = None
+        lock: Optional[ReadWriteLock] = None
         try:
-            config = self.client_config.config['lock']
-
-            # Get a redis client
-            if not self._lock_redis_client:
-                self._lock_redis_client = StrictRedis(host=config['redis']['host'],
-                                                      port=config['redis']['port'],
-                                                      db=config['redis']['db'])
-
             # Create a lock key
             if not lock_key:
                 lock_key = f'filesystem_lock|{self.key}'
 
-            # Get a lock object
-            lock = redis_lock.Lock(self._lock_redis_client, lock_key,
-                                   expire=config['expire'],
-                                   auto_renewal=config['auto_renewal'],
-                                   strict=config['redis']['strict'])
+            lock = ReadWriteLock(lock_key, self.client_config, operation or caller_operation(__file__))
+            lock.acquire(shared=shared, failfast=failfast)
 
-            # Get the lock - blocking and timeout kw args can not
-            # be used simultaneously
-            if failfast:
-                lock_kwargs = {'blocking': False}
-            else:
-                lock_kwargs = {'timeout': config['timeout']}
-
-            if lock.acquire(**lock_kwargs):
-                # Do the work
-                start_time = time.time()
-                yield
-                if config['expire']:
-                    if (time.time() - start_time) > config['expire']:
-                        logger.error(
-                            f"Task took more than {config['expire']}s. File locking possibly invalid.")
-            else:
-                if failfast:
-                    raise GigantumLockedException("Cannot interrupt operation in progress")
-                raise IOError(f"Could not acquire file system lock within {config['timeout']} seconds.")
+            # Do the work
+            yield
 
         except Exception as e:
             logger.error(e, exc_info=True)
@@ -158,11 +136,7 @@ class Repository(object):
         finally:
             # Release the Lock
             if lock:
-                try:
-                    lock.release()
-                except redis_lock.NotAcquired as e:
-                    # if you didn't get the lock and an error occurs, you probably won't be able to release, so log.
-                    logger.error(e)
+                lock.release()
 
     @property
     def root_dir(self) -> str:
@@ -302,7 +276,7 @@ class Repository(object):
         or un-tracked files. """
 
         try:
-            result_status = self.git.status()
+            result_status = self.git.status(untracked_files='normal')
             for status_key in result_status.keys():
                 n = result_status.get(status_key)
                 if n:
@@ -313,9 +287,13 @@ class Repository(object):
             logger.error(e)
             return False
 
-    def _set_root_dir(self, new_root_dir: str) -> None:
+    def _set_root_dir(self, new_root_dir: str, git_repo: Optional[Any] = None) -> None:
         """Update the root directory and also reconfigure the git instance
 
+        Args:
+            new_root_dir: Root directory of the repository
+            git_repo: Optional already open git repo handle for the root directory
+
         Returns:
             None
         """
@@ -323,7 +301,51 @@ class Repository(object):
         self._root_dir = os.path.expanduser(new_root_dir)
 
         # Update the git working directory
-        self.git.set_working_directory(self.root_dir)
+        if git_repo is not None:
+            self.git.set_working_directory(self.root_dir, repo=git_repo)
+        else:
+            self.git.set_working_directory(self.root_dir)
+
+    def _load_from_root_dir(self, root_dir: str, cache: Optional[RepositoryCache] = None) -> None:
+        """Set the root directory, then load and validate the repository metadata
+
+        If a cache is provided and it holds this repository in its current state, the cached metadata (and git
+        handle, if possible) are used instead.
+
+        Args:
+            root_dir: Root directory of the repository
+            cache: Optional RepositoryCache
+
+        Returns:
+            None
+        """
+        root_dir = os.path.expanduser(root_dir)
+
+        # Compute the signature before loading, so changes made while loading are caught on the next load
+        signature = RepositoryCache.signature(root_dir, self._metadata_files) if cache is not None else None
+        if cache is not None and signature:
+            cached = cache.get(root_dir, signature)
+            if cached:
+                self._data, git_repo = cached
+                self._set_root_dir(root_dir, git_repo=git_repo)
+                return
+
+        self._set_root_dir(root_dir)
+        self._load_gigantum_data()
+        self._validate_gigantum_data()
+
+        if cache is not None and signature:
+            cache.put(root_dir, signature, self._data, getattr(self.git, 'repo', None))
+
+    def _invalidate_cache(self) -> None:
+        """Remove this repository from the process repository cache, e.g. after its metadata has been modified
+
+        Returns:
+            None
+        """
+        cache = RepositoryCache.get_instance(self.client_config)
+        if cache is not None and self._root_dir:
+            cache.invalidate(self._root_dir)
 
     def _save_gigantum_data(self) -> None:
         """Method to save changes to the Repository metadata file
@@ -337,6 +359,7 @@ class Repository(object):
         with open(os.path.join(self.root_dir, ".gigantum", "gigantum.yaml"), 'wt') as gf:
             gf.write(yaml.safe_dump(self._data, default_flow_style=False))
             gf.flush()
+        self._invalidate_cache()
 
     def _load_gigantum_data(self) -> None:
         """Method to load the repository YAML file to a dictionary
@@ -370,9 +393,61 @@ class Repository(object):
         if section not in ['code', 'input', 'output']:
             raise ValueError("section (code, input, output) must be provided.")
 
+    def get_uncommitted_changes(self) -> Tuple[Dict[str, Any], Optional[List[str]]]:
+        """Get the git status of the working tree, scoped to changed paths if a ChangeIndex is watching this repository
+
+        Returns:
+            (git status dict, paths the status was limited to or None if the whole working tree was scanned)
+        """
+        change_index = ChangeIndex.get(self.root_dir)
+        paths = change_index.pending_paths() if change_index else None
+        return self.git.status(paths=paths), paths
+
+    def stage_uncommitted_changes(self, status: Dict[str, Any], paths: Optional[List[str]],
+                                  feedback_callback: Optional[Callable[[str], None]] = None) -> None:
+        """Stage the changes returned by `get_uncommitted_changes()`
+
+        If more paths changed than the configured `sweep.batch_size`, they are staged in batches, reporting progress
+        to `feedback_callback` after each one.
+
+        Args:
+            status: git status dict
+            paths: paths the status was limited to, or None to stage the whole working tree
+            feedback_callback: Optional callback to give user-facing feedback while staging
+
+        Returns:
+            None
+        """
+        changed = list(status['untracked'])
+        changed.extend([filename for filename, _ in status['unstaged']])
+
+        batch_size = self.client_config.config['sweep']['batch_size']
+        if paths is None and len(changed) <= batch_size:
+            self.git.add_all()
+            return
+
+        for start in range(0, len(changed), batch_size):
+            self.git.add_paths(changed[start:start + batch_size])
+            if feedback_callback and len(changed) > batch_size:
+                feedback_callback(f"Staged {min(start + batch_size, len(changed))} of {len(changed)} changed files")
+
+    def mark_changes_committed(self, paths: Optional[List[str]]) -> None:
+        """Let the ChangeIndex watching this repository (if any) know changes have been committed
+
+        Args:
+            paths: paths returned by `get_uncommitted_changes()`
+
+        Returns:
+            None
+        """
+        change_index = ChangeIndex.get(self.root_dir)
+        if change_index:
+            change_index.mark_clean(paths)
+
     def sweep_uncommitted_changes(self, upload: bool = False,
                                   extra_msg: Optional[str] = None,
-                                  show: bool = False) -> None:
+                                  show: bool = False,
+                                  feedback_callback: Optional[Callable[[str], None]] = None) -> None:
         """ Sweep all changes into a commit, and create activity record.
             NOTE: This method MUST be called inside a lock.
 
@@ -380,14 +455,16 @@ class Repository(object):
             upload(bool): Flag indicating if this was from a batch upload
             extra_msg(str): Optional string used to augment the activity message
             show(bool): Optional flag indicating if the result of this sweep is important enough to be shown in the feed
+            feedback_callback: Optional callback to report progress while staging a large number of changes
 
         Returns:
 
         """
-        result_status = self.git.status()
+        result_status, scoped_paths = self.get_uncommitted_changes()
         if any([result_status[k] for k in result_status.keys()]):
-            self.git.add_all()
+            self.stage_uncommitted_changes(result_status, scoped_paths, feedback_callback)
             self.git.commit("Sweep of uncommitted changes")
+            self.mark_changes_committed(scoped_paths)
 
             tags = ['save']
             if upload:
@@ -419,6 +496,7 @@ class Repository(object):
             ars = ActivityStore(self)
             ars.create_activity_record(ar)
         else:
+            self.mark_changes_committed(scoped_paths)
             logger.info(f"{str(self)} no changes to sweep.")
 
     @staticmethod
@@ -472,6 +550,27 @@ class Repository(object):
         possible_section, _ = relative_path.split('/', 1)
         return Repository.get_activity_type_from_section(possible_section)
 
+    @staticmethod
+    def _summarize_changes(changes: List[Tuple[str, str, str]]) -> str:
+        """Summarize a list of changed files as one markdown line per change, section and directory
+
+        Args:
+            changes: (change, section, path) of each changed file
+
+        Returns:
+            markdown string
+        """
+        counts: Dict[Tuple[str, str, str], int] = dict()
+        for change, section, filename in changes:
+            key = (change, section, os.path.dirname(filename.rstrip('/')))
+            counts[key] = counts.get(key, 0) + 1
+
+        lines = list()
+        for (change, section, directory), count in counts.items():
+            location = f"`{directory}/`" if directory else "the root directory"
+            lines.append(f"{change[0].upper() + change[1:]} {count} {section} file(s) in {location}")
+        return '\n'.join(lines)
+
     def process_sweep_status(self, result_obj: ActivityRecord,
                              status: Dict[str, Any]) -> Tuple[ActivityRecord, int, int, int]:
 
@@ -482,6 +581,8 @@ class Repository(object):
             ActivityAction.EDIT: [],
             ActivityAction.NOACTION: [],
         }
+        # (change, section, path) of each message, used to summarize bulk changes
+        detail_changes: Dict[ActivityAction, List[Tuple[str, str, str]]] = {action: [] for action in detail_msgs}
         sections = []
         ncnt = 0
         for filename in status['untracked']:
@@ -500,6 +601,7 @@ class Repository(object):
             action = ActivityAction.CREATE
             detail_type[action] = activity_detail_type
             detail_msgs[action].append(msg)
+            detail_changes[action].append(("added", section, filename))
 
             ncnt += 1
 
@@ -551,6 +653,7 @@ class Repository(object):
 
             detail_type[action] = activity_detail_type
             detail_msgs[action].append(msg)
+            detail_changes[action].append((change, section, filename))
 
         modified_section_set = set(msections)
         if new_type == self._default_activity_type:
@@ -571,11 +674,31 @@ class Repository(object):
                 # Mismatch between new and modify or within modify, just use catchall LABBOOK or DATASET type
                 new_type = self._default_activity_type
 
-        adrs = [ActivityDetailRecord(detail_type[action],
-                                     show=False,
-                                     action=action,
-                                     data=TextData('markdown', '\n'.join(detail_msgs[action])))
-                for action in detail_type.keys() if len(detail_msgs[action]) > 0]
+        summary_threshold = self.client_config.config['sweep']['summary_threshold']
+        adrs = list()
+        for action in detail_type.keys():
+            if len(detail_msgs[action]) == 0:
+                continue
+
+            if len(detail_msgs[action]) <= summary_threshold:
+                adrs.append(ActivityDetailRecord(detail_type[action],
+                                                 show=False,
+                                                 action=action,
+                                                 data=TextData('markdown', '\n'.join(detail_msgs[action]))))
+            else:
+                # Too many files to list one per line, summarize by directory and keep the full list in a separate
+                # record. Detail records are stored compressed and only loaded when requested.
+                adrs.append(ActivityDetailRecord(detail_type[action],
+                                                 show=False,
+                                                 action=action,
+                                                 data=TextData('markdown',
+                                                               self._summarize_changes(detail_changes[action]))))
+                file_list = '\n'.join([f"{change}\t{filename}" for change, _, filename in detail_changes[action]])
+                adrs.append(ActivityDetailRecord(detail_type[action],
+                                                 show=False,
+                                                 action=action,
+                                                 tags=ImmutableList(['file_list']),
+                                                 data=TextData('plain', file_list)))
         result_obj = result_obj.update(activity_type=new_type,
                                        detail_objects=DetailRecordList(adrs))
 
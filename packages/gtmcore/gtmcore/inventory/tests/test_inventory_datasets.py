@@ -6,6 +6,7 @@ import datetime
 import shutil
 import tempfile
 import time
+from mock import patch
 
 from gtmcore.dataset.dataset import Dataset
 from gtmcore.configuration.utils import call_subprocess
@@ -539,3 +540,41 @@ class TestInventoryDatasets(object):
         assert len(datasets) == 1
         assert datasets[0].name == ds.name
         assert datasets[0].namespace == ds.namespace
+
+    def test_update_linked_datasets_batched(self, mock_config_file):
+        inv_manager = InventoryManager()
+        lb = inv_manager.create_labbook("test", "test", "labbook1", description="my first project")
+        names = ['dataset100', 'dataset101']
+        for name in names:
+            ds = inv_manager.create_dataset("test", "test", name, "gigantum_object_v1", description="my dataset")
+            helper_create_remote_repo(ds, 'test', None, None)
+            inv_manager.link_dataset_to_labbook(ds.remote, 'test', name, lb, 'test')
+
+        # Remove the checked out submodules, as in a fresh clone of the Project
+        call_subprocess(['git', 'submodule', 'deinit', '-q', '-f', '--all'], cwd=lb.root_dir)
+        submodule_dirs = [os.path.join(lb.root_dir, '.gigantum', 'datasets', 'test', name) for name in names]
+        assert not any(os.path.exists(os.path.join(d, '.gigantum')) for d in submodule_dirs)
+
+        commands = list()
+
+        def call_subprocess_spy(cmd_tokens, *args, **kwargs):
+            commands.append(cmd_tokens[:3])
+            return call_subprocess(cmd_tokens, *args, **kwargs)
+
+        with patch('gtmcore.inventory.inventory.call_subprocess', side_effect=call_subprocess_spy):
+            inv_manager.update_linked_datasets(lb, 'test')
+
+        assert all(os.path.exists(os.path.join(d, '.gigantum')) for d in submodule_dirs)
+        # Both datasets are checked out by a single command
+        assert commands.count(['git', 'submodule', 'update']) == 1
+        for name in names:
+            ds = inv_manager.load_dataset_from_directory(os.path.join(lb.root_dir, '.gigantum', 'datasets', 'test',
+                                                                      name))
+            ds.namespace = 'test'
+            assert os.path.isdir(Manifest(ds, 'test').cache_mgr.current_revision_dir)
+
+        # Datasets that are already checked out are not updated again
+        commands.clear()
+        with patch('gtmcore.inventory.inventory.call_subprocess', side_effect=call_subprocess_spy):
+            inv_manager.update_linked_datasets(lb, 'test')
+        assert ['git', 'submodule', 'update'] not in commands
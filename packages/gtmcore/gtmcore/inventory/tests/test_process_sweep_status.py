@@ -337,3 +337,48 @@ class TestShims(object):
         assert ar.detail_objects[1].type.value == ActivityDetailType.CODE.value
         assert "Modified" in ar.detail_objects[0].data['text/markdown']
         assert "Created" in ar.detail_objects[1].data['text/markdown']
+
+    def test_process_sweep_status_summarized(self, mock_lb, monkeypatch):
+        monkeypatch.setitem(mock_lb.client_config.config['sweep'], 'summary_threshold', 5)
+        os.makedirs(os.path.join(mock_lb.root_dir, 'output', 'run1'))
+        for i in range(8):
+            helper_write_file(mock_lb, 'output', os.path.join('run1', f'f{i}.txt'), 'cat')
+        for i in range(3):
+            helper_write_file(mock_lb, 'output', f'g{i}.txt', 'cat')
+        helper_write_file(mock_lb, 'code', 'f1.txt', 'cat')
+        git_status, lb, ar = helper_commit(mock_lb, helper_gen_record())
+
+        ar, new_count, modified_count, deleted_count = lb.process_sweep_status(ar, git_status)
+
+        assert new_count == 12
+        assert ar.type == ActivityType.LABBOOK
+        assert len(ar.detail_objects) == 2
+        summary = [d for d in ar.detail_objects if 'file_list' not in d.tags][0]
+        assert summary.data['text/markdown'] == "Added 1 Code file(s) in `code/`\n" \
+                                                "Added 3 Output Data file(s) in `output/`\n" \
+                                                "Added 8 Output Data file(s) in `output/run1/`"
+        file_list = [d for d in ar.detail_objects if 'file_list' in d.tags][0]
+        assert file_list.show is False
+        assert len(file_list.data['text/plain'].split('\n')) == 12
+        assert "added\toutput/run1/f0.txt" in file_list.data['text/plain']
+
+        # Below the threshold, files are still listed individually
+        helper_write_file(mock_lb, 'code', 'f1.txt', 'dog')
+        git_status, lb, ar = helper_commit(mock_lb, helper_gen_record())
+        ar, _, modified_count, _ = lb.process_sweep_status(ar, git_status)
+        assert modified_count == 1
+        assert len(ar.detail_objects) == 1
+        assert ar.detail_objects[0].data['text/markdown'] == "Modified Code file `code/f1.txt`"
+
+    def test_sweep_in_batches(self, mock_lb, monkeypatch):
+        monkeypatch.setitem(mock_lb.client_config.config['sweep'], 'batch_size', 4)
+        for i in range(10):
+            helper_write_file(mock_lb, 'input', f'f{i}.txt', 'cat')
+
+        feedback = list()
+        mock_lb.sweep_uncommitted_changes(feedback_callback=feedback.append)
+
+        assert feedback == ["Staged 4 of 10 changed files", "Staged 8 of 10 changed files",
+                            "Staged 10 of 10 changed files"]
+        assert mock_lb.is_repo_clean
+        assert "10 new file(s)" in mock_lb.git.log_entry(mock_lb.git.commit_hash)['message']
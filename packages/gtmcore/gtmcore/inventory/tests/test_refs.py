@@ -0,0 +1,100 @@
+import subprocess
+
+import pytest
+
+from gtmcore.inventory.branching import BranchManager
+from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.inventory.refs import RefSnapshotCache, get_ref_snapshot
+from gtmcore.fixtures import mock_config_file
+
+
+@pytest.fixture()
+def mock_ref_cache(mock_config_file):
+    cache = RefSnapshotCache.get_instance()
+    cache.clear()
+    lb = InventoryManager().create_labbook('test', 'test', 'labbook1', description='refs')
+    yield lb, cache
+    cache.clear()
+
+
+def helper_git(lb, *args):
+    return subprocess.run(['git', *args], cwd=lb.root_dir, check=True, stdout=subprocess.PIPE).stdout.decode()
+
+
+class TestRefSnapshot(object):
+    def test_matches_git(self, mock_ref_cache):
+        lb, cache = mock_ref_cache
+        helper_git(lb, 'branch', 'feature-1')
+        helper_git(lb, 'pack-refs', '--all')
+        helper_git(lb, 'branch', 'feature-2')
+
+        snapshot = get_ref_snapshot(lb)
+        assert snapshot.branches_local == sorted(lb.git.list_branches()['local']) == \
+            ['feature-1', 'feature-2', 'master']
+        assert snapshot.active_branch == 'master'
+        assert snapshot.head == lb.git.commit_hash
+        assert snapshot.local['feature-1'] == snapshot.local['feature-2'] == lb.git.commit_hash
+        assert snapshot.remotes == []
+        assert snapshot.branches_remote == []
+
+    def test_reused_until_refs_change(self, mock_ref_cache):
+        lb, cache = mock_ref_cache
+        snapshot = get_ref_snapshot(lb)
+        hits = cache.hits
+        assert get_ref_snapshot(lb) is snapshot
+        assert cache.hits == hits + 1
+
+        # A commit updates the branch ref
+        with open(f'{lb.root_dir}/code/test.txt', 'wt') as f:
+            f.write('test')
+        lb.sweep_uncommitted_changes()
+        updated = get_ref_snapshot(lb)
+        assert updated is not snapshot
+        assert updated.head == lb.git.commit_hash != snapshot.head
+
+        # Several updates in a row, checkouts and new branches
+        bm = BranchManager(lb, username='test')
+        bm.create_branch('feature-1')
+        assert bm.active_branch == 'feature-1'
+        assert get_ref_snapshot(lb).active_branch == 'feature-1'
+        assert bm.branches_local == ['feature-1', 'master']
+        helper_git(lb, 'checkout', 'master')
+        bm.remove_branch('feature-1')
+        assert bm.branches_local == ['master']
+
+        # Adding a remote
+        helper_git(lb, 'remote', 'add', 'origin', 'https://example.com/test/labbook1.git')
+        assert get_ref_snapshot(lb).remotes == [{'name': 'origin', 'url': 'https://example.com/test/labbook1.git'}]
+
+    def test_remote_branches_and_counts(self, mock_ref_cache, tmpdir):
+        lb, cache = mock_ref_cache
+        remote_dir = str(tmpdir.join('remote.git'))
+        subprocess.run(['git', 'clone', '--bare', lb.root_dir, remote_dir], check=True, stdout=subprocess.PIPE,
+                       stderr=subprocess.PIPE)
+        helper_git(lb, 'remote', 'add', 'origin', remote_dir)
+        helper_git(lb, 'fetch', 'origin')
+        helper_git(lb, 'remote', 'set-head', 'origin', 'master')
+
+        bm = BranchManager(lb, username='test')
+        assert bm.branches_remote == ['master']
+        assert bm.get_commits_ahead_behind() == (0, 0)
+
+        for i in range(2):
+            with open(f'{lb.root_dir}/code/test{i}.txt', 'wt') as f:
+                f.write('test')
+            lb.sweep_uncommitted_changes()
+        assert bm.get_commits_ahead_behind() == (lb.git.count_ahead_behind('master', 'origin/master')[0] // 2, 0)
+        assert bm.refs.ahead_behind[('master', 'origin')] == bm.get_commits_ahead_behind()
+
+        helper_git(lb, 'push', 'origin', 'master')
+        assert bm.get_commits_ahead() == 0
+
+    def test_cache_disabled(self, mock_ref_cache):
+        lb, cache = mock_ref_cache
+        lb.client_config.config['repository_cache']['enabled'] = False
+        hits, misses = cache.hits, cache.misses
+        snapshot = get_ref_snapshot(lb)
+        assert snapshot.branches_local == ['master']
+        assert snapshot.active_branch == 'master'
+        assert get_ref_snapshot(lb) is not snapshot
+        assert (cache.hits, cache.misses) == (hits, misses)
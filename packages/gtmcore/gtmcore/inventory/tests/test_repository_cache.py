@@ -0,0 +1,188 @@
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from gtmcore.inventory.cache import RepositoryCache
+from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.fixtures import mock_config_file
+
+
+@pytest.fixture()
+def mock_cached_inventory(mock_config_file):
+    cache = RepositoryCache.get_instance()
+    cache.clear()
+    yield InventoryManager(), cache
+    cache.clear()
+
+
+class MockPersistentCommand(object):
+    """Stands in for the persistent `git cat-file` process of a GitPython Repo"""
+    def __init__(self):
+        self.stopped = False
+
+    def __del__(self):
+        self.stopped = True
+
+
+def count_yaml_loads():
+    return patch('yaml.safe_load', side_effect=yaml.safe_load)
+
+
+class TestRepositoryCache(object):
+    def test_load_labbook_uses_cache(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        im.create_labbook('test', 'test', 'labbook1', description='my first labbook')
+
+        lb1 = im.load_labbook('test', 'test', 'labbook1')
+        with count_yaml_loads() as mock_load:
+            lb2 = im.load_labbook('test', 'test', 'labbook1')
+            assert mock_load.call_count == 0
+
+        assert lb2.description == 'my first labbook'
+        assert lb2.root_dir == lb1.root_dir
+        # Same thread, so the git handle is shared
+        assert lb2.git.repo is lb1.git.repo
+        # But metadata is not
+        assert lb2.data is not lb1.data
+        lb2.data['description'] = 'modified in memory only'
+        assert im.load_labbook('test', 'test', 'labbook1').description == 'my first labbook'
+
+    def test_load_dataset_uses_cache(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        im.create_dataset('test', 'test', 'dataset1', storage_type='gigantum_object_v1', description='my dataset')
+
+        im.load_dataset('test', 'test', 'dataset1')
+        with count_yaml_loads() as mock_load:
+            ds = im.load_dataset('test', 'test', 'dataset1')
+            assert mock_load.call_count == 0
+        assert ds.description == 'my dataset'
+        assert ds.namespace == 'test'
+
+    def test_invalidated_by_save(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        lb = im.create_labbook('test', 'test', 'labbook1', description='my first labbook')
+        im.load_labbook('test', 'test', 'labbook1')
+
+        lb.description = 'updated'
+        assert im.load_labbook('test', 'test', 'labbook1').description == 'updated'
+
+    def test_invalidated_by_external_change(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        lb = im.create_labbook('test', 'test', 'labbook1', description='my first labbook')
+        im.load_labbook('test', 'test', 'labbook1')
+
+        # Simulate another process editing the file
+        with open(lb.config_path, 'rt') as f:
+            data = yaml.safe_load(f)
+        data['description'] = 'edited elsewhere with a longer description'
+        with open(lb.config_path, 'wt') as f:
+            f.write(yaml.safe_dump(data, default_flow_style=False))
+
+        assert im.load_labbook('test', 'test', 'labbook1').description == data['description']
+
+    def test_invalidated_by_git(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        lb = im.create_labbook('test', 'test', 'labbook1', description='my first labbook')
+        im.load_labbook('test', 'test', 'labbook1')
+        hits = cache.hits
+
+        # Commit moves the current ref
+        with open(os.path.join(lb.root_dir, 'code', 'f.txt'), 'wt') as f:
+            f.write('content')
+        lb.sweep_uncommitted_changes()
+        im.load_labbook('test', 'test', 'labbook1')
+        assert cache.hits == hits
+
+        # Checkout moves HEAD
+        im.load_labbook('test', 'test', 'labbook1')
+        assert cache.hits == hits + 1
+        lb.git.create_branch('other-branch')
+        lb.git.checkout('other-branch')
+        assert im.load_labbook('test', 'test', 'labbook1').active_branch == 'other-branch'
+        assert cache.hits == hits + 1
+
+    def test_invalidate_hook(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        lb = im.create_labbook('test', 'test', 'labbook1', description='my first labbook')
+        im.load_labbook('test', 'test', 'labbook1')
+        assert lb.root_dir in cache
+
+        im.invalidate_cached_repository('test', 'test', 'labbook1')
+        assert lb.root_dir not in cache
+
+    def test_delete(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        lb = im.create_labbook('test', 'test', 'labbook1', description='my first labbook')
+        im.load_labbook('test', 'test', 'labbook1')
+
+        im.delete_labbook('test', 'test', 'labbook1')
+        assert lb.root_dir not in cache
+        with pytest.raises(Exception):
+            im.load_labbook('test', 'test', 'labbook1')
+
+    def test_lru_eviction(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        cache.max_entries = 2
+        try:
+            lbs = [im.create_labbook('test', 'test', f'labbook{i}', description='lb') for i in range(3)]
+            for i in range(3):
+                im.load_labbook('test', 'test', f'labbook{i}')
+            assert len(cache) == 2
+            assert lbs[0].root_dir not in cache
+            assert lbs[2].root_dir in cache
+        finally:
+            cache.max_entries = 64
+
+    def test_dropped_entries_release_git_processes(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        cache.max_entries = 1
+        try:
+            im.create_labbook('test', 'test', 'labbook0', description='lb')
+            im.create_labbook('test', 'test', 'labbook1', description='lb')
+            lb0 = im.load_labbook('test', 'test', 'labbook0')
+            command = MockPersistentCommand()
+            lb0.git.repo.git.cat_file_all = command
+
+            # Evicting the entry stops its persistent cat-file process
+            lb1 = im.load_labbook('test', 'test', 'labbook1')
+            assert command.stopped
+            assert lb0.git.repo.git.cat_file_all is None
+
+            command = MockPersistentCommand()
+            lb1.git.repo.git.cat_file_all = command
+            cache.invalidate(lb1.root_dir)
+            assert command.stopped
+        finally:
+            cache.max_entries = 64
+
+    def test_release_deferred_to_owning_thread(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        lb = im.create_labbook('test', 'test', 'labbook1', description='lb')
+        loaded = im.load_labbook('test', 'test', 'labbook1')
+        command = MockPersistentCommand()
+        loaded.git.repo.git.cat_file_all = command
+
+        thread = threading.Thread(target=lambda: cache.invalidate(lb.root_dir))
+        thread.start()
+        thread.join()
+        assert not command.stopped
+
+        # Released the next time the owning thread uses the cache
+        im.load_labbook('test', 'test', 'labbook1')
+        assert command.stopped
+
+    def test_git_handle_not_shared_across_threads(self, mock_cached_inventory):
+        im, cache = mock_cached_inventory
+        im.create_labbook('test', 'test', 'labbook1', description='my first labbook')
+        lb = im.load_labbook('test', 'test', 'labbook1')
+
+        loaded = list()
+        thread = threading.Thread(target=lambda: loaded.append(im.load_labbook('test', 'test', 'labbook1')))
+        thread.start()
+        thread.join()
+
+        assert loaded[0].description == 'my first labbook'
+        assert loaded[0].git.repo is not lb.git.repo
@@ -22,6 +22,7 @@ class LabBook(Repository):
     _default_activity_type = ActivityType.LABBOOK
     _default_activity_detail_type = ActivityDetailType.LABBOOK
     _default_activity_section = "Project Root"
+    _metadata_files = [os.path.join('.gigantum', 'project.yaml'), os.path.join('.gigantum', 'labbook.yaml')]
 
     def __init__(self, author: Optional[GitAuthor] = None) -> None:
         super().__init__(author)
@@ -134,6 +135,7 @@ class LabBook(Repository):
         with open(self.config_path, 'wt') as lbfile:
             lbfile.write(yaml.safe_dump(self._data, default_flow_style=False))
             lbfile.flush()
+        self._invalidate_cache()
 
     def _load_gigantum_data(self) -> None:
         """Method to load the labbook YAML file to a dictionary
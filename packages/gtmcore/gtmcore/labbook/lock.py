@@ -18,8 +18,9 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 import redis_lock
-from redis import StrictRedis
 
+from gtmcore.locking import get_lock_redis_client
+from gtmcore.locking.lock import READERS_KEY_PREFIX, HOLDER_KEY_PREFIX
 from gtmcore.logging import LMLogger
 
 logger = LMLogger.get_logger()
@@ -37,8 +38,10 @@ def reset_all_locks(config: dict) -> None:
         None
 
     """
-    client = StrictRedis(host=config['redis']['host'],
-                         port=config['redis']['port'],
-                         db=config['redis']['db'])
+    client = get_lock_redis_client(config)
 
     redis_lock.reset_all(client)
+    for prefix in [READERS_KEY_PREFIX, HOLDER_KEY_PREFIX]:
+        keys = list(client.scan_iter(match=f'{prefix}*'))
+        if keys:
+            client.delete(*keys)
@@ -0,0 +1 @@
+from gtmcore.locking.lock import ReadWriteLock, get_lock_redis_client, caller_operation, describe_lock_metrics
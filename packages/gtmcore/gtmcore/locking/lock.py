@@ -0,0 +1,317 @@
+import contextlib
+import os
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+import redis
+import redis_lock
+from redis import StrictRedis
+
+from gtmcore.configuration import Configuration
+from gtmcore.exceptions import GigantumLockedException
+from gtmcore.logging import LMLogger
+from gtmcore.metrics import MetricsRegistry
+
+logger = LMLogger.get_logger()
+
+LOCK_WAIT_METRIC = 'gigantum_lock_wait_seconds'
+LOCK_HOLD_METRIC = 'gigantum_lock_hold_seconds'
+LOCK_ACQUISITIONS_METRIC = 'gigantum_lock_acquisitions_total'
+LOCK_CONTENDED_METRIC = 'gigantum_lock_contended_total'
+LOCK_WAIT_TOTAL_METRIC = 'gigantum_lock_wait_seconds_total'
+LOCK_HOLD_TOTAL_METRIC = 'gigantum_lock_hold_seconds_total'
+
+# Prefixes of the keys kept next to the keys of `redis_lock` (`lock:<name>` and `lock-signal:<name>`)
+READERS_KEY_PREFIX = 'lock-readers:'
+HOLDER_KEY_PREFIX = 'lock-holder:'
+STATS_KEY_PREFIX = 'lock-stats:'
+
+# Statistics of a lock are dropped once it hasn't been used for this many seconds
+STATS_TTL = 7 * 24 * 3600
+
+# Connection pools of the lock database, by (host, port, db)
+_pools: Dict[Tuple[str, int, int], redis.ConnectionPool] = dict()
+_pools_lock = threading.Lock()
+
+
+def get_lock_redis_client(config: dict) -> StrictRedis:
+    """Get a client for the lock database
+
+    All clients of a process share one connection pool, so taking a lock doesn't open a new connection. The pool
+    handles forks (e.g. background job workers) by discarding connections inherited from the parent.
+
+    Args:
+        config(dict): The configuration details for the 'lock' section of the config file
+
+    Returns:
+        StrictRedis
+    """
+    pool_key = (config['redis']['host'], config['redis']['port'], config['redis']['db'])
+    with _pools_lock:
+        pool = _pools.get(pool_key)
+        if pool is None:
+            pool = redis.ConnectionPool(host=pool_key[0], port=pool_key[1], db=pool_key[2])
+            _pools[pool_key] = pool
+    return StrictRedis(connection_pool=pool)
+
+
+def caller_operation(*skip_files: str) -> str:
+    """Get a name for the operation taking a lock, from the first calling frame outside of the locking code
+
+    Methods are named `<class>.<method>` (e.g. `CreateBranch.mutate_and_get_payload`) when the class can be found
+    from `self` or `cls`.
+
+    Args:
+        *skip_files: Additional source files of frames to skip
+
+    Returns:
+        str
+    """
+    skipped = {__file__, contextlib.__file__, *skip_files}
+    frame = sys._getframe(1)
+    while frame.f_back is not None and frame.f_code.co_filename in skipped:
+        frame = frame.f_back
+
+    owner = frame.f_locals.get('cls', None)
+    if not isinstance(owner, type):
+        instance = frame.f_locals.get('self', None)
+        owner = type(instance) if instance is not None else None
+    name = frame.f_code.co_name
+    return f"{owner.__name__}.{name}" if owner is not None else name
+
+
+def describe_lock_metrics(registry: MetricsRegistry, config: Configuration) -> None:
+    """Set the help text of the lock metrics, and report the lock statistics of all processes from Redis
+
+    Args:
+        registry: registry rendered by the metrics endpoint
+        config: Configuration instance
+
+    Returns:
+        None
+    """
+    registry.describe(LOCK_WAIT_METRIC, 'histogram', 'Time spent waiting for a lock in this process, by mode')
+    registry.describe(LOCK_HOLD_METRIC, 'histogram',
+                      'Time a lock was held in this process, by mode and holding operation')
+    registry.describe(LOCK_ACQUISITIONS_METRIC, 'counter', 'Number of times a lock was acquired, by lock')
+    registry.describe(LOCK_CONTENDED_METRIC, 'counter',
+                      'Number of times a lock was already held when it was requested, by lock')
+    registry.describe(LOCK_WAIT_TOTAL_METRIC, 'counter', 'Total time spent waiting for a lock, by lock')
+    registry.describe(LOCK_HOLD_TOTAL_METRIC, 'counter', 'Total time a lock was held, by lock')
+
+    lock_config = config.config['lock']
+    metric_names = {'acquired': LOCK_ACQUISITIONS_METRIC, 'contended': LOCK_CONTENDED_METRIC,
+                    'wait': LOCK_WAIT_TOTAL_METRIC, 'hold': LOCK_HOLD_TOTAL_METRIC}
+
+    def collect() -> List[Tuple[str, Dict[str, str], float]]:
+        client = get_lock_redis_client(lock_config)
+        names = [k.decode()[len(STATS_KEY_PREFIX):] for k in client.scan_iter(match=f'{STATS_KEY_PREFIX}*')]
+        pipeline = client.pipeline(transaction=False)
+        for name in names:
+            pipeline.hgetall(f'{STATS_KEY_PREFIX}{name}')
+
+        samples = list()
+        for name, stats in zip(names, pipeline.execute()):
+            for field, value in stats.items():
+                metric = metric_names.get(field.decode())
+                if metric:
+                    samples.append((metric, {'lock': name}, float(value)))
+        return samples
+
+    registry.register_collector(collect)
+
+
+class ReadWriteLock(object):
+    """A Redis lock that is held either exclusively by one operation, or shared by any number of readers
+
+    The exclusive lock is a `redis_lock.Lock`. A reader takes it only briefly, to add itself to a sorted set of
+    readers (scored by the time its lease expires), so readers queue behind a waiting writer instead of starving it.
+    A writer keeps the exclusive lock and waits for the current readers to leave. Readers that crashed are
+    forgotten once their lease (`shared_expire`) runs out.
+
+    The operation holding the lock is recorded in Redis, so a contended wait can be attributed. Wait and hold times
+    are recorded in the metrics registry of the process, and counted per lock in Redis so the contention of locks
+    taken by background jobs can be reported too.
+    """
+    def __init__(self, name: str, config: Configuration, operation: str) -> None:
+        """
+
+        Args:
+            name: Name of the lock
+            config: Configuration instance
+            operation: Name of the operation taking the lock
+        """
+        self.name = name
+        self.operation = operation
+        self.config = config.config['lock']
+        self.client = get_lock_redis_client(self.config)
+        self.registry = MetricsRegistry.get_instance(config)
+
+        self.shared = False
+        self._id = uuid.uuid4().hex
+        self._mutex = redis_lock.Lock(self.client, name, expire=self.config['expire'],
+                                      auto_renewal=self.config['auto_renewal'], strict=self.config['redis']['strict'])
+        self._held = False
+        self._acquired_at = 0.0
+        self._wait = 0.0
+        self._contended = False
+
+    @property
+    def _readers_key(self) -> str:
+        return f'{READERS_KEY_PREFIX}{self.name}'
+
+    @property
+    def _holder_key(self) -> str:
+        return f'{HOLDER_KEY_PREFIX}{self.name}'
+
+    @property
+    def _reader_member(self) -> str:
+        return f'{self.operation}|{os.getpid()}|{self._id}'
+
+    def holders(self) -> List[str]:
+        """Get the operations currently holding the lock
+
+        Returns:
+            list of `<operation> (pid <pid>)`
+        """
+        pipeline = self.client.pipeline(transaction=False)
+        pipeline.get(self._holder_key)
+        pipeline.zrangebyscore(self._readers_key, time.time(), '+inf')
+        holder, readers = pipeline.execute()
+
+        result = list()
+        if holder is not None:
+            operation, pid = holder.decode().rsplit('|', 1)
+            result.append(f'{operation} (pid {pid})')
+        for member in readers:
+            reader_operation, reader_pid, _ = member.decode().rsplit('|', 2)
+            result.append(f'{reader_operation} (pid {reader_pid}, shared)')
+        return result
+
+    def _acquire_mutex(self, failfast: bool) -> None:
+        if self._mutex.acquire(blocking=False):
+            return
+
+        self._contended = True
+        holders = self.holders()
+        logger.info(f"Waiting for lock {self.name} held by {', '.join(holders) or 'an unknown operation'}")
+        if failfast:
+            raise GigantumLockedException("Cannot interrupt operation in progress")
+        if not self._mutex.acquire(timeout=self.config['timeout']):
+            raise IOError(f"Could not acquire file system lock within {self.config['timeout']} seconds.")
+
+    def _wait_for_readers(self, failfast: bool, deadline: float) -> None:
+        delay = 0.01
+        while True:
+            pipeline = self.client.pipeline(transaction=False)
+            pipeline.zremrangebyscore(self._readers_key, '-inf', time.time())
+            pipeline.zcard(self._readers_key)
+            if pipeline.execute()[1] == 0:
+                return
+
+            if not self._contended:
+                self._contended = True
+                logger.info(f"Waiting for lock {self.name} held by {', '.join(self.holders())}")
+            if failfast:
+                raise GigantumLockedException("Cannot interrupt operation in progress")
+            if time.time() > deadline:
+                raise IOError(f"Could not acquire file system lock within {self.config['timeout']} seconds.")
+            time.sleep(delay)
+            delay = min(delay * 2, 0.2)
+
+    def acquire(self, shared: bool = False, failfast: bool = False) -> None:
+        """Acquire the lock
+
+        Args:
+            shared: Take a shared (read) lock instead of the exclusive one
+            failfast: Raise GigantumLockedException right away if the lock is held, instead of waiting
+
+        Raises:
+            GigantumLockedException: If the lock is held and failfast is True
+            IOError: If the lock can't be acquired within the configured timeout
+        """
+        start = time.perf_counter()
+        deadline = time.time() + self.config['timeout']
+        self.shared = shared
+        self._contended = False
+        try:
+            self._acquire_mutex(failfast)
+        except Exception:
+            self._record_stats(acquired=False)
+            raise
+
+        try:
+            if shared:
+                self.client.zadd(self._readers_key, {self._reader_member: time.time() + self.config['shared_expire']})
+            else:
+                self.client.set(self._holder_key, f'{self.operation}|{os.getpid()}')
+                self._wait_for_readers(failfast, deadline)
+        except Exception:
+            self._release_mutex()
+            self._record_stats(acquired=False)
+            raise
+
+        if shared:
+            # Readers only hold the exclusive lock while joining
+            self._release_mutex()
+
+        self._held = True
+        self._acquired_at = time.perf_counter()
+        self._wait = self._acquired_at - start
+        if self._wait > 1.0:
+            logger.warning(f"{self.operation} waited {self._wait:.1f}s for lock {self.name}")
+
+    def _release_mutex(self) -> None:
+        if not self.shared:
+            try:
+                self.client.delete(self._holder_key)
+            except redis.exceptions.RedisError as err:
+                logger.error(err)
+        try:
+            self._mutex.release()
+        except redis_lock.NotAcquired as e:
+            # if you didn't get the lock and an error occurs, you probably won't be able to release, so log.
+            logger.error(e)
+
+    def release(self) -> None:
+        """Release the lock, if held"""
+        if not self._held:
+            return
+        self._held = False
+
+        hold = time.perf_counter() - self._acquired_at
+        limit = self.config['shared_expire'] if self.shared else self.config['expire']
+        if limit and hold > limit:
+            logger.error(f"Task took more than {limit}s. File locking possibly invalid.")
+
+        if self.shared:
+            self.client.zrem(self._readers_key, self._reader_member)
+        else:
+            self._release_mutex()
+        self._record_stats(acquired=True, hold=hold)
+
+    def _record_stats(self, acquired: bool, hold: float = 0.0) -> None:
+        if not self.registry:
+            return
+
+        mode = 'shared' if self.shared else 'exclusive'
+        if acquired:
+            self.registry.observe(LOCK_WAIT_METRIC, self._wait, mode=mode)
+            self.registry.observe(LOCK_HOLD_METRIC, hold, mode=mode, operation=self.operation)
+
+        stats_key = f'{STATS_KEY_PREFIX}{self.name}'
+        try:
+            pipeline = self.client.pipeline(transaction=False)
+            if acquired:
+                pipeline.hincrby(stats_key, 'acquired', 1)
+                pipeline.hincrbyfloat(stats_key, 'wait', self._wait)
+                pipeline.hincrbyfloat(stats_key, 'hold', hold)
+            if self._contended:
+                pipeline.hincrby(stats_key, 'contended', 1)
+            pipeline.expire(stats_key, STATS_TTL)
+            pipeline.execute()
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to record statistics of lock {self.name}: {err}")
@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+from gtmcore.exceptions import GigantumLockedException
+from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.labbook.lock import reset_all_locks
+from gtmcore.locking import ReadWriteLock, get_lock_redis_client, caller_operation, describe_lock_metrics
+from gtmcore.locking.lock import LOCK_HOLD_METRIC, STATS_KEY_PREFIX, READERS_KEY_PREFIX
+from gtmcore.metrics import MetricsRegistry
+from gtmcore.fixtures import mock_config_file
+
+
+@pytest.fixture()
+def mock_locked_labbook(mock_config_file):
+    lb = InventoryManager().create_labbook('test', 'test', 'labbook1', description='locking')
+    registry = MetricsRegistry.get_instance(lb.client_config)
+    registry.reset()
+    lock_key = f'filesystem_lock|{lb.key}'
+    client = get_lock_redis_client(lb.client_config.config['lock'])
+    client.delete(f'{STATS_KEY_PREFIX}{lock_key}')
+    yield lb, lock_key, registry
+    reset_all_locks(lb.client_config.config['lock'])
+
+
+class Exporter(object):
+    def export(self) -> str:
+        return caller_operation()
+
+
+def helper_hold_lock(lb, shared: bool, hold: float, operation: str) -> threading.Thread:
+    """Hold the lock of a repository from another thread until `hold` seconds have passed"""
+    acquired = threading.Event()
+
+    def hold_lock():
+        with lb.lock(shared=shared, operation=operation):
+            acquired.set()
+            time.sleep(hold)
+
+    thread = threading.Thread(target=hold_lock)
+    thread.start()
+    assert acquired.wait(5)
+    return thread
+
+
+class TestReadWriteLock(object):
+    def test_shared_client_pool(self, mock_config_file):
+        lock_config = mock_config_file[0].config['lock']
+        assert get_lock_redis_client(lock_config).connection_pool is \
+            get_lock_redis_client(lock_config).connection_pool
+
+    def test_caller_operation(self):
+        assert Exporter().export() == 'Exporter.export'
+        assert caller_operation() == 'TestReadWriteLock.test_caller_operation'
+
+    def test_shared_locks(self, mock_locked_labbook):
+        lb, lock_key, registry = mock_locked_labbook
+        with lb.lock(shared=True):
+            # Other readers don't wait, writers do
+            with lb.lock(shared=True, failfast=True):
+                pass
+            with pytest.raises(GigantumLockedException):
+                with lb.lock(failfast=True):
+                    assert False, "Should not be able to acquire lock"
+
+        with lb.lock():
+            with pytest.raises(GigantumLockedException):
+                with lb.lock(shared=True, failfast=True):
+                    assert False, "Should not be able to acquire lock"
+
+    def test_writer_waits_for_readers(self, mock_locked_labbook):
+        lb, lock_key, registry = mock_locked_labbook
+        reader = helper_hold_lock(lb, shared=True, hold=0.5, operation='export')
+        start = time.time()
+        with lb.lock():
+            assert time.time() - start >= 0.4
+            holders = ReadWriteLock(lock_key, lb.client_config, 'test').holders()
+            assert holders[0].startswith('TestReadWriteLock.test_writer_waits_for_readers (pid')
+        reader.join()
+
+    def test_abandoned_reader(self, mock_locked_labbook):
+        lb, lock_key, registry = mock_locked_labbook
+        client = get_lock_redis_client(lb.client_config.config['lock'])
+        client.zadd(f'{READERS_KEY_PREFIX}{lock_key}', {'crashed|1|abc': time.time() - 1})
+        with lb.lock(failfast=True):
+            pass
+
+    def test_telemetry(self, mock_locked_labbook):
+        lb, lock_key, registry = mock_locked_labbook
+        describe_lock_metrics(registry, lb.client_config)
+
+        writer = helper_hold_lock(lb, shared=False, hold=0.3, operation='sweep')
+        with lb.lock(shared=True, operation='export'):
+            pass
+        writer.join()
+
+        stats = get_lock_redis_client(lb.client_config.config['lock']).hgetall(f'{STATS_KEY_PREFIX}{lock_key}')
+        assert int(stats[b'acquired']) == 2
+        assert int(stats[b'contended']) == 1
+        assert 0.2 <= float(stats[b'wait']) < 5
+
+        assert registry.histogram(LOCK_HOLD_METRIC, mode='exclusive', operation='sweep').count == 1
+        assert registry.histogram(LOCK_HOLD_METRIC, mode='shared', operation='export').count == 1
+
+        rendered = registry.render()
+        assert f'gigantum_lock_contended_total{{lock="{lock_key}"}} 1.0' in rendered
+        assert f'gigantum_lock_acquisitions_total{{lock="{lock_key}"}} 2.0' in rendered
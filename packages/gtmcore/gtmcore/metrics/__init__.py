@@ -0,0 +1,3 @@
+from gtmcore.metrics.registry import MetricsRegistry, Histogram, Counter
+from gtmcore.metrics.instrumentation import install_process_counters, GIT_PROCESSES_METRIC, REDIS_ROUND_TRIPS_METRIC
+from gtmcore.metrics.profiler import SamplingProfiler
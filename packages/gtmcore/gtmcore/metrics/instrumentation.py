@@ -0,0 +1,77 @@
+import os
+import sys
+import threading
+from typing import Any, Optional, Tuple
+
+import redis.connection
+
+from gtmcore.metrics.registry import MetricsRegistry
+
+GIT_PROCESSES_METRIC = 'gigantum_git_processes_total'
+REDIS_ROUND_TRIPS_METRIC = 'gigantum_redis_round_trips_total'
+
+# Registry the process counters record in, once installed
+_registry: Optional[MetricsRegistry] = None
+_install_lock = threading.Lock()
+
+
+def _git_subcommand(args: Any) -> Optional[str]:
+    """Get the subcommand (e.g. `status`) of a git command line, skipping global options
+
+    Returns:
+        the subcommand, or None if the command is not git
+    """
+    if isinstance(args, (str, bytes, os.PathLike)) or not args:
+        # A program without arguments or a shell command line
+        return None
+    parts = [os.fsdecode(a) if isinstance(a, (bytes, os.PathLike)) else str(a) for a in args]
+    if os.path.basename(parts[0]) != 'git':
+        return None
+
+    i = 1
+    while i < len(parts) and parts[i].startswith('-'):
+        # Options taking a separate value
+        i += 2 if parts[i] in ('-C', '-c', '--git-dir', '--work-tree') else 1
+    return parts[i] if i < len(parts) else ''
+
+
+def install_process_counters(registry: MetricsRegistry) -> None:
+    """Count the git processes started and the Redis round trips made by this process
+
+    Git processes are counted from the `subprocess.Popen` audit event, so commands run by GitPython, `call_subprocess`
+    and direct `subprocess` use are all included. Redis round trips are counted when a command, or a whole pipeline,
+    is sent on a connection. The hooks are installed once per process, later calls only change the registry the
+    counts are recorded in.
+
+    Args:
+        registry: registry to record the counts in
+
+    Returns:
+        None
+    """
+    global _registry
+    registry.describe(GIT_PROCESSES_METRIC, 'counter', 'Number of git processes started, by subcommand')
+    registry.describe(REDIS_ROUND_TRIPS_METRIC, 'counter', 'Number of commands or pipelines sent to Redis')
+    with _install_lock:
+        installed = _registry is not None
+        _registry = registry
+        if installed:
+            return
+
+    def audit_hook(event: str, event_args: Tuple[Any, ...]) -> None:
+        if event != 'subprocess.Popen' or _registry is None:
+            return
+        subcommand = _git_subcommand(event_args[1])
+        if subcommand is not None:
+            _registry.increment(GIT_PROCESSES_METRIC, command=subcommand)
+
+    sys.addaudithook(audit_hook)
+
+    send_packed_command = redis.connection.Connection.send_packed_command
+
+    def counting_send_packed_command(self, *args, **kwargs):
+        if _registry is not None:
+            _registry.increment(REDIS_ROUND_TRIPS_METRIC)
+        return send_packed_command(self, *args, **kwargs)
+
+    redis.connection.Connection.send_packed_command = counting_send_packed_command  # type: ignore
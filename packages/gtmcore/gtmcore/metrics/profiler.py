@@ -0,0 +1,213 @@
+import glob
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter as FrameCounter
+from typing import Dict, List, Optional, Any
+
+from gtmcore.configuration import Configuration
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# Profiles are named <unix time in ms>-<pid>-<operation>-<duration in ms>.folded
+PROFILE_NAME_RE = re.compile(r'^(?P<timestamp>\d+)-(?P<pid>\d+)-(?P<operation>[A-Za-z0-9_]+)-'
+                             r'(?P<duration>\d+)\.folded$')
+
+
+class ProfileSession(object):
+    """The samples collected for one profiled thread"""
+    def __init__(self, thread_id: int) -> None:
+        self.thread_id = thread_id
+        self.start = time.perf_counter()
+        self.stacks: FrameCounter = FrameCounter()
+
+
+def _frame_label(frame: Any) -> str:
+    code = frame.f_code
+    filename = '/'.join(code.co_filename.split(os.sep)[-2:])
+    # `;` separates frames in the folded format
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(';', ':')
+
+
+def _folded_stack(frame: Any) -> str:
+    labels = list()
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class _Sampler(object):
+    """A background thread sampling the stacks of the threads being profiled
+
+    The thread only runs while at least one session is active, so the profiler costs nothing between profiled
+    requests. Each sampling pass holds the lock, so once `remove()` returns a session's samples are final.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: Dict[int, ProfileSession] = dict()
+        self._thread: Optional[threading.Thread] = None
+        self.interval = 0.005
+
+    def add(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions[id(session)] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='gigantum-profiler', daemon=True)
+                self._thread.start()
+
+    def remove(self, session: ProfileSession) -> None:
+        with self._lock:
+            self._sessions.pop(id(session), None)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+
+                frames = sys._current_frames()
+                for session in self._sessions.values():
+                    frame = frames.get(session.thread_id)
+                    if frame is not None:
+                        session.stacks[_folded_stack(frame)] += 1
+                del frames
+
+
+_sampler = _Sampler()
+
+
+class SamplingProfiler(object):
+    """Statistical profiler for slow requests
+
+    Every request is sampled while it runs. When a request takes longer than the threshold its samples are written,
+    in the folded stack format read by flamegraph tools (e.g. `flamegraph.pl` or speedscope), to the profile
+    directory, which keeps the most recent `max_profiles` profiles. Faster requests are discarded.
+    """
+    def __init__(self, directory: str, threshold: float = 2.0, interval: float = 0.005, max_profiles: int = 20) -> None:
+        """
+
+        Args:
+            directory: directory to store profiles in
+            threshold: minimum duration of a request, in seconds, for its profile to be kept
+            interval: seconds between samples
+            max_profiles: number of profiles to keep
+        """
+        self.directory = directory
+        self.threshold = threshold
+        self.interval = interval
+        self.max_profiles = max_profiles
+
+    @classmethod
+    def get_instance(cls, config: Optional[Configuration] = None) -> Optional['SamplingProfiler']:
+        """Method to get a profiler configured from the `profiler` configuration section
+
+        Args:
+            config: Optional Configuration instance
+
+        Returns:
+            SamplingProfiler, or None if profiling is disabled
+        """
+        config = config or Configuration()
+        profiler_config = config.config['profiler']
+        if not profiler_config['enabled']:
+            return None
+
+        return cls(os.path.join(config.app_workdir, '.labmanager', 'profiles'),
+                   threshold=profiler_config['threshold'],
+                   interval=profiler_config['interval'],
+                   max_profiles=profiler_config['max_profiles'])
+
+    def start(self) -> ProfileSession:
+        """Start sampling the current thread
+
+        Returns:
+            ProfileSession
+        """
+        session = ProfileSession(threading.get_ident())
+        _sampler.interval = self.interval
+        _sampler.add(session)
+        return session
+
+    def stop(self, session: ProfileSession, operation: str) -> Optional[str]:
+        """Stop sampling, and store the profile if the request was slow
+
+        Args:
+            session: session returned by `start()`
+            operation: name of the profiled operation
+
+        Returns:
+            name of the stored profile, or None if it was discarded
+        """
+        _sampler.remove(session)
+        duration = time.perf_counter() - session.start
+        if duration < self.threshold or not session.stacks:
+            return None
+
+        operation = re.sub(r'[^A-Za-z0-9_]', '_', operation) or 'unknown'
+        name = f"{int(time.time() * 1000)}-{os.getpid()}-{operation}-{int(duration * 1000)}.folded"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = os.path.join(self.directory, f".{name}.tmp")
+            with open(tmp_path, 'wt') as f:
+                for stack, count in session.stacks.most_common():
+                    f.write(f"{stack} {count}\n")
+            os.replace(tmp_path, os.path.join(self.directory, name))
+            self._prune()
+        except OSError as err:
+            logger.warning(f"Failed to store profile of {operation}: {err}")
+            return None
+
+        logger.info(f"Stored profile {name} of {operation} ({sum(session.stacks.values())} samples)")
+        return name
+
+    def _prune(self) -> None:
+        names = sorted([os.path.basename(p) for p in glob.glob(os.path.join(self.directory, '*.folded'))
+                        if PROFILE_NAME_RE.match(os.path.basename(p))])
+        for name in names[:-self.max_profiles] if self.max_profiles > 0 else names:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                # Removed by another process
+                pass
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        """List the stored profiles, most recent first
+
+        Returns:
+            list of dicts with the name, operation, duration_ms, timestamp (unix time in ms) and size of each profile
+        """
+        profiles = list()
+        for path in glob.glob(os.path.join(self.directory, '*.folded')):
+            match = PROFILE_NAME_RE.match(os.path.basename(path))
+            if not match:
+                continue
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                continue
+            profiles.append({'name': os.path.basename(path),
+                             'operation': match.group('operation'),
+                             'duration_ms': int(match.group('duration')),
+                             'timestamp': int(match.group('timestamp')),
+                             'size': size})
+        return sorted(profiles, key=lambda p: p['name'], reverse=True)
+
+    def profile_path(self, name: str) -> Optional[str]:
+        """Get the path of a stored profile
+
+        Args:
+            name: name of the profile, as returned by `list_profiles()`
+
+        Returns:
+            absolute path, or None if there is no such profile
+        """
+        if not PROFILE_NAME_RE.match(name):
+            return None
+        path = os.path.join(self.directory, name)
+        return path if os.path.isfile(path) else None
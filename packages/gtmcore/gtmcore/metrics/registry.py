@@ -0,0 +1,288 @@
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from gtmcore.configuration import Configuration
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# Labels of a series, as sorted (name, value) pairs
+Labels = Tuple[Tuple[str, str], ...]
+
+# Samples reported by a collector, as (metric name, labels, value)
+Samples = List[Tuple[str, Dict[str, str], float]]
+
+# Label value used once a metric has reached its maximum number of series
+OVERFLOW_LABEL_VALUE = '__other__'
+
+# Bucket boundaries (in seconds) of histograms in the Prometheus output
+EXPORT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram(object):
+    """A histogram of durations with logarithmic buckets, in the style of an HDR histogram
+
+    Every power of two between `min_value` and `max_value` is split into `sub_buckets` buckets, so a value is stored
+    with a relative error of at most 2**(1/sub_buckets) - 1 (~9% with the default of 8) using a fixed, small amount of
+    memory. Values outside the range are clamped into the first or last bucket. The count, sum and maximum are exact.
+    """
+    def __init__(self, min_value: float = 1e-5, max_value: float = 600.0, sub_buckets: int = 8) -> None:
+        """
+
+        Args:
+            min_value: lower bound of the first bucket, in seconds
+            max_value: values above this are counted in the last bucket
+            sub_buckets: number of buckets per power of two
+        """
+        self.min_value = min_value
+        self.sub_buckets = sub_buckets
+        self._num_buckets = int(math.ceil(math.log2(max_value / min_value) * sub_buckets)) + 1
+        self._counts = [0] * self._num_buckets
+        self._lock = threading.Lock()
+
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.min_value:
+            return 0
+        return min(int(math.log2(value / self.min_value) * self.sub_buckets), self._num_buckets - 1)
+
+    def upper_bound(self, index: int) -> float:
+        """Get the upper bound of a bucket"""
+        return self.min_value * 2 ** ((index + 1) / self.sub_buckets)
+
+    def record(self, value: float) -> None:
+        """Record a value, in seconds"""
+        index = self._index(value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def snapshot(self) -> Tuple[List[int], int, float]:
+        """Get a consistent copy of the bucket counts, count and sum"""
+        with self._lock:
+            return list(self._counts), self.count, self.sum
+
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile from the buckets
+
+        Args:
+            q: quantile, between 0 and 1
+
+        Returns:
+            upper bound of the bucket containing the quantile (capped to the maximum value), or 0 if empty
+        """
+        with self._lock:
+            counts = list(self._counts)
+            total, maximum = self.count, self.max
+        if total == 0:
+            return 0.0
+
+        rank = max(1, int(math.ceil(q * total)))
+        seen = 0
+        for index, count in enumerate(counts):
+            seen += count
+            if seen >= rank:
+                return min(self.upper_bound(index), maximum)
+        return maximum
+
+    def cumulative_counts(self, boundaries: Tuple[float, ...], counts: Optional[List[int]] = None) -> List[int]:
+        """Get the number of values in buckets whose upper bound is at most each boundary
+
+        Args:
+            boundaries: increasing boundaries, in seconds
+            counts: bucket counts from `snapshot()`, or None to use the current counts
+
+        Returns:
+            cumulative count for each boundary
+        """
+        if counts is None:
+            counts = self.snapshot()[0]
+
+        result = list()
+        index = 0
+        cumulative = 0
+        for boundary in boundaries:
+            # Allow for floating point error when a bucket bound coincides with a boundary
+            while index < len(counts) and self.upper_bound(index) <= boundary * (1 + 1e-9):
+                cumulative += counts[index]
+                index += 1
+            result.append(cumulative)
+        return result
+
+
+class Counter(object):
+    """A monotonically increasing count"""
+    def __init__(self) -> None:
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def increment(self, amount: int = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join([f'{name}="{_escape(value)}"' for name, value in pairs]) + '}'
+
+
+class MetricsRegistry(object):
+    """In-process registry of counters and histograms, rendered in the Prometheus text format
+
+    Each process (e.g. each API worker) has its own registry, so a scrape reports the process that served it.
+    The number of series of each metric is capped, further label combinations are counted under a single series
+    whose label values are `__other__`.
+    """
+    _instance: Optional['MetricsRegistry'] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, max_series: int = 2000) -> None:
+        """
+
+        Args:
+            max_series: maximum number of label combinations per metric
+        """
+        self.max_series = max_series
+        self._lock = threading.Lock()
+        # name -> (type, help)
+        self._descriptions: Dict[str, Tuple[str, str]] = dict()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = dict()
+        self._counters: Dict[str, Dict[Labels, Counter]] = dict()
+        self._collectors: List[Callable[[], Samples]] = list()
+
+    @classmethod
+    def get_instance(cls, config: Optional[Configuration] = None) -> Optional['MetricsRegistry']:
+        """Method to get the registry for this process
+
+        Args:
+            config: Optional Configuration instance
+
+        Returns:
+            MetricsRegistry, or None if metrics are disabled
+        """
+        metrics_config = (config or Configuration()).config['metrics']
+        if not metrics_config['enabled']:
+            return None
+
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls(max_series=metrics_config['max_series'])
+            return cls._instance
+
+    def describe(self, name: str, metric_type: str, help_text: str) -> None:
+        """Set the type (counter or histogram) and help text of a metric"""
+        self._descriptions[name] = (metric_type, help_text)
+
+    def _series(self, metrics: Dict[str, Dict[Labels, object]], name: str, labels: Dict[str, str], factory) -> object:
+        key: Labels = tuple(sorted(labels.items()))
+        series = metrics.get(name)
+        if series is not None:
+            existing = series.get(key)
+            if existing is not None:
+                return existing
+
+        with self._lock:
+            series = metrics.setdefault(name, dict())
+            if key not in series and len(series) >= self.max_series:
+                key = tuple([(label, OVERFLOW_LABEL_VALUE) for label, _ in key])
+            if key not in series:
+                series[key] = factory()
+            return series[key]
+
+    def register_collector(self, collector: Callable[[], Samples]) -> None:
+        """Add a function called on every render to report values kept outside of the registry (e.g. in Redis)
+
+        Args:
+            collector: function returning a list of (metric name, labels, value) samples
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        """Get (or create) the histogram of a metric for a set of labels"""
+        return self._series(self._histograms, name, labels, Histogram)  # type: ignore
+
+    def counter(self, name: str, **labels: str) -> Counter:
+        """Get (or create) the counter of a metric for a set of labels"""
+        return self._series(self._counters, name, labels, Counter)  # type: ignore
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """Record a duration, in seconds, in a histogram"""
+        self.histogram(name, **labels).record(value)
+
+    def increment(self, name: str, amount: int = 1, **labels: str) -> None:
+        """Increment a counter"""
+        self.counter(name, **labels).increment(amount)
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (version 0.0.4)
+
+        Returns:
+            str
+        """
+        lines = list()
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            collectors = list(self._collectors)
+
+        collected: Dict[str, List[Tuple[Labels, float]]] = dict()
+        for collector in collectors:
+            try:
+                samples = collector()
+            except Exception as err:
+                logger.warning(f"Failed to collect metrics from {collector}: {err}")
+                continue
+            for name, sample_labels, value in samples:
+                collected.setdefault(name, list()).append((tuple(sorted(sample_labels.items())), value))
+
+        for name in sorted(counters):
+            metric_type, help_text = self._descriptions.get(name, ('counter', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, counter in sorted(counters[name].items()):
+                lines.append(f'{name}{_format_labels(labels)} {counter.value}')
+
+        for name in sorted(collected):
+            metric_type, help_text = self._descriptions.get(name, ('gauge', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in sorted(collected[name]):
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+
+        for name in sorted(histograms):
+            metric_type, help_text = self._descriptions.get(name, ('histogram', ''))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, histogram in sorted(histograms[name].items()):
+                bucket_counts, count, total = histogram.snapshot()
+                for boundary, cumulative in zip(EXPORT_BUCKETS,
+                                                histogram.cumulative_counts(EXPORT_BUCKETS, bucket_counts)):
+                    lines.append(f'{name}_bucket{_format_labels(labels, ("le", repr(boundary)))} {cumulative}')
+                lines.append(f'{name}_bucket{_format_labels(labels, ("le", "+Inf"))} {count}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {total}')
+                lines.append(f'{name}_count{_format_labels(labels)} {count}')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self) -> None:
+        """Remove all recorded values"""
+        with self._lock:
+            self._counters = dict()
+            self._histograms = dict()
@@ -0,0 +1,174 @@
+import os
+import subprocess
+import threading
+import time
+
+import redis
+
+from gtmcore.fixtures import mock_config_file
+
+from gtmcore.metrics import MetricsRegistry, Histogram, install_process_counters, GIT_PROCESSES_METRIC, \
+    REDIS_ROUND_TRIPS_METRIC, SamplingProfiler
+from gtmcore.metrics.instrumentation import _git_subcommand
+
+
+class TestHistogram(object):
+    def test_quantiles(self):
+        histogram = Histogram()
+        for i in range(1, 1001):
+            histogram.record(i / 1000)
+
+        assert histogram.count == 1000
+        assert abs(histogram.sum - 500.5) < 1e-6
+        assert histogram.max == 1.0
+        # Relative error is bounded by the bucket width
+        for q in [0.5, 0.9, 0.99]:
+            assert q <= histogram.quantile(q) <= q * 2 ** (1 / 8) + 1e-9
+        assert histogram.quantile(1.0) == 1.0
+        assert Histogram().quantile(0.5) == 0.0
+
+    def test_clamping_and_cumulative_counts(self):
+        histogram = Histogram(min_value=1e-3, max_value=1.0)
+        for value in [0.0, 0.0005, 0.003, 0.02, 0.02, 0.4, 5000.0]:
+            histogram.record(value)
+        # Values below the minimum are in the first bucket, which ends just above it
+        assert histogram.cumulative_counts((0.001, 0.0011, 0.004, 0.05, 1.0, 10000.0)) == [0, 2, 3, 5, 6, 7]
+
+    def test_concurrent_record(self):
+        histogram = Histogram()
+
+        def record():
+            for _ in range(5000):
+                histogram.record(0.01)
+
+        threads = [threading.Thread(target=record) for _ in range(4)]
+        [t.start() for t in threads]
+        [t.join() for t in threads]
+        assert histogram.count == 20000
+        assert sum(histogram.snapshot()[0]) == 20000
+
+
+class TestMetricsRegistry(object):
+    def test_render(self):
+        registry = MetricsRegistry()
+        registry.describe('test_duration_seconds', 'histogram', 'A test histogram')
+        registry.observe('test_duration_seconds', 0.003, field='labbook', parent_type='Query')
+        registry.observe('test_duration_seconds', 0.2, parent_type='Query', field='labbook')
+        registry.increment('test_total', 2, path='a "quoted"\nname')
+
+        lines = registry.render().split('\n')
+        assert '# HELP test_duration_seconds A test histogram' in lines
+        assert '# TYPE test_duration_seconds histogram' in lines
+        assert 'test_duration_seconds_bucket{field="labbook",parent_type="Query",le="0.001"} 0' in lines
+        assert 'test_duration_seconds_bucket{field="labbook",parent_type="Query",le="0.005"} 1' in lines
+        assert 'test_duration_seconds_bucket{field="labbook",parent_type="Query",le="0.25"} 2' in lines
+        assert 'test_duration_seconds_bucket{field="labbook",parent_type="Query",le="+Inf"} 2' in lines
+        assert 'test_duration_seconds_count{field="labbook",parent_type="Query"} 2' in lines
+        assert '# TYPE test_total counter' in lines
+        assert 'test_total{path="a \\"quoted\\"\\nname"} 2' in lines
+
+        registry.reset()
+        assert registry.render() == '\n'
+
+    def test_max_series(self):
+        registry = MetricsRegistry(max_series=3)
+        for i in range(10):
+            registry.increment('test_total', operation=f'op{i}')
+        assert registry.counter('test_total', operation='op0').value == 1
+        assert registry.counter('test_total', operation='op2').value == 1
+        assert registry.counter('test_total', operation='__other__').value == 7
+
+    def test_get_instance(self, mock_config_file):
+        registry = MetricsRegistry.get_instance()
+        assert registry is not None
+        assert MetricsRegistry.get_instance() is registry
+
+
+class TestProcessCounters(object):
+    def test_git_subcommand(self):
+        assert _git_subcommand(['git', 'status', '--porcelain=v2']) == 'status'
+        assert _git_subcommand(['/usr/bin/git', '-C', '/tmp', '-c', 'a=b', '--literal-pathspecs', 'rm']) == 'rm'
+        assert _git_subcommand(['git']) == ''
+        assert _git_subcommand(['ls', '-l']) is None
+        assert _git_subcommand('git status') is None
+
+    def test_counters(self):
+        registry = MetricsRegistry()
+        install_process_counters(registry)
+
+        git_before = registry.counter(GIT_PROCESSES_METRIC, command='version').value
+        subprocess.run(['git', 'version'], stdout=subprocess.PIPE, check=True)
+        subprocess.run(['true'], check=True)
+        assert registry.counter(GIT_PROCESSES_METRIC, command='version').value == git_before + 1
+
+        client = redis.StrictRedis(db=7)
+        client.ping()
+        redis_before = registry.counter(REDIS_ROUND_TRIPS_METRIC).value
+        client.set('metrics-test', 1)
+        client.get('metrics-test')
+        pipeline = client.pipeline()
+        pipeline.get('metrics-test')
+        pipeline.delete('metrics-test')
+        pipeline.execute()
+        assert registry.counter(REDIS_ROUND_TRIPS_METRIC).value == redis_before + 3
+
+
+def helper_busy_wait(seconds: float) -> None:
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestSamplingProfiler(object):
+    def test_keep_slow_profiles(self, tmpdir):
+        profiler = SamplingProfiler(str(tmpdir), threshold=0.05, interval=0.001, max_profiles=2)
+
+        session = profiler.start()
+        assert profiler.stop(session, 'FastQuery') is None
+        assert profiler.list_profiles() == []
+
+        names = list()
+        for operation in ['First', 'Second', 'Third']:
+            session = profiler.start()
+            helper_busy_wait(0.06)
+            names.append(profiler.stop(session, operation))
+            time.sleep(0.002)
+
+        # Only the most recent profiles are kept
+        profiles = profiler.list_profiles()
+        assert [p['name'] for p in profiles] == [names[2], names[1]]
+        assert [p['operation'] for p in profiles] == ['Third', 'Second']
+        assert profiles[0]['duration_ms'] >= 60
+
+        with open(profiler.profile_path(names[2]), 'rt') as f:
+            lines = f.read().splitlines()
+        stack, count = lines[0].rsplit(' ', 1)
+        assert int(count) > 0
+        assert stack.split(';')[-1].startswith('helper_busy_wait (tests/test_metrics.py:')
+        assert stack.split(';')[-2].startswith('test_keep_slow_profiles (tests/test_metrics.py:')
+
+    def test_no_samples_after_stop(self, tmpdir):
+        profiler = SamplingProfiler(str(tmpdir), threshold=0, interval=0.0005)
+        session = profiler.start()
+        # A second session keeps the sampler running after the first one is stopped
+        other_session = profiler.start()
+        helper_busy_wait(0.02)
+
+        assert profiler.stop(session, 'Query') is not None
+        samples = session.stacks.copy()
+        helper_busy_wait(0.02)
+        assert session.stacks == samples
+        assert sum(other_session.stacks.values()) > sum(samples.values())
+        profiler.stop(other_session, 'Other')
+
+    def test_profile_path(self, tmpdir):
+        profiler = SamplingProfiler(str(tmpdir))
+        assert profiler.profile_path('../secret') is None
+        assert profiler.profile_path('1-1-Query-1.folded') is None
+        with open(os.path.join(str(tmpdir), '1-1-Query-1.folded'), 'wt') as f:
+            f.write('a;b 1\n')
+        assert profiler.profile_path('1-1-Query-1.folded') == os.path.join(str(tmpdir), '1-1-Query-1.folded')
+
+    def test_get_instance(self, mock_config_file):
+        # Profiling is opt-in
+        assert SamplingProfiler.get_instance() is None
@@ -0,0 +1,470 @@
+import os
+import shutil
+import stat
+import struct
+import threading
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_EXCEPTION, wait
+from typing import BinaryIO, Callable, Deque, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+# Callback to report progress, called with the number of bytes completed and the total number of bytes
+ProgressCallback = Callable[[int, int], None]
+
+# A namedtuple for a file, directory or symlink to write to an archive. `path` is where the content is read from and
+# `arcname` is the name in the archive (directory names end with a `/`). `compress` is False for content that is stored
+# as is.
+ArchiveEntry = NamedTuple('ArchiveEntry', [('path', str), ('arcname', str), ('mode', int), ('size', int),
+                                           ('mtime', float), ('compress', bool)])
+
+# Files with these extensions are already compressed (git packs contain zlib compressed objects), so they are stored
+STORED_EXTENSIONS = ('.pack', '.zip', '.lbk', '.gz', '.tgz', '.bz2', '.xz', '.zst', '.7z', '.png', '.jpg', '.jpeg',
+                     '.gif', '.mp3', '.mp4', '.mov', '.avi', '.mkv', '.parquet', '.snappy')
+
+# Zip format records, see https://pkware.cachefly.net/webdocs/casestudies/APPNOTE.TXT
+_LOCAL_HEADER = struct.Struct('<4s2B4HL2L2H')
+_CENTRAL_DIRECTORY_HEADER = struct.Struct('<4s4B4HL2L5H2L')
+_END_OF_CENTRAL_DIRECTORY = struct.Struct('<4s4H2LH')
+_ZIP64_END_OF_CENTRAL_DIRECTORY = struct.Struct('<4sQ2H2L4Q')
+_ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR = struct.Struct('<4sLQL')
+_DEFAULT_VERSION = 20
+_ZIP64_VERSION = 45
+_UNIX_SYSTEM = 3
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Directories (relative to the snapshot source) of content-addressed files, which are hard linked into snapshots
+IMMUTABLE_DIRS = (os.path.join('.git', 'objects') + os.sep, os.path.join('.git', 'lfs', 'objects') + os.sep)
+
+# Files that may change in place are copied into snapshots up to this size, and hard linked if larger
+SNAPSHOT_COPY_LIMIT = 16 * 1024 * 1024
+DEFAULT_COMPRESSION_LEVEL = 6
+
+# The deflate window, the amount of preceding data a compressed chunk can refer to
+_WINDOW_SIZE = 32 * 1024
+
+
+def default_workers() -> int:
+    return min(8, os.cpu_count() or 1)
+
+
+def is_compressible(file_name: str) -> bool:
+    """Check if a file is worth compressing, based on its extension"""
+    return not file_name.lower().endswith(STORED_EXTENSIONS)
+
+
+def _is_immutable(rel_path: str) -> bool:
+    """Check if a file is in a content-addressed store, where files are replaced but never changed in place"""
+    return rel_path.startswith(IMMUTABLE_DIRS)
+
+
+def snapshot_directory(source_dir: str, snapshot_dir: str, copy_limit: int = SNAPSHOT_COPY_LIMIT) \
+        -> List[ArchiveEntry]:
+    """Snapshot a directory into another directory by hard linking and copying its files
+
+    Linking only writes metadata, so it is fast regardless of the size of the files, but a link shares its content
+    with the source. Files in git's object stores are never changed in place, so they are always linked. Other files
+    can be (e.g. by an editor's autosave), so they are copied unless they are larger than `copy_limit`. Files are
+    copied anyway if they can't be linked (e.g. across filesystems).
+
+    Large files that were linked can still change after the snapshot. `ParallelZipWriter` checks the size and
+    modification time of every file as it archives it, and fails instead of writing a file that changed.
+
+    Args:
+        source_dir: Directory to snapshot
+        snapshot_dir: Empty directory to snapshot into. A directory with the same name as `source_dir` is created in it.
+        copy_limit: Size in bytes above which files that may change are linked instead of copied
+
+    Returns:
+        list of ArchiveEntry for the snapshot, in the order they should be archived
+    """
+    source_dir = os.path.normpath(source_dir)
+    base_name = os.path.basename(source_dir)
+    snapshot_root = os.path.join(snapshot_dir, base_name)
+    can_link = True
+
+    entries = list()
+    for dir_path, dir_names, file_names in os.walk(source_dir):
+        dir_names.sort()
+        rel_dir = os.path.relpath(dir_path, source_dir)
+        target_dir = snapshot_root if rel_dir == '.' else os.path.join(snapshot_root, rel_dir)
+        arc_dir = base_name if rel_dir == '.' else f"{base_name}/{rel_dir.replace(os.sep, '/')}"
+
+        os.makedirs(target_dir)
+        dir_stat = os.stat(dir_path)
+        entries.append(ArchiveEntry(path=target_dir, arcname=f"{arc_dir}/", mode=dir_stat.st_mode, size=0,
+                                    mtime=dir_stat.st_mtime, compress=False))
+
+        # Symlinks to directories are listed as directories, but are not followed by os.walk
+        link_names = [d for d in dir_names if os.path.islink(os.path.join(dir_path, d))]
+        for name in sorted(file_names + link_names):
+            source = os.path.join(dir_path, name)
+            target = os.path.join(target_dir, name)
+            st = os.lstat(source)
+            if stat.S_ISLNK(st.st_mode):
+                os.symlink(os.readlink(source), target)
+                size = len(os.fsencode(os.readlink(source)))
+            elif stat.S_ISREG(st.st_mode):
+                rel_path = name if rel_dir == '.' else os.path.join(rel_dir, name)
+                link = can_link and (st.st_size > copy_limit or _is_immutable(rel_path))
+                if link:
+                    try:
+                        os.link(source, target)
+                    except OSError:
+                        logger.info(f"Cannot hard link into {snapshot_dir}, copying files to snapshot instead")
+                        can_link = link = False
+                if not link:
+                    shutil.copy2(source, target)
+                st = os.lstat(target)
+                size = st.st_size
+            else:
+                # Sockets, fifos, etc. can't be archived
+                continue
+
+            entries.append(ArchiveEntry(path=target, arcname=f"{arc_dir}/{name}", mode=st.st_mode, size=size,
+                                        mtime=st.st_mtime, compress=is_compressible(name)))
+
+    return entries
+
+
+def _deflate_chunk(data: bytes, level: int, preceding: bytes, final: bool) -> bytes:
+    """Compress a chunk of a file to raw deflate data that continues the data of the preceding chunks
+
+    Chunks are flushed to a byte boundary without marking the end of the stream, so compressed chunks can be
+    concatenated. The end of the preceding chunk is used as a dictionary so matches can span chunks.
+    """
+    if preceding:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=preceding)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _dos_date_time(mtime: float) -> Tuple[int, int]:
+    t = time.localtime(max(mtime, 315532800))
+    year = min(max(t.tm_year, 1980), 2107)
+    return (year - 1980) << 9 | t.tm_mon << 5 | t.tm_mday, t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2
+
+
+class _EntryState(object):
+    """State of an archive entry while it is written"""
+    def __init__(self, entry: ArchiveEntry, compress_type: int) -> None:
+        self.entry = entry
+        self.name = entry.arcname.encode('utf-8')
+        self.compress_type = compress_type
+        # Sizes can't be known in advance (files can still change), so the local header has room for zip64 sizes
+        # whenever they could exceed the limit
+        self.zip64 = entry.size * 1.05 > zipfile.ZIP64_LIMIT
+        self.crc = 0
+        self.file_size = 0
+        self.compress_size = 0
+        self.header_offset = 0
+
+
+class ParallelZipWriter(object):
+    """Writes a zip archive, compressing with multiple threads
+
+    Files are read sequentially in chunks, which are compressed by a pool of threads and written in order as they
+    complete, so large files are compressed in parallel and memory use is bounded. The archive is a standard zip
+    archive (with zip64 extensions where needed), compatible with `unzip` and the `zipfile` module.
+    """
+    def __init__(self, workers: Optional[int] = None, compression_level: int = DEFAULT_COMPRESSION_LEVEL,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self.workers = workers or default_workers()
+        self.compression_level = compression_level
+        self.chunk_size = chunk_size
+        # Maximum number of chunks being compressed or waiting to be written
+        self.max_pending = self.workers * 4
+
+        self._central_directory: List[bytes] = list()
+        self._completed_bytes = 0
+        self._total_bytes = 0
+        self._progress_callback: Optional[ProgressCallback] = None
+
+    def write(self, entries: List[ArchiveEntry], output_path: str,
+              progress_callback: Optional[ProgressCallback] = None) -> None:
+        """Method to write entries to a new zip archive
+
+        Args:
+            entries: Entries to write, in order
+            output_path: Path of the archive to create
+            progress_callback: Optional callback to report the number of bytes of file content written
+
+        Returns:
+            None
+        """
+        self._central_directory = list()
+        self._completed_bytes = 0
+        self._total_bytes = sum(e.size for e in entries)
+        self._progress_callback = progress_callback
+
+        pending: Deque[Tuple[_EntryState, Union[Future, bytes], int, bool, bool]] = deque()
+        with open(output_path, 'wb') as archive_file, ThreadPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                for entry in entries:
+                    for item in self._entry_chunks(entry, pool):
+                        pending.append(item)
+                        while len(pending) > self.max_pending:
+                            self._write_chunk(archive_file, *pending.popleft())
+
+                while pending:
+                    self._write_chunk(archive_file, *pending.popleft())
+
+                self._write_end_of_archive(archive_file)
+            except BaseException:
+                for item in pending:
+                    if isinstance(item[1], Future):
+                        item[1].cancel()
+                raise
+
+    def _entry_chunks(self, entry: ArchiveEntry, pool: ThreadPoolExecutor) \
+            -> Iterator[Tuple[_EntryState, Union[Future, bytes], int, bool, bool]]:
+        """Generate (state, data, raw size, first, last) tuples for the chunks of an entry, where data is the
+        compressed data or a future for it"""
+        if stat.S_ISDIR(entry.mode):
+            yield _EntryState(entry, zipfile.ZIP_STORED), b'', 0, True, True
+            return
+
+        if stat.S_ISLNK(entry.mode):
+            state = _EntryState(entry, zipfile.ZIP_STORED)
+            target = os.fsencode(os.readlink(entry.path))
+            state.crc = zlib.crc32(target)
+            state.file_size = len(target)
+            yield state, target, len(target), True, True
+            return
+
+        compress = entry.compress
+        state = _EntryState(entry, zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
+        with open(entry.path, 'rb') as src:
+            data = src.read(self.chunk_size)
+            first = True
+            preceding = b''
+            while True:
+                # Read ahead to know if this is the last chunk, which ends the compressed stream
+                next_data = src.read(self.chunk_size)
+                last = not next_data
+                state.crc = zlib.crc32(data, state.crc)
+                state.file_size += len(data)
+                if compress:
+                    chunk: Union[Future, bytes] = pool.submit(_deflate_chunk, data, self.compression_level,
+                                                              preceding, last)
+                    preceding = data[-_WINDOW_SIZE:]
+                else:
+                    chunk = data
+                yield state, chunk, len(data), first, last
+
+                if last:
+                    # A snapshot may hard link a large file, which could have been changed in place since
+                    st = os.fstat(src.fileno())
+                    if state.file_size != entry.size or st.st_size != entry.size or st.st_mtime != entry.mtime:
+                        raise ValueError(f"{entry.arcname} changed while it was archived")
+                    return
+                first = False
+                data = next_data
+
+    def _write_chunk(self, archive_file: BinaryIO, state: _EntryState, chunk: Union[Future, bytes], raw_size: int,
+                     first: bool, last: bool) -> None:
+        data = chunk.result() if isinstance(chunk, Future) else chunk
+        if first:
+            self._write_local_header(archive_file, state)
+        archive_file.write(data)
+        state.compress_size += len(data)
+
+        if last:
+            self._finish_entry(archive_file, state)
+
+        if raw_size:
+            self._completed_bytes += raw_size
+            if self._progress_callback:
+                self._progress_callback(self._completed_bytes, self._total_bytes)
+
+    def _write_local_header(self, archive_file: BinaryIO, state: _EntryState) -> None:
+        state.header_offset = archive_file.tell()
+        flags = 0x800 if not state.entry.arcname.isascii() else 0
+        date, dos_time = _dos_date_time(state.entry.mtime)
+        if state.zip64:
+            extra = struct.pack('<HHQQ', 1, 16, 0, 0)
+            sizes = 0xFFFFFFFF
+        else:
+            extra = b''
+            sizes = 0
+        header = _LOCAL_HEADER.pack(b'PK\x03\x04', _ZIP64_VERSION if state.zip64 else _DEFAULT_VERSION, 0, flags,
+                                    state.compress_type, dos_time, date, 0, sizes, sizes, len(state.name), len(extra))
+        archive_file.write(header + state.name + extra)
+
+    def _finish_entry(self, archive_file: BinaryIO, state: _EntryState) -> None:
+        """Fill in the CRC and sizes in the local header, and add the entry to the central directory"""
+        if not state.zip64 and max(state.file_size, state.compress_size) > zipfile.ZIP64_LIMIT:
+            raise ValueError(f"{state.entry.arcname} changed size while it was archived")
+
+        end = archive_file.tell()
+        archive_file.seek(state.header_offset + 14)
+        if state.zip64:
+            archive_file.write(struct.pack('<L', state.crc))
+            archive_file.seek(state.header_offset + 30 + len(state.name) + 4)
+            archive_file.write(struct.pack('<QQ', state.file_size, state.compress_size))
+        else:
+            archive_file.write(struct.pack('<LLL', state.crc, state.compress_size, state.file_size))
+        archive_file.seek(end)
+
+        # Only values that don't fit are stored in the zip64 extra field, in this order
+        zip64_values = list()
+        file_size, compress_size, header_offset = state.file_size, state.compress_size, state.header_offset
+        if file_size > zipfile.ZIP64_LIMIT:
+            zip64_values.append(file_size)
+            file_size = 0xFFFFFFFF
+        if compress_size > zipfile.ZIP64_LIMIT:
+            zip64_values.append(compress_size)
+            compress_size = 0xFFFFFFFF
+        if header_offset > zipfile.ZIP64_LIMIT:
+            zip64_values.append(header_offset)
+            header_offset = 0xFFFFFFFF
+        extra = struct.pack(f'<HH{len(zip64_values)}Q', 1, 8 * len(zip64_values), *zip64_values) \
+            if zip64_values else b''
+
+        version = _ZIP64_VERSION if (zip64_values or state.zip64) else _DEFAULT_VERSION
+        external_attr = (state.entry.mode & 0xFFFF) << 16
+        if stat.S_ISDIR(state.entry.mode):
+            # MS-DOS directory flag
+            external_attr |= 0x10
+        flags = 0x800 if not state.entry.arcname.isascii() else 0
+        date, dos_time = _dos_date_time(state.entry.mtime)
+        record = _CENTRAL_DIRECTORY_HEADER.pack(b'PK\x01\x02', version, _UNIX_SYSTEM, version, 0, flags,
+                                                state.compress_type, dos_time, date, state.crc, compress_size,
+                                                file_size, len(state.name), len(extra), 0, 0, 0, external_attr,
+                                                header_offset)
+        self._central_directory.append(record + state.name + extra)
+
+    def _write_end_of_archive(self, archive_file: BinaryIO) -> None:
+        offset = archive_file.tell()
+        for record in self._central_directory:
+            archive_file.write(record)
+        size = archive_file.tell() - offset
+        count = len(self._central_directory)
+
+        if count > zipfile.ZIP_FILECOUNT_LIMIT or offset > zipfile.ZIP64_LIMIT or size > zipfile.ZIP64_LIMIT:
+            zip64_offset = archive_file.tell()
+            archive_file.write(_ZIP64_END_OF_CENTRAL_DIRECTORY.pack(b'PK\x06\x06', 44, _ZIP64_VERSION, _ZIP64_VERSION,
+                                                                    0, 0, count, count, size, offset))
+            archive_file.write(_ZIP64_END_OF_CENTRAL_DIRECTORY_LOCATOR.pack(b'PK\x06\x07', 0, zip64_offset, 1))
+            count = min(count, 0xFFFF)
+            size = min(size, 0xFFFFFFFF)
+            offset = min(offset, 0xFFFFFFFF)
+
+        archive_file.write(_END_OF_CENTRAL_DIRECTORY.pack(b'PK\x05\x06', 0, 0, count, count, size, offset, 0))
+
+
+def _member_name(info: zipfile.ZipInfo) -> str:
+    """Get the normalized name of an archive member, rejecting names that would be written outside the destination"""
+    name = info.filename
+    if info.create_system == 0:
+        # Archives created on Windows may use backslashes
+        name = name.replace('\\', '/')
+
+    parts = [p for p in name.split('/') if p not in ('', '.')]
+    if name.startswith('/') or not parts or '..' in parts or ':' in parts[0]:
+        raise ValueError(f"Invalid path in archive: {info.filename}")
+    return '/'.join(parts) + ('/' if name.endswith('/') else '')
+
+
+def _member_mode(info: zipfile.ZipInfo) -> int:
+    mode = info.external_attr >> 16
+    if info.create_system != 3 or not stat.S_IFMT(mode):
+        # No unix permissions were stored
+        mode = (stat.S_IFDIR | 0o755) if info.is_dir() else (stat.S_IFREG | 0o644)
+    return mode
+
+
+def extract_zip(archive_path: str, dest_dir: str, progress_callback: Optional[ProgressCallback] = None,
+                validate_names: Optional[Callable[[List[str]], None]] = None, workers: Optional[int] = None,
+                chunk_size: int = DEFAULT_CHUNK_SIZE) -> List[str]:
+    """Extract a zip archive, decompressing files in parallel
+
+    The archive is validated before anything is extracted, using its central directory: member paths must stay
+    inside the destination, there must be enough free disk space, and `validate_names` can check the archive's
+    structure. Each member is then validated as it is extracted (its CRC, and its size is limited to its declared
+    size), and extraction stops at the first failure.
+
+    Args:
+        archive_path: Path to the zip archive
+        dest_dir: Directory to extract into, created if needed
+        progress_callback: Optional callback to report the number of bytes extracted
+        validate_names: Optional callback that is passed the normalized member names, and raises to reject the archive
+        workers: Number of threads to extract with
+        chunk_size: Number of bytes to read and write at a time
+
+    Returns:
+        list of the normalized names of the extracted members
+    """
+    with zipfile.ZipFile(archive_path) as zf:
+        members = [(info, _member_name(info)) for info in zf.infolist()]
+        names = [name for _, name in members]
+        if validate_names:
+            validate_names(names)
+
+        os.makedirs(dest_dir, exist_ok=True)
+        total_bytes = sum(info.file_size for info, _ in members)
+        if shutil.disk_usage(dest_dir).free < total_bytes:
+            raise ValueError(f"Not enough free disk space to extract {total_bytes} bytes")
+
+        dest_root = os.path.realpath(dest_dir)
+        progress_lock = threading.Lock()
+        completed_bytes = 0
+
+        def report(num_bytes: int) -> None:
+            nonlocal completed_bytes
+            with progress_lock:
+                completed_bytes += num_bytes
+                if progress_callback:
+                    progress_callback(completed_bytes, total_bytes)
+
+        def extract_member(info: zipfile.ZipInfo, name: str) -> None:
+            target = os.path.join(dest_root, *name.split('/'))
+            mode = _member_mode(info)
+            if stat.S_ISLNK(mode):
+                link = zf.read(info).decode('utf-8')
+                resolved = os.path.normpath(os.path.join(os.path.dirname(target), link))
+                if os.path.isabs(link) or os.path.commonpath([dest_root, resolved]) != dest_root:
+                    raise ValueError(f"Invalid symlink in archive: {info.filename} -> {link}")
+                os.symlink(link, target)
+                report(info.file_size)
+                return
+
+            with zf.open(info) as src, open(target, 'wb') as dst:
+                while True:
+                    data = src.read(chunk_size)
+                    if not data:
+                        break
+                    dst.write(data)
+                    report(len(data))
+            os.chmod(target, stat.S_IMODE(mode))
+            mtime = time.mktime(info.date_time + (0, 0, -1))
+            os.utime(target, (mtime, mtime))
+
+        # Directories are created first, so files can be extracted in any order
+        for info, name in members:
+            if name.endswith('/'):
+                os.makedirs(os.path.join(dest_root, *name.split('/')), exist_ok=True)
+            else:
+                os.makedirs(os.path.join(dest_root, *name.split('/')[:-1]), exist_ok=True)
+
+        with ThreadPoolExecutor(max_workers=workers or default_workers()) as pool:
+            futures = [pool.submit(extract_member, info, name) for info, name in members if not name.endswith('/')]
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                # Raises the first failure
+                future.result()
+
+        for info, name in members:
+            if name.endswith('/'):
+                os.chmod(os.path.join(dest_root, *name.split('/')), stat.S_IMODE(_member_mode(info)) | 0o700)
+
+    return names
@@ -0,0 +1,192 @@
+import datetime
+import os
+from typing import Optional
+
+import redis
+
+from gtmcore.configuration import Configuration
+from gtmcore.configuration.utils import call_subprocess
+from gtmcore.dispatcher import Dispatcher
+from gtmcore.inventory import Repository
+from gtmcore.inventory.branching import BranchManager
+from gtmcore.logging import LMLogger
+
+logger = LMLogger.get_logger()
+
+
+class FetchScheduler(object):
+    """Class to keep the remote tracking branches of recently viewed repositories up to date in the background
+
+    Pages showing how far a repository is ahead of or behind its remote used to run `git fetch` while resolving the
+    request. Instead, viewing a repository dispatches a background fetch if the last one is older than the
+    repository's fetch interval, and the ahead/behind counts are computed from the tracking branches as they are,
+    along with the time of the last fetch so the staleness can be shown.
+
+    The interval adapts to how often the remote changes: it is reset to `min_interval` when a fetch updated a
+    tracking branch, and doubled (up to `max_interval`) when it didn't. Repositories that are not viewed are not
+    fetched. The interval of each repository is stored in redis, and the time of the last fetch is the modification
+    time of `FETCH_HEAD`, so fetches done by a sync are taken into account.
+    """
+    KEY_PREFIX = "REMOTE-FETCH"
+
+    # Seconds a dispatched fetch is considered in progress, so it is not dispatched again
+    CLAIM_TIMEOUT = 600
+
+    def __init__(self, config: Optional[Configuration] = None) -> None:
+        fetch_config = (config or Configuration()).config['remote_fetch']
+        self.enabled: bool = fetch_config['enabled']
+        self.min_interval: int = fetch_config['min_interval']
+        self.max_interval: int = fetch_config['max_interval']
+
+        self._redis_client: Optional[redis.StrictRedis] = None
+
+    @property
+    def redis_client(self) -> redis.StrictRedis:
+        """Property to get a redis client for fetch state
+
+        Returns:
+            redis.StrictRedis
+        """
+        if not self._redis_client:
+            self._redis_client = redis.StrictRedis(db=1)
+        return self._redis_client
+
+    def _key(self, repository: Repository) -> str:
+        return f"{self.KEY_PREFIX}|{os.path.abspath(repository.root_dir)}"
+
+    def _claim_key(self, repository: Repository) -> str:
+        return f"{self._key(repository)}|claim"
+
+    @staticmethod
+    def _fetch_head_path(repository: Repository) -> str:
+        git_dir = os.path.join(repository.root_dir, '.git')
+        if not os.path.isdir(git_dir):
+            # Submodules keep their git directory in the parent repository
+            return call_subprocess(['git', 'rev-parse', '--git-path', 'FETCH_HEAD'], cwd=repository.root_dir).strip()
+        return os.path.join(git_dir, 'FETCH_HEAD')
+
+    def last_fetched(self, repository: Repository) -> Optional[datetime.datetime]:
+        """Method to get when the remote of a repository was last fetched
+
+        Args:
+            repository: Subject Repository
+
+        Returns:
+            timezone aware UTC datetime, or None if it has never been fetched
+        """
+        try:
+            mtime = os.path.getmtime(self._fetch_head_path(repository))
+        except FileNotFoundError:
+            return None
+        return datetime.datetime.fromtimestamp(mtime, tz=datetime.timezone.utc)
+
+    def interval(self, repository: Repository) -> int:
+        """Method to get the current fetch interval of a repository
+
+        Args:
+            repository: Subject Repository
+
+        Returns:
+            seconds
+        """
+        try:
+            value = self.redis_client.get(self._key(repository))
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to read fetch interval of {str(repository)}: {err}")
+            value = None
+        return int(value) if value is not None else self.min_interval
+
+    def is_due(self, repository: Repository) -> bool:
+        """Method to check if the remote of a repository should be fetched again
+
+        Args:
+            repository: Subject Repository
+
+        Returns:
+            bool
+        """
+        if not self.enabled or not BranchManager(repository).refs.has_remote:
+            return False
+
+        last_fetched = self.last_fetched(repository)
+        if last_fetched is None:
+            return True
+        age = datetime.datetime.now(tz=datetime.timezone.utc) - last_fetched
+        return age.total_seconds() >= self.interval(repository)
+
+    def claim(self, repository: Repository) -> bool:
+        """Method to mark a fetch of the repository as scheduled, if one is due
+
+        Args:
+            repository: Subject Repository
+
+        Returns:
+            True if a fetch is due and was not already scheduled, and the caller should now dispatch it
+        """
+        if not self.is_due(repository):
+            return False
+
+        try:
+            return bool(self.redis_client.set(self._claim_key(repository), 1, nx=True, ex=self.CLAIM_TIMEOUT))
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to claim fetch of {str(repository)}: {err}")
+            return False
+
+    def release(self, repository: Repository) -> None:
+        """Method to mark a scheduled fetch of the repository as finished
+
+        Args:
+            repository: Subject Repository
+
+        Returns:
+            None
+        """
+        try:
+            self.redis_client.delete(self._claim_key(repository))
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to release fetch claim of {str(repository)}: {err}")
+
+    def dispatch(self, repository: Repository) -> Optional[str]:
+        """Method to dispatch a claimed fetch of the repository to a background job
+
+        Git credentials must already be configured if the remote requires them.
+
+        Args:
+            repository: Subject Repository
+
+        Returns:
+            Key of the dispatched job, or None if it could not be dispatched
+        """
+        # Imported here to avoid a circular import, as background jobs depend on the workflows package
+        import gtmcore.dispatcher.jobs as jobs
+
+        try:
+            job_key = Dispatcher().dispatch_task(jobs.fetch_repository_remote, kwargs={'repository': repository},
+                                                 metadata={'method': 'fetch_repository_remote'})
+            return str(job_key)
+        except Exception as err:
+            self.release(repository)
+            logger.warning(f"Failed to schedule fetch of {str(repository)}: {err}")
+            return None
+
+    def fetch(self, repository: Repository) -> bool:
+        """Method to fetch the remote of a repository and adapt its fetch interval
+
+        Args:
+            repository: Subject Repository
+
+        Returns:
+            True if a remote tracking branch changed
+        """
+        bm = BranchManager(repository)
+        before = bm.refs.remote
+        bm.fetch()
+        changed = bm.refs.remote != before
+
+        interval = self.min_interval if changed else min(self.interval(repository) * 2, self.max_interval)
+        try:
+            # The interval is forgotten once a repository hasn't been fetched for a while
+            self.redis_client.set(self._key(repository), interval, ex=self.max_interval * 4)
+        except redis.exceptions.RedisError as err:
+            logger.warning(f"Failed to store fetch interval of {str(repository)}: {err}")
+        return changed
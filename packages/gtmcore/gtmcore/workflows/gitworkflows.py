@@ -49,9 +49,13 @@ class GitWorkflow(ABC):
     def import_from_remote(cls, remote: RepoLocation, username: str) -> 'GitWorkflow':
         pass
 
-    def garbagecollect(self):
-        """ Run a `git gc` on the repository. """
-        gitworkflows_utils.git_garbage_collect(self.repository)
+    def schedule_maintenance(self) -> Optional[str]:
+        """ Schedule incremental maintenance of the repository in a background job, which runs once it is idle.
+
+        Returns:
+            Key of the dispatched job, or None if maintenance was already scheduled
+        """
+        return gitworkflows_utils.schedule_repository_maintenance(self.repository)
 
     def publish(self, username: str, access_token: Optional[str] = None, remote: str = "origin",
                 public: bool = False, feedback_callback: Callable = lambda _ : None,
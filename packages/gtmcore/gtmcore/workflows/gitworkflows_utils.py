@@ -4,9 +4,11 @@ import os
 import shutil
 import uuid
 import requests
-from typing import Any, Optional, Callable, List
+from typing import Any, Dict, Optional, Callable, List
 
 from gtmcore.gitlib import RepoLocation
+from gtmcore.gitlib.maintenance import RepositoryMaintenance
+from gtmcore.gitlib.partial_clone import clone_arguments
 from gtmcore.workflows.gitlab import GitLabManager, GitLabException
 from gtmcore.activity import ActivityStore, ActivityType, ActivityRecord, \
                              ActivityDetailType, ActivityDetailRecord, \
@@ -22,7 +24,7 @@ from gtmcore.logging import LMLogger
 from gtmcore.configuration.utils import call_subprocess
 from gtmcore.inventory.branching import BranchManager, MergeError
 from gtmcore.configuration import Configuration
-from gtmcore.dispatcher import Dispatcher
+from gtmcore.dispatcher import Dispatcher, JobKey, default_redis_conn
 import gtmcore.dispatcher.dataset_jobs
 
 
@@ -36,28 +38,51 @@ class WorkflowsException(Exception):
     pass
 
 
-# TODO #1456: Subprocess calls to Git should be consolidated in the internal Git API - currently git_fs_shim.py
-def git_garbage_collect(repository: Repository) -> None:
-    """Run "git gc" (garbage collect) over the repo. If run frequently enough, this only takes a short time
-    even on large repos.
+def maintain_repository(repository: Repository, idle: bool = False,
+                        feedback_callback: Optional[Callable] = None) -> List[str]:
+    """Run the incremental maintenance tasks that are due on the repo. When not idle, only tasks that have exceeded
+    their foreground thresholds are run, so this is usually a no-op.
 
     Note!! This method assumes the subject repository has already been locked!
 
     Args:
         repository: Subject Repository
+        idle: Run all due tasks, for use when no user operation is waiting on the repository
+        feedback_callback: Optional callback to give user-facing feedback
 
     Returns:
-        None
+        List of the maintenance tasks that completed
+    """
+    return RepositoryMaintenance(repository.root_dir, config=repository.client_config).maintain(
+        idle=idle, feedback_callback=feedback_callback)
 
-    Raises:
-        subprocess.CalledProcessError when git gc fails.
-        """
-    logger.info(f"Running git gc (Garbage Collect) in {str(repository)}...")
+
+def schedule_repository_maintenance(repository: Repository) -> Optional[str]:
+    """Dispatch a background job to run the incremental maintenance tasks that are due on the repo, unless one is
+    already scheduled. The job waits for the repository to be idle (unlocked).
+
+    Args:
+        repository: Subject Repository
+
+    Returns:
+        Key of the dispatched job, or None if no job was dispatched
+    """
+    maintenance = RepositoryMaintenance(repository.root_dir, config=repository.client_config)
+    if not maintenance.claim():
+        return None
+
+    # Imported here to avoid a circular import, as background jobs depend on this module
+    import gtmcore.dispatcher.jobs as jobs
 
     try:
-        call_subprocess(['git', 'gc'], cwd=repository.root_dir)
-    except subprocess.CalledProcessError:
-        logger.warning(f"Ignore `git gc` error - {str(repository)} repo remains unpruned")
+        job_metadata = {'method': 'run_repository_maintenance'}
+        job_key = Dispatcher().dispatch_task(jobs.run_repository_maintenance,
+                                             kwargs={'repository': repository}, metadata=job_metadata)
+        return str(job_key)
+    except Exception as err:
+        maintenance.release()
+        logger.warning(f"Failed to schedule git maintenance for {str(repository)}: {err}")
+        return None
 
 
 def create_remote_gitlab_repo(repository: Repository, username: str, visibility: str,
@@ -100,7 +125,7 @@ def publish_to_remote(repository: Repository, username: str, remote: str,
 
     current_server = repository.client_config.get_server_configuration()
     feedback_callback(f"Preparing to publish {repository.name} to {current_server.name}")
-    git_garbage_collect(repository)
+    maintain_repository(repository, feedback_callback=feedback_callback)
 
     # Try five attempts to fetch - the remote repo could have been created just milliseconds
     # ago, so may need a few moments to settle before it supports all the git operations.
@@ -167,10 +192,11 @@ def sync_branch(repository: Repository, username: Optional[str], override: str,
     if not repository.has_remote:
         return 0
     try:
-        repository.sweep_uncommitted_changes()
+        repository.sweep_uncommitted_changes(feedback_callback=feedback_callback)
 
         current_server = repository.client_config.get_server_configuration()
         feedback_callback(f"Preparing to sync {repository.name} with {current_server.name}.")
+        maintain_repository(repository, feedback_callback=feedback_callback)
         repository.git.fetch()
 
         bm = BranchManager(repository)
@@ -262,9 +288,21 @@ def migrate_labbook_branches(labbook: LabBook) -> None:
 
 
 # TODO #1456: Subprocess calls to Git should be consolidated in the internal Git API - currently git_fs_shim.py
-def _clone(remote_url: str, working_dir: str) -> str:
+def _clone(remote_url: str, working_dir: str, clone_mode: Optional[str] = None) -> str:
+    """Clone a remote repository into an empty working directory
+
+    Args:
+        remote_url: URL of the remote repository
+        working_dir: Empty directory to clone into
+        clone_mode: One of `partial_clone.CLONE_MODES`. Defaults to the configured `git.clone_mode`
 
-    clone_tokens = f"git clone --progress {remote_url}".split()
+    Returns:
+        Path to the cloned repository
+    """
+    git_config = Configuration().config['git']
+    clone_args = clone_arguments(clone_mode or git_config['clone_mode'], depth=git_config['clone_depth'])
+
+    clone_tokens = ['git', 'clone', '--progress'] + clone_args + [remote_url]
     call_subprocess(clone_tokens, cwd=working_dir)
 
     # Affirm there is only one directory created
@@ -292,14 +330,14 @@ def _clone(remote_url: str, working_dir: str) -> str:
 def clone_repo(remote_url: str, username: str, owner: str,
                load_repository: Callable[[str], Any],
                put_repository: Callable[[str, str, str], Any],
-               make_owner: bool = False) -> Repository:
+               make_owner: bool = False, clone_mode: Optional[str] = None) -> Repository:
 
     try:
         # Clone into a temporary directory, such that if anything
         # gets messed up, then this directory will be cleaned up.
         tempdir = os.path.join(Configuration().upload_dir, f"{username}_{owner}_clone_{uuid.uuid4().hex[0:10]}")
         os.makedirs(tempdir)
-        path = _clone(remote_url=remote_url, working_dir=tempdir)
+        path = _clone(remote_url=remote_url, working_dir=tempdir, clone_mode=clone_mode)
         candidate_repo = load_repository(path)
 
         if os.environ.get('WINDOWS_HOST'):
@@ -315,38 +353,80 @@ def clone_repo(remote_url: str, username: str, owner: str,
         raise GitLabException(e)
 
 
-def process_linked_datasets(labbook: LabBook, logged_in_username: str) -> None:
+def _linked_dataset_import_key(logged_in_username: str, dataset_owner: str, dataset_name: str) -> str:
+    return f"gigantum:linked-dataset-import:{logged_in_username}|{dataset_owner}|{dataset_name}"
+
+
+def release_linked_dataset_import(logged_in_username: str, dataset_owner: str, dataset_name: str) -> None:
+    """Method to release the claim on importing a linked dataset, made by `process_linked_datasets`
+
+    Args:
+        logged_in_username: the current logged in username
+        dataset_owner: Owner of the dataset
+        dataset_name: Name of the dataset
+
+    Returns:
+        None
+    """
+    default_redis_conn().delete(_linked_dataset_import_key(logged_in_username, dataset_owner, dataset_name))
+
+
+def process_linked_datasets(labbook: LabBook, logged_in_username: str) -> Optional[JobKey]:
     """Method to update or init any linked dataset submodule references, clean up lingering files, and schedule
-    jobs to auto-import if needed
+    a job to auto-import any linked datasets that are missing
+
+    Datasets that are already in the user's inventory (e.g. because they are linked to another Project) are skipped
+    without dispatching a job, as are datasets being imported by a job for another Project. All missing datasets are
+    imported by a single job.
 
     Args:
         labbook: the labbook to analyze
         logged_in_username: the current logged in username
 
     Returns:
-
+        JobKey of the import job, or None if no datasets need to be imported
     """
     im = InventoryManager()
 
     # Update linked datasets inside the Project or clean them out if needed
     im.update_linked_datasets(labbook, logged_in_username)
 
-    # Check for linked datasets, and schedule auto-imports
-    d = Dispatcher()
-    datasets = im.get_linked_datasets(labbook)
-    for ds in datasets:
-        kwargs = {
-            'logged_in_username': logged_in_username,
-            'dataset_owner': ds.namespace,
-            'dataset_name': ds.name,
-            'remote_url': ds.remote,
-        }
-        metadata = {'dataset': f"{logged_in_username}|{ds.namespace}|{ds.name}",
-                    'method': 'dataset_jobs.check_and_import_dataset'}
+    existing = {(owner, name) for _, owner, name in im.list_repository_ids(logged_in_username, 'dataset')}
+    import_ttl = Configuration().config['datasets']['linked_import_timeout']
+    redis_conn = default_redis_conn()
+
+    datasets: List[Dict[str, str]] = list()
+    for ds in im.get_linked_datasets(labbook):
+        owner, remote_url = ds.namespace, ds.remote
+        if not owner or (owner, ds.name) in existing:
+            continue
+        if not remote_url:
+            logger.warning(f"Cannot import linked Dataset {owner}/{ds.name}, it has no remote")
+            continue
+        # Claim the import, so a job importing the same dataset for another Project isn't duplicated
+        claim_key = _linked_dataset_import_key(logged_in_username, owner, ds.name)
+        if not redis_conn.set(claim_key, labbook.key, nx=True, ex=import_ttl):
+            logger.info(f"Linked Dataset {owner}/{ds.name} is already being imported")
+            continue
+        datasets.append({'dataset_owner': owner, 'dataset_name': ds.name, 'remote_url': remote_url})
+
+    if not datasets:
+        return None
 
-        d.dispatch_task(gtmcore.dispatcher.dataset_jobs.check_and_import_dataset,
-                        kwargs=kwargs,
-                        metadata=metadata)
+    kwargs = {
+        'logged_in_username': logged_in_username,
+        'datasets': datasets,
+    }
+    metadata = {'labbook': labbook.key,
+                'method': 'dataset_jobs.import_linked_datasets'}
+    try:
+        return Dispatcher().dispatch_task(gtmcore.dispatcher.dataset_jobs.import_linked_datasets,
+                                          kwargs=kwargs,
+                                          metadata=metadata)
+    except Exception:
+        for d in datasets:
+            release_linked_dataset_import(logged_in_username, d['dataset_owner'], d['dataset_name'])
+        raise
 
 
 # TODO #1456: Subprocess calls to Git should be consolidated in the internal Git API - currently git_fs_shim.py
@@ -364,14 +444,14 @@ def call_git_subprocess(cmd_tokens: List[str], cwd: str, feedback_callback: Call
     Raises:
         subprocess.CalledProcessError
     """
-    output = ""
+    output = []
     with subprocess.Popen(cmd_tokens, cwd=cwd, shell=False,
                           stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, universal_newlines=True) as sp:
         for line in sp.stdout:  # type: ignore
             # Send each line to the feedback callback when it is available and also append
             # to the complete output (needed when a conflict occurs)
             feedback_callback(line)
-            output = f"{output}{line}"
+            output.append(line)
 
     if sp.returncode != 0:
         if MERGE_CONFLICT_STRING in line:
@@ -381,7 +461,7 @@ def call_git_subprocess(cmd_tokens: List[str], cwd: str, feedback_callback: Call
             #
             # When you do get a merge conflict, send the whole output back to the caller
             # so the output can be processed to find the conflicted files.
-            return output
+            return "".join(output)
         else:
             # An error occurred
             cmd = " ".join(cmd_tokens)
@@ -390,43 +470,3 @@ def call_git_subprocess(cmd_tokens: List[str], cwd: str, feedback_callback: Call
         # No error. Don't return output.
         return None
 
-
-def handle_git_feedback(current_feedback: Optional[str], message: str) -> str:
-    """Function to handle git output in a reasonable way for UI rendering for the user
-
-    Args:
-        current_feedback: current string of feedback stored in the background job
-        message: new message output from git
-
-    Returns:
-        string containing all messages separated by newlines
-    """
-    # We manage whitespace for git feedback in this function
-    message = message.strip()
-
-    if not current_feedback:
-        # This is the first line provided as feedback so just return the message.
-        return message
-
-    # Clean up some of the output that we know we want to ignore for now
-    # that isn't super useful to sent back to the user.
-    lines_to_skip = (".git/info/lfs.locksverify true",
-                     "Locking support detected on remote",
-                     "hint:")
-    if message.startswith(lines_to_skip):
-        return current_feedback
-
-    # Check if the new message is actually an update to the previous message (e.g. a progress indicator)
-    lines = current_feedback.split('\n')
-    last_line = lines[-1]
-    msg_parts = message.split(':')
-    if len(msg_parts) > 1:
-        # You might have a progress update vs. a new message
-        last_line_parts = last_line.split(':')
-        if len(msg_parts) == len(last_line_parts):
-            if msg_parts[0] == last_line_parts[0]:
-                # It's an update! Remove last line to update instead of just append
-                _ = lines.pop()
-
-    lines.append(message)
-    return "\n".join(lines)
@@ -0,0 +1,181 @@
+import os
+import shutil
+import stat
+import subprocess
+import tempfile
+import uuid
+import zipfile
+from typing import Dict, Tuple
+
+import pytest
+
+from gtmcore.workflows.archive import ParallelZipWriter, extract_zip, snapshot_directory
+
+
+@pytest.fixture()
+def mock_source_dir():
+    """A directory with a mix of compressible, incompressible, empty and executable files, and a symlink"""
+    root = os.path.join(tempfile.gettempdir(), uuid.uuid4().hex)
+    source = os.path.join(root, 'my-project')
+    os.makedirs(os.path.join(source, 'code', 'nested'))
+    os.makedirs(os.path.join(source, 'output', 'empty-dir'))
+
+    with open(os.path.join(source, 'code', 'notebook.ipynb'), 'wt') as f:
+        f.write('{"cells": []}\n' * 20000)
+    with open(os.path.join(source, 'code', 'nested', 'random.pack'), 'wb') as f:
+        f.write(os.urandom(300000))
+    with open(os.path.join(source, 'code', 'run.sh'), 'wt') as f:
+        f.write('#!/bin/bash\necho hi\n')
+    os.chmod(os.path.join(source, 'code', 'run.sh'), 0o755)
+    open(os.path.join(source, 'output', 'empty.txt'), 'wt').close()
+    os.symlink('../code/notebook.ipynb', os.path.join(source, 'output', 'link.ipynb'))
+
+    yield root, source
+    shutil.rmtree(root)
+
+
+def helper_write_archive(root: str, source: str, **kwargs) -> str:
+    snapshot_dir = os.path.join(root, 'snapshot')
+    os.makedirs(snapshot_dir)
+    entries = snapshot_directory(source, snapshot_dir)
+    archive_path = os.path.join(root, 'archive.zip')
+    ParallelZipWriter(**kwargs).write(entries, archive_path)
+    return archive_path
+
+
+def helper_tree(path: str) -> Dict[str, Tuple]:
+    tree: Dict[str, Tuple] = dict()
+    for dir_path, dir_names, file_names in os.walk(path):
+        for name in dir_names + file_names:
+            full_path = os.path.join(dir_path, name)
+            rel_path = os.path.relpath(full_path, path)
+            if os.path.islink(full_path):
+                tree[rel_path] = ('link', os.readlink(full_path))
+            elif os.path.isdir(full_path):
+                tree[rel_path] = ('dir',)
+            else:
+                with open(full_path, 'rb') as f:
+                    tree[rel_path] = ('file', f.read(), os.stat(full_path).st_mode & stat.S_IXUSR)
+    return tree
+
+
+class TestArchive(object):
+    def test_snapshot_links_files(self, mock_source_dir):
+        root, source = mock_source_dir
+        os.makedirs(os.path.join(source, '.git', 'objects', 'ab'))
+        with open(os.path.join(source, '.git', 'objects', 'ab', 'cdef'), 'wb') as f:
+            f.write(b'object')
+        snapshot_dir = os.path.join(root, 'snapshot')
+        os.makedirs(snapshot_dir)
+        entries = snapshot_directory(source, snapshot_dir, copy_limit=290000)
+
+        assert entries[0].arcname == 'my-project/'
+        names = [e.arcname for e in entries]
+        assert 'my-project/output/empty-dir/' in names
+        assert 'my-project/output/link.ipynb' in names
+
+        def same_file(rel_path: str) -> bool:
+            return os.stat(os.path.join(snapshot_dir, 'my-project', rel_path)).st_ino == \
+                os.stat(os.path.join(source, rel_path)).st_ino
+
+        # Git objects and files over the copy limit are linked, other files are copied
+        assert same_file(os.path.join('.git', 'objects', 'ab', 'cdef'))
+        assert same_file(os.path.join('code', 'nested', 'random.pack'))
+        assert not same_file(os.path.join('code', 'notebook.ipynb'))
+        assert not same_file(os.path.join('code', 'run.sh'))
+
+        # Changing a copied file in place doesn't change the snapshot
+        with open(os.path.join(source, 'code', 'notebook.ipynb'), 'wt') as f:
+            f.write('changed')
+        with open(os.path.join(snapshot_dir, 'my-project', 'code', 'notebook.ipynb'), 'rt') as f:
+            assert f.read().startswith('{"cells": []}')
+
+    def test_changed_linked_file_fails(self, mock_source_dir):
+        root, source = mock_source_dir
+        snapshot_dir = os.path.join(root, 'snapshot')
+        os.makedirs(snapshot_dir)
+        entries = snapshot_directory(source, snapshot_dir, copy_limit=0)
+
+        # A linked file changed in place after the snapshot can't be archived consistently
+        with open(os.path.join(source, 'code', 'notebook.ipynb'), 'at') as f:
+            f.write('more')
+        with pytest.raises(ValueError, match='notebook.ipynb changed while it was archived'):
+            ParallelZipWriter().write(entries, os.path.join(root, 'archive.zip'))
+
+    def test_archive_is_standard_zip(self, mock_source_dir):
+        root, source = mock_source_dir
+        # A small chunk size, so files are compressed in multiple chunks by multiple threads
+        archive_path = helper_write_archive(root, source, workers=4, chunk_size=64 * 1024)
+
+        with zipfile.ZipFile(archive_path) as zf:
+            assert zf.testzip() is None
+            infos = {info.filename: info for info in zf.infolist()}
+            assert infos['my-project/code/notebook.ipynb'].compress_type == zipfile.ZIP_DEFLATED
+            assert infos['my-project/code/notebook.ipynb'].compress_size < 10000
+            assert infos['my-project/code/nested/random.pack'].compress_type == zipfile.ZIP_STORED
+            with open(os.path.join(source, 'code', 'notebook.ipynb'), 'rb') as f:
+                assert zf.read('my-project/code/notebook.ipynb') == f.read()
+
+        subprocess.run(['unzip', '-tq', archive_path], check=True)
+
+    def test_round_trip(self, mock_source_dir):
+        root, source = mock_source_dir
+        archive_path = helper_write_archive(root, source, workers=3, chunk_size=32 * 1024)
+
+        progress = list()
+        dest = os.path.join(root, 'extracted')
+        names = extract_zip(archive_path, dest, chunk_size=16 * 1024,
+                            progress_callback=lambda done, total: progress.append((done, total)))
+
+        assert 'my-project/code/run.sh' in names
+        assert helper_tree(os.path.join(dest, 'my-project')) == helper_tree(source)
+        assert progress[-1][0] == progress[-1][1]
+        assert len(progress) > 10
+
+    def test_extract_unzip_archive(self, mock_source_dir):
+        root, source = mock_source_dir
+        archive_path = os.path.join(root, 'cli.zip')
+        subprocess.run(['zip', '-qry', archive_path, 'my-project'], cwd=root, check=True)
+
+        dest = os.path.join(root, 'extracted')
+        extract_zip(archive_path, dest)
+        assert helper_tree(os.path.join(dest, 'my-project')) == helper_tree(source)
+
+    def test_extract_rejects_unsafe_paths(self, mock_source_dir):
+        root, _ = mock_source_dir
+        dest = os.path.join(root, 'extracted')
+        for bad_name in ('../escape.txt', '/etc/escape.txt', 'a/../../escape.txt', 'C:/escape.txt'):
+            archive_path = os.path.join(root, 'bad.zip')
+            with zipfile.ZipFile(archive_path, 'w') as zf:
+                zf.writestr('ok.txt', 'ok')
+                zf.writestr(zipfile.ZipInfo(bad_name), 'bad')
+
+            with pytest.raises(ValueError):
+                extract_zip(archive_path, dest)
+            # Nothing is extracted from an invalid archive
+            assert not os.path.exists(dest)
+            assert not os.path.exists(os.path.join(root, 'escape.txt'))
+
+    def test_extract_rejects_escaping_symlink(self, mock_source_dir):
+        root, _ = mock_source_dir
+        archive_path = os.path.join(root, 'bad.zip')
+        info = zipfile.ZipInfo('project/link')
+        info.create_system = 3
+        info.external_attr = (stat.S_IFLNK | 0o777) << 16
+        with zipfile.ZipFile(archive_path, 'w') as zf:
+            zf.writestr(info, '../../outside')
+
+        with pytest.raises(ValueError):
+            extract_zip(archive_path, os.path.join(root, 'extracted'))
+        assert not os.path.lexists(os.path.join(root, 'extracted', 'project', 'link'))
+
+    def test_extract_validate_names(self, mock_source_dir):
+        root, source = mock_source_dir
+        archive_path = helper_write_archive(root, source)
+
+        def validate(names):
+            raise ValueError(f"rejected {len(names)} names")
+
+        with pytest.raises(ValueError, match='rejected'):
+            extract_zip(archive_path, os.path.join(root, 'extracted'), validate_names=validate)
+        assert not os.path.exists(os.path.join(root, 'extracted'))
@@ -4,14 +4,30 @@ import shutil
 import tempfile
 import subprocess
 import os
+import zipfile
 from pkg_resources import resource_filename
 
 from gtmcore.inventory.inventory  import InventoryManager, InventoryException
 from gtmcore.configuration import Configuration
+from gtmcore.dataset import Manifest
 from gtmcore.workflows import ZipExporter, ZipWorkflowException
+from gtmcore.workflows.zipworkflow import OBJECT_PACK_DIR
 
 from gtmcore.fixtures import (mock_config_file, mock_labbook_lfs_disabled,
                               sample_src_file, helper_create_remote_repo as _MOCK_create_remote_repo)
+from gtmcore.fixtures.datasets import helper_append_file
+
+
+def helper_create_dataset_with_files(username: str):
+    ds = InventoryManager().create_dataset(username, username, 'dataset-with-files', 'gigantum_object_v1')
+    m = Manifest(ds, username)
+    os.makedirs(os.path.join(m.cache_mgr.cache_root, m.dataset_revision, "other_dir"))
+    helper_append_file(m.cache_mgr.cache_root, m.dataset_revision, "test1.txt", "test content 1")
+    helper_append_file(m.cache_mgr.cache_root, m.dataset_revision, "other_dir/test2.txt", "test content 2")
+    # Same content as test1.txt, so it is stored as the same object
+    helper_append_file(m.cache_mgr.cache_root, m.dataset_revision, "other_dir/copy.txt", "test content 1")
+    m.sweep_all_changes()
+    return ds, m
 
 
 class TestDatasetImportZipping(object):
@@ -126,3 +142,57 @@ class TestDatasetImportZipping(object):
             assert 'unittester' == InventoryManager().query_owner(lb2)
             assert lb2.is_repo_clean
             assert lb2.active_branch == 'master'
+
+    def test_export_import_with_object_pack(self, mock_config_file):
+        ds, m = helper_create_dataset_with_files('unittester')
+
+        with tempfile.TemporaryDirectory() as tempd:
+            path = ZipExporter.export_dataset(ds.root_dir, tempd, username='unittester')
+            with zipfile.ZipFile(path) as zf:
+                objects = [n for n in zf.namelist() if n.startswith(f'{OBJECT_PACK_DIR}/')]
+            assert sorted(objects) == sorted({f"{OBJECT_PACK_DIR}/{m.manifest[p]['h']}"
+                                              for p in ['test1.txt', 'other_dir/test2.txt']})
+
+            newds = ZipExporter.import_dataset(path, 'unittester2', 'unittester2')
+            assert newds.is_repo_clean
+
+            new_m = Manifest(newds, 'unittester2')
+            assert new_m.cache_mgr.cache_root != m.cache_mgr.cache_root
+            for rel_path, content in [('test1.txt', 'test content 1'), ('other_dir/test2.txt', 'test content 2'),
+                                      ('other_dir/copy.txt', 'test content 1')]:
+                assert os.path.isfile(new_m.dataset_to_object_path(rel_path))
+                with open(os.path.join(new_m.current_revision_dir, rel_path), 'rt') as f:
+                    assert f.read() == content
+            assert len(new_m.status().modified) == 0
+
+    def test_export_requested_paths_and_metadata_only(self, mock_config_file):
+        ds, m = helper_create_dataset_with_files('unittester')
+
+        with tempfile.TemporaryDirectory() as tempd:
+            path = ZipExporter.export_dataset(ds.root_dir, tempd, username='unittester', paths=['other_dir/test2.txt'])
+            with zipfile.ZipFile(path) as zf:
+                objects = [n for n in zf.namelist() if n.startswith(f'{OBJECT_PACK_DIR}/')]
+            assert objects == [f"{OBJECT_PACK_DIR}/{m.manifest['other_dir/test2.txt']['h']}"]
+            os.remove(path)
+
+            path = ZipExporter.export_dataset(ds.root_dir, tempd, username='unittester', metadata_only=True)
+            with zipfile.ZipFile(path) as zf:
+                assert not [n for n in zf.namelist() if n.startswith(f'{OBJECT_PACK_DIR}/')]
+                assert f'{ds.name}/manifest/' in zf.namelist()
+
+    def test_import_discards_corrupt_objects(self, mock_config_file):
+        ds, m = helper_create_dataset_with_files('unittester')
+
+        with tempfile.TemporaryDirectory() as tempd:
+            path = ZipExporter.export_dataset(ds.root_dir, tempd, username='unittester')
+            bad_hash = m.manifest['other_dir/test2.txt']['h']
+            tampered = os.path.join(tempd, 'tampered.zip')
+            with zipfile.ZipFile(path) as src, zipfile.ZipFile(tampered, 'w') as dst:
+                for info in src.infolist():
+                    data = b'not the content' if info.filename == f'{OBJECT_PACK_DIR}/{bad_hash}' else src.read(info)
+                    dst.writestr(info, data)
+
+            newds = ZipExporter.import_dataset(tampered, 'unittester2', 'unittester2')
+            new_m = Manifest(newds, 'unittester2')
+            assert os.path.isfile(new_m.dataset_to_object_path('test1.txt'))
+            assert not os.path.exists(new_m.dataset_to_object_path('other_dir/test2.txt'))
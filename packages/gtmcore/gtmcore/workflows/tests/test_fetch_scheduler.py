@@ -0,0 +1,94 @@
+import os
+import subprocess
+
+import pytest
+
+from gtmcore.dispatcher import jobs
+from gtmcore.inventory.branching import BranchManager
+from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.workflows.fetch_scheduler import FetchScheduler
+from gtmcore.fixtures import mock_config_file, helper_create_remote_repo
+
+
+@pytest.fixture()
+def mock_published_labbook(mock_config_file):
+    lb = InventoryManager().create_labbook('test', 'test', 'labbook1', description='fetching')
+    helper_create_remote_repo(lb, 'test', None, None)
+    yield lb, FetchScheduler(lb.client_config)
+
+
+def helper_age_last_fetch(lb) -> None:
+    fetch_head = os.path.join(lb.root_dir, '.git', 'FETCH_HEAD')
+    if os.path.exists(fetch_head):
+        os.utime(fetch_head, (0, 0))
+
+
+def helper_push_remote_commit(lb, tmpdir, filename: str) -> None:
+    """Commit to the remote from another clone"""
+    clone_dir = str(tmpdir.join(filename))
+    subprocess.run(['git', 'clone', lb.remote, clone_dir], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with open(os.path.join(clone_dir, filename), 'wt') as f:
+        f.write('remote change')
+    for args in [['add', filename], ['-c', 'user.name=test', '-c', 'user.email=test@test.com', 'commit', '-m', 'Remote'],
+                 ['push', 'origin', 'master']]:
+        subprocess.run(['git', *args], cwd=clone_dir, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+class TestFetchScheduler(object):
+    def test_not_due_without_remote(self, mock_config_file):
+        lb = InventoryManager().create_labbook('test', 'test', 'labbook1', description='fetching')
+        scheduler = FetchScheduler(lb.client_config)
+        assert scheduler.last_fetched(lb) is None
+        assert scheduler.is_due(lb) is False
+        assert scheduler.claim(lb) is False
+
+    def test_claim(self, mock_published_labbook):
+        lb, scheduler = mock_published_labbook
+        helper_age_last_fetch(lb)
+        assert scheduler.is_due(lb) is True
+
+        assert scheduler.claim(lb) is True
+        assert scheduler.claim(lb) is False
+        scheduler.release(lb)
+        assert scheduler.claim(lb) is True
+        scheduler.release(lb)
+
+        scheduler.fetch(lb)
+        assert scheduler.last_fetched(lb) is not None
+        assert scheduler.is_due(lb) is False
+        assert scheduler.claim(lb) is False
+
+    def test_adaptive_interval(self, mock_published_labbook, tmpdir):
+        lb, scheduler = mock_published_labbook
+        assert scheduler.interval(lb) == scheduler.min_interval
+
+        assert scheduler.fetch(lb) is False
+        assert scheduler.interval(lb) == scheduler.min_interval * 2
+        for _ in range(10):
+            scheduler.fetch(lb)
+        assert scheduler.interval(lb) == scheduler.max_interval
+
+        helper_push_remote_commit(lb, tmpdir, 'remote1.txt')
+        assert BranchManager(lb).get_commits_ahead_behind() == (0, 0)
+        assert scheduler.fetch(lb) is True
+        assert scheduler.interval(lb) == scheduler.min_interval
+        assert BranchManager(lb).get_commits_ahead_behind() == (0, 1)
+
+    def test_fetch_job(self, mock_published_labbook, tmpdir):
+        lb, scheduler = mock_published_labbook
+        helper_push_remote_commit(lb, tmpdir, 'remote1.txt')
+
+        helper_age_last_fetch(lb)
+        assert scheduler.claim(lb) is True
+        assert jobs.fetch_repository_remote(lb) is True
+        assert BranchManager(lb).get_commits_behind() == 1
+        # The claim is released by the job
+        helper_age_last_fetch(lb)
+        assert scheduler.claim(lb) is True
+        scheduler.release(lb)
+
+        # Skipped while the repository is locked
+        helper_push_remote_commit(lb, tmpdir, 'remote2.txt')
+        with lb.lock():
+            assert jobs.fetch_repository_remote(lb) is False
+        assert BranchManager(lb).get_commits_behind() == 1
@@ -23,13 +23,19 @@ from gtmcore.fixtures import (helper_create_remote_repo as _MOCK_create_remote_r
                               mock_config_file)
 from gtmcore.inventory.branching import BranchManager, MergeError
 
-from gtmcore.dispatcher import Dispatcher
+from gtmcore.dispatcher import Dispatcher, JobProgressRecord
 import gtmcore.dispatcher.dataset_jobs
 from gtmcore.dataset.manifest import Manifest
 from gtmcore.fixtures.datasets import helper_append_file
 from gtmcore.dataset.io.manager import IOManager
 
 
+def helper_progress(completed_bytes: int) -> JobProgressRecord:
+    """Progress of a background file transfer job, as reported to its progress channel"""
+    return JobProgressRecord(feedback=None, percent_complete=None, completed_bytes=completed_bytes, has_failures=None,
+                             failure_detail=None, updated_at=None)
+
+
 def _mock_fetch(self, remote):
     assert isinstance(remote, str)
     pass
@@ -160,15 +166,14 @@ class TestGitWorkflowsMethods(object):
         """ test importing a project with a linked dataset"""
         def dispatcher_mock(self, function_ref, kwargs, metadata):
             assert kwargs['logged_in_username'] == 'other-test-user2'
-            assert kwargs['dataset_owner'] == 'testuser'
-            assert kwargs['dataset_name'] == 'test-ds'
+            assert [(d['dataset_owner'], d['dataset_name']) for d in kwargs['datasets']] == [('testuser', 'test-ds')]
 
             # Stop patching so job gets scheduled for real
             dispatcher_patch.stop()
 
             # Call same method as in mutation
             d = Dispatcher()
-            res = d.dispatch_task(gtmcore.dispatcher.dataset_jobs.check_and_import_dataset,
+            res = d.dispatch_task(gtmcore.dispatcher.dataset_jobs.import_linked_datasets,
                                   kwargs=kwargs, metadata=metadata)
 
             return res
@@ -225,15 +230,14 @@ class TestGitWorkflowsMethods(object):
         """ test syncing a project that pulls in a linked dataset"""
         def dispatcher_mock(self, function_ref, kwargs, metadata):
             assert kwargs['logged_in_username'] == 'other-test-user2'
-            assert kwargs['dataset_owner'] == 'testuser'
-            assert kwargs['dataset_name'] == 'test-ds'
+            assert [(d['dataset_owner'], d['dataset_name']) for d in kwargs['datasets']] == [('testuser', 'test-ds')]
 
             # Stop patching so job gets scheduled for real
             dispatcher_patch.stop()
 
             # Call same method as in mutation
             d = Dispatcher()
-            res = d.dispatch_task(gtmcore.dispatcher.dataset_jobs.check_and_import_dataset,
+            res = d.dispatch_task(gtmcore.dispatcher.dataset_jobs.import_linked_datasets,
                                   kwargs=kwargs, metadata=metadata)
 
             return res
@@ -298,15 +302,14 @@ class TestGitWorkflowsMethods(object):
         """ test checking out a branch in a project that pulls in a linked dataset"""
         def dispatcher_mock(self, function_ref, kwargs, metadata):
             assert kwargs['logged_in_username'] == 'other-test-user2'
-            assert kwargs['dataset_owner'] == 'testuser'
-            assert kwargs['dataset_name'] == 'test-ds'
+            assert [(d['dataset_owner'], d['dataset_name']) for d in kwargs['datasets']] == [('testuser', 'test-ds')]
 
             # Stop patching so job gets scheduled for real
             dispatcher_patch.stop()
 
             # Call same method as in mutation
             d = Dispatcher()
-            res = d.dispatch_task(gtmcore.dispatcher.dataset_jobs.check_and_import_dataset,
+            res = d.dispatch_task(gtmcore.dispatcher.dataset_jobs.import_linked_datasets,
                                   kwargs=kwargs, metadata=metadata)
 
             return res
@@ -639,8 +642,8 @@ class TestGitWorkflowsMethods(object):
             assert failure_detail is None
 
         def dispatch_query_mock(self, job_key):
-            JobStatus = namedtuple("JobStatus", ['status', 'meta'])
-            return JobStatus(status='finished', meta={'completed_bytes': '500'})
+            JobStatus = namedtuple("JobStatus", ['status', 'meta', 'progress'])
+            return JobStatus(status='finished', meta={}, progress=helper_progress(500))
 
         def dispatch_mock(self, method_reference, kwargs, metadata, persist):
                 return "afakejobkey"
@@ -673,8 +676,8 @@ class TestGitWorkflowsMethods(object):
             assert failure_detail is None
 
         def dispatch_query_mock(self, job_key):
-            JobStatus = namedtuple("JobStatus", ['status', 'meta'])
-            return JobStatus(status='finished', meta={'completed_bytes': '100'})
+            JobStatus = namedtuple("JobStatus", ['status', 'meta', 'progress'])
+            return JobStatus(status='finished', meta={}, progress=helper_progress(100))
 
         def dispatch_mock(self, method_reference, kwargs, metadata, persist):
                 return "afakejobkey"
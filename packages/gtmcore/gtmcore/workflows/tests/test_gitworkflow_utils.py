@@ -1,64 +1,44 @@
-from gtmcore.workflows.gitworkflows_utils import handle_git_feedback
+from mock import patch
 
-
-class TestGitWorkflowsUtils(object):
-    def test_handle_git_feedback_first_msg(self):
-        current_feedback = ""
-        message = "my first message"
-
-        output = handle_git_feedback(current_feedback, message)
-
-        assert output == "my first message"
-
-    def test_handle_git_feedback_append(self):
-        current_feedback = ""
-        msg1 = "my first message"
-        msg2 = "my second message"
-
-        current_feedback = handle_git_feedback(current_feedback, msg1)
-        assert current_feedback == "my first message"
-        current_feedback = handle_git_feedback(current_feedback, msg2)
-        assert current_feedback == "my first message\nmy second message"
-
-    def test_handle_git_feedback_skip(self):
-        current_feedback = ""
-        msg1 = "my first message"
-        msg2 = "Locking support detected on remote"
-        msg3 = ".git/info/lfs.locksverify true"
-        msg4 = "hint: asdfasdf"
-        msg5 = "my second message"
-
-        current_feedback = handle_git_feedback(current_feedback, msg1)
-        assert current_feedback == "my first message"
-        current_feedback = handle_git_feedback(current_feedback, msg2)
-        assert current_feedback == "my first message"
-        current_feedback = handle_git_feedback(current_feedback, msg3)
-        assert current_feedback == "my first message"
-        current_feedback = handle_git_feedback(current_feedback, msg4)
-        assert current_feedback == "my first message"
-        current_feedback = handle_git_feedback(current_feedback, msg5)
-        assert current_feedback == "my first message\nmy second message"
-
-    def test_handle_git_feedback_update(self):
-        current_feedback = ""
-        msg1 = "my first message"
-        msg2 = "my second message"
-        msg3 = "progress: 1"
-        msg4 = "progress: 2"
-        msg5 = "progress: 3"
-        msg6 = "my last message"
-
-        current_feedback = handle_git_feedback(current_feedback, msg1)
-        assert current_feedback == "my first message"
-        current_feedback = handle_git_feedback(current_feedback, msg2)
-        assert current_feedback == "my first message\nmy second message"
-        current_feedback = handle_git_feedback(current_feedback, msg3)
-        assert current_feedback == "my first message\nmy second message\nprogress: 1"
-        current_feedback = handle_git_feedback(current_feedback, msg4)
-        assert current_feedback == "my first message\nmy second message\nprogress: 2"
-        current_feedback = handle_git_feedback(current_feedback, msg5)
-        assert current_feedback == "my first message\nmy second message\nprogress: 3"
-        current_feedback = handle_git_feedback(current_feedback, msg6)
-        assert current_feedback == "my first message\nmy second message\nprogress: 3\nmy last message"
+from gtmcore.dispatcher import Dispatcher, JobKey
+from gtmcore.inventory.inventory import InventoryManager
+from gtmcore.workflows.gitworkflows_utils import process_linked_datasets, release_linked_dataset_import
+from gtmcore.fixtures import mock_config_file, helper_create_remote_repo
 
 
+class TestGitWorkflowsUtils(object):
+    def test_process_linked_datasets_dedupes_imports(self, mock_config_file):
+        im = InventoryManager()
+        lb = im.create_labbook('test', 'test', 'labbook1', description="my first project")
+        lb2 = im.create_labbook('test', 'test', 'labbook2', description="my second project")
+        for name in ['dataset100', 'dataset101']:
+            ds = im.create_dataset('test', 'test', name, "gigantum_object_v1", description="my dataset")
+            helper_create_remote_repo(ds, 'test', None, None)
+            im.link_dataset_to_labbook(ds.remote, 'test', name, lb, 'test')
+            im.link_dataset_to_labbook(ds.remote, 'test', name, lb2, 'test')
+        im.delete_dataset('test', 'test', 'dataset101')
+
+        dispatched = list()
+
+        def dispatch_task_mock(self, method_reference, kwargs, metadata):
+            dispatched.append((method_reference.__name__, kwargs, metadata))
+            return JobKey(f"rq:job:{len(dispatched)}")
+
+        with patch.object(Dispatcher, 'dispatch_task', dispatch_task_mock):
+            job_key = process_linked_datasets(lb, 'test')
+            # The dataset is already being imported for the first Project
+            assert process_linked_datasets(lb2, 'test') is None
+
+        # Only the missing dataset is imported, by a single job
+        assert job_key is not None
+        assert len(dispatched) == 1
+        method_name, kwargs, metadata = dispatched[0]
+        assert method_name == 'import_linked_datasets'
+        assert [d['dataset_name'] for d in kwargs['datasets']] == ['dataset101']
+        assert metadata['labbook'] == lb.key
+
+        # Once the import job is done, it can be scheduled again
+        release_linked_dataset_import('test', 'test', 'dataset101')
+        with patch.object(Dispatcher, 'dispatch_task', dispatch_task_mock):
+            assert process_linked_datasets(lb2, 'test') is not None
+        release_linked_dataset_import('test', 'test', 'dataset101')
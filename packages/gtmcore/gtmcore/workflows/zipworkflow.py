@@ -1,4 +1,8 @@
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from hashlib import blake2b
 
 from tempfile import TemporaryDirectory
 from typing import Optional, Callable, List, cast
@@ -8,11 +12,18 @@ from gtmcore.configuration.utils import call_subprocess
 from gtmcore.inventory.inventory import InventoryManager, Repository
 from gtmcore.labbook import LabBook
 from gtmcore.dataset import Dataset
+from gtmcore.dataset.manifest import Manifest
 from gtmcore.logging import LMLogger
 from gtmcore.workflows import gitworkflows_utils
+from gtmcore.workflows.archive import ArchiveEntry, ParallelZipWriter, ProgressCallback, default_workers, \
+    extract_zip, is_compressible, snapshot_directory
 
 logger = LMLogger.get_logger()
 
+# Top level directory of the object pack in a Dataset archive. The pack contains the content of the Dataset's files
+# from the object cache, named by content hash, so each distinct file is stored once.
+OBJECT_PACK_DIR = '.objects'
+
 
 class ZipWorkflowException(GigantumException):
     pass
@@ -23,52 +34,199 @@ class ZipExporter(object):
 
     @classmethod
     def _export_zip(cls, repo: Repository, export_directory: str,
-                    config_file: Optional[str] = None, ) -> str:
+                    progress_callback: Optional[ProgressCallback] = None,
+                    extra_entries: Optional[Callable[[Repository], List[ArchiveEntry]]] = None) -> str:
+        """Method to export a repository to a zip archive
+
+        The repository is only locked while it is snapshotted (see `snapshot_directory`), and the archive is then
+        compressed from the snapshot with multiple threads, so other operations on the repository aren't blocked for
+        the duration of the export. The lock is shared, so concurrent exports don't wait for each other.
+
+        Args:
+            repo: Repository to export
+            export_directory: Directory to write the archive to
+            progress_callback: Optional callback to report the number of bytes compressed
+            extra_entries: Optional callback to list additional entries to archive, called while the repository is
+                           locked
+
+        Returns:
+            str
+        """
         if not os.path.isdir(export_directory):
             os.makedirs(export_directory, exist_ok=True)
 
-        repo_dir, _ = repo.root_dir.rsplit(os.path.sep, 1)
+        # The snapshot is made next to the archive, so files can be hard linked unless exports are on another volume
+        with TemporaryDirectory(dir=export_directory, prefix='.snapshot-') as snapshot_dir:
+            with repo.lock(shared=True):
+                repo_zip_name = f'{repo.name}-{repo.git.commit_hash[:6]}'
+                entries = snapshot_directory(repo.root_dir, snapshot_dir)
+                if extra_entries:
+                    entries.extend(extra_entries(repo))
 
-        repo_zip_name = f'{repo.name}-' \
-                      f'{repo.git.log()[0]["commit"][:6]}'
-        zip_path = f'{repo_zip_name}.zip'
-        exported_path = os.path.join(export_directory, zip_path)
-
-        try:
-            # zip data using subprocess - NOTE! Python zipfile library does not work correctly.
-            call_subprocess(['zip', '-r', exported_path, os.path.basename(repo.root_dir)],
-                            cwd=repo_dir, check=True)
-            assert os.path.exists(exported_path)
-            return exported_path
-        except:
+            exported_path = os.path.join(export_directory, f'{repo_zip_name}.zip')
             try:
-                os.remove(exported_path)
+                ParallelZipWriter().write(entries, exported_path, progress_callback=progress_callback)
+                return exported_path
             except:
-                pass
-            raise
+                try:
+                    os.remove(exported_path)
+                except:
+                    pass
+                raise
 
     @classmethod
-    def export_labbook(cls, labbook_path: str, lb_export_directory: str) -> str:
+    def export_labbook(cls, labbook_path: str, lb_export_directory: str,
+                       progress_callback: Optional[ProgressCallback] = None) -> str:
         try:
             labbook = InventoryManager().load_labbook_from_directory(labbook_path)
-            return cls._export_zip(labbook, lb_export_directory)
+            return cls._export_zip(labbook, lb_export_directory, progress_callback=progress_callback)
         except Exception as e:
             logger.error(e)
             raise ZipWorkflowException(e)
 
+    @staticmethod
+    def _dataset_object_entries(dataset: Repository, username: str,
+                                paths: Optional[List[str]] = None) -> List[ArchiveEntry]:
+        """Method to list the objects in the cache for a Dataset's files, to archive in the object pack
+
+        Files with the same content share an object, so each object is listed once. Objects that have not been
+        downloaded to the cache are skipped.
+
+        Args:
+            dataset: Dataset to export
+            username: Logged in username, used to locate the object cache
+            paths: Optional relative paths of the files and directories to include. All files are included if omitted.
+
+        Returns:
+            list of ArchiveEntry
+        """
+        manifest = Manifest(cast(Dataset, dataset), username)
+        prefixes = [p.strip('/') for p in paths] if paths is not None else None
+
+        entries = dict()
+        missing = 0
+        for rel_path, item in manifest.manifest.items():
+            if rel_path[-1] == '/' or item['h'] in entries:
+                continue
+            if prefixes is not None and not any(rel_path == p or rel_path.startswith(f'{p}/') for p in prefixes):
+                continue
+
+            level1, level2 = manifest._get_object_subdirs(item['h'])
+            object_path = os.path.join(manifest.cache_mgr.cache_root, 'objects', level1, level2, item['h'])
+            if not os.path.isfile(object_path):
+                missing += 1
+                continue
+
+            st = os.stat(object_path)
+            entries[item['h']] = ArchiveEntry(path=object_path, arcname=f"{OBJECT_PACK_DIR}/{item['h']}",
+                                              mode=st.st_mode, size=st.st_size, mtime=st.st_mtime,
+                                              compress=is_compressible(rel_path))
+
+        if missing:
+            logger.info(f"Exporting {dataset.name} without {missing} file(s) that are not in the local cache")
+        return list(entries.values())
+
     @classmethod
-    def export_dataset(cls, dataset_path: str, ds_export_directory: str) -> str:
+    def export_dataset(cls, dataset_path: str, ds_export_directory: str,
+                       progress_callback: Optional[ProgressCallback] = None, username: Optional[str] = None,
+                       metadata_only: bool = False, paths: Optional[List[str]] = None) -> str:
+        """Method to export a Dataset to a zip archive
+
+        Unless `metadata_only` is set, file contents are included in a deduplicated object pack, read directly from
+        the object cache. The object cache is per user, so file contents are only included if `username` is set.
+
+        Args:
+            dataset_path: Root directory of the Dataset
+            ds_export_directory: Directory to write the archive to
+            progress_callback: Optional callback to report the number of bytes compressed
+            username: Logged in username, used to locate the object cache
+            metadata_only: If True, only the Dataset repository (including its manifest) is exported
+            paths: Optional relative paths of the files and directories to include the contents of
+
+        Returns:
+            str
+        """
         try:
             dataset = InventoryManager().load_dataset_from_directory(dataset_path)
-            return cls._export_zip(dataset, ds_export_directory)
+            extra_entries = None
+            if username and not metadata_only:
+                # The namespace locates the Dataset's object cache
+                dataset.namespace = InventoryManager().query_owner(dataset)
+                extra_entries = partial(cls._dataset_object_entries, username=username, paths=paths)
+
+            return cls._export_zip(dataset, ds_export_directory, progress_callback=progress_callback,
+                                   extra_entries=extra_entries)
         except Exception as e:
             logger.error(e)
             raise ZipWorkflowException(e)
 
+    @staticmethod
+    def _import_dataset_objects(dataset: Repository, pack_dir: str, username: str) -> int:
+        """Method to move the objects in an extracted object pack into the Dataset's object cache, and link them into
+        the current revision
+
+        Each object's content is checked against its name, and objects that don't match are discarded (the file can
+        still be downloaded if the Dataset is published).
+
+        Args:
+            dataset: Imported Dataset
+            pack_dir: Directory the object pack was extracted to
+            username: Logged in username, used to locate the object cache
+
+        Returns:
+            int, the number of objects imported
+        """
+        def verify(object_path: str) -> bool:
+            h = blake2b()
+            with open(object_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    h.update(chunk)
+            return h.hexdigest() == os.path.basename(object_path)
+
+        object_names = sorted(os.listdir(pack_dir))
+        with ThreadPoolExecutor(max_workers=default_workers()) as pool:
+            valid = list(pool.map(verify, [os.path.join(pack_dir, name) for name in object_names]))
+
+        manifest = Manifest(cast(Dataset, dataset), username)
+        manifest.cache_mgr.initialize()
+        imported = 0
+        for name, is_valid in zip(object_names, valid):
+            if not is_valid:
+                logger.warning(f"Discarding object {name} imported into {dataset.name}, its content does not match")
+                continue
+
+            level1, level2 = manifest._get_object_subdirs(name)
+            object_dir = os.path.join(manifest.cache_mgr.cache_root, 'objects', level1, level2)
+            os.makedirs(object_dir, exist_ok=True)
+            if not os.path.isfile(os.path.join(object_dir, name)):
+                shutil.move(os.path.join(pack_dir, name), os.path.join(object_dir, name))
+            imported += 1
+
+        manifest.link_revision()
+        return imported
+
+    @staticmethod
+    def _repository_dir_name(names: List[str]) -> str:
+        """Get the name of the repository directory in an archive, checking there is only one"""
+        top_level = {name.split('/', 1)[0] for name in names if not name.startswith(f'{OBJECT_PACK_DIR}/')}
+        if len(top_level) != 1:
+            raise ValueError("Expected only one directory unzipped")
+        return top_level.pop()
+
+    @classmethod
+    def _validate_archive_names(cls, names: List[str]) -> None:
+        """Check that an archive contains a single repository directory, before anything is extracted"""
+        top = cls._repository_dir_name(names)
+        for required in ('.git', '.gigantum'):
+            if not any(name.startswith(f'{top}/{required}/') for name in names):
+                raise ValueError(f"Archive does not contain a Gigantum repository (missing {required})")
+
     @classmethod
     def _import_zip(cls, archive_path: str, username: str, owner: str,
                     fetch_method: Callable, put_method: Callable,
-                    update_meta: Callable = lambda _ : None) -> Repository:
+                    update_meta: Callable = lambda _ : None,
+                    progress_callback: Optional[ProgressCallback] = None,
+                    import_objects: Optional[Callable[[Repository, str], int]] = None) -> Repository:
 
         if not os.path.isfile(archive_path):
             raise ValueError(f'Archive at {archive_path} is not a file or does not exist')
@@ -81,13 +239,9 @@ class ZipExporter(object):
 
         # Unzip into a temporary directory and cleanup if fails
         with TemporaryDirectory() as temp_dir:
-            call_subprocess(['unzip', archive_path, '-d', 'project'],
-                            cwd=temp_dir, check=True)
-
-            pdirs = os.listdir(os.path.join(temp_dir, 'project'))
-            if len(pdirs) != 1:
-                raise ValueError("Expected only one directory unzipped")
-            unzipped_path = os.path.join(temp_dir, 'project', pdirs[0])
+            names = extract_zip(archive_path, os.path.join(temp_dir, 'project'),
+                                progress_callback=progress_callback, validate_names=cls._validate_archive_names)
+            unzipped_path = os.path.join(temp_dir, 'project', cls._repository_dir_name(names))
 
             repo = fetch_method(unzipped_path)
             statusmsg = f'{statusmsg}\nSetting up safe Git configuration...'
@@ -104,6 +258,12 @@ class ZipExporter(object):
 
             repo = put_method(unzipped_path, username=username, owner=owner)
 
+            pack_dir = os.path.join(temp_dir, 'project', OBJECT_PACK_DIR)
+            if import_objects and os.path.isdir(pack_dir):
+                statusmsg = f'{statusmsg}\nImporting file contents...'
+                update_meta(statusmsg)
+                import_objects(repo, pack_dir)
+
             statusmsg = f'{statusmsg}\nImport Complete'
             update_meta(statusmsg)
 
@@ -111,12 +271,13 @@ class ZipExporter(object):
 
     @classmethod
     def import_labbook(cls, archive_path: str, username: str, owner: str,
-                       update_meta: Callable = lambda _ : None) -> LabBook:
+                       update_meta: Callable = lambda _ : None,
+                       progress_callback: Optional[ProgressCallback] = None) -> LabBook:
         try:
             repo = cls._import_zip(archive_path, username, owner,
                                    fetch_method=InventoryManager().load_labbook_from_directory,
                                    put_method=InventoryManager().put_labbook,
-                                   update_meta=update_meta)
+                                   update_meta=update_meta, progress_callback=progress_callback)
             lb = cast(LabBook, repo)
             gitworkflows_utils.process_linked_datasets(lb, username)
             return lb
@@ -129,12 +290,14 @@ class ZipExporter(object):
 
     @classmethod
     def import_dataset(cls, archive_path: str, username: str, owner: str,
-                       update_meta: Callable = lambda _ : None) -> Dataset:
+                       update_meta: Callable = lambda _ : None,
+                       progress_callback: Optional[ProgressCallback] = None) -> Dataset:
         try:
             repo = cls._import_zip(archive_path, username, owner,
                                    fetch_method=InventoryManager().load_dataset_from_directory,
                                    put_method=InventoryManager().put_dataset,
-                                   update_meta=update_meta)
+                                   update_meta=update_meta, progress_callback=progress_callback,
+                                   import_objects=partial(cls._import_dataset_objects, username=username))
             return cast(Dataset, repo)
         except Exception as e:
             logger.error(e)